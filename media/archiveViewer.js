@@ -5,8 +5,11 @@
     const vscode = acquireVsCodeApi();
 
     // 状态管理
+    // 目录树按页加载：directories 保存已加载的目录（路径 -> { entries, total, loading }），根目录路径为空字符串；
+    // 搜索时 searchResults 保存结果列表，清空搜索后回到目录树
     let state = {
-        entries: [],
+        directories: new Map(),
+        searchResults: null,
         selectedEntry: null,
         expandedPaths: new Set()
     };
@@ -40,6 +43,10 @@
 
         // 刷新
         document.getElementById('refreshBtn').addEventListener('click', () => {
+            state.directories.clear();
+            state.expandedPaths.clear();
+            state.searchResults = null;
+            showLoading(true);
             vscode.postMessage({ command: 'refresh' });
         });
 
@@ -54,14 +61,17 @@
         const message = event.data;
 
         switch (message.type) {
-            case 'archiveEntries':
-                handleArchiveEntries(message.data);
+            case 'archiveSummary':
+                handleArchiveSummary(message.data);
+                break;
+            case 'directoryPage':
+                handleDirectoryPage(message.data);
                 break;
             case 'filePreview':
                 handleFilePreview(message);
                 break;
             case 'searchResults':
-                handleSearchResults(message.data);
+                handleSearchResults(message.data, message.total);
                 break;
             case 'error':
                 showError(message.message);
@@ -69,23 +79,90 @@
         }
     });
 
-    // 处理压缩包内容列表
-    function handleArchiveEntries(entries) {
+    // 处理压缩包概况
+    function handleArchiveSummary(summary) {
+        elements.fileCount.textContent = `${summary.fileCount} 文件, ${summary.dirCount} 目录`;
+        elements.archiveStats.textContent = `总大小: ${formatSize(summary.totalSize)}`;
+        updateStatus('就绪');
+    }
+
+    // 处理一页目录内容：offset 为 0 时替换，否则追加到已加载的子项之后
+    function handleDirectoryPage(page) {
         showLoading(false);
-        state.entries = entries;
+        const loaded = state.directories.get(page.path);
+        const entries = page.offset === 0 || !loaded ? page.entries : loaded.entries.concat(page.entries);
+        state.directories.set(page.path, { entries, total: page.total, loading: false });
+        if (!state.searchResults) {
+            renderDirectoryTree();
+        }
+    }
 
-        const fileCount = entries.filter(e => !e.isDirectory).length;
-        const dirCount = entries.filter(e => e.isDirectory).length;
-        const totalSize = entries.reduce((sum, e) => sum + (e.size || 0), 0);
+    // 请求目录的一页子项
+    function requestDirectory(path, offset) {
+        const loaded = state.directories.get(path);
+        if (loaded && loaded.loading) return;
+        state.directories.set(path, {
+            entries: loaded ? loaded.entries : [],
+            total: loaded ? loaded.total : 0,
+            loading: true
+        });
+        vscode.postMessage({ command: 'listDirectory', path: path, offset: offset });
+    }
 
-        elements.fileCount.textContent = `${fileCount} 文件, ${dirCount} 目录`;
-        elements.archiveStats.textContent = `总大小: ${formatSize(totalSize)}`;
-        updateStatus('就绪');
+    // 渲染按页加载的目录树
+    function renderDirectoryTree() {
+        elements.fileTree.innerHTML = renderDirectory('', 0);
+        bindTreeEvents();
+    }
 
-        renderFileTree(entries);
+    function renderDirectory(path, level) {
+        const dir = state.directories.get(path);
+        const padding = `padding-left: ${level * 16 + 8}px`;
+        if (!dir || (dir.loading && dir.entries.length === 0)) {
+            return `<div class="tree-item tree-loading" style="${padding}">加载中...</div>`;
+        }
+
+        let html = dir.entries.map(entry => {
+            let item = renderTreeItem(entry, level);
+            if (entry.isDirectory && state.expandedPaths.has(entry.path)) {
+                item += `<div class="tree-children">${renderDirectory(entry.path, level + 1)}</div>`;
+            }
+            return item;
+        }).join('');
+
+        if (dir.entries.length < dir.total) {
+            html += `
+                <div class="tree-item tree-more" data-dir="${escapeAttr(path)}" data-offset="${dir.entries.length}" style="${padding}">
+                    <span class="tree-name">${dir.loading ? '加载中...' : `加载更多（已显示 ${dir.entries.length} / ${dir.total}）`}</span>
+                </div>
+            `;
+        }
+        return html;
+    }
+
+    // 渲染单个树节点
+    function renderTreeItem(entry, level) {
+        const isExpanded = state.expandedPaths.has(entry.path);
+        const icon = entry.isDirectory
+            ? (typeof window.getFolderIcon === 'function' ? window.getFolderIcon(isExpanded) : Icons.folderClosed)
+            : getFileIcon(entry.name);
+        const detail = entry.isDirectory
+            ? (entry.childCount !== undefined ? `<span class="tree-size">${entry.childCount} 项</span>` : '')
+            : `<span class="tree-size">${formatSize(entry.size || 0)}</span>`;
+
+        return `
+            <div class="tree-item ${state.selectedEntry === entry.path ? 'selected' : ''}" 
+                 data-path="${escapeAttr(entry.path)}" 
+                 data-is-dir="${entry.isDirectory}"
+                 style="padding-left: ${level * 16 + 8}px">
+                <span class="tree-icon">${icon}</span>
+                <span class="tree-name">${escapeHtml(entry.name)}</span>
+                ${detail}
+            </div>
+        `;
     }
 
-    // 渲染文件树
+    // 渲染搜索结果（结果数量有上限，一次性构建成树）
     function renderFileTree(entries) {
         const tree = buildTree(entries);
         elements.fileTree.innerHTML = renderTreeNode(tree, 0);
@@ -118,7 +195,7 @@
         return root;
     }
 
-    // 渲染树节点
+    // 渲染搜索结果树的节点
     function renderTreeNode(node, level) {
         const children = Object.values(node.children);
 
@@ -131,26 +208,10 @@
         });
 
         return children.map(child => {
-            const isExpanded = state.expandedPaths.has(child.path);
-            const icon = child.isDirectory
-                ? (typeof window.getFolderIcon === 'function' ? window.getFolderIcon(isExpanded) : Icons.folderClosed)
-                : getFileIcon(child.name);
-
-            let html = `
-                <div class="tree-item ${state.selectedEntry === child.path ? 'selected' : ''}" 
-                     data-path="${child.path}" 
-                     data-is-dir="${child.isDirectory}"
-                     style="padding-left: ${level * 16 + 8}px">
-                    <span class="tree-icon">${icon}</span>
-                    <span class="tree-name">${child.name}</span>
-                    ${!child.isDirectory ? `<span class="tree-size">${formatSize(child.size || 0)}</span>` : ''}
-                </div>
-            `;
-
-            if (child.isDirectory && isExpanded) {
+            let html = renderTreeItem(child, level);
+            if (child.isDirectory && state.expandedPaths.has(child.path)) {
                 html += `<div class="tree-children">${renderTreeNode(child, level + 1)}</div>`;
             }
-
             return html;
         }).join('');
     }
@@ -166,7 +227,14 @@
 
     // 绑定树事件
     function bindTreeEvents() {
-        elements.fileTree.querySelectorAll('.tree-item').forEach(item => {
+        elements.fileTree.querySelectorAll('.tree-more').forEach(item => {
+            item.addEventListener('click', () => {
+                requestDirectory(item.dataset.dir, parseInt(item.dataset.offset, 10));
+                renderDirectoryTree();
+            });
+        });
+
+        elements.fileTree.querySelectorAll('.tree-item[data-path]').forEach(item => {
             item.addEventListener('click', () => {
                 const path = item.dataset.path;
                 const isDir = item.dataset.isDir === 'true';
@@ -193,7 +261,14 @@
         } else {
             state.expandedPaths.add(path);
         }
-        renderFileTree(state.entries);
+        if (state.searchResults) {
+            renderFileTree(state.searchResults);
+            return;
+        }
+        if (state.expandedPaths.has(path) && !state.directories.has(path)) {
+            requestDirectory(path, 0);
+        }
+        renderDirectoryTree();
     }
 
     // 选择文件
@@ -255,7 +330,15 @@
     // 搜索处理
     function handleSearch() {
         const query = elements.searchInput.value.trim();
-        if (!query) return;
+        if (!query) {
+            // 清空搜索后回到目录树
+            if (state.searchResults) {
+                state.searchResults = null;
+                updateStatus('就绪');
+                renderDirectoryTree();
+            }
+            return;
+        }
 
         vscode.postMessage({
             command: 'search',
@@ -267,7 +350,7 @@
     function handleLocalSearch() {
         const query = elements.searchInput.value.toLowerCase();
 
-        elements.fileTree.querySelectorAll('.tree-item').forEach(item => {
+        elements.fileTree.querySelectorAll('.tree-item[data-path]').forEach(item => {
             const name = item.querySelector('.tree-name').textContent.toLowerCase();
             const path = item.dataset.path.toLowerCase();
             const match = name.includes(query) || path.includes(query);
@@ -276,8 +359,11 @@
     }
 
     // 处理搜索结果
-    function handleSearchResults(entries) {
-        updateStatus(`找到 ${entries.length} 个匹配`);
+    function handleSearchResults(entries, total) {
+        state.searchResults = entries;
+        updateStatus(total > entries.length
+            ? `找到 ${total} 个匹配，显示前 ${entries.length} 个`
+            : `找到 ${entries.length} 个匹配`);
         renderFileTree(entries);
     }
 
@@ -298,6 +384,10 @@
         return div.innerHTML;
     }
 
+    function escapeAttr(text) {
+        return String(text).replace(/&/g, '&amp;').replace(/"/g, '&quot;').replace(/</g, '&lt;');
+    }
+
     function showLoading(show) {
         elements.loadingOverlay.style.display = show ? 'flex' : 'none';
     }
@@ -25,6 +25,8 @@
         dimensionPath: [], // 当前的维度路径 [0, 1, 2]
         tensorShape: [], // 当前张量的完整形状
         currentDepth: 0, // 当前深度
+        // 虚拟滚动表格状态（按窗口加载的二维视图）
+        grid: null,
         // 绘图状态
         plotParams: {
             chartType: 'line',
@@ -32,15 +34,32 @@
             yAxis: 1,
             showLegend: true,
             showGrid: true,
-            colorScheme: 'Viridis'
+            colorScheme: 'Viridis',
+            bins: 64,
+            binScale: 'linear'
         },
-        currentPlotData: null  // 当前绘图数据
+        currentPlotData: null,  // 当前绘图数据
+        plotKey: null,          // 当前绘图的张量，缩放时按它请求更精细的数据
+        plotZoomTimer: null,
+        // 检查点树：节点路径(JSON) -> { node, children, total, loading }，子节点按页懒加载
+        tree: new Map(),
+        treeExpanded: new Set(),
+        treeRows: [],       // 当前渲染的树节点行，按行号查找节点
+        pendingKey: null,   // 等待 describe 返回的张量键名
+        filterResults: null,    // 键名筛选的匹配结果（只有元数据），不为空时代替检查点树显示
+        filterTimer: null,
+        // 文件比较结果与表格排序
+        diff: null,
+        diffSort: { column: 'status', descending: false },
+        diffExpanded: new Set()
     };
 
     // DOM元素
     const elements = {
         tensorList: document.getElementById('tensorList'),
         dataTable: document.getElementById('dataTable'),
+        dataTableContainer: document.getElementById('dataTableContainer'),
+        gridSpacer: document.getElementById('gridSpacer'),
         plotContainer: document.getElementById('plotContainer'),
         infoPanel: document.getElementById('infoPanel'),
         searchInput: document.getElementById('searchInput'),
@@ -51,7 +70,8 @@
         tensorStats: document.getElementById('tensorStats'),
         loadingOverlay: document.getElementById('loadingOverlay'),
         currentPath: document.getElementById('currentPath'),
-        exportChartBtn: document.getElementById('exportChartBtn')
+        exportChartBtn: document.getElementById('exportChartBtn'),
+        diffPanel: document.getElementById('diffPanel')
     };
 
     // 初始化
@@ -169,6 +189,13 @@
         // 导出
         document.getElementById('exportBtn').addEventListener('click', handleExport);
 
+        // 与另一个文件比较
+        document.getElementById('compareBtn').addEventListener('click', () => {
+            updateStatus('选择要比较的文件...');
+            vscode.postMessage({ command: 'compare' });
+        });
+        elements.diffPanel.addEventListener('click', handleDiffPanelClick);
+
         // 切片
         document.getElementById('applySlice').addEventListener('click', handleSlice);
 
@@ -198,15 +225,99 @@
         elements.dataTable.addEventListener('mousedown', handleTableMouseDown);
         elements.dataTable.addEventListener('mousemove', handleTableMouseMove);
         elements.dataTable.addEventListener('mouseup', handleTableMouseUp);
+
+        // 虚拟滚动表格：滚动和窗口尺寸变化时重新渲染可见区域
+        elements.dataTableContainer.addEventListener('scroll', () => {
+            const editor = elements.dataTable.querySelector('.cell-editor');
+            if (editor) editor.blur();
+            scheduleGridRender();
+        });
+        window.addEventListener('resize', scheduleGridRender);
+    }
+
+    // ========== 二进制数组解码 ==========
+
+    const TYPED_ARRAYS = {
+        float64: Float64Array,
+        float32: Float32Array,
+        int8: Int8Array,
+        int16: Int16Array,
+        int32: Int32Array,
+        int64: BigInt64Array,
+        uint8: Uint8Array,
+        uint16: Uint16Array,
+        uint32: Uint32Array,
+        uint64: BigUint64Array,
+        bool: Uint8Array
+    };
+
+    /**
+     * 把二进制载荷 {__binary__, dtype, shape, buffer} 转换为（嵌套的）TypedArray 视图
+     * 1维为 TypedArray，2维及以上为逐行 subarray 组成的数组，不复制数据
+     */
+    function decodeBinaryArray(payload) {
+        const Ctor = TYPED_ARRAYS[payload.dtype] || Float64Array;
+        const flat = new Ctor(payload.buffer);
+        const shape = payload.shape;
+
+        if (shape.length === 0) {
+            return payload.dtype === 'bool' ? flat[0] !== 0 : flat[0];
+        }
+
+        const build = (offset, dim) => {
+            const size = shape[dim];
+            if (dim === shape.length - 1) {
+                const row = flat.subarray(offset, offset + size);
+                return payload.dtype === 'bool' ? Array.from(row, v => v !== 0) : row;
+            }
+            const step = shape.slice(dim + 1).reduce((a, b) => a * b, 1);
+            const rows = new Array(size);
+            for (let i = 0; i < size; i++) {
+                rows[i] = build(offset + i * step, dim + 1);
+            }
+            return rows;
+        };
+        return build(0, 0);
+    }
+
+    /**
+     * 递归解码消息中的二进制载荷
+     */
+    function decodeBinary(value) {
+        if (Array.isArray(value)) {
+            return value.map(decodeBinary);
+        }
+        if (value && typeof value === 'object' && !ArrayBuffer.isView(value) && !(value instanceof ArrayBuffer)) {
+            if (value.__binary__ === true && value.buffer) {
+                return decodeBinaryArray(value);
+            }
+            for (const key of Object.keys(value)) {
+                value[key] = decodeBinary(value[key]);
+            }
+        }
+        return value;
+    }
+
+    /**
+     * 判断是否为一行数据（普通数组或 TypedArray）
+     */
+    function isRow(value) {
+        return Array.isArray(value) || ArrayBuffer.isView(value);
     }
 
     // 处理来自插件的消息
     window.addEventListener('message', (event) => {
-        const message = event.data;
+        const message = decodeBinary(event.data);
 
         switch (message.type) {
-            case 'tensorData':
-                handleTensorData(message.data);
+            case 'treeData':
+                handleTreeData(message.data);
+                break;
+            case 'tensorItem':
+                handleTensorItem(message.data);
+                break;
+            case 'treeError':
+                handleTreeError(message.path, message.message);
                 break;
             case 'searchResults':
                 handleSearchResults(message.data);
@@ -217,12 +328,21 @@
             case 'sliceData':
                 handleSliceData(message.data);
                 break;
+            case 'windowData':
+                handleWindowData(message);
+                break;
             case 'plotData':
                 handlePlotData(message.data);
                 break;
+            case 'layerHistograms':
+                handleLayerHistograms(message.path, message.data);
+                break;
             case 'saveResponse':
                 handleSaveResponse(message);  // 直接传递整个消息对象
                 break;
+            case 'diffResult':
+                handleDiffResult(message.data);
+                break;
             case 'dependencyStatus':
                 // 更新依赖状态
                 window.dependencyStatus = message.data;
@@ -234,21 +354,6 @@
         }
     });
 
-    // 处理张量数据
-    function handleTensorData(data) {
-        showLoading(false);
-        state.tensors = data.tensors;
-
-        updateStatus(`已加载 ${data.tensors.length} 个张量`);
-        elements.tensorStats.textContent = `总大小: ${formatSize(data.totalSize)}`;
-
-        renderTensorList(data.tensors);
-
-        if (data.tensors.length > 0) {
-            selectTensor(data.tensors[0].key);
-        }
-    }
-
     // 处理切片数据
     function handleSliceData(data) {
         showLoading(false);
@@ -259,60 +364,282 @@
             return;
         }
         
+        // 结果过大时后端只返回一页
+        const page = data && data.paged ? data : null;
+
         // 更新当前张量的预览数据
         const tensor = state.tensors.find(t => t.key === state.selectedKey);
         if (tensor) {
-            tensor.preview = data;
-            state.currentData = data;
+            tensor.preview = page ? page.data : data;
+            state.currentData = tensor.preview;
             renderDataTable(tensor);
-            updateStatus('切片加载完成');
+            if (page) {
+                updateStatus(`切片结果过大（${page.shape.join(' × ')}），仅显示第 ${page.offset + 1}-${page.offset + page.count} 行`);
+            } else {
+                updateStatus('切片加载完成');
+            }
         }
     }
 
-    // 处理过滤数据（占位函数）
+    // 处理筛选结果：结果只有张量的元数据，以平铺列表代替检查点树显示，选中后再按需 describe
     function handleFilteredData(data) {
-        showLoading(false);
-        const tensor = state.tensors.find(t => t.key === state.selectedKey);
-        if (tensor) {
-            tensor.preview = data;
-            state.currentData = data;
-            renderDataTable(tensor);
+        if (data && data.error) {
+            showError(`筛选失败：${data.error}`);
+            return;
+        }
+        // 筛选框已被清空，忽略迟到的结果
+        if (!elements.filterInput.value.trim()) {
+            return;
+        }
+        state.filterResults = data.tensors;
+        updateStatus(`匹配 ${data.tensors.length.toLocaleString()} 个张量（${formatSize(data.totalSize)}）`);
+        if (state.currentDepth === 0) {
+            renderTree();
         }
     }
 
+    function renderFilterResults() {
+        if (state.filterResults.length === 0) {
+            elements.tensorList.innerHTML = '<div class="tensor-item tree-loading"><div class="tensor-name">没有匹配的张量</div></div>';
+            return;
+        }
+        elements.tensorList.innerHTML = state.filterResults.map(item => `
+            <div class="tensor-item ${state.selectedKey === item.key ? 'selected' : ''}"
+                 data-key="${escapeHtml(item.key)}" title="${escapeHtml(item.key)}">
+                <div class="tensor-name">${TREE_TENSOR_ICON}${escapeHtml(item.key)}</div>
+                <div class="tensor-meta">
+                    <span class="shape">${item.info.shape.join(' × ') || '标量'}</span>
+                    <span class="dtype">${escapeHtml(item.info.dtype)}</span>
+                </div>
+            </div>
+        `).join('');
+
+        elements.tensorList.querySelectorAll('[data-key]').forEach(item => {
+            item.addEventListener('click', () => selectTensor(item.dataset.key));
+        });
+    }
+
     // 渲染张量列表 - 树形结构
-    function renderTensorList(tensors) {
+    function renderTensorList() {
         if (state.currentDepth === 0) {
-            // 顶层：显示所有张量
-            elements.tensorList.innerHTML = tensors.map(t => {
-                const isMultiDim = t.info.shape.length >= 3;
-                const icon = isMultiDim 
-                    ? '<svg width="14" height="14" viewBox="0 0 16 16" fill="currentColor" style="vertical-align: text-bottom; margin-right: 4px;"><path d="M1.75 1A1.75 1.75 0 0 0 0 2.75v10.5C0 14.216.784 15 1.75 15h12.5A1.75 1.75 0 0 0 16 13.25v-8.5A1.75 1.75 0 0 0 14.25 3H7.5a.25.25 0 0 1-.2-.1l-.9-1.2C6.07 1.26 5.55 1 5 1H1.75z"></path></svg>'
-                    : '<svg width="14" height="14" viewBox="0 0 16 16" fill="currentColor" style="vertical-align: text-bottom; margin-right: 4px;"><path d="M2 1.75C2 .784 2.784 0 3.75 0h6.586c.464 0 .909.184 1.237.513l2.914 2.914c.329.328.513.773.513 1.237v9.586A1.75 1.75 0 0 1 13.25 16h-9.5A1.75 1.75 0 0 1 2 14.25V1.75z"></path></svg>';
-                return `
-                    <div class="tensor-item ${state.selectedKey === t.key ? 'selected' : ''}" 
-                         data-key="${t.key}">
-                        <div class="tensor-name">
-                            ${icon}${t.key}
-                            ${isMultiDim ? ` <span style="font-size: 11px; color: var(--vscode-descriptionForeground);">(${t.info.shape.length}D)</span>` : ''}
-                        </div>
-                        <div class="tensor-meta">
-                            <span class="shape">${t.info.shape.join(' × ')}</span>
-                            <span class="dtype">${t.info.dtype}</span>
-                        </div>
-                    </div>
-                `;
-            }).join('');
-
-            elements.tensorList.querySelectorAll('.tensor-item').forEach(item => {
-                item.addEventListener('click', () => selectTensor(item.dataset.key));
-            });
+            // 顶层：检查点树，容器按需展开
+            renderTree();
         } else {
             // 子层：显示当前维度的切片
             renderDimensionList();
         }
     }
 
+    // ========== 检查点树 ==========
+
+    const TREE_FOLDER_ICON = '<svg width="14" height="14" viewBox="0 0 16 16" fill="currentColor" style="vertical-align: text-bottom; margin-right: 4px;"><path d="M1.75 1A1.75 1.75 0 0 0 0 2.75v10.5C0 14.216.784 15 1.75 15h12.5A1.75 1.75 0 0 0 16 13.25v-8.5A1.75 1.75 0 0 0 14.25 3H7.5a.25.25 0 0 1-.2-.1l-.9-1.2C6.07 1.26 5.55 1 5 1H1.75z"></path></svg>';
+    const TREE_TENSOR_ICON = '<svg width="14" height="14" viewBox="0 0 16 16" fill="currentColor" style="vertical-align: text-bottom; margin-right: 4px;"><path d="M2 1.75C2 .784 2.784 0 3.75 0h6.586c.464 0 .909.184 1.237.513l2.914 2.914c.329.328.513.773.513 1.237v9.586A1.75 1.75 0 0 1 13.25 16h-9.5A1.75 1.75 0 0 1 2 14.25V1.75z"></path></svg>';
+
+    function treePathId(path) {
+        return JSON.stringify(path);
+    }
+
+    // 处理一页子节点：offset 为 0 的根节点表示（重新）打开文件
+    function handleTreeData(data) {
+        const id = treePathId(data.path);
+        if (data.path.length === 0 && data.offset === 0) {
+            showLoading(false);
+            state.tree.clear();
+            state.treeExpanded.clear();
+            state.tensors = [];
+            updateStatus(`共 ${data.node.tensors.toLocaleString()} 个张量`);
+            elements.tensorStats.textContent = `参数量: ${formatCount(data.node.params)} · 总大小: ${formatSize(data.node.nbytes)}`;
+            // 刷新后按新的文件内容重新筛选
+            if (state.filterResults) {
+                handleFilter();
+            }
+        }
+
+        const loaded = state.tree.get(id);
+        const children = loaded && data.offset > 0 ? loaded.children.slice(0, data.offset).concat(data.children) : data.children;
+        state.tree.set(id, { node: data.node, children, total: data.total, loading: false });
+
+        if (state.currentDepth === 0) {
+            renderTree();
+        }
+
+        // 首次打开时自动选中顶层的第一个张量（如 .npy 与单张量文件）
+        if (data.path.length === 0 && data.offset === 0 && !state.selectedKey) {
+            const first = data.children.find(child => child.kind === 'tensor');
+            if (first) {
+                selectTensor(first.key);
+            }
+        }
+    }
+
+    // 展开失败时收起节点，再次点击可以重试
+    function handleTreeError(path, message) {
+        const id = treePathId(path);
+        const loaded = state.tree.get(id);
+        if (loaded && loaded.children.length > 0) {
+            loaded.loading = false;
+        } else {
+            state.tree.delete(id);
+            state.treeExpanded.delete(id);
+        }
+        showError(message);
+        if (state.currentDepth === 0) {
+            renderTree();
+        }
+    }
+
+    // 处理选中张量时按需返回的信息、统计与预览
+    function handleTensorItem(item) {
+        state.tensors = state.tensors.filter(t => t.key !== item.key).concat([item]);
+        if (state.pendingKey === item.key) {
+            state.pendingKey = null;
+            showLoading(false);
+            selectTensor(item.key);
+        }
+    }
+
+    // 请求节点的一页子节点
+    function requestChildren(path, offset) {
+        const id = treePathId(path);
+        const loaded = state.tree.get(id);
+        if (loaded && loaded.loading) return;
+        state.tree.set(id, {
+            node: loaded ? loaded.node : null,
+            children: loaded ? loaded.children : [],
+            total: loaded ? loaded.total : 0,
+            loading: true
+        });
+        vscode.postMessage({ command: 'children', path: path, offset: offset });
+    }
+
+    function toggleTreeNode(path) {
+        const id = treePathId(path);
+        if (state.treeExpanded.has(id)) {
+            state.treeExpanded.delete(id);
+        } else {
+            state.treeExpanded.add(id);
+            if (!state.tree.has(id)) {
+                requestChildren(path, 0);
+            }
+        }
+        renderTree();
+    }
+
+    function renderTree() {
+        if (state.filterResults) {
+            renderFilterResults();
+            return;
+        }
+        state.treeRows = [];
+        const root = state.tree.get(treePathId([]));
+        elements.tensorList.innerHTML = root ? renderTreeLevel([], 0) : '';
+
+        elements.tensorList.querySelectorAll('[data-histogram]').forEach(button => {
+            button.addEventListener('click', (event) => {
+                event.stopPropagation();
+                requestLayerHistograms(state.treeRows[parseInt(button.dataset.histogram)].path);
+            });
+        });
+
+        elements.tensorList.querySelectorAll('[data-row]').forEach(item => {
+            item.addEventListener('click', () => {
+                const row = state.treeRows[parseInt(item.dataset.row)];
+                if (row.more) {
+                    requestChildren(row.path, row.offset);
+                    renderTree();
+                } else if (row.child.kind === 'tensor') {
+                    selectTensor(row.child.key);
+                } else if (row.child.childCount > 0) {
+                    toggleTreeNode(row.path);
+                }
+            });
+        });
+    }
+
+    function renderTreeLevel(path, level) {
+        const entry = state.tree.get(treePathId(path));
+        const padding = `padding-left: ${level * 16 + 12}px`;
+        if (!entry || (entry.loading && entry.children.length === 0)) {
+            return `<div class="tensor-item tree-loading" style="${padding}"><div class="tensor-name">加载中...</div></div>`;
+        }
+
+        let html = entry.children.map(child => {
+            const childPath = path.concat([child.name]);
+            let item = renderTreeNode(child, childPath, level);
+            if (child.childCount > 0 && state.treeExpanded.has(treePathId(childPath))) {
+                item += renderTreeLevel(childPath, level + 1);
+            }
+            return item;
+        }).join('');
+
+        if (entry.children.length < entry.total) {
+            const row = state.treeRows.push({ more: true, path, offset: entry.children.length }) - 1;
+            html += `
+                <div class="tensor-item tree-more" data-row="${row}" style="${padding}">
+                    <div class="tensor-name">${entry.loading ? '加载中...' : `加载更多（已显示 ${entry.children.length} / ${entry.total}）`}</div>
+                </div>
+            `;
+        }
+        return html;
+    }
+
+    function renderTreeNode(child, path, level) {
+        const row = state.treeRows.push({ child, path }) - 1;
+        const padding = `padding-left: ${level * 16 + 12}px`;
+        const name = escapeHtml(child.name);
+
+        if (child.kind === 'tensor') {
+            const isMultiDim = child.shape.length >= 3;
+            return `
+                <div class="tensor-item ${state.selectedKey === child.key ? 'selected' : ''}" data-row="${row}"
+                     data-key="${escapeHtml(child.key)}" title="${escapeHtml(child.key)}" style="${padding}">
+                    <div class="tensor-name">
+                        ${isMultiDim ? TREE_FOLDER_ICON : TREE_TENSOR_ICON}${name}
+                        ${isMultiDim ? ` <span style="font-size: 11px; color: var(--vscode-descriptionForeground);">(${child.shape.length}D)</span>` : ''}
+                    </div>
+                    <div class="tensor-meta">
+                        <span class="shape">${child.shape.join(' × ') || '标量'}</span>
+                        <span class="dtype">${escapeHtml(child.dtype)}</span>
+                    </div>
+                </div>
+            `;
+        }
+
+        if (child.kind === 'value') {
+            return `
+                <div class="tensor-item tree-value" data-row="${row}" style="${padding}">
+                    <div class="tensor-name">${name} <span class="tree-type">${escapeHtml(child.type)}</span></div>
+                    <div class="tensor-meta"><span>${escapeHtml(child.value)}</span></div>
+                </div>
+            `;
+        }
+
+        // 容器与分组：显示子树汇总，无子节点时不可展开
+        const expandable = child.childCount > 0;
+        const expanded = expandable && state.treeExpanded.has(treePathId(path));
+        const type = child.kind === 'group' ? '' : ` <span class="tree-type">${escapeHtml(child.type)}</span>`;
+        return `
+            <div class="tensor-item tree-node" data-row="${row}" style="${padding}">
+                <div class="tensor-name">
+                    <span class="tree-toggle">${expandable ? (expanded ? '▾' : '▸') : ''}</span>${TREE_FOLDER_ICON}${name}${type}
+                </div>
+                <div class="tensor-meta">
+                    <span>${child.childCount} 项</span>
+                    ${child.tensors > 0 ? `<span>${child.tensors.toLocaleString()} 个张量</span><span>${formatCount(child.params)} 参数</span><span>${formatSize(child.nbytes)}</span>` : ''}
+                    ${child.tensors > 0 ? `<span class="tree-action" data-histogram="${row}" title="分别统计子树中每个张量的数值分布">分布</span>` : ''}
+                </div>
+            </div>
+        `;
+    }
+
+    // 大数字按 K/M/B 缩写
+    function formatCount(value) {
+        if (value < 1e3) return String(value);
+        if (value < 1e6) return (value / 1e3).toFixed(1) + 'K';
+        if (value < 1e9) return (value / 1e6).toFixed(2) + 'M';
+        return (value / 1e9).toFixed(2) + 'B';
+    }
+
     // 渲染维度切片列表
     function renderDimensionList() {
         const tensor = state.tensors.find(t => t.key === state.selectedKey);
@@ -416,7 +743,7 @@
         if (state.currentDepth === 0) {
             // 返回顶层，显示所有张量
             console.log('返回根层，显示张量列表');
-            renderTensorList(state.tensors);
+            renderTensorList();
             updateCurrentPath();
         } else {
             // 返回上一个导航层
@@ -453,25 +780,35 @@
         });
 
         const tensor = state.tensors.find(t => t.key === key);
-        if (tensor) {
-            state.tensorShape = tensor.info.shape;
-            
-            // 如果是3维及以上，进入导航模式
-            if (tensor.info.shape.length >= 3) {
-                state.currentDepth = 1;
-                renderDimensionList();
-                updateCurrentPath();
-            } else {
-                // 2维及以下直接显示
-                renderDataTable(tensor);
-            }
-            
-            renderInfoPanel(tensor);
+        if (!tensor) {
+            // 统计与预览在选中时才计算
+            state.pendingKey = key;
+            showLoading(true);
+            vscode.postMessage({ command: 'describe', key: key });
+            return;
         }
+
+        state.tensorShape = tensor.info.shape;
+        
+        // 如果是3维及以上，进入导航模式
+        if (tensor.info.shape.length >= 3) {
+            closeGrid();
+            elements.dataTable.innerHTML = '<tr><td class="empty">请在左侧选择要查看的切片</td></tr>';
+            state.currentDepth = 1;
+            renderDimensionList();
+            updateCurrentPath();
+        } else {
+            // 2维及以下直接按窗口加载
+            const shape = tensor.info.shape;
+            openGrid(key, null, shape.length >= 1 ? shape[0] : 1, shape.length === 2 ? shape[1] : 1);
+        }
+        
+        renderInfoPanel(tensor);
     }
 
-    // 渲染数据表格
+    // 渲染数据表格（切片、筛选等一次性结果）
     function renderDataTable(tensor) {
+        closeGrid();
         if (!tensor.preview || tensor.preview.length === 0) {
             elements.dataTable.innerHTML = '<tr><td class="empty">无预览数据</td></tr>';
             return;
@@ -482,7 +819,7 @@
         let html = '<thead><tr>';
 
         // 表头 - 左上角显示当前单元格位置
-        if (Array.isArray(data[0])) {
+        if (isRow(data[0])) {
             const cellPos = state.currentCell ? getCellAddress(state.currentCell.row, state.currentCell.col) : '';
             html += `<th class="cell-position">${cellPos || '◻'}</th>`;
             for (let i = 0; i < Math.min(data[0].length, 20); i++) {
@@ -502,7 +839,7 @@
             html += '<tr>';
             html += `<td class="index">${i + 1}</td>`;
 
-            if (Array.isArray(data[i])) {
+            if (isRow(data[i])) {
                 const maxCols = Math.min(data[i].length, 20);
                 for (let j = 0; j < maxCols; j++) {
                     const cellId = `${i}-${j}`;
@@ -564,6 +901,272 @@
 
 
 
+    // ========== 虚拟滚动表格 ==========
+
+    const GRID_ROW_HEIGHT = 24;
+    const GRID_INDEX_WIDTH = 72;
+    const GRID_COL_WIDTH = 100;
+    const TILE_ROWS = 64;
+    const TILE_COLS = 32;
+    const MAX_CACHED_TILES = 256;
+    const MAX_PENDING_TILES = 8;
+    // 浏览器对元素高度有上限，超过时按比例把滚动位置映射到行号
+    const MAX_SCROLL_HEIGHT = 10000000;
+    let nextWindowRequestId = 1;
+
+    /**
+     * 打开虚拟表格：只请求并渲染可见区域附近的数据块
+     * @param key 张量键名
+     * @param index 高维张量前 ndim-2 维的索引，2维及以下为 null
+     */
+    function openGrid(key, index, rows, cols) {
+        state.grid = {
+            key,
+            index,
+            rows,
+            cols,
+            tiles: new Map(),     // 数据块缓存 "块行:块列" -> 二维数据，按最近使用排序
+            requests: new Map(),  // 请求ID -> 数据块键
+            loading: new Set(),   // 正在加载的数据块键
+            edits: new Map(),     // 未保存的编辑 "行,列" -> 新值
+            frame: null
+        };
+        state.editHistory = [];
+        state.historyIndex = -1;
+        state.selectedCells.clear();
+        state.currentCell = null;
+        state.currentData = null;
+
+        const container = elements.dataTableContainer;
+        container.classList.add('virtual');
+        elements.dataTable.classList.add('virtual');
+        container.scrollTop = 0;
+        container.scrollLeft = 0;
+        updateGridSpacer();
+        renderGrid();
+    }
+
+    /**
+     * 关闭虚拟表格，恢复普通表格布局
+     */
+    function closeGrid() {
+        if (!state.grid) return;
+        if (state.grid.frame) {
+            cancelAnimationFrame(state.grid.frame);
+        }
+        state.grid = null;
+        elements.dataTableContainer.classList.remove('virtual');
+        elements.dataTable.classList.remove('virtual');
+        elements.dataTable.style.width = '';
+        elements.gridSpacer.style.width = '';
+        elements.gridSpacer.style.height = '';
+    }
+
+    function gridColWidth(col) {
+        return state.columnWidths[col] || GRID_COL_WIDTH;
+    }
+
+    /**
+     * 第 col 列左边缘相对数据区的偏移（考虑手动调整过的列宽）
+     */
+    function gridColOffset(col) {
+        let offset = col * GRID_COL_WIDTH;
+        Object.keys(state.columnWidths).forEach(c => {
+            if (Number(c) < col) {
+                offset += state.columnWidths[c] - GRID_COL_WIDTH;
+            }
+        });
+        return offset;
+    }
+
+    /**
+     * 二分查找水平滚动位置对应的首列
+     */
+    function gridColAt(x) {
+        let lo = 0;
+        let hi = Math.max(0, state.grid.cols - 1);
+        while (lo < hi) {
+            const mid = (lo + hi + 1) >> 1;
+            if (gridColOffset(mid) <= x) {
+                lo = mid;
+            } else {
+                hi = mid - 1;
+            }
+        }
+        return lo;
+    }
+
+    function updateGridSpacer() {
+        const grid = state.grid;
+        const height = Math.min((grid.rows + 1) * GRID_ROW_HEIGHT, MAX_SCROLL_HEIGHT);
+        elements.gridSpacer.style.height = height + 'px';
+        elements.gridSpacer.style.width = (GRID_INDEX_WIDTH + gridColOffset(grid.cols)) + 'px';
+    }
+
+    /**
+     * 垂直滚动位置对应的首行
+     */
+    function gridFirstRow(visibleRows) {
+        const grid = state.grid;
+        const container = elements.dataTableContainer;
+        const maxFirst = Math.max(0, grid.rows - visibleRows);
+        if ((grid.rows + 1) * GRID_ROW_HEIGHT <= MAX_SCROLL_HEIGHT) {
+            return Math.min(Math.floor(container.scrollTop / GRID_ROW_HEIGHT), maxFirst);
+        }
+        const maxScroll = container.scrollHeight - container.clientHeight;
+        return maxScroll > 0 ? Math.round(container.scrollTop / maxScroll * maxFirst) : 0;
+    }
+
+    function scheduleGridRender() {
+        const grid = state.grid;
+        if (!grid || grid.frame) return;
+        grid.frame = requestAnimationFrame(() => {
+            grid.frame = null;
+            if (state.grid === grid) {
+                renderGrid();
+            }
+        });
+    }
+
+    function getGridValue(grid, row, col) {
+        const tile = grid.tiles.get(`${Math.floor(row / TILE_ROWS)}:${Math.floor(col / TILE_COLS)}`);
+        const tileRow = tile && tile[row % TILE_ROWS];
+        return tileRow ? tileRow[col % TILE_COLS] : undefined;
+    }
+
+    /**
+     * 渲染可见区域：表格本身粘附在视口中，只替换其中的行列内容
+     */
+    function renderGrid() {
+        const grid = state.grid;
+        if (!grid) return;
+        // 正在编辑单元格时不重绘，避免输入框被替换
+        if (elements.dataTable.querySelector('.cell-editor')) return;
+
+        if (grid.rows === 0 || grid.cols === 0) {
+            elements.dataTable.innerHTML = '<tr><td class="empty">空张量</td></tr>';
+            return;
+        }
+
+        const container = elements.dataTableContainer;
+        const visibleRows = Math.max(1, Math.floor(container.clientHeight / GRID_ROW_HEIGHT) - 1);
+        const rowStart = gridFirstRow(visibleRows);
+        const rowEnd = Math.min(grid.rows, rowStart + visibleRows);
+        const colStart = gridColAt(container.scrollLeft);
+        let colEnd = colStart;
+        let width = GRID_INDEX_WIDTH;
+        while (colEnd < grid.cols && width < container.clientWidth) {
+            width += gridColWidth(colEnd);
+            colEnd++;
+        }
+
+        requestGridTiles(rowStart, rowEnd, colStart, colEnd);
+
+        const cellPos = state.currentCell ? getCellAddress(state.currentCell.row, state.currentCell.col) : '';
+        let html = `<thead><tr><th class="cell-position" style="width: ${GRID_INDEX_WIDTH}px">${cellPos || '◻'}</th>`;
+        for (let j = colStart; j < colEnd; j++) {
+            html += `<th data-col="${j}" style="width: ${gridColWidth(j)}px">${getColumnName(j)}</th>`;
+        }
+        html += '</tr></thead><tbody>';
+
+        for (let i = rowStart; i < rowEnd; i++) {
+            html += `<tr><td class="index">${i + 1}</td>`;
+            for (let j = colStart; j < colEnd; j++) {
+                const editKey = `${i},${j}`;
+                const edited = grid.edits.has(editKey);
+                const value = edited ? grid.edits.get(editKey) : getGridValue(grid, i, j);
+                const classes = [];
+                if (edited) classes.push('edited');
+                if (value === undefined) classes.push('loading');
+                if (state.selectedCells.has(`${i}-${j}`)) classes.push('selected');
+                if (state.currentCell && state.currentCell.row === i && state.currentCell.col === j) classes.push('current');
+                const text = value === undefined ? '' : (edited ? value : formatValue(value));
+                html += `<td data-row="${i}" data-col="${j}" class="${classes.join(' ')}" title="${text}">${text}</td>`;
+            }
+            html += '</tr>';
+        }
+        html += '</tbody>';
+
+        elements.dataTable.style.width = width + 'px';
+        elements.dataTable.innerHTML = html;
+    }
+
+    /**
+     * 请求可见区域及其周围一圈的数据块，优先可见区域，并限制同时进行的请求数
+     */
+    function requestGridTiles(rowStart, rowEnd, colStart, colEnd) {
+        const grid = state.grid;
+        const tr0 = Math.floor(rowStart / TILE_ROWS);
+        const tr1 = Math.floor((rowEnd - 1) / TILE_ROWS);
+        const tc0 = Math.floor(colStart / TILE_COLS);
+        const tc1 = Math.floor((colEnd - 1) / TILE_COLS);
+        const maxTr = Math.floor((grid.rows - 1) / TILE_ROWS);
+        const maxTc = Math.floor((grid.cols - 1) / TILE_COLS);
+
+        const visible = [];
+        const prefetch = [];
+        for (let tr = Math.max(0, tr0 - 1); tr <= Math.min(maxTr, tr1 + 1); tr++) {
+            for (let tc = Math.max(0, tc0 - 1); tc <= Math.min(maxTc, tc1 + 1); tc++) {
+                const inView = tr >= tr0 && tr <= tr1 && tc >= tc0 && tc <= tc1;
+                (inView ? visible : prefetch).push([tr, tc]);
+            }
+        }
+
+        for (const [tr, tc] of visible.concat(prefetch)) {
+            const tileKey = `${tr}:${tc}`;
+            const tile = grid.tiles.get(tileKey);
+            if (tile) {
+                // 刷新最近使用顺序
+                grid.tiles.delete(tileKey);
+                grid.tiles.set(tileKey, tile);
+                continue;
+            }
+            if (grid.loading.has(tileKey) || grid.loading.size >= MAX_PENDING_TILES) {
+                continue;
+            }
+
+            const requestId = nextWindowRequestId++;
+            grid.requests.set(requestId, tileKey);
+            grid.loading.add(tileKey);
+            vscode.postMessage({
+                command: 'window',
+                requestId,
+                key: grid.key,
+                index: grid.index,
+                rowStart: tr * TILE_ROWS,
+                rowCount: TILE_ROWS,
+                colStart: tc * TILE_COLS,
+                colCount: TILE_COLS
+            });
+        }
+    }
+
+    /**
+     * 处理窗口数据：写入数据块缓存并淘汰最久未使用的块
+     */
+    function handleWindowData(message) {
+        const grid = state.grid;
+        // 已切换到其他张量或切片，丢弃过期响应
+        if (!grid || !grid.requests.has(message.requestId)) return;
+
+        const tileKey = grid.requests.get(message.requestId);
+        grid.requests.delete(message.requestId);
+        grid.loading.delete(tileKey);
+
+        const data = message.data;
+        if (!data || data.error) {
+            showError(`读取数据失败：${data ? data.error : '无响应'}`);
+            grid.tiles.set(tileKey, []);
+        } else {
+            grid.tiles.set(tileKey, data.data);
+        }
+
+        while (grid.tiles.size > MAX_CACHED_TILES) {
+            grid.tiles.delete(grid.tiles.keys().next().value);
+        }
+        scheduleGridRender();
+    }
+
     // 加载指定维度的切片
     function loadDimensionSlice() {
         const tensor = state.tensors.find(t => t.key === state.selectedKey);
@@ -584,15 +1187,11 @@
             return;
         }
         
-        showLoading(true);
-        updateStatus(`正在加载切片 [${state.dimensionPath.join('][')}]...`);
-        
-        // 请求切片数据
-        vscode.postMessage({
-            command: 'slice',
-            key: state.selectedKey,
-            slice: sliceStr
-        });
+        updateStatus(`切片 [${state.dimensionPath.join('][')}]`);
+
+        // 最后两维按窗口加载
+        const shape = tensor.info.shape;
+        openGrid(state.selectedKey, [...state.dimensionPath], shape[shape.length - 2], shape[shape.length - 1]);
     }
 
     // 渲染信息面板
@@ -606,6 +1205,20 @@
                 <div class="info-row"><span>数据类型:</span><span>${info.dtype}</span></div>
                 <div class="info-row"><span>元素数量:</span><span>${info.size.toLocaleString()}</span></div>
             </div>
+            ${info.storageSize !== undefined ? `
+            <div class="info-section">
+                <h4>存储布局</h4>
+                <div class="info-row"><span>分块:</span><span>${info.chunks ? info.chunks.join(' × ') : '连续存储'}</span></div>
+                <div class="info-row"><span>压缩:</span><span>${info.compression ? `${info.compression}${info.compressionOpts !== null && info.compressionOpts !== undefined ? ` (${info.compressionOpts})` : ''}` : '无'}</span></div>
+                <div class="info-row"><span>磁盘占用:</span><span>${formatSize(info.storageSize)}</span></div>
+            </div>
+            ` : ''}
+            ${info.statsDeferred ? `
+            <div class="info-section">
+                <h4>统计信息</h4>
+                <div class="info-row"><span>数据集较大，打开时未计算统计信息，可通过直方图查看分布</span></div>
+            </div>
+            ` : ''}
             ${info.min !== undefined ? `
             <div class="info-section">
                 <h4>统计信息</h4>
@@ -613,6 +1226,21 @@
                 <div class="info-row"><span>最大值:</span><span>${formatValue(info.max)}</span></div>
                 <div class="info-row"><span>均值:</span><span>${formatValue(info.mean)}</span></div>
                 <div class="info-row"><span>标准差:</span><span>${formatValue(info.std)}</span></div>
+                ${info.quantiles && info.quantiles['0.5'] !== undefined ? `<div class="info-row"><span>中位数(近似):</span><span>${formatValue(info.quantiles['0.5'])}</span></div>` : ''}
+            </div>
+            ` : ''}
+            ${info.nanCount !== undefined ? `
+            <div class="info-section">
+                <h4>特殊值</h4>
+                <div class="info-row"><span>NaN:</span><span>${info.nanCount.toLocaleString()}</span></div>
+                <div class="info-row"><span>Inf:</span><span>${info.infCount.toLocaleString()}</span></div>
+                <div class="info-row"><span>零值:</span><span>${info.zeroCount.toLocaleString()}</span></div>
+            </div>
+            ` : ''}
+            ${info.quantiles ? `
+            <div class="info-section">
+                <h4>分位数(近似)</h4>
+                ${Object.entries(info.quantiles).map(([q, v]) => `<div class="info-row"><span>P${parseFloat(q) * 100}:</span><span>${formatValue(v)}</span></div>`).join('')}
             </div>
             ` : ''}
         `;
@@ -639,20 +1267,36 @@
         showLoading(false);
         state.searchResults = results;
 
-        const total = results.reduce((sum, r) => sum + r.matches.length, 0);
-        updateStatus(`找到 ${total} 个匹配`);
+        // 数值条件按命中数统计，提前结束扫描时命中数为下限
+        const total = results.reduce((sum, r) => sum + (r.hitCount !== undefined ? r.hitCount : r.matches.length), 0);
+        const exact = results.every(r => r.hitCountExact !== false);
+        updateStatus(`找到 ${exact ? '' : '至少 '}${total} 个匹配`);
 
         // TODO: 高亮显示搜索结果
     }
 
     // 筛选处理
+    // 按键名筛选：检查点树只加载了展开的节点，因此由后端按元数据匹配整个文件；维度列表在本地筛选
     function handleFilter() {
-        const query = elements.filterInput.value.toLowerCase();
+        const query = elements.filterInput.value.trim();
+        clearTimeout(state.filterTimer);
 
-        elements.tensorList.querySelectorAll('.tensor-item').forEach(item => {
-            const name = item.querySelector('.tensor-name').textContent.toLowerCase();
-            item.style.display = name.includes(query) ? '' : 'none';
-        });
+        if (state.currentDepth > 0) {
+            elements.tensorList.querySelectorAll('.tensor-item:not([data-action])').forEach(item => {
+                const name = item.querySelector('.tensor-name').textContent.toLowerCase();
+                item.style.display = name.includes(query.toLowerCase()) ? '' : 'none';
+            });
+            return;
+        }
+
+        if (!query) {
+            state.filterResults = null;
+            renderTree();
+            return;
+        }
+        state.filterTimer = setTimeout(() => {
+            vscode.postMessage({ command: 'filter', filter: { key: query } });
+        }, 200);
     }
 
     // 绘图处理
@@ -686,6 +1330,10 @@
 
             if (series.x) trace.x = series.x;
             if (series.z) trace.z = series.z;
+            // 降采样/金字塔数据通过 x0/dx、y0/dy 映射回原始下标
+            ['x0', 'dx', 'y0', 'dy'].forEach(field => {
+                if (series[field] !== undefined) trace[field] = series[field];
+            });
 
             switch (chartType) {
                 case 'bar':
@@ -699,7 +1347,15 @@
                     trace.type = 'heatmap';
                     break;
                 case 'histogram':
-                    trace.type = 'histogram';
+                    if (series.edges) {
+                        // 服务端分箱结果：以柱状图绘制，柱宽为各分箱宽度
+                        const edges = Array.from(series.edges);
+                        trace.type = 'bar';
+                        trace.x = edges.slice(0, -1).map((e, i) => (e + edges[i + 1]) / 2);
+                        trace.width = edges.slice(0, -1).map((e, i) => edges[i + 1] - e);
+                    } else {
+                        trace.type = 'histogram';
+                    }
                     break;
                 case 'box':
                     trace.type = 'box';
@@ -733,7 +1389,133 @@
             ...plotData.layout
         };
 
+        if (chartType === 'histogram' && state.plotParams.binScale === 'log') {
+            layout.xaxis.type = 'log';
+        }
+
+        // 直方图单独报告 NaN/Inf 计数
+        const special = plotData.data.filter(series => series.edges && (series.nanCount || series.posInfCount || series.negInfCount));
+        if (special.length > 0) {
+            updateStatus(special.map(series => `${series.name}: NaN ${series.nanCount}, +Inf ${series.posInfCount}, -Inf ${series.negInfCount}`).join('; '));
+        }
+
+        const container = elements.plotContainer;
+        if (plotData.region && container.layout) {
+            // 缩放结果：保持当前可见范围，只替换数据
+            layout.xaxis.range = container.layout.xaxis.range;
+            layout.yaxis.range = container.layout.yaxis.range;
+            Plotly.react(container, traces, layout, { responsive: true });
+        } else {
+            Plotly.newPlot(container, traces, layout, { responsive: true });
+        }
+
+        if (container.removeAllListeners) {
+            container.removeAllListeners('plotly_relayout');
+        }
+        container.on('plotly_relayout', handlePlotRelayout);
+    }
+
+    // 请求检查点树中一个节点下每个张量的直方图
+    function requestLayerHistograms(path) {
+        showLoading(true);
+        updateStatus(`正在统计 ${path.join('.') || '全部张量'} 的数值分布...`);
+        vscode.postMessage({
+            command: 'layerHistograms',
+            path: path,
+            options: { bins: state.plotParams.bins, scale: state.plotParams.binScale }
+        });
+    }
+
+    // 每个张量的分布画成一条折线（分箱中心 -> 计数），便于逐层比较
+    function handleLayerHistograms(path, results) {
+        showLoading(false);
+        switchTab('chart');
+
+        const valid = results.filter(result => !result.error);
+        const failed = results.filter(result => result.error);
+        const traces = valid.map(result => {
+            const edges = Array.from(result.edges);
+            return {
+                name: result.key,
+                type: 'scatter',
+                mode: 'lines',
+                line: { shape: 'hvh' },
+                x: edges.slice(0, -1).map((e, i) => (e + edges[i + 1]) / 2),
+                y: result.counts
+            };
+        });
+
+        // 缩放时不按 plotKey 重新请求
+        state.plotKey = null;
+        state.currentPlotData = { type: 'histogram', title: path.join('.'), data: [] };
+        const layout = {
+            title: `分布 - ${path.join('.') || '全部张量'}`,
+            paper_bgcolor: 'transparent',
+            plot_bgcolor: 'transparent',
+            font: { color: 'var(--vscode-foreground)' },
+            showlegend: state.plotParams.showLegend,
+            xaxis: {
+                type: state.plotParams.binScale === 'log' ? 'log' : 'linear',
+                showgrid: state.plotParams.showGrid,
+                gridcolor: 'rgba(128, 128, 128, 0.2)'
+            },
+            yaxis: {
+                title: '计数',
+                showgrid: state.plotParams.showGrid,
+                gridcolor: 'rgba(128, 128, 128, 0.2)'
+            }
+        };
         Plotly.newPlot(elements.plotContainer, traces, layout, { responsive: true });
+
+        let status = `已统计 ${valid.length} 个张量的分布`;
+        if (failed.length > 0) {
+            status += `；${failed.length} 个无法统计：` + failed.map(result => `${result.key}（${result.error}）`).join('，');
+        }
+        updateStatus(status);
+    }
+
+    /**
+     * 图表缩放/平移后按可见范围请求更精细的数据（防抖）
+     * 折线图等按 x 范围请求 {start, end}，热力图按行列范围请求
+     */
+    function handlePlotRelayout(event) {
+        if (!state.plotKey || !state.currentPlotData || state.currentPlotData.type === 'histogram') return;
+
+        const layout = elements.plotContainer.layout;
+        const is2d = ['heatmap', 'image'].includes(state.currentPlotData.type);
+        let region = null;
+        if (!event['xaxis.autorange'] && !event['yaxis.autorange']) {
+            const xRange = event['xaxis.range[0]'] !== undefined
+                ? [event['xaxis.range[0]'], event['xaxis.range[1]']]
+                : (event['xaxis.range'] || null);
+            const yRange = event['yaxis.range[0]'] !== undefined
+                ? [event['yaxis.range[0]'], event['yaxis.range[1]']]
+                : (event['yaxis.range'] || null);
+            if (!xRange && !yRange) return;
+
+            const [x0, x1] = xRange || layout.xaxis.range;
+            region = { start: Math.max(0, Math.floor(x0)), end: Math.ceil(x1) + 1 };
+            if (is2d) {
+                const [y0, y1] = yRange || layout.yaxis.range;
+                region = {
+                    colStart: region.start,
+                    colEnd: region.end,
+                    rowStart: Math.max(0, Math.floor(Math.min(y0, y1))),
+                    rowEnd: Math.ceil(Math.max(y0, y1)) + 1
+                };
+            }
+        } else if (!state.currentPlotData.region) {
+            return;  // 已经是总览
+        }
+
+        clearTimeout(state.plotZoomTimer);
+        state.plotZoomTimer = setTimeout(() => {
+            vscode.postMessage({
+                command: 'plot',
+                key: state.plotKey,
+                params: { ...state.plotParams, chartType: state.currentPlotData.type, region }
+            });
+        }, 200);
     }
 
     // 导出处理
@@ -846,6 +1628,151 @@
         });
     }
 
+    // ========== 文件比较 ==========
+
+    // 按状态排序时差异最大的排在最前
+    const DIFF_STATUS_ORDER = { different: 0, shape: 1, error: 2, close: 3, identical: 4 };
+    const DIFF_STATUS_TEXT = { identical: '相同', close: '容差内', different: '不同', shape: '形状不同', error: '错误' };
+    const DIFF_COLUMNS = [
+        { id: 'key', label: '键名' },
+        { id: 'status', label: '状态' },
+        { id: 'shape', label: '形状' },
+        { id: 'dtype', label: '类型' },
+        { id: 'maxAbsDiff', label: '最大绝对差' },
+        { id: 'meanAbsDiff', label: '平均绝对差' },
+        { id: 'maxRelDiff', label: '最大相对差' },
+        { id: 'mismatchCount', label: '超差元素' },
+        { id: 'diffCount', label: '不等元素' }
+    ];
+
+    function handleDiffResult(result) {
+        state.diff = result;
+        state.diffExpanded.clear();
+        const s = result.summary;
+        updateStatus(`比较完成：${s.different} 个不同，${s.shape} 个形状不同，${s.close} 个容差内，${s.identical} 个相同`);
+        renderDiffPanel();
+        switchTab('diff');
+    }
+
+    function diffSortValue(entry, column) {
+        switch (column) {
+            case 'key': return entry.key;
+            case 'status': return DIFF_STATUS_ORDER[entry.status];
+            case 'shape': return (entry.shapeA || []).join('×');
+            case 'dtype': return entry.dtypeA || '';
+            default: return entry[column] === undefined ? -1 : entry[column];
+        }
+    }
+
+    function renderDiffPanel() {
+        const result = state.diff;
+        if (!result) return;
+
+        const { column, descending } = state.diffSort;
+        const entries = result.entries.slice().sort((a, b) => {
+            const x = diffSortValue(a, column);
+            const y = diffSortValue(b, column);
+            const order = typeof x === 'string' ? x.localeCompare(y) : x - y;
+            return (descending ? -order : order) || a.key.localeCompare(b.key);
+        });
+
+        const s = result.summary;
+        const header = DIFF_COLUMNS.map(c => {
+            const arrow = c.id === column ? (descending ? ' ▼' : ' ▲') : '';
+            return `<th class="sortable" data-column="${c.id}">${c.label}${arrow}</th>`;
+        }).join('');
+
+        const rows = entries.map(entry => {
+            const expandable = (entry.firstDiffs && entry.firstDiffs.length) || entry.error;
+            const expanded = state.diffExpanded.has(entry.key);
+            const shape = entry.shapeA && entry.shapeB && entry.shapeA.join('×') !== entry.shapeB.join('×')
+                ? `${entry.shapeA.join('×')} / ${entry.shapeB.join('×')}`
+                : (entry.shapeA || []).join('×');
+            const dtype = entry.dtypeA && entry.dtypeB && entry.dtypeA !== entry.dtypeB
+                ? `${entry.dtypeA} / ${entry.dtypeB}`
+                : (entry.dtypeA || '');
+            const num = (v) => v === undefined ? '' : formatDiffNumber(v);
+            const count = (v) => v === undefined ? '' : v.toLocaleString();
+            let html = `<tr class="diff-row${expandable ? ' expandable' : ''}" data-key="${escapeHtml(entry.key)}">
+                <td title="${escapeHtml(entry.keyB ? `${entry.key} ↔ ${entry.keyB}` : entry.key)}">${expandable ? (expanded ? '▾ ' : '▸ ') : ''}${escapeHtml(entry.key)}</td>
+                <td><span class="diff-status diff-${entry.status}">${DIFF_STATUS_TEXT[entry.status]}</span></td>
+                <td>${shape}</td>
+                <td>${escapeHtml(dtype)}</td>
+                <td>${num(entry.maxAbsDiff)}</td>
+                <td>${num(entry.meanAbsDiff)}</td>
+                <td>${num(entry.maxRelDiff)}</td>
+                <td>${count(entry.mismatchCount)}${entry.nonFiniteCount ? ` <span title="差值为 NaN/Inf 的元素">(${entry.nonFiniteCount.toLocaleString()} 非有限)</span>` : ''}</td>
+                <td>${count(entry.diffCount)}</td>
+            </tr>`;
+            if (expandable && expanded) {
+                const detail = entry.error
+                    ? escapeHtml(entry.error)
+                    : entry.firstDiffs.map(d => `[${d.index.join(', ')}]: ${escapeHtml(d.a)} → ${escapeHtml(d.b)}`).join('<br>');
+                html += `<tr class="diff-detail"><td colspan="${DIFF_COLUMNS.length}">${detail}</td></tr>`;
+            }
+            return html;
+        }).join('');
+
+        const onlyList = (keys, label) => keys.length
+            ? `<div class="info-section"><h4>${label}（${keys.length}）</h4><div class="diff-only">${keys.map(escapeHtml).join(', ')}</div></div>`
+            : '';
+
+        elements.diffPanel.innerHTML = `
+            <div class="diff-summary">
+                <div title="${escapeHtml(result.fileA)}">A: ${escapeHtml(result.fileA)}</div>
+                <div title="${escapeHtml(result.fileB)}">B: ${escapeHtml(result.fileB)}</div>
+                <div>
+                    ${['different', 'shape', 'error', 'close', 'identical'].map(k => `<span class="diff-status diff-${k}">${DIFF_STATUS_TEXT[k]} ${s[k]}</span>`).join(' ')}
+                    <span class="diff-tolerance">rtol=${result.rtol}, atol=${result.atol}</span>
+                </div>
+            </div>
+            <div class="data-table-container">
+                <table class="data-table diff-table">
+                    <thead><tr>${header}</tr></thead>
+                    <tbody>${rows}</tbody>
+                </table>
+            </div>
+            ${onlyList(result.onlyA, '只在 A 中')}
+            ${onlyList(result.onlyB, '只在 B 中')}
+        `;
+    }
+
+    // 表头点击排序，同一列再次点击切换升降序；有差异位置的行点击展开
+    function handleDiffPanelClick(e) {
+        const th = e.target.closest('th.sortable');
+        if (th) {
+            const column = th.dataset.column;
+            if (state.diffSort.column === column) {
+                state.diffSort.descending = !state.diffSort.descending;
+            } else {
+                // 数值列默认从大到小
+                state.diffSort = { column, descending: !['key', 'status', 'shape', 'dtype'].includes(column) };
+            }
+            renderDiffPanel();
+            return;
+        }
+        const row = e.target.closest('tr.diff-row.expandable');
+        if (row) {
+            const key = row.dataset.key;
+            if (state.diffExpanded.has(key)) {
+                state.diffExpanded.delete(key);
+            } else {
+                state.diffExpanded.add(key);
+            }
+            renderDiffPanel();
+        }
+    }
+
+    function formatDiffNumber(value) {
+        if (value === 0) return '0';
+        if (Math.abs(value) >= 1e4 || Math.abs(value) < 1e-3) return value.toExponential(3);
+        return value.toPrecision(4);
+    }
+
+    function escapeHtml(text) {
+        return String(text).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+    }
+
     // Tab切换
     function switchTab(tabName) {
         document.querySelectorAll('.tab').forEach(t => {
@@ -898,6 +1825,10 @@
     function handleCellDoubleClick(e) {
         const cell = e.target.closest('td');
         if (!cell || cell.classList.contains('index') || !cell.dataset.row) return;
+        if (!state.grid) {
+            updateStatus('切片结果为只读，请通过左侧维度导航打开后编辑');
+            return;
+        }
 
         const row = parseInt(cell.dataset.row);
         const col = parseInt(cell.dataset.col);
@@ -908,16 +1839,7 @@
             // 打开编辑对话框
             showCellEditDialog(row, col, originalValue, (newValue) => {
                 if (newValue !== originalValue) {
-                    addToHistory({
-                        type: 'edit',
-                        cell: cell,
-                        row: row + 1, // 表格行索引从0开始，但rowIndex从1开始（包含表头）
-                        col: col + 1,
-                        oldValue: originalValue,
-                        newValue: newValue
-                    });
-                    cell.textContent = newValue;
-                    cell.classList.add('edited');
+                    commitCellEdit(cell, row, col, originalValue, newValue);
                 }
             });
         } else {
@@ -936,19 +1858,11 @@
             const saveEdit = () => {
                 const newValue = input.value;
                 if (newValue !== originalValue) {
-                    addToHistory({
-                        type: 'edit',
-                        cell: cell,
-                        row: row + 1,
-                        col: col + 1,
-                        oldValue: originalValue,
-                        newValue: newValue
-                    });
-                    cell.textContent = newValue;
-                    cell.classList.add('edited');
+                    commitCellEdit(cell, row, col, originalValue, newValue);
                 } else {
                     cell.textContent = originalValue;
                 }
+                scheduleGridRender();
             };
 
             input.addEventListener('blur', saveEdit);
@@ -962,6 +1876,25 @@
         }
     }
 
+    /**
+     * 记录一次单元格编辑，row/col 为二维视图中从0开始的绝对坐标
+     */
+    function commitCellEdit(cell, row, col, oldValue, newValue) {
+        const grid = state.grid;
+        const editKey = `${row},${col}`;
+        addToHistory({
+            type: 'edit',
+            row: row,
+            col: col,
+            oldValue: oldValue,
+            newValue: newValue,
+            previous: grid.edits.get(editKey)  // 本次编辑前尚未保存的值
+        });
+        grid.edits.set(editKey, newValue);
+        cell.textContent = newValue;
+        cell.classList.add('edited');
+    }
+
     /**
      * 显示单元格编辑对话框
      */
@@ -1078,8 +2011,8 @@
                 const newWidth = Math.max(40, e.clientX - th.getBoundingClientRect().left);
                 th.style.width = newWidth + 'px';
                 
-                // 同时更新对应列的所有单元格
-                const colIndex = state.resizeColumn - 1; // 减1因为第一列是索引列
+                // 同时更新对应列的所有单元格（data-col 为绝对列号）
+                const colIndex = th.dataset.col !== undefined ? parseInt(th.dataset.col) : -1;
                 if (colIndex >= 0) {
                     const tds = table.querySelectorAll(`td[data-col="${colIndex}"]`);
                     tds.forEach(td => td.style.width = newWidth + 'px');
@@ -1117,6 +2050,10 @@
         if (state.isResizing) {
             state.isResizing = false;
             state.resizeColumn = null;
+            if (state.grid) {
+                updateGridSpacer();
+                renderGrid();
+            }
         }
         
         if (state.isSelecting) {
@@ -1178,7 +2115,7 @@
      * 切换单元格选择状态
      */
     function toggleCellSelection(cell) {
-        const key = `${cell.parentElement.rowIndex}-${cell.cellIndex}`;
+        const key = `${cell.dataset.row}-${cell.dataset.col}`;
         if (state.selectedCells.has(key)) {
             state.selectedCells.delete(key);
             cell.classList.remove('selected');
@@ -1223,16 +2160,14 @@
         if (state.historyIndex < 0) return;
         
         const action = state.editHistory[state.historyIndex];
-        if (action.type === 'edit') {
-            const table = elements.dataTable.querySelector('table') || elements.dataTable;
-            const row = table.rows[action.row];
-            if (row) {
-                const cell = row.cells[action.col];
-                if (cell) {
-                    cell.textContent = action.oldValue;
-                    cell.classList.remove('edited');
-                }
+        if (action.type === 'edit' && state.grid) {
+            const editKey = `${action.row},${action.col}`;
+            if (action.previous === undefined) {
+                state.grid.edits.delete(editKey);
+            } else {
+                state.grid.edits.set(editKey, action.previous);
             }
+            renderGrid();
         }
         
         state.historyIndex--;
@@ -1248,16 +2183,9 @@
         state.historyIndex++;
         const action = state.editHistory[state.historyIndex];
         
-        if (action.type === 'edit') {
-            const table = elements.dataTable.querySelector('table') || elements.dataTable;
-            const row = table.rows[action.row];
-            if (row) {
-                const cell = row.cells[action.col];
-                if (cell) {
-                    cell.textContent = action.newValue;
-                    cell.classList.add('edited');
-                }
-            }
+        if (action.type === 'edit' && state.grid) {
+            state.grid.edits.set(`${action.row},${action.col}`, action.newValue);
+            renderGrid();
         }
         
         updateStatus(`重做: ${state.historyIndex + 1}/${state.editHistory.length}`);
@@ -1267,21 +2195,16 @@
      * 保存更改
      */
     function saveChanges() {
-        if (state.editHistory.length === 0) {
+        const grid = state.grid;
+        if (!grid || grid.edits.size === 0) {
             updateStatus('没有需要保存的更改');
             return;
         }
 
-        // 收集所有编辑记录
-        const changes = [];
-        state.editHistory.forEach(action => {
-            if (action.type === 'edit') {
-                changes.push({
-                    row: action.row,
-                    col: action.col,
-                    value: action.newValue
-                });
-            }
+        // 收集所有未保存的编辑（每个单元格只保留最后一次的值）
+        const changes = Array.from(grid.edits, ([editKey, value]) => {
+            const [row, col] = editKey.split(',').map(Number);
+            return { row, col, value };
         });
 
         if (changes.length === 0) {
@@ -1296,7 +2219,8 @@
         // 发送保存请求到后端
         vscode.postMessage({
             command: 'saveEdits',
-            key: state.selectedKey,
+            key: grid.key,
+            index: grid.index,
             changes: changes
         });
         
@@ -1314,8 +2238,16 @@
         showLoading(false);
         if (response.success) {
             updateStatus(response.message || `成功保存 ${response.modified || 0} 个更改`);
-            // 保存成功后，可以选择清空历史或保留以支持撤销
-            // 这里保留历史以支持保存后撤销
+            // 修改已写入文件：清空未保存的编辑和历史，重新加载数据块
+            if (state.grid) {
+                state.grid.edits.clear();
+                state.grid.tiles.clear();
+                state.grid.requests.clear();
+                state.grid.loading.clear();
+                state.editHistory = [];
+                state.historyIndex = -1;
+                renderGrid();
+            }
         } else {
             showError(`保存失败: ${response.error}`);
             // 恢复编辑标记
@@ -1377,6 +2309,16 @@
                             ${tensor.info.shape.map((s, i) => `<option value="${i}" ${params.yAxis === i ? 'selected' : ''}>维度 ${i} (${s})</option>`).join('')}
                         </select>
                     </label>
+                    <label>分箱数:
+                        <input type="number" id="dialogBins" class="select" min="1" max="4096" value="${params.bins}">
+                    </label>
+                    <label>分箱方式:
+                        <select id="dialogBinScale" class="select">
+                            <option value="linear" ${params.binScale === 'linear' ? 'selected' : ''}>等宽</option>
+                            <option value="log" ${params.binScale === 'log' ? 'selected' : ''}>对数</option>
+                            <option value="quantile" ${params.binScale === 'quantile' ? 'selected' : ''}>等频（分位数）</option>
+                        </select>
+                    </label>
                     <label>
                         <input type="checkbox" id="dialogShowLegend" ${params.showLegend ? 'checked' : ''}> 显示图例
                     </label>
@@ -1415,13 +2357,16 @@
                 yAxis: parseInt(document.getElementById('dialogYAxis').value),
                 showLegend: document.getElementById('dialogShowLegend').checked,
                 showGrid: document.getElementById('dialogShowGrid').checked,
-                colorScheme: document.getElementById('dialogColorScheme').value
+                colorScheme: document.getElementById('dialogColorScheme').value,
+                bins: parseInt(document.getElementById('dialogBins').value) || 64,
+                binScale: document.getElementById('dialogBinScale').value
             };
             
             // 更新左侧选择器
             elements.chartType.value = state.plotParams.chartType;
 
             showLoading(true);
+            state.plotKey = state.selectedKey;
             vscode.postMessage({
                 command: 'plot',
                 key: state.selectedKey,
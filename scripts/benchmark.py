@@ -0,0 +1,579 @@
+"""
+TensorLens 性能基准测试
+生成参数化的大型测试数据（MB 到数十 GB；.npy、.npz、压缩 .npz、.pt；多种 dtype 与维度），
+逐个计时 tensor_handler.py 的各个命令，记录耗时、峰值内存与读取字节数，
+结果写入 JSON 报告，可与之前的报告比较以发现性能退化。
+
+用法：
+    python scripts/benchmark.py run --sizes 1MB,256MB --formats npy,npz --output base.json
+    python scripts/benchmark.py compare base.json new.json --threshold 0.2
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import zipfile
+import platform
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_FIXTURE_DIR = SCRIPT_DIR.parent / 'test_data' / 'benchmark'
+
+REPORT_VERSION = 1
+
+FORMATS = ['npy', 'npz', 'npz-compressed', 'pt']
+DTYPES = ['float64', 'float32', 'float16', 'bfloat16', 'int64', 'int32', 'int8', 'uint8', 'bool']
+COMMANDS = ['load', 'info', 'children', 'describe', 'slice', 'window', 'search', 'histogram', 'plot', 'export', 'save']
+
+# 各维度数下除第0维外的形状，第0维由目标大小决定
+TRAILING_SHAPES = {1: (), 2: (1024,), 3: (64, 64), 4: (3, 32, 32)}
+
+# 生成数据时每次写入的字节数
+WRITE_CHUNK_BYTES = 64 * 1024 * 1024
+
+_SIZE_UNITS = {'': 1, 'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3, 'TB': 1024 ** 4}
+
+
+def parse_size(text: str) -> int:
+    """解析 '64MB'、'1.5GB' 这样的大小"""
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMGT]?B?)\s*', text.upper())
+    if not match:
+        raise argparse.ArgumentTypeError(f"无法解析大小: '{text}'（示例：512KB、64MB、20GB）")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+
+def format_size(nbytes: int) -> str:
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if nbytes < 1024 or unit == 'GB':
+            return f'{nbytes:.0f}{unit}' if unit == 'B' else f'{nbytes:.3g}{unit}'
+        nbytes /= 1024
+
+
+def parse_list(text: str) -> list:
+    return [item.strip() for item in text.split(',') if item.strip()]
+
+
+# ========== 测试数据生成 ==========
+
+def numpy_dtype(dtype: str, np):
+    """bfloat16 在磁盘上以 16 位原始位模式生成（仅 .pt 支持）"""
+    return np.dtype('int16') if dtype == 'bfloat16' else np.dtype(dtype)
+
+
+def fixture_shape(size: int, dtype: str, rank: int, members: int, np) -> tuple:
+    """每个成员的形状：总大小平均分给各成员，第0维取整后至少为 1"""
+    trailing = TRAILING_SHAPES[rank]
+    row_elems = 1
+    for dim in trailing:
+        row_elems *= dim
+    elems = size // members // numpy_dtype(dtype, np).itemsize
+    return (max(1, elems // row_elems),) + trailing
+
+
+def random_block(rng, dtype: str, count: int, np):
+    """生成 count 个随机元素（一维）"""
+    if dtype == 'bool':
+        return rng.random(count) < 0.5
+    if dtype == 'bfloat16':
+        # 取 float32 正态随机数的高 16 位作为 bfloat16 位模式
+        return (rng.standard_normal(count, dtype=np.float32).view(np.uint32) >> 16).astype(np.uint16).view(np.int16)
+    kind = np.dtype(dtype).kind
+    if kind == 'f':
+        return rng.standard_normal(count, dtype=np.float64 if dtype == 'float64' else np.float32).astype(dtype, copy=False)
+    info = np.iinfo(dtype)
+    return rng.integers(info.min, info.max, count, dtype=dtype, endpoint=True)
+
+
+def iter_random_bytes(rng, dtype: str, shape: tuple, np):
+    """按 WRITE_CHUNK_BYTES 分块产出随机数据的字节，不在内存中构造完整数组"""
+    total = 1
+    for dim in shape:
+        total *= dim
+    per_chunk = max(1, WRITE_CHUNK_BYTES // numpy_dtype(dtype, np).itemsize)
+    for start in range(0, total, per_chunk):
+        yield random_block(rng, dtype, min(per_chunk, total - start), np).tobytes()
+
+
+def write_npy_stream(f, rng, dtype: str, shape: tuple, np):
+    header = {'descr': np.lib.format.dtype_to_descr(numpy_dtype(dtype, np)), 'fortran_order': False, 'shape': shape}
+    np.lib.format.write_array_header_1_0(f, header)
+    for block in iter_random_bytes(rng, dtype, shape, np):
+        f.write(block)
+
+
+def write_fixture(path: Path, fmt: str, dtype: str, shape: tuple, members: int, seed: int):
+    """
+    分块写入一个测试文件，内存占用与文件大小无关
+    .npy 只有一个数组；.npz 与 .pt 含 members 个同形状的张量（tensor_0, tensor_1, ...）
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    partial = path.with_name(path.name + '.partial')
+
+    if fmt == 'npy':
+        with open(partial, 'wb') as f:
+            write_npy_stream(f, rng, dtype, shape, np)
+    elif fmt in ('npz', 'npz-compressed'):
+        compression = zipfile.ZIP_DEFLATED if fmt == 'npz-compressed' else zipfile.ZIP_STORED
+        with zipfile.ZipFile(partial, 'w', compression=compression, allowZip64=True) as zf:
+            for i in range(members):
+                with zf.open(f'tensor_{i}.npy', 'w', force_zip64=True) as f:
+                    write_npy_stream(f, rng, dtype, shape, np)
+    elif fmt == 'pt':
+        import torch
+        # 先写成临时 .npy 再以写时复制方式映射，torch.save 从映射中直接读取存储，不占用等量内存
+        scratch = []
+        state = {}
+        try:
+            for i in range(members):
+                scratch_path = path.with_name(f'{path.name}.{i}.npy')
+                with open(scratch_path, 'wb') as f:
+                    write_npy_stream(f, rng, dtype, shape, np)
+                scratch.append(scratch_path)
+                tensor = torch.from_numpy(np.load(scratch_path, mmap_mode='c'))
+                state[f'tensor_{i}'] = tensor.view(torch.bfloat16) if dtype == 'bfloat16' else tensor
+            torch.save(state, partial)
+        finally:
+            state.clear()
+            for scratch_path in scratch:
+                scratch_path.unlink(missing_ok=True)
+    else:
+        raise ValueError(f'未知格式: {fmt}')
+    os.replace(partial, path)
+
+
+def fixture_plan(args) -> list:
+    """展开 格式 × dtype × 维度 × 大小 的组合；bfloat16 只生成 .pt"""
+    import numpy as np
+    plan = []
+    for fmt in args.formats:
+        for dtype in args.dtypes:
+            if dtype == 'bfloat16' and fmt != 'pt':
+                continue
+            for rank in args.ranks:
+                for size in args.sizes:
+                    members = 1 if fmt == 'npy' else args.members
+                    shape = fixture_shape(size, dtype, rank, members, np)
+                    ext = {'npy': 'npy', 'npz': 'npz', 'npz-compressed': 'npz', 'pt': 'pt'}[fmt]
+                    name = f"{fmt}_{dtype}_r{rank}_{format_size(size)}.{ext}"
+                    plan.append({
+                        'id': name,
+                        'format': fmt,
+                        'dtype': dtype,
+                        'rank': rank,
+                        'size': size,
+                        'members': members,
+                        'shape': list(shape)
+                    })
+    return plan
+
+
+def ensure_fixture(fixture: dict, fixture_dir: Path, seed: int, regenerate: bool) -> Path:
+    """测试文件已存在时直接复用（文件名包含全部参数），否则生成"""
+    path = fixture_dir / fixture['id']
+    if path.exists() and not regenerate:
+        return path
+    print(f"  🛠  生成 {fixture['id']}  形状 {tuple(fixture['shape'])} × {fixture['members']}", flush=True)
+    start = time.perf_counter()
+    write_fixture(path, fixture['format'], fixture['dtype'], tuple(fixture['shape']), fixture['members'], seed)
+    print(f"     完成，{format_size(path.stat().st_size)}，耗时 {time.perf_counter() - start:.1f}s", flush=True)
+    return path
+
+
+# ========== 单次测量（在子进程中运行） ==========
+
+def read_proc_io() -> dict:
+    """
+    Linux 下进程的读取字节数：rchar 为 read 系统调用读取的字节，read_bytes 为实际从存储设备读取的字节
+    内存映射的访问不经过 read，只体现在 read_bytes 与主缺页次数中（配合 --cold 使用才有意义）
+    """
+    try:
+        with open('/proc/self/io') as f:
+            fields = dict(line.split(':') for line in f if ':' in line)
+        return {'rchar': int(fields['rchar']), 'read_bytes': int(fields['read_bytes'])}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def read_rusage() -> dict:
+    """峰值常驻内存（字节）与主缺页次数；不支持 resource 模块的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # macOS 上 ru_maxrss 单位为字节，Linux 上为 KB
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return {'maxrss': usage.ru_maxrss * scale, 'majflt': usage.ru_majflt}
+
+
+def run_one(command: str, args: dict) -> dict:
+    """
+    在当前进程中执行一次命令并测量：导入 tensor_handler 与 numpy 之后记录基线
+    （与常驻工作进程一致，导入开销不计入命令），计时范围包括命令本身和命令行模式下的 JSON 序列化；
+    同时启用 tensor_handler 的遥测，记录各阶段（import/open/read/compute/serialize）的耗时与读取量
+    """
+    sys.path.insert(0, str(SCRIPT_DIR))
+    import tensor_handler
+    tensor_handler.load_numpy()
+
+    io_before = read_proc_io()
+    usage_before = read_rusage()
+    start = time.perf_counter()
+    telemetry = tensor_handler.Telemetry()
+    tensor_handler._request_local.telemetry = telemetry
+    error = None
+    try:
+        result = tensor_handler.dispatch(command, args)
+        with tensor_handler.telemetry_phase('serialize'):
+            output = json.dumps(result, ensure_ascii=False, default=tensor_handler.json_default)
+        if isinstance(result, dict) and result.get('error'):
+            error = str(result['error'])
+    except Exception as e:
+        output = ''
+        error = f'{type(e).__name__}: {e}'
+    wall = time.perf_counter() - start
+    phases = telemetry.finish()
+    io_after = read_proc_io()
+    usage_after = read_rusage()
+
+    measurement = {
+        'wallSeconds': wall,
+        'outputBytes': len(output.encode('utf-8')),
+        'error': error
+    }
+    if usage_after:
+        # 遥测按阶段重置了 VmHWM，此时 ru_maxrss 也随之重置，峰值以遥测结果为准
+        measurement['baselineRssBytes'] = usage_before['maxrss']
+        measurement['peakRssBytes'] = max(usage_after['maxrss'], phases.get('peakRssBytes') or 0)
+        measurement['majorFaults'] = usage_after['majflt'] - usage_before['majflt']
+    if io_after:
+        measurement['bytesRead'] = io_after['rchar'] - io_before['rchar']
+        measurement['storageReadBytes'] = io_after['read_bytes'] - io_before['read_bytes']
+    measurement['phases'] = phases['phases']
+    return measurement
+
+
+def drop_file_cache(path: Path):
+    """尽量把文件移出页缓存（POSIX_FADV_DONTNEED，只对已落盘的干净页有效）"""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def measure(python: str, command: str, args: dict, env: dict) -> dict:
+    """在新的 Python 进程中执行一次命令，保证峰值内存与读取字节只属于这一次"""
+    proc = subprocess.run(
+        [python, str(Path(__file__).resolve()), '_run', command, json.dumps(args)],
+        capture_output=True, text=True, encoding='utf-8', env=env
+    )
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {'error': f'子进程退出码 {proc.returncode}: {proc.stderr.strip()[-500:]}'}
+    return json.loads(lines[-1])
+
+
+# ========== 命令参数 ==========
+
+def command_args(command: str, fixture: dict, path: Path, scratch_dir: Path, search_query: str):
+    """为测试文件构造命令参数；不适用的组合返回 None"""
+    key = 'data' if fixture['format'] == 'npy' else 'tensor_0'
+    shape = fixture['shape']
+    rank = len(shape)
+    middle = shape[0] // 2
+
+    if command in ('load', 'info', 'children'):
+        return {'file': str(path)}
+    if command == 'describe':
+        return {'file': str(path), 'key': key}
+    if command == 'slice':
+        spec = f'{middle}:{middle + 4096}' if rank == 1 else str(middle)
+        return {'file': str(path), 'key': key, 'slice': spec}
+    if command == 'window':
+        return {'file': str(path), 'key': key, 'rowStart': middle if rank <= 2 else 0,
+                'rowCount': 64, 'colStart': 0, 'colCount': 32,
+                'index': [middle] + [0] * (rank - 3) if rank > 2 else None}
+    if command == 'search':
+        # 默认查询 nan：测试数据中没有 NaN，会完整扫描所有张量
+        return {'file': str(path), 'query': search_query}
+    if command == 'histogram':
+        if fixture['dtype'] == 'bool':
+            return None
+        return {'file': str(path), 'key': key, 'bins': 256}
+    if command == 'plot':
+        return {'file': str(path), 'type': 'line', 'keys': [key], 'options': {}}
+    if command == 'export':
+        return {'file': str(path), 'key': key, 'format': 'npy', 'output': str(scratch_dir / f"{fixture['id']}.export.npy")}
+    if command == 'save':
+        if fixture['format'] == 'pt':
+            return None
+        # 把第一个元素写为 1：第一次之后每次写入的值相同，重复测量时文件内容不变
+        return {'file': str(path), 'key': key, 'changes': [{'row': 0, 'col': 0, 'value': '1'}],
+                'index': [0] * (rank - 2) if rank > 2 else None}
+    raise ValueError(f'未知命令: {command}')
+
+
+# ========== 运行与报告 ==========
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=SCRIPT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_info(python: str) -> dict:
+    probe = subprocess.run(
+        [python, '-c', 'import json, sys, numpy\n'
+                       'try:\n    import torch; t = torch.__version__\nexcept ImportError:\n    t = None\n'
+                       'print(json.dumps({"python": sys.version.split()[0], "numpy": numpy.__version__, "torch": t}))'],
+        capture_output=True, text=True
+    )
+    info = json.loads(probe.stdout) if probe.returncode == 0 else {}
+    info.update({
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpuCount': os.cpu_count(),
+        'gitCommit': git_commit()
+    })
+    return info
+
+
+def summarize_runs(runs: list) -> dict:
+    """多次测量取耗时（含各阶段耗时）中位数；内存与读取量取最大值"""
+    walls = [run['wallSeconds'] for run in runs]
+    summary = {
+        'wallSeconds': {'median': statistics.median(walls), 'min': min(walls), 'max': max(walls)}
+    }
+    for field in ['peakRssBytes', 'baselineRssBytes', 'bytesRead', 'storageReadBytes', 'majorFaults', 'outputBytes']:
+        values = [run[field] for run in runs if run.get(field) is not None]
+        if values:
+            summary[field] = max(values)
+    phases = {}
+    for run in runs:
+        for name, phase in (run.get('phases') or {}).items():
+            phases.setdefault(name, []).append(phase['ms'])
+    if phases:
+        summary['phasesMs'] = {name: statistics.median(values) for name, values in phases.items()}
+    return summary
+
+
+def run_benchmarks(args) -> dict:
+    fixture_dir = Path(args.fixture_dir)
+    fixture_dir.mkdir(parents=True, exist_ok=True)
+    scratch_dir = fixture_dir / 'scratch'
+    scratch_dir.mkdir(exist_ok=True)
+
+    # 不启用统计缓存，每次测量的都是冷缓存下的完整计算
+    env = {k: v for k, v in os.environ.items() if k != 'TENSORLENS_CACHE_DIR'}
+    env['PYTHONIOENCODING'] = 'utf-8'
+    if args.workers is not None:
+        env['TENSORLENS_WORKERS'] = str(args.workers)
+
+    has_torch = subprocess.run([args.python, '-c', 'import torch'], capture_output=True).returncode == 0
+    plan = fixture_plan(args)
+    print(f'🚀 共 {len(plan)} 个测试文件 × {len(args.commands)} 个命令，每项测量 {args.repeat} 次')
+    print(f'📁 测试数据目录: {fixture_dir}\n')
+
+    results = []
+    for fixture in plan:
+        base = {'fixture': fixture}
+        if fixture['format'] == 'pt' and not has_torch:
+            print(f"⚠️  跳过 {fixture['id']}：PyTorch 未安装")
+            results.extend({**base, 'command': command, 'status': 'skipped', 'error': 'PyTorch 未安装'}
+                           for command in args.commands)
+            continue
+
+        path = ensure_fixture(fixture, fixture_dir, args.seed, args.regenerate)
+        fixture['fileBytes'] = path.stat().st_size
+        print(f"📊 {fixture['id']} ({format_size(fixture['fileBytes'])})")
+
+        for command in args.commands:
+            cmd_args = command_args(command, fixture, path, scratch_dir, args.search_query)
+            if cmd_args is None:
+                results.append({**base, 'command': command, 'status': 'unsupported'})
+                print(f'   {command:10s} 不支持')
+                continue
+
+            runs = []
+            for _ in range(args.repeat):
+                if args.cold:
+                    drop_file_cache(path)
+                runs.append(measure(args.python, command, cmd_args, env))
+                if runs[-1].get('error'):
+                    break
+            error = runs[-1].get('error')
+            if error:
+                results.append({**base, 'command': command, 'args': cmd_args, 'status': 'error', 'error': error})
+                print(f'   {command:10s} ❌ {error[:120]}')
+                continue
+
+            summary = summarize_runs(runs)
+            results.append({**base, 'command': command, 'args': cmd_args, 'status': 'ok', **summary, 'runs': runs})
+            rss = summary.get('peakRssBytes')
+            read = summary.get('bytesRead')
+            print(f"   {command:10s} {summary['wallSeconds']['median'] * 1000:10.1f} ms"
+                  f"   峰值内存 {format_size(rss) if rss is not None else '-':>8s}"
+                  f"   读取 {format_size(read) if read is not None else '-':>8s}", flush=True)
+
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        scratch_dir.mkdir(exist_ok=True)
+        if not args.keep_fixtures:
+            path.unlink(missing_ok=True)
+
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+    return {
+        'version': REPORT_VERSION,
+        'createdAt': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(args.python),
+        'options': {
+            'sizes': args.sizes,
+            'formats': args.formats,
+            'dtypes': args.dtypes,
+            'ranks': args.ranks,
+            'members': args.members,
+            'commands': args.commands,
+            'repeat': args.repeat,
+            'cold': args.cold,
+            'seed': args.seed,
+            'searchQuery': args.search_query
+        },
+        'results': results
+    }
+
+
+# ========== 报告比较 ==========
+
+def compare_reports(base: dict, new: dict, threshold: float, min_delta: float) -> list:
+    """
+    按 (测试文件, 命令) 配对比较两份报告，返回退化项列表
+    耗时中位数增加超过 threshold 比例且绝对增加超过 min_delta 秒、或峰值内存增加超过 threshold 比例时视为退化
+    """
+    def index(report):
+        return {(r['fixture']['id'], r['command']): r for r in report['results']}
+
+    base_index, new_index = index(base), index(new)
+    rows, regressions = [], []
+    for pair, after in new_index.items():
+        before = base_index.get(pair)
+        if before is None:
+            continue
+        if before.get('status') == 'ok' and after.get('status') != 'ok':
+            regressions.append({'fixture': pair[0], 'command': pair[1], 'metric': 'status',
+                                'before': 'ok', 'after': after.get('status'), 'error': after.get('error')})
+            continue
+        if before.get('status') != 'ok' or after.get('status') != 'ok':
+            continue
+
+        t0, t1 = before['wallSeconds']['median'], after['wallSeconds']['median']
+        rows.append((pair, t0, t1, before.get('peakRssBytes'), after.get('peakRssBytes')))
+        if t1 - t0 > min_delta and t1 > t0 * (1 + threshold):
+            regressions.append({'fixture': pair[0], 'command': pair[1], 'metric': 'wallSeconds',
+                                'before': t0, 'after': t1, 'ratio': t1 / t0 if t0 else None})
+        m0, m1 = before.get('peakRssBytes'), after.get('peakRssBytes')
+        if m0 and m1 and m1 > m0 * (1 + threshold):
+            regressions.append({'fixture': pair[0], 'command': pair[1], 'metric': 'peakRssBytes',
+                                'before': m0, 'after': m1, 'ratio': m1 / m0})
+
+    print(f"{'测试文件':40s} {'命令':10s} {'耗时(前)':>10s} {'耗时(后)':>10s} {'变化':>8s} {'内存(前)':>9s} {'内存(后)':>9s}")
+    for (fixture, command), t0, t1, m0, m1 in sorted(rows):
+        change = f'{(t1 / t0 - 1) * 100:+.0f}%' if t0 else '-'
+        print(f"{fixture:40s} {command:10s} {t0 * 1000:8.1f}ms {t1 * 1000:8.1f}ms {change:>8s}"
+              f" {format_size(m0) if m0 else '-':>9s} {format_size(m1) if m1 else '-':>9s}")
+    missing = sorted(set(base_index) - set(new_index))
+    if missing:
+        print(f'\n⚠️  新报告中缺少 {len(missing)} 项（测试矩阵不同？）')
+    return regressions
+
+
+# ========== 命令行 ==========
+
+def main():
+    if len(sys.argv) >= 4 and sys.argv[1] == '_run':
+        # 内部：子进程中执行一次测量，结果以一行 JSON 输出
+        print(json.dumps(run_one(sys.argv[2], json.loads(sys.argv[3]))))
+        return
+
+    parser = argparse.ArgumentParser(description='TensorLens 性能基准测试')
+    sub = parser.add_subparsers(dest='action', required=True)
+
+    run = sub.add_parser('run', help='生成测试数据并测量各命令')
+    run.add_argument('--sizes', type=lambda s: [parse_size(x) for x in parse_list(s)], default='1MB,64MB',
+                     help='每个测试文件的数据大小，逗号分隔（默认 1MB,64MB）')
+    run.add_argument('--formats', type=parse_list, default=','.join(FORMATS),
+                     help=f"文件格式（默认 {','.join(FORMATS)}）")
+    run.add_argument('--dtypes', type=parse_list, default='float32,float16,int64,uint8,bool',
+                     help=f"数据类型，可选 {','.join(DTYPES)}（bfloat16 只用于 .pt）")
+    run.add_argument('--ranks', type=lambda s: [int(x) for x in parse_list(s)], default='1,2,4',
+                     help='张量维度数，可选 1-4（默认 1,2,4）')
+    run.add_argument('--members', type=int, default=4, help='.npz/.pt 中的张量个数（默认 4）')
+    run.add_argument('--commands', type=parse_list, default=','.join(COMMANDS),
+                     help=f"要测量的命令（默认全部：{','.join(COMMANDS)}）")
+    run.add_argument('--repeat', type=int, default=3, help='每项测量次数，耗时取中位数（默认 3）')
+    run.add_argument('--cold', action='store_true', help='每次测量前把测试文件移出页缓存')
+    run.add_argument('--workers', type=int, help='TENSORLENS_WORKERS（默认使用环境变量或 CPU 核数）')
+    run.add_argument('--search-query', default='nan', help='search 命令的查询（默认 nan，完整扫描）')
+    run.add_argument('--fixture-dir', default=str(DEFAULT_FIXTURE_DIR), help='测试数据目录')
+    run.add_argument('--keep-fixtures', action='store_true', help='测量后保留测试数据，下次运行直接复用')
+    run.add_argument('--regenerate', action='store_true', help='即使测试数据已存在也重新生成')
+    run.add_argument('--seed', type=int, default=0, help='随机数种子')
+    run.add_argument('--python', default=sys.executable, help='运行 tensor_handler.py 的解释器')
+    run.add_argument('--output', '-o', help='报告路径（默认 benchmark-<时间>.json）')
+
+    cmp = sub.add_parser('compare', help='比较两份报告，发现退化时退出码为 1')
+    cmp.add_argument('base', help='基准报告')
+    cmp.add_argument('new', help='新报告')
+    cmp.add_argument('--threshold', type=float, default=0.2, help='视为退化的相对增幅（默认 0.2 即 20%%）')
+    cmp.add_argument('--min-delta', type=float, default=0.005, help='耗时的最小绝对增幅（秒），低于此值视为噪声')
+
+    args = parser.parse_args()
+
+    if args.action == 'compare':
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+        with open(args.new, encoding='utf-8') as f:
+            new = json.load(f)
+        regressions = compare_reports(base, new, args.threshold, args.min_delta)
+        if regressions:
+            print(f'\n❌ 发现 {len(regressions)} 项退化:')
+            for item in regressions:
+                if item['metric'] == 'status':
+                    print(f"  {item['fixture']} {item['command']}: 原本成功，现在 {item['after']}（{item.get('error')}）")
+                else:
+                    print(f"  {item['fixture']} {item['command']}: {item['metric']} ×{item['ratio']:.2f}")
+            sys.exit(1)
+        print('\n✅ 没有发现退化')
+        return
+
+    unknown = [c for c in args.commands if c not in COMMANDS]
+    unknown += [f for f in args.formats if f not in FORMATS]
+    unknown += [d for d in args.dtypes if d not in DTYPES]
+    unknown += [str(r) for r in args.ranks if r not in TRAILING_SHAPES]
+    if unknown:
+        parser.error(f"不支持的参数值: {', '.join(unknown)}")
+
+    report = run_benchmarks(args)
+    output = args.output or f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    failed = sum(1 for r in report['results'] if r['status'] == 'error')
+    print(f"\n✨ 完成，报告已写入 {output}" + (f"（{failed} 项失败）" if failed else ''))
+
+
+if __name__ == '__main__':
+    main()
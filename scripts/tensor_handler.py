@@ -3,17 +3,38 @@
 张量文件处理脚本
 支持 .npz, .npy, .pt, .pth 格式
 """
+import io
 import sys
 import json
 import os
 import re
+import pickle
+import zipfile
+import zlib
+import posixpath
+import base64
+import struct
+import shutil
+import builtins
+import importlib
+import tempfile
+import operator
+import itertools
+import time
+import functools
+import threading
+import types
+import contextlib
+import collections
+import collections.abc
 from pathlib import Path
 
 
 def load_numpy():
     """动态导入numpy"""
     try:
-        import numpy as np
+        with import_phase('numpy'):
+            import numpy as np
         return np
     except ImportError:
         raise ImportError("需要安装numpy: pip install numpy")
@@ -22,104 +43,169 @@ def load_numpy():
 def load_torch():
     """动态导入torch"""
     try:
-        import torch
+        with import_phase('torch'):
+            import torch
         return torch
     except ImportError:
         raise ImportError("需要安装pytorch: pip install torch")
 
 
+def load_h5py():
+    """动态导入h5py"""
+    try:
+        with import_phase('h5py'):
+            import h5py
+        return h5py
+    except ImportError:
+        raise ImportError("需要安装h5py: pip install h5py")
+
+
+def import_phase(module: str):
+    """模块首次导入时计入遥测的 import 阶段，已导入时不记录"""
+    if module in sys.modules:
+        return contextlib.nullcontext()
+    return telemetry_phase('import')
+
+
 def get_file_type(file_path: str) -> str:
     """获取文件类型"""
     ext = Path(file_path).suffix.lower()
+    if split_archive_path(file_path)[1] is not None and ext not in ARCHIVE_MEMBER_TYPES:
+        raise ValueError(f"压缩包内的 {ext} 文件需要先解压，只有 .npy/.npz 可以直接读取")
     if ext in ['.npz', '.npy']:
         return 'numpy'
     elif ext in ['.pt', '.pth']:
         return 'torch'
+    elif ext == '.safetensors' or is_safetensors_index(file_path):
+        return 'safetensors'
+    elif ext in ['.h5', '.hdf5', '.hdf', '.he5']:
+        return 'hdf5'
     else:
         raise ValueError(f"不支持的文件格式: {ext}")
 
 
 def load_tensor_file(file_path: str) -> dict:
-    """加载张量文件"""
+    """
+    加载张量文件
+    所有格式都通过惰性数组层打开：张量按需内存映射，信息与统计优先取自磁盘缓存，
+    未缓存的张量并行解压、统计
+    """
     file_type = get_file_type(file_path)
-    
-    if file_type == 'numpy':
-        return load_numpy_file(file_path)
-    else:
-        return load_torch_file(file_path)
-
-
-def load_numpy_file(file_path: str) -> dict:
-    """加载numpy文件"""
     np = load_numpy()
     ext = Path(file_path).suffix.lower()
     
-    if ext == '.npy':
-        data = np.load(file_path, allow_pickle=True)
-        tensors = [create_tensor_item('data', data, np)]
-    else:  # .npz
-        npz = np.load(file_path, allow_pickle=True)
-        tensors = [create_tensor_item(key, npz[key], np) for key in npz.files]
+    arrays = open_tensor_arrays(file_path)
+    cache = get_stats_cache()
+    items = {}
+    for key in arrays:
+        item = cache.get(file_path, key, 'item')
+        if item is not None:
+            items[key] = item
+
+    pending = [key for key in arrays if key not in items]
+    for key, item in summarize_tensors(file_path, arrays, pending, np).items():
+        cache.put(file_path, key, 'item', item)
+        items[key] = item
+    tensors = [items[key] for key in arrays]
     
     total_size = sum(t['info']['size'] * get_dtype_size(t['info']['dtype']) for t in tensors)
     
     return {
         'file': file_path,
-        'fileType': ext[1:],
+        'fileType': file_type if file_type in ('safetensors', 'hdf5') else ext[1:],
         'tensors': tensors,
         'totalSize': total_size
     }
 
 
-def load_torch_file(file_path: str) -> dict:
-    """加载torch文件"""
-    torch = load_torch()
-    np = load_numpy()
-    
-    data = torch.load(file_path, map_location='cpu', weights_only=False)
-    tensors = []
-    
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, torch.Tensor):
-                arr = value.detach().numpy()
-                tensors.append(create_tensor_item(key, arr, np))
-            elif isinstance(value, dict):
-                # 嵌套字典（如state_dict）
-                for sub_key, sub_value in value.items():
-                    if isinstance(sub_value, torch.Tensor):
-                        arr = sub_value.detach().numpy()
-                        tensors.append(create_tensor_item(f"{key}.{sub_key}", arr, np))
-    elif isinstance(data, torch.Tensor):
-        arr = data.detach().numpy()
-        tensors.append(create_tensor_item('data', arr, np))
-    
-    ext = Path(file_path).suffix.lower()
-    total_size = sum(t['info']['size'] * get_dtype_size(t['info']['dtype']) for t in tensors)
-    
-    return {
-        'file': file_path,
-        'fileType': ext[1:],
-        'tensors': tensors,
-        'totalSize': total_size
-    }
+CHECKPOINT_MAX_DEPTH = 64  # 对象图展开的最大深度，更深的容器按普通值处理
+
+
+def checkpoint_children(value):
+    """
+    检查点对象图中容器的直接子项 [(名称, 值)]；不是容器时返回 None
+    字典按键、列表与元组按下标展开；反序列化得到的自定义对象展开其状态（__dict__）与追加的元素
+    """
+    if isinstance(value, _PickleStub):
+        items = list(value.items())
+        state = getattr(value, 'state', None)
+        if isinstance(state, tuple) and len(state) == 2 and isinstance(state[1], dict):
+            # (__dict__, __slots__ 状态)
+            items.extend(state[1].items())
+            state = state[0]
+        if isinstance(state, dict):
+            items.extend(state.items())
+        elif state is not None:
+            items.append(('state', state))
+        # NEWOBJ 只调用 __new__，不经过 __init__
+        items.extend(enumerate(getattr(value, 'items_list', ())))
+        if not items:
+            items = list(enumerate(getattr(value, 'args', ())))
+        return items
+    if isinstance(value, dict):
+        return list(value.items())
+    if isinstance(value, (list, tuple)):
+        return list(enumerate(value))
+    if isinstance(getattr(value, '__dict__', None), dict) and not isinstance(
+            value, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+        # 旧版 PyTorch 文件通过 torch.load 得到真实对象（如整个 nn.Module、argparse.Namespace）
+        return list(vars(value).items())
+    return None
+
+
+def iter_checkpoint_tensors(data, is_tensor):
+    """
+    遍历检查点对象图中的所有张量，返回 (键名, 张量)
+    键名是从根到张量的各级字典键、列表下标用 '.' 连接（如 'optimizer.state.0.exp_avg'）；
+    根对象本身是张量时键名为 'data'。循环引用和超过 CHECKPOINT_MAX_DEPTH 的容器不再展开
+    """
+    if is_tensor(data):
+        yield 'data', data
+        return
+
+    visiting = set()
+
+    def walk(value, prefix: str, depth: int):
+        children = checkpoint_children(value)
+        if children is None or depth >= CHECKPOINT_MAX_DEPTH or id(value) in visiting:
+            return
+        visiting.add(id(value))
+        for name, child in children:
+            key = f'{prefix}.{name}' if prefix else str(name)
+            if is_tensor(child):
+                yield key, child
+            else:
+                yield from walk(child, key, depth + 1)
+        visiting.discard(id(value))
 
+    yield from walk(data, '', 0)
 
-def create_tensor_item(key: str, data, np) -> dict:
-    """创建张量项"""
+
+def create_tensor_item(key: str, data, np, upcast: str = None) -> dict:
+    """
+    创建张量项
+    upcast 不为空时 data 是 bf16/fp8 的原始位模式视图，预览和统计都按块转换为 float32，不生成完整副本
+    """
     # 获取预览数据
-    preview = get_preview_data(data, np)
+    if upcast:
+        preview = get_preview_data(upcast_raw(preview_view(data), upcast, np), np)
+    else:
+        preview = get_preview_data(data, np)
     
-    # 计算统计信息
+    # 计算统计信息（分块单遍扫描）；过大的 HDF5 数据集打开时不做全量扫描
     stats = {}
+    extra = {}
+    if isinstance(data, Hdf5Array):
+        extra = dict(data.dataset.storage_info)
+        if data.nbytes > HDF5_STATS_MAX_BYTES:
+            extra['statsDeferred'] = True
     try:
-        if np.issubdtype(data.dtype, np.number):
-            stats = {
-                'min': float(np.min(data)),
-                'max': float(np.max(data)),
-                'mean': float(np.mean(data)),
-                'std': float(np.std(data))
-            }
+        if extra.get('statsDeferred'):
+            pass
+        elif upcast:
+            stats = compute_stats(data, np, convert=lambda chunk: upcast_raw(chunk, upcast, np))
+        elif is_real_numeric(data.dtype, np):
+            stats = compute_stats(data, np)
     except:
         pass
     
@@ -128,35 +214,375 @@ def create_tensor_item(key: str, data, np) -> dict:
         'info': {
             'key': key,
             'shape': list(data.shape),
-            'dtype': str(data.dtype),
+            'dtype': 'float32' if upcast else str(data.dtype),
             'size': int(data.size),
+            **extra,
             **stats
         },
         'preview': preview
     }
 
 
+# ========== 流式统计引擎 ==========
+
+# 每个数据块的最大字节数（按 float64 计算），决定统计、搜索等分块操作的内存上限
+CHUNK_BYTES = 16 * 1024 * 1024
+
+# 默认输出的分位数
+DEFAULT_QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+
+def is_real_numeric(dtype, np) -> bool:
+    """是否为实数数值类型（整数或浮点，不含复数和布尔）"""
+    return np.issubdtype(dtype, np.integer) or np.issubdtype(dtype, np.floating)
+
+
+def chunk_elements(dtype, chunk_bytes: int = CHUNK_BYTES) -> int:
+    """按块字节上限计算每块元素数（以 float64 临时数组计）"""
+    return max(1, chunk_bytes // max(dtype.itemsize, 8))
+
+
+def iter_flat_chunks(data, np, max_elems: int, order: str = 'K'):
+    """
+    按内存布局顺序（order='C' 时按逻辑行优先顺序）把数组切成不超过 max_elems 个元素的一维块
+    连续数组（包括内存映射）返回视图，不复制；非连续数组逐行块复制。
+    非连续数组总是按逻辑行优先顺序产出：单行过大时逐行递归，行内也必须按 'C' 展开，
+    否则 Fortran 连续的子数组会按列展开，与调用方假定的 'C' 顺序不一致
+    """
+    if isinstance(data, (Hdf5Array, Hdf5Rows)):
+        yield from data.iter_chunks(max_elems)
+        return
+    if data.ndim == 0:
+        yield data.reshape(1)
+        return
+    if data.size == 0:
+        return
+
+    if data.flags['C_CONTIGUOUS'] or (order == 'K' and data.flags['F_CONTIGUOUS']):
+        flat = data.ravel(order='K')
+        for start in range(0, flat.size, max_elems):
+            yield flat[start:start + max_elems]
+        return
+
+    row_elems = data[0].size
+    if row_elems > max_elems:
+        for i in range(data.shape[0]):
+            yield from iter_flat_chunks(data[i], np, max_elems, 'C')
+        return
+
+    rows = max(1, max_elems // max(row_elems, 1))
+    for start in range(0, data.shape[0], rows):
+        yield data[start:start + rows].ravel()
+
+
+class QuantileSketch:
+    """
+    可合并的近似分位数草图（KLL 风格）
+    第 i 层的每个样本代表 2**i 个原始值；某层超过容量时排序后隔一取一提升到上一层。
+    大数据块先按其规模随机抽样直接放入对应层，避免对整个块排序。
+    """
+
+    def __init__(self, np, capacity: int = 8192, seed: int = 0):
+        self.np = np
+        self.capacity = capacity
+        self.levels = []
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """加入一维 float64 有限值"""
+        np = self.np
+        n = values.size
+        if n == 0:
+            return
+        level = 0
+        while (n >> (level + 1)) >= self.capacity:
+            level += 1
+        if level > 0:
+            values = values[self.rng.integers(0, n, size=n >> level)]
+        self._add(level, values)
+        self._compact()
+
+    def merge(self, other: 'QuantileSketch'):
+        for level, values in enumerate(other.levels):
+            self._add(level, values)
+        self._compact()
+
+    def _add(self, level: int, values):
+        while len(self.levels) <= level:
+            self.levels.append(self.np.empty(0, dtype=self.np.float64))
+        self.levels[level] = self.np.concatenate([self.levels[level], self.np.asarray(values, dtype=self.np.float64)])
+
+    def _compact(self):
+        np = self.np
+        level = 0
+        while level < len(self.levels):
+            buf = self.levels[level]
+            if buf.size > self.capacity:
+                buf = np.sort(buf)
+                keep = buf[-1:] if buf.size % 2 else buf[:0]
+                even = buf[:buf.size - keep.size]
+                promoted = even[int(self.rng.integers(0, 2))::2]
+                self.levels[level] = keep
+                self._add(level + 1, promoted)
+            level += 1
+
+    def quantiles(self, qs) -> list:
+        np = self.np
+        if not self.levels:
+            return [None] * len(qs)
+        values = np.concatenate(self.levels)
+        if values.size == 0:
+            return [None] * len(qs)
+        weights = np.concatenate([np.full(buf.size, 2.0 ** i) for i, buf in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values = values[order]
+        cumulative = np.cumsum(weights[order])
+        total = cumulative[-1]
+        result = []
+        for q in qs:
+            idx = int(np.searchsorted(cumulative, q * total, side='left'))
+            result.append(float(values[min(idx, values.size - 1)]))
+        return result
+
+
+class StreamingStats:
+    """
+    单遍流式统计：最小/最大值、均值、方差（Chan 并行合并公式，数值稳定），
+    NaN/Inf/零值计数，以及近似分位数。NaN/Inf 不参与数值统计。
+    """
+
+    def __init__(self, np):
+        self.np = np
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.nan_count = 0
+        self.posinf_count = 0
+        self.neginf_count = 0
+        self.zero_count = 0
+        self.sketch = QuantileSketch(np)
+
+    def update(self, chunk):
+        """加入一个一维数据块"""
+        np = self.np
+        if chunk.size == 0:
+            return
+
+        if np.issubdtype(chunk.dtype, np.floating):
+            finite_mask = np.isfinite(chunk)
+            n_finite = int(np.count_nonzero(finite_mask))
+            if n_finite != chunk.size:
+                nan_count = int(np.count_nonzero(np.isnan(chunk)))
+                posinf_count = int(np.count_nonzero(np.isposinf(chunk)))
+                self.nan_count += nan_count
+                self.posinf_count += posinf_count
+                self.neginf_count += chunk.size - n_finite - nan_count - posinf_count
+                chunk = chunk[finite_mask]
+
+        if chunk.size == 0:
+            return
+
+        self.zero_count += chunk.size - int(np.count_nonzero(chunk))
+        chunk_min = chunk.min()
+        chunk_max = chunk.max()
+        self.min = chunk_min if self.min is None else min(self.min, chunk_min)
+        self.max = chunk_max if self.max is None else max(self.max, chunk_max)
+
+        values = chunk.astype(np.float64, copy=False)
+        n_b = values.size
+        mean_b = float(values.mean())
+        m2_b = float(np.square(values - mean_b).sum())
+        self._merge_moments(n_b, mean_b, m2_b)
+        self.sketch.update(values)
+
+    def merge(self, other: 'StreamingStats'):
+        """合并另一个统计结果（用于并行计算）"""
+        self.nan_count += other.nan_count
+        self.posinf_count += other.posinf_count
+        self.neginf_count += other.neginf_count
+        self.zero_count += other.zero_count
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+            self._merge_moments(other.count, other.mean, other.m2)
+        self.sketch.merge(other.sketch)
+
+    def _merge_moments(self, n_b: int, mean_b: float, m2_b: float):
+        n_a = self.count
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * n_a * n_b / n
+        self.count = n
+
+    def result(self, quantiles=DEFAULT_QUANTILES) -> dict:
+        stats = {
+            'nanCount': self.nan_count,
+            'infCount': self.posinf_count + self.neginf_count,
+            'zeroCount': self.zero_count
+        }
+        if self.count:
+            stats.update({
+                'min': float(self.min),
+                'max': float(self.max),
+                'mean': self.mean,
+                'std': (self.m2 / self.count) ** 0.5,
+                'quantiles': {str(q): v for q, v in zip(quantiles, self.sketch.quantiles(quantiles))}
+            })
+        return stats
+
+
+def compute_stats(data, np, chunk_bytes: int = CHUNK_BYTES, convert=None) -> dict:
+    """
+    分块单遍计算数组统计信息，内存占用与数组大小无关
+    convert 用于逐块转换数据类型（如 bf16 位模式 -> float32），块大小按转换后的 4 字节元素计算
+    """
+    stats = StreamingStats(np)
+    itemsize = 4 if convert else data.dtype.itemsize
+    for chunk in iter_flat_chunks(data, np, max(1, chunk_bytes // itemsize)):
+        stats.update(convert(chunk) if convert else chunk)
+    return stats.result()
+
+
+def preview_view(data, max_rows=100, max_cols=20):
+    """预览所用的数据区域：0维为标量，1维取前若干行，2维及以上取（合并前面各维后）左上角"""
+    if data.ndim == 0:
+        return data
+    elif data.ndim == 1:
+        return data[:max_rows]
+    elif data.ndim == 2:
+        return data[:max_rows, :max_cols]
+    # 高维数据，展示前两维
+    return data.reshape(-1, data.shape[-1])[:max_rows, :max_cols]
+
+
 def get_preview_data(data, np, max_rows=100, max_cols=20):
     """获取预览数据"""
     try:
         if data.ndim == 0:
             return [[data.item()]]
-        elif data.ndim == 1:
-            return data[:max_rows].tolist()
-        elif data.ndim == 2:
-            return data[:max_rows, :max_cols].tolist()
-        else:
-            # 高维数据，展示前两维
-            flat = data.reshape(-1, data.shape[-1])
-            return flat[:max_rows, :max_cols].tolist()
+        return to_payload(preview_view(data, max_rows, max_cols), np)
     except:
         return []
 
 
+# ========== 二进制传输 ==========
+
+class BinaryArray:
+    """
+    以二进制帧传输的数组
+    常驻模式下响应中的 BinaryArray 被替换为描述符 {__binary__, dtype, shape, strides, offset, length}，
+    原始小端字节紧跟在 JSON 行之后发送；单次执行模式下退化为 tolist()。
+    """
+
+    def __init__(self, array, np):
+        self.array = np.ascontiguousarray(array)
+
+    def descriptor(self, offset: int) -> dict:
+        arr = self.array
+        return {
+            '__binary__': True,
+            'dtype': BINARY_DTYPE_NAMES[arr.dtype.str.lstrip('<|')],
+            'shape': list(arr.shape),
+            'strides': list(arr.strides),
+            'offset': offset,
+            'length': arr.nbytes
+        }
+
+    def tobytes(self):
+        return memoryview(self.array).cast('B')
+
+    def tolist(self):
+        return self.array.tolist()
+
+    def to_json(self) -> dict:
+        """缓存用的 JSON 表示"""
+        return {'__ndarray__': base64.b64encode(self.array.tobytes()).decode('ascii'), 'dtype': self.array.dtype.str, 'shape': list(self.array.shape)}
+
+    @staticmethod
+    def from_json(obj: dict, np):
+        data = np.frombuffer(base64.b64decode(obj['__ndarray__']), dtype=np.dtype(obj['dtype']))
+        return BinaryArray(data.reshape(obj['shape']), np)
+
+
+# numpy 小端 dtype 字符串 -> 前端 TypedArray 对应的类型名
+BINARY_DTYPE_NAMES = {
+    'f8': 'float64', 'f4': 'float32',
+    'i1': 'int8', 'i2': 'int16', 'i4': 'int32', 'i8': 'int64',
+    'u1': 'uint8', 'u2': 'uint16', 'u4': 'uint32', 'u8': 'uint64',
+    'b1': 'bool'
+}
+
+
+def to_payload(arr, np, exact_int64: bool = True):
+    """
+    把数组转换为响应载荷：数值数组使用二进制传输，其他类型（复数、结构化、对象、字符串）仍转为列表
+    float16 升为 float32；exact_int64=False 时 64 位整数转为 float64（图表库不支持 BigInt）
+    """
+    arr = np.asarray(arr)
+    dtype = arr.dtype
+    if dtype == np.float16:
+        arr = arr.astype(np.float32)
+    elif not exact_int64 and dtype.kind in 'iu' and dtype.itemsize == 8:
+        arr = arr.astype(np.float64)
+    elif dtype.kind not in 'biuf':
+        return arr.tolist()
+    if arr.dtype.byteorder == '>':
+        arr = arr.astype(arr.dtype.newbyteorder('<'))
+    return BinaryArray(arr, np)
+
+
+def encode_response(request_id, result) -> tuple:
+    """
+    把响应编码为 (JSON 行, 二进制块列表)，二进制块按描述符中的偏移依次排列
+    当前请求带有遥测时，序列化完成后附加 telemetry 字段
+    """
+    buffers = []
+    offset = [0]
+
+    def default(obj):
+        if isinstance(obj, BinaryArray):
+            descriptor = obj.descriptor(offset[0])
+            buffers.append(obj.tobytes())
+            offset[0] += descriptor['length']
+            return descriptor
+        raise TypeError(f'无法序列化的对象: {type(obj).__name__}')
+
+    with telemetry_phase('serialize'):
+        body = json.dumps(result, ensure_ascii=False, default=default)
+    line = f'{{"id": {json.dumps(request_id)}, "result": {body}, "binaryLength": {offset[0]}'
+    telemetry = current_telemetry()
+    if telemetry is not None:
+        line += f', "telemetry": {json.dumps(telemetry.finish())}'
+    return line + '}', buffers
+
+
+def json_default(obj):
+    """单次执行模式下的 JSON 序列化"""
+    if isinstance(obj, BinaryArray):
+        return obj.tolist()
+    raise TypeError(f'无法序列化的对象: {type(obj).__name__}')
+
+
+def cache_json_default(obj):
+    """缓存中的 JSON 序列化，数组以 base64 保存"""
+    if isinstance(obj, BinaryArray):
+        return obj.to_json()
+    raise TypeError(f'无法序列化的对象: {type(obj).__name__}')
+
+
+def cache_json_object_hook(obj: dict):
+    if '__ndarray__' in obj:
+        return BinaryArray.from_json(obj, load_numpy())
+    return obj
+
+
 def get_dtype_size(dtype: str) -> int:
     """获取数据类型字节大小"""
     dtype_sizes = {
-        'float64': 8, 'float32': 4, 'float16': 2,
+        'float64': 8, 'float32': 4, 'float16': 2, 'float8': 1,
         'int64': 8, 'int32': 4, 'int16': 2, 'int8': 1,
         'uint64': 8, 'uint32': 4, 'uint16': 2, 'uint8': 1,
         'bool': 1, 'complex64': 8, 'complex128': 16
@@ -167,284 +593,3337 @@ def get_dtype_size(dtype: str) -> int:
     return 4  # 默认
 
 
-def search_tensor(file_path: str, query: str, regex: bool, case_sensitive: bool) -> list:
-    """搜索张量数据"""
-    np = load_numpy()
-    file_type = get_file_type(file_path)
-    results = []
-    
-    # 加载数据
-    if file_type == 'numpy':
-        ext = Path(file_path).suffix.lower()
-        if ext == '.npy':
-            arrays = {'data': np.load(file_path, allow_pickle=True)}
+# ========== 数值搜索 ==========
+
+DEFAULT_TOLERANCE = 1e-6
+
+_RANGE_QUERY = re.compile(r'^(>=|<=|>|<)(.+)$')
+_BETWEEN_QUERY = re.compile(r'^(.+?)\.\.(.+)$')
+_TOLERANCE_QUERY = re.compile(r'^(.+?)(?:±|\+-)(.+)$')
+
+
+def parse_value_query(query: str, np, tolerance: float = DEFAULT_TOLERANCE):
+    """
+    解析数值搜索条件，返回 (描述, 匹配函数)；不是数值条件时返回 None
+    匹配函数接收一维数据块，返回布尔掩码。支持：
+    - 数值：浮点数按容差匹配，整数精确匹配；x±t 指定容差
+    - 比较：>x、>=x、<x、<=x
+    - 区间：a..b（闭区间）
+    - 特殊值：nan、inf（正负无穷）、+inf、-inf
+    """
+    q = query.strip().replace(' ', '')
+    lower = q.lower()
+
+    def is_float(chunk):
+        return chunk.dtype.kind == 'f'
+
+    if lower == 'nan':
+        return 'NaN', lambda c: np.isnan(c) if is_float(c) else np.zeros(c.shape, dtype=bool)
+    if lower in ('inf', '±inf'):
+        return '±Inf', lambda c: np.isinf(c) if is_float(c) else np.zeros(c.shape, dtype=bool)
+    if lower == '+inf':
+        return '+Inf', lambda c: np.isposinf(c) if is_float(c) else np.zeros(c.shape, dtype=bool)
+    if lower == '-inf':
+        return '-Inf', lambda c: np.isneginf(c) if is_float(c) else np.zeros(c.shape, dtype=bool)
+
+    try:
+        match = _RANGE_QUERY.match(q)
+        if match:
+            op, bound = match.group(1), float(match.group(2))
+            compare = {'>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal}[op]
+            return f'{op} {bound:g}', lambda c: compare(c, bound)
+
+        match = _BETWEEN_QUERY.match(q)
+        if match:
+            low, high = sorted((float(match.group(1)), float(match.group(2))))
+            return f'[{low:g}, {high:g}]', lambda c: (c >= low) & (c <= high)
+
+        match = _TOLERANCE_QUERY.match(q)
+        if match:
+            target, tolerance = float(match.group(1)), abs(float(match.group(2)))
         else:
-            npz = np.load(file_path, allow_pickle=True)
-            arrays = {k: npz[k] for k in npz.files}
+            target = float(q)
+    except ValueError:
+        return None
+
+    if target != target:
+        return parse_value_query('nan', np)
+
+    def equals(chunk):
+        if chunk.dtype.kind in 'biu' and tolerance < 1 and float(target).is_integer():
+            return chunk == int(target)
+        return np.abs(chunk - target) <= tolerance
+    return f'{target:g} ± {tolerance:g}', equals
+
+
+def scan_tensor(file_path: str, key: str, arrays, matcher, np, max_results: int, count_all: bool) -> dict:
+    """
+    分块扫描单个张量：收集前 max_results 个匹配的位置后即停止（count_all 时继续计数）
+    每块只产生与块同样大小的临时掩码，不会复制整个数组；请求被取消（如被新的搜索取代）时在块之间停止
+    """
+    shape, dtype, order, chunks = iter_tensor_chunks(file_path, key, arrays, np)
+    matches = []
+    hits = 0
+    complete = True
+    if dtype.kind not in 'biuf':
+        chunks.close()
+        return {'matches': matches, 'hits': 0, 'complete': True}
+
+    total = 1
+    for dim in shape:
+        total *= dim
+    offset = 0
+    try:
+        for chunk in chunks:
+            check_cancelled()
+            found = np.flatnonzero(matcher(chunk))
+            hits += found.size
+            for idx in found[:max(0, max_results - len(matches))]:
+                pos = tuple(int(i) for i in np.unravel_index(offset + int(idx), shape, order=order)) if shape else ()
+                matches.append({
+                    'position': str(pos),
+                    'value': str(chunk[idx]),
+                    'context': f'位置 {pos}'
+                })
+            offset += chunk.size
+            if len(matches) >= max_results and not count_all:
+                complete = offset >= total
+                break
+    finally:
+        chunks.close()
+    return {'matches': matches, 'hits': hits, 'complete': complete}
+
+
+def search_tensor(file_path: str, query: str, regex: bool, case_sensitive: bool,
+                  tolerance: float = DEFAULT_TOLERANCE, max_results: int = 100,
+                  count_all: bool = False) -> list:
+    """
+    搜索张量：键名匹配，以及（非正则模式下）数值条件匹配
+    各张量在线程池中并行分块扫描，每个张量找到 max_results 个匹配后提前结束；
+    hitCount 为命中数，提前结束时为下限（hitCountExact 为 false）
+    """
+    np = load_numpy()
+    arrays = open_tensor_arrays(file_path)
+    keys = list(arrays)
+
+    if regex:
+        pattern = re.compile(query, 0 if case_sensitive else re.IGNORECASE)
+        key_matches = lambda key: bool(pattern.search(key))
+    elif case_sensitive:
+        key_matches = lambda key: query in key
     else:
-        torch = load_torch()
-        loaded = torch.load(file_path, map_location='cpu', weights_only=False)
-        arrays = {}
-        if isinstance(loaded, dict):
-            for k, v in loaded.items():
-                if isinstance(v, torch.Tensor):
-                    arrays[k] = v.detach().numpy()
-        elif isinstance(loaded, torch.Tensor):
-            arrays['data'] = loaded.detach().numpy()
-    
-    # 对每个数组进行搜索
-    for key, arr in arrays.items():
+        key_matches = lambda key: query.lower() in key.lower()
+
+    value_query = None if regex else parse_value_query(query, np, tolerance)
+
+    def search_one(key):
         matches = []
-        
-        # 搜索键名
-        key_match = False
-        if regex:
-            pattern = re.compile(query, 0 if case_sensitive else re.IGNORECASE)
-            key_match = bool(pattern.search(key))
-        else:
-            if case_sensitive:
-                key_match = query in key
-            else:
-                key_match = query.lower() in key.lower()
-        
-        if key_match:
+        if key_matches(key):
             matches.append({'position': 'key', 'value': key, 'context': '键名匹配'})
-        
-        # 搜索数据内容（数值）
+        if value_query is None:
+            return key, matches, None
         try:
-            # 尝试将查询转换为数值
-            if not regex:
-                try:
-                    query_num = float(query)
-                    # 在数组中查找匹配的值
-                    if arr.dtype.kind in ['i', 'u', 'f']:  # 整数或浮点数
-                        # 查找相等的值
-                        if arr.dtype.kind == 'f':
-                            # 浮点数使用近似匹配
-                            found_indices = np.where(np.abs(arr - query_num) < 1e-6)
-                        else:
-                            found_indices = np.where(arr == int(query_num))
-                        
-                        # 限制返回数量，避免结果过多
-                        max_results = 100
-                        count = min(len(found_indices[0]), max_results)
-                        
-                        for i in range(count):
-                            pos = tuple(idx[i] for idx in found_indices)
-                            value = arr[pos]
-                            matches.append({
-                                'position': str(pos),
-                                'value': str(value),
-                                'context': f'位置 {pos}'
-                            })
-                        
-                        if len(found_indices[0]) > max_results:
-                            matches.append({
-                                'position': '...',
-                                'value': f'还有 {len(found_indices[0]) - max_results} 个匹配',
-                                'context': '结果已截断'
-                            })
-                except (ValueError, TypeError):
-                    # 不是数值，跳过数据搜索
-                    pass
+            scan = scan_tensor(file_path, key, arrays, value_query[1], np, max_results, count_all)
+        except RequestCancelled:
+            raise
         except Exception as e:
-            # 搜索失败，只返回键名匹配
-            pass
-        
-        if matches:
-            results.append({
-                'key': key,
-                'matches': matches,
-                'totalMatches': len(matches)
+            print(f"搜索张量 {key} 失败: {e}", file=sys.stderr)
+            return key, matches, None
+        matches.extend(scan['matches'])
+        if scan['hits'] > len(scan['matches']) or not scan['complete']:
+            remaining = scan['hits'] - len(scan['matches'])
+            matches.append({
+                'position': '...',
+                'value': f'还有 {remaining} 个匹配' if scan['complete'] else f'还有至少 {remaining} 个匹配',
+                'context': '结果已截断'
             })
-    
+        return key, matches, scan
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max(1, min(get_worker_count(), len(keys)))) as executor:
+        outcomes = list(executor.map(bind_request(search_one), keys))
+
+    results = []
+    for key, matches, scan in outcomes:
+        if not matches:
+            continue
+        item = {
+            'key': key,
+            'matches': matches,
+            'totalMatches': len(matches)
+        }
+        if scan is not None:
+            item['query'] = value_query[0]
+            item['hitCount'] = scan['hits']
+            item['hitCountExact'] = scan['complete']
+        results.append(item)
     return results
 
 
 def filter_tensor(file_path: str, key: str = None, shape: list = None, dtype: str = None) -> dict:
-    """筛选张量数据"""
-    data = load_tensor_file(file_path)
-    
+    """
+    按键名、形状、dtype 筛选张量
+    只比较元数据（与 info 命令相同，来自文件头或已缓存的惰性映射），不读取张量数据也不计算统计；
+    结果中的张量项只有 info，统计与预览仍在选中时通过 describe 获取
+    """
+    file_type = get_file_type(file_path)
+    ext = Path(file_path).suffix.lower()
+
     filtered = []
-    for tensor in data['tensors']:
-        info = tensor['info']
-        
+    for info in get_tensor_info(file_path):
         if key and key.lower() not in info['key'].lower():
             continue
         if shape and info['shape'] != shape:
             continue
         if dtype and dtype.lower() not in info['dtype'].lower():
             continue
-        
-        filtered.append(tensor)
-    
-    data['tensors'] = filtered
-    return data
+        filtered.append({'key': info['key'], 'info': info})
 
+    return {
+        'file': file_path,
+        'fileType': file_type if file_type in ('safetensors', 'hdf5') else ext[1:],
+        'tensors': filtered,
+        'totalSize': sum(item['info']['nbytes'] for item in filtered)
+    }
 
-def prepare_plot_data(file_path: str, plot_type: str, keys: list, options: dict) -> dict:
-    """准备绑图数据"""
-    np = load_numpy()
-    file_type = get_file_type(file_path)
-    
-    if file_type == 'numpy':
-        ext = Path(file_path).suffix.lower()
-        if ext == '.npy':
-            arrays = {'data': np.load(file_path, allow_pickle=True)}
+
+# ========== 直方图 ==========
+
+DEFAULT_BINS = 64
+MAX_HISTOGRAM_GROUPS = 1024
+
+
+def histogram_range(data, np, with_sketch: bool = False) -> dict:
+    """分块扫描有限值的最小值、最大值和最小正值，可选同时构建分位数草图"""
+    lo = hi = min_positive = None
+    sketch = QuantileSketch(np) if with_sketch else None
+    for chunk in iter_flat_chunks(data, np, chunk_elements(data.dtype)):
+        values = chunk[np.isfinite(chunk)] if chunk.dtype.kind == 'f' else chunk
+        if values.size == 0:
+            continue
+        chunk_lo, chunk_hi = values.min().item(), values.max().item()
+        lo = chunk_lo if lo is None else min(lo, chunk_lo)
+        hi = chunk_hi if hi is None else max(hi, chunk_hi)
+        positive = values[values > 0]
+        if positive.size:
+            chunk_pos = positive.min().item()
+            min_positive = chunk_pos if min_positive is None else min(min_positive, chunk_pos)
+        if sketch is not None:
+            sketch.update(values)
+    return {'min': lo, 'max': hi, 'minPositive': min_positive, 'sketch': sketch}
+
+
+def histogram_edges(bounds: dict, bins: int, scale: str, dtype, np):
+    """
+    计算分箱边界
+    linear 为等宽分箱（与 np.histogram 按数据 dtype 计算的边界一致）；
+    log 为对数等比分箱（覆盖正值范围）；quantile 为等频分箱（近似分位数，重复边界会被合并）
+    """
+    lo, hi = bounds['min'], bounds['max']
+    if scale == 'log':
+        if bounds['minPositive'] is None:
+            raise ValueError('数据中没有正值，无法使用对数分箱')
+        lo = bounds['minPositive']
+        if lo == hi:
+            return np.array([lo / 2, hi * 2])
+        return np.geomspace(lo, hi, bins + 1)
+    if lo == hi:
+        return np.array([lo - 0.5, hi + 0.5])
+    if scale == 'quantile':
+        edges = np.asarray(bounds['sketch'].quantiles(np.linspace(0, 1, bins + 1)), dtype=np.float64)
+        edges[0], edges[-1] = lo, hi
+        return np.unique(edges)
+    return np.histogram_bin_edges(np.empty(0, dtype=dtype), bins=bins, range=(lo, hi))
+
+
+def count_histogram(data, edges, np, uniform: bool) -> dict:
+    """单遍分块统计各分箱计数，NaN、±Inf 以及超出边界的有限值分别计数"""
+    counts = np.zeros(len(edges) - 1, dtype=np.int64)
+    nan_count = posinf_count = neginf_count = underflow = overflow = 0
+    lo, hi = float(edges[0]), float(edges[-1])
+    for chunk in iter_flat_chunks(data, np, chunk_elements(data.dtype)):
+        values = chunk
+        if chunk.dtype.kind == 'f':
+            finite = np.isfinite(chunk)
+            if not finite.all():
+                nan_count += int(np.isnan(chunk).sum())
+                posinf_count += int(np.isposinf(chunk).sum())
+                neginf_count += int(np.isneginf(chunk).sum())
+                values = chunk[finite]
+        underflow += int((values < lo).sum())
+        overflow += int((values > hi).sum())
+        if uniform:
+            # 等宽分箱走 numpy 的快速路径
+            chunk_counts, _ = np.histogram(values, bins=len(counts), range=(lo, hi))
         else:
-            arrays = dict(np.load(file_path, allow_pickle=True))
+            chunk_counts, _ = np.histogram(values, bins=edges)
+        counts += chunk_counts
+    return {
+        'counts': counts,
+        'nanCount': nan_count,
+        'posInfCount': posinf_count,
+        'negInfCount': neginf_count,
+        'underflow': underflow,
+        'overflow': overflow
+    }
+
+
+def compute_histogram(file_path: str, key: str, bins: int = DEFAULT_BINS, scale: str = 'linear',
+                      slice_spec: str = None, axis: int = None, value_range: list = None) -> dict:
+    """
+    计算张量（或其切片）的直方图，只返回分箱边界和计数
+    axis 不为空时沿该轴为每个下标分别计数（共享同一组边界），counts 为二维；
+    value_range 指定 [最小值, 最大值] 时跳过范围扫描，范围外的值计入 underflow/overflow。
+    不带切片、轴和范围的结果按文件身份缓存。
+    """
+    np = load_numpy()
+    if scale not in ('linear', 'log', 'quantile'):
+        raise ValueError(f'不支持的分箱方式: {scale}')
+    bins = max(1, min(int(bins), 4096))
+
+    cache = get_stats_cache()
+    cacheable = not slice_spec and axis is None and not value_range
+    kind = f'histogram:{scale}:{bins}'
+    if cacheable:
+        cached = cache.get(file_path, key, kind)
+        if cached is not None:
+            return cached
+
+    data = get_array(file_path, key)
+    if slice_spec:
+        data = np.asarray(apply_slice(data, slice_spec))
+    if not is_real_numeric(data.dtype, np):
+        raise ValueError(f'不支持对 {data.dtype} 类型计算直方图')
+
+    if value_range:
+        lo, hi = float(value_range[0]), float(value_range[1])
+        bounds = {'min': lo, 'max': hi, 'minPositive': lo if lo > 0 else None, 'sketch': None}
+        if scale == 'log' and lo <= 0:
+            # 范围下界不是正数：对数分箱从范围内数据的最小正值开始
+            min_positive = histogram_range(data, np)['minPositive']
+            if min_positive is not None and min_positive <= hi:
+                bounds['minPositive'] = min_positive
+        if scale == 'quantile':
+            bounds['sketch'] = histogram_range(data, np, with_sketch=True)['sketch']
+    else:
+        bounds = histogram_range(data, np, with_sketch=(scale == 'quantile'))
+
+    result = {'key': key, 'scale': scale, 'size': int(data.size)}
+    if bounds['min'] is None:
+        # 没有有限值：只报告特殊值计数
+        edges = np.array([0.0, 1.0])
+    else:
+        edges = histogram_edges(bounds, bins, scale, data.dtype, np)
+    uniform = scale == 'linear'
+
+    if axis is None:
+        result.update(count_histogram(data, edges, np, uniform))
+    else:
+        axis = int(axis) % max(data.ndim, 1)
+        groups = data.shape[axis]
+        if groups > MAX_HISTOGRAM_GROUPS:
+            raise ValueError(f'维度 {axis} 长度为 {groups}，超过按轴统计的上限 {MAX_HISTOGRAM_GROUPS}')
+        parts = [count_histogram(data[(slice(None),) * axis + (i,)], edges, np, uniform) for i in range(groups)]
+        result['axis'] = axis
+        result['counts'] = np.stack([part['counts'] for part in parts])
+        for field in ('nanCount', 'posInfCount', 'negInfCount', 'underflow', 'overflow'):
+            result[field] = [part[field] for part in parts]
+
+    result['edges'] = to_payload(np.asarray(edges, dtype=np.float64), np)
+    result['counts'] = to_payload(result['counts'], np, exact_int64=False)
+    if cacheable:
+        cache.put(file_path, key, kind, result)
+    return result
+
+
+def compute_histograms(file_path: str, keys: list, **options) -> list:
+    """并行计算多个张量的直方图（如检查点中每一层的权重分布），不支持的张量返回 error"""
+    if keys is None or keys == '*':
+        keys = list(open_tensor_arrays(file_path))
+
+    def run(key):
+        try:
+            return compute_histogram(file_path, key, **options)
+        except Exception as e:
+            return {'key': key, 'error': str(e)}
+
+    workers = max(1, min(get_worker_count(), len(keys)))
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(bind_request(run), keys))
+
+
+# ========== 降采样与多分辨率金字塔 ==========
+
+# 折线图等一维序列的目标点数
+PLOT_POINTS = 4000
+# 热力图每个方向的最大格数
+PYRAMID_SIDE = 512
+# 金字塔按 PYRAMID_TILE × PYRAMID_TILE 个输出格分块计算和缓存
+PYRAMID_TILE = 256
+
+
+def iter_buckets(arr, np, bucket: int, chunk_bytes: int = CHUNK_BYTES):
+    """
+    按逻辑（行优先）顺序把数组划分为长度为 bucket 的桶，逐块产出 (起始下标, 二维块)
+    二维块每行是一个完整的桶，末尾不足一个桶的部分单独作为一行产出
+    """
+    per_chunk = max(bucket, chunk_elements(arr.dtype, chunk_bytes) // bucket * bucket)
+    carry = None
+    start = 0
+    for chunk in iter_flat_chunks(arr, np, per_chunk, order='C'):
+        if carry is not None:
+            chunk = np.concatenate([carry, chunk])
+        usable = chunk.size // bucket * bucket
+        if usable:
+            yield start, chunk[:usable].reshape(-1, bucket)
+            start += usable
+        carry = chunk[usable:] if usable < chunk.size else None
+    if carry is not None:
+        yield start, carry.reshape(1, -1)
+
+
+def as_float(block, np):
+    """整数、布尔块转为 float64，浮点块保持原样"""
+    return block if block.dtype.kind == 'f' else block.astype(np.float64)
+
+
+def downsample_minmax(arr, np, points: int, offset: int = 0):
+    """min/max 降采样：每个桶按下标顺序保留最小值和最大值两个点，不会丢失尖峰"""
+    bucket = max(1, -(-arr.size // max(1, points // 2)))
+    xs, ys = [], []
+    for start, block in iter_buckets(arr, np, bucket):
+        values = as_float(block, np)
+        nan = np.isnan(values)
+        imin = np.where(nan, np.inf, values).argmin(axis=1)
+        imax = np.where(nan, -np.inf, values).argmax(axis=1)
+        rows = np.arange(block.shape[0])[:, None]
+        idx = np.stack([np.minimum(imin, imax), np.maximum(imin, imax)], axis=1)
+        xs.append((offset + start + rows * block.shape[1] + idx).ravel())
+        ys.append(values[rows, idx].ravel())
+    x, y = np.concatenate(xs), np.concatenate(ys)
+    # 最小值和最大值是同一个点时去重
+    keep = np.ones(x.size, dtype=bool)
+    keep[1:] = x[1:] != x[:-1]
+    return x[keep], y[keep]
+
+
+def downsample_stride(arr, np, points: int, offset: int = 0):
+    """等间隔抽样：每个桶取第一个点，适合直方图、箱线图等需要无偏样本的图表"""
+    bucket = max(1, -(-arr.size // max(1, points)))
+    xs, ys = [], []
+    for start, block in iter_buckets(arr, np, bucket):
+        xs.append(offset + start + np.arange(block.shape[0]) * bucket)
+        ys.append(as_float(block[:, 0], np))
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+def downsample_lttb(arr, np, points: int, offset: int = 0):
+    """
+    LTTB（最大三角形三桶）降采样，保留曲线形状
+    两遍流式扫描：第一遍求各桶均值，第二遍逐桶选出与前一选中点、后一桶均值构成面积最大的点
+    """
+    n = arr.size
+    points = max(3, points)
+    bucket = max(1, -(-n // (points - 2)))
+
+    centers, means = [], []
+    for start, block in iter_buckets(arr, np, bucket):
+        values = as_float(block, np)
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means.append(np.where(valid, values, 0).sum(axis=1) / count)
+        centers.append(start + np.arange(block.shape[0]) * bucket + (block.shape[1] - 1) / 2)
+    centers, means = np.concatenate(centers), np.concatenate(means)
+
+    last_x, last_y = n - 1, float(arr.flat[n - 1])
+    px, py = 0.0, float(arr.flat[0])
+    xs, ys = [0], [py]
+    index = 0
+    for start, block in iter_buckets(arr, np, bucket):
+        values = as_float(block, np)
+        for row in range(block.shape[0]):
+            if index + 1 < len(centers):
+                nx, ny = centers[index + 1], means[index + 1]
+            else:
+                nx, ny = last_x, last_y
+            y = values[row]
+            x = start + row * bucket + np.arange(y.size)
+            area = np.abs((px - nx) * (y - py) - (px - x) * (ny - py))
+            area = np.where(np.isnan(area), -1.0, area)
+            pick = int(area.argmax())
+            px, py = float(x[pick]), float(y[pick])
+            xs.append(int(x[pick]))
+            ys.append(py)
+            index += 1
+    if xs[-1] != last_x:
+        xs.append(last_x)
+        ys.append(last_y)
+    x, y = np.asarray(xs, dtype=np.int64) + offset, np.asarray(ys, dtype=np.float64)
+    keep = np.ones(x.size, dtype=bool)
+    keep[1:] = x[1:] != x[:-1]
+    return x[keep], y[keep]
+
+
+DOWNSAMPLERS = {
+    'minmax': downsample_minmax,
+    'lttb': downsample_lttb,
+    'stride': downsample_stride,
+}
+
+
+def flat_range(arr, start: int, end: int):
+    """取数组按行优先展平后的 [start, end) 区间；连续数组返回视图，否则只复制覆盖该区间的行"""
+    if isinstance(arr, Hdf5Array) and arr.ndim > 1 and start == 0 and end == arr.size:
+        # 整个 HDF5 数据集参与降采样：保持惰性，由降采样按块读取
+        return arr
+    if arr.ndim <= 1 or arr.flags['C_CONTIGUOUS']:
+        return arr.reshape(-1)[start:end]
+    row_elems = arr[0].size
+    first, last = start // row_elems, -(-end // row_elems)
+    base = first * row_elems
+    return arr[first:last].reshape(-1)[start - base:end - base]
+
+
+def series_payload(arr, np, method: str, points: int, region: dict = None) -> dict:
+    """
+    一维序列的绘图数据：点数不超过 points 时原样返回（x 用 x0/dx 表示），
+    否则按 method 降采样并返回对应的 x 下标；region 为缩放时的可见区间 {start, end}
+    """
+    total = arr.size
+    start, end = 0, total
+    if region:
+        start = max(0, min(int(region.get('start', 0)), total))
+        end = max(start, min(int(region.get('end', total)), total))
+    data = flat_range(arr, start, end)
+
+    if data.size <= points or data.size == 0:
+        return {'y': to_payload(data.reshape(-1), np, exact_int64=False), 'x0': start, 'dx': 1, 'total': total}
+
+    x, y = DOWNSAMPLERS.get(method, downsample_minmax)(data, np, points, start)
+    return {
+        'x': to_payload(x, np, exact_int64=False),
+        'y': to_payload(y, np),
+        'total': total,
+        'downsample': method
+    }
+
+
+def pyramid_factor(length: int, side: int = PYRAMID_SIDE) -> int:
+    """使 length 缩减到 side 以内的最小 2 的幂倍数"""
+    factor = 1
+    while -(-length // factor) > side:
+        factor *= 2
+    return factor
+
+
+def reduce_blocks(band, fr: int, fc: int, method: str, np):
+    """把二维数据按 fr×fc 的块求均值或最大值（忽略 NaN），边缘不足一块的部分按实际元素计算"""
+    rows, cols = band.shape
+    out_rows, out_cols = -(-rows // fr), -(-cols // fc)
+    padded = np.full((out_rows * fr, out_cols * fc), np.nan)
+    padded[:rows, :cols] = band
+    blocks = padded.reshape(out_rows, fr, out_cols, fc)
+    valid = ~np.isnan(blocks)
+    count = valid.sum(axis=(1, 3))
+    if method == 'max':
+        result = np.where(valid, blocks, -np.inf).max(axis=(1, 3))
     else:
-        torch = load_torch()
-        loaded = torch.load(file_path, map_location='cpu', weights_only=False)
-        arrays = {}
-        if isinstance(loaded, dict):
-            for k, v in loaded.items():
-                if isinstance(v, torch.Tensor):
-                    arrays[k] = v.detach().numpy()
-        elif isinstance(loaded, torch.Tensor):
-            arrays['data'] = loaded.detach().numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = np.where(valid, blocks, 0).sum(axis=(1, 3)) / count
+    result[count == 0] = np.nan
+    return result.astype(np.float32)
+
+
+def compute_pyramid_tile(arr2d, fr: int, fc: int, method: str, tile_row: int, tile_col: int, np):
+    """按行带流式计算金字塔一个分块，每个行带不超过 CHUNK_BYTES（至少 fr 行）"""
+    rows, cols = arr2d.shape
+    r0 = tile_row * PYRAMID_TILE * fr
+    r1 = min(rows, r0 + PYRAMID_TILE * fr)
+    c0 = tile_col * PYRAMID_TILE * fc
+    c1 = min(cols, c0 + PYRAMID_TILE * fc)
+    band_rows = max(fr, CHUNK_BYTES // max(1, (c1 - c0) * 8) // fr * fr)
+
+    parts = []
+    for start in range(r0, r1, band_rows):
+        band = as_float(np.asarray(arr2d[start:min(r1, start + band_rows), c0:c1]), np)
+        parts.append(reduce_blocks(band, fr, fc, method, np))
+    return np.concatenate(parts, axis=0)
+
+
+def pyramid_region(file_path: str, key: str, arr2d, method: str, region: dict, np) -> dict:
+    """
+    热力图数据：选择使可见区域不超过 PYRAMID_SIDE 格的金字塔层级，只计算覆盖区域的分块
+    分块按 (视图形状, 方法, 层级, 分块坐标) 缓存；返回的 x0/dx、y0/dy 把格子映射回原始下标
+    """
+    rows, cols = arr2d.shape
+    region = region or {}
+    r0 = max(0, min(int(region.get('rowStart', 0)), rows))
+    r1 = max(r0, min(int(region.get('rowEnd', rows)), rows))
+    c0 = max(0, min(int(region.get('colStart', 0)), cols))
+    c1 = max(c0, min(int(region.get('colEnd', cols)), cols))
+    fr = pyramid_factor(r1 - r0)
+    fc = pyramid_factor(c1 - c0)
+
+    if fr == 1 and fc == 1:
+        return {
+            'z': to_payload(np.asarray(arr2d[r0:r1, c0:c1]), np, exact_int64=False),
+            'x0': c0, 'dx': 1, 'y0': r0, 'dy': 1,
+            'shape': [rows, cols], 'factor': [1, 1]
+        }
+
+    out_r0, out_r1 = r0 // fr, -(-r1 // fr)
+    out_c0, out_c1 = c0 // fc, -(-c1 // fc)
+    cache = get_stats_cache()
+    band_parts = []
+    for tile_row in range(out_r0 // PYRAMID_TILE, (out_r1 - 1) // PYRAMID_TILE + 1):
+        row_parts = []
+        for tile_col in range(out_c0 // PYRAMID_TILE, (out_c1 - 1) // PYRAMID_TILE + 1):
+            kind = f'pyramid:{rows}x{cols}:{method}:{fr}x{fc}:{tile_row}:{tile_col}'
+            tile = cache.get_or_compute(
+                file_path, key, kind,
+                lambda: to_payload(compute_pyramid_tile(arr2d, fr, fc, method, tile_row, tile_col, np), np)
+            )
+            row_parts.append(tile.array)
+        band_parts.append(np.concatenate(row_parts, axis=1))
+    level = np.concatenate(band_parts, axis=0)
+
+    base_r = (out_r0 // PYRAMID_TILE) * PYRAMID_TILE
+    base_c = (out_c0 // PYRAMID_TILE) * PYRAMID_TILE
+    z = level[out_r0 - base_r:out_r1 - base_r, out_c0 - base_c:out_c1 - base_c]
+    return {
+        'z': to_payload(z, np),
+        'x0': out_c0 * fc + (fc - 1) / 2, 'dx': fc,
+        'y0': out_r0 * fr + (fr - 1) / 2, 'dy': fr,
+        'shape': [rows, cols], 'factor': [fr, fc]
+    }
+
+
+def plot_view_2d(arr, plot_type: str, np):
+    """热力图/图像的二维视图：1维数据在图像模式下排成方阵，热力图中为单行；高维合并除第0维外的各维"""
+    if arr.ndim == 0:
+        return arr.reshape(1, 1)
+    if arr.ndim == 1:
+        if plot_type == 'image':
+            size = int(np.sqrt(len(arr)))
+            return arr[:size * size].reshape(size, size)
+        return arr.reshape(1, -1)
+    if arr.ndim > 2:
+        return arr.reshape(arr.shape[0], -1)
+    return arr
+
+
+def prepare_plot_data(file_path: str, plot_type: str, keys: list, options: dict) -> dict:
+    """
+    准备绘图数据
+    一维序列按 options.downsample（minmax/lttb/stride）降采样到约 options.points 个点；
+    热力图和图像使用按 options.reduce（mean/max）聚合的多分辨率金字塔；
+    options.region 为缩放后的可见区域，只返回该区域更精细的数据
+    """
+    np = load_numpy()
+    arrays = open_tensor_arrays(file_path)
+    region = options.get('region')
+    points = int(options.get('points') or PLOT_POINTS)
+    default_method = 'stride' if plot_type in ('histogram', 'box') else 'minmax'
+    method = options.get('downsample') or default_method
+    reduce = options.get('reduce') or 'mean'
     
     series = []
     for key in keys:
         if key not in arrays:
             continue
+        check_cancelled()
         
         arr = arrays[key]
         
-        if plot_type == 'image':
-            # 图像类型需要2D数据
-            if arr.ndim == 1:
-                size = int(np.sqrt(len(arr)))
-                arr = arr[:size*size].reshape(size, size)
-            elif arr.ndim > 2:
-                arr = arr.reshape(arr.shape[0], -1)
-            
-            series.append({
-                'name': key,
-                'z': arr.tolist()
-            })
-        elif plot_type == 'heatmap':
-            if arr.ndim == 1:
-                arr = arr.reshape(1, -1)
-            elif arr.ndim > 2:
-                arr = arr.reshape(arr.shape[0], -1)
-            
+        if plot_type == 'histogram':
+            # 直方图在服务端对完整张量分箱，只返回边界和计数
+            hist = compute_histogram(
+                file_path, key,
+                options.get('bins') or DEFAULT_BINS,
+                options.get('binScale') or 'linear'
+            )
             series.append({
                 'name': key,
-                'z': arr[:100, :100].tolist()
+                'edges': hist['edges'],
+                'y': hist['counts'],
+                'nanCount': hist['nanCount'],
+                'posInfCount': hist['posInfCount'],
+                'negInfCount': hist['negInfCount']
             })
+        elif plot_type in ('image', 'heatmap'):
+            view = plot_view_2d(arr, plot_type, np)
+            series.append({'name': key, **pyramid_region(file_path, key, view, reduce, region, np)})
         else:
             # 线图、柱状图等
-            flat = arr.flatten()[:10000]
-            series.append({
-                'name': key,
-                'x': list(range(len(flat))),
-                'y': flat.tolist()
-            })
+            series.append({'name': key, **series_payload(arr, np, method, points, region)})
     
     return {
         'type': plot_type,
         'title': f'{plot_type.title()} - {", ".join(keys)}',
-        'data': series
+        'data': series,
+        'region': region
     }
 
 
-def export_data(file_path: str, key: str, format: str, output: str):
-    """导出数据"""
-    np = load_numpy()
-    file_type = get_file_type(file_path)
-    
-    # 加载数据
-    if file_type == 'numpy':
-        ext = Path(file_path).suffix.lower()
-        if ext == '.npy':
-            arr = np.load(file_path, allow_pickle=True)
-        else:
-            npz = np.load(file_path, allow_pickle=True)
-            arr = npz[key]
-    else:
-        torch = load_torch()
-        loaded = torch.load(file_path, map_location='cpu', weights_only=False)
-        if isinstance(loaded, dict):
-            arr = loaded[key].detach().numpy()
-        else:
-            arr = loaded.detach().numpy()
-    
-    # 导出
-    if format == 'csv':
-        if arr.ndim == 1:
-            arr = arr.reshape(-1, 1)
-        elif arr.ndim > 2:
-            arr = arr.reshape(arr.shape[0], -1)
-        np.savetxt(output, arr, delimiter=',')
-    
-    elif format == 'json':
-        with open(output, 'w') as f:
-            json.dump(arr.tolist(), f)
-    
-    elif format == 'npy':
-        np.save(output, arr)
-    
-    elif format == 'txt':
-        np.savetxt(output, arr.flatten(), fmt='%s')
-    
-    elif format == 'png':
+# ========== 流式导出 ==========
+
+# 导出按较小的块读取，使进度汇报与取消响应足够及时
+EXPORT_CHUNK_BYTES = 1024 * 1024
+
+
+def iter_export_chunks(file_path: str, key: str, np, chunk_bytes: int = EXPORT_CHUNK_BYTES):
+    """
+    按逻辑行优先（C）顺序分块读取张量，返回 (形状, dtype, 块迭代器)
+    未打开的压缩 .npz 成员边解压边读取；Fortran 顺序的压缩成员只能先完整解压
+    """
+    arrays = open_tensor_arrays(file_path)
+    if len(arrays) == 1:
+        key = next(iter(arrays))
+    elif key not in arrays:
+        raise KeyError(f'张量不存在: {key}')
+
+    shape, dtype, order, chunks = iter_tensor_chunks(file_path, key, arrays, np, chunk_bytes)
+    if order != 'C' and len(shape) > 1:
+        chunks.close()
+        arr = arrays[key]
+        chunks = iter_flat_chunks(arr, np, chunk_elements(arr.dtype, chunk_bytes), order='C')
+    return tuple(shape), dtype, chunks
+
+
+def iter_row_segments(chunks, width: int):
+    """
+    把一维块流切分为不跨行的片段，产出 (起始元素下标, 片段)
+    width 为每行元素数；一行过长时会被拆成多个片段，内存占用不随行宽增长
+    """
+    pos = 0
+    for chunk in chunks:
+        start = 0
+        while start < chunk.size:
+            count = min(chunk.size - start, width - pos % width)
+            yield pos, chunk[start:start + count]
+            pos += count
+            start += count
+
+
+def write_json_stream(f, shape: tuple, chunks, np, progress):
+    """
+    流式写出嵌套 JSON 数组，结果与 json.dump(arr.tolist()) 相同
+    每个元素前按其多维位置补齐需要打开的括号，行末补齐需要关闭的括号
+    """
+    if len(shape) == 0:
+        for chunk in chunks:
+            f.write(json.dumps(chunk.tolist()[0]))
+        return
+    size = 1
+    for dim in shape:
+        size *= dim
+    if size == 0:
+        f.write(json.dumps(np.zeros(shape).tolist()))
+        return
+
+    # 第 k 层的括号每隔 spans[k] 个元素打开/关闭一次
+    spans = []
+    span = 1
+    for dim in reversed(shape):
+        span *= dim
+        spans.append(span)
+    separators = (', ', ': ')
+    for pos, segment in iter_row_segments(chunks, shape[-1]):
+        end = pos + segment.size
+        opens = sum(1 for span in spans if pos % span == 0)
+        closes = sum(1 for span in spans if end % span == 0)
+        body = json.dumps(segment.tolist(), separators=separators)[1:-1]
+        f.write((', ' if pos else '') + '[' * opens + body + ']' * closes)
+        progress(end)
+
+
+def write_npy_stream(f, shape: tuple, dtype, chunks, np, progress):
+    """流式写出 .npy：先写头部，再按 C 顺序依次写入数据块"""
+    header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': shape}
+    try:
+        np.lib.format.write_array_header_1_0(f, header)
+    except ValueError:
+        # 头部超过 65535 字节（字段极多的结构化 dtype）时需要 2.0 版本
+        np.lib.format.write_array_header_2_0(f, header)
+    done = 0
+    for chunk in chunks:
+        f.write(chunk.tobytes())
+        done += chunk.size
+        progress(done)
+
+
+def write_text_stream(f, shape: tuple, chunks, np, progress, delimiter: str = None):
+    """
+    流式写出文本：delimiter 为空时每个元素一行（fmt='%s'），否则按行写出 CSV（与 np.savetxt 默认格式相同）
+    CSV 中 1 维视为一列，高维合并第 0 维之后的各维
+    """
+    if delimiter is None:
+        done = 0
+        for chunk in chunks:
+            np.savetxt(f, chunk, fmt='%s')
+            done += chunk.size
+            progress(done)
+        return
+
+    width = 1 if len(shape) <= 1 else int(np.prod(shape[1:]))
+    if width == 0:
+        # 与 np.savetxt 一致：每行输出一个空行
+        f.write('\n' * (shape[0] if shape else 1))
+        return
+    pending = []
+    pending_size = 0
+    done = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_size += chunk.size
+        rows = pending_size // width
+        if rows == 0:
+            continue
+        block = np.concatenate(pending) if len(pending) > 1 else pending[0]
+        np.savetxt(f, block[:rows * width].reshape(rows, width), delimiter=delimiter)
+        rest = block[rows * width:]
+        pending = [rest] if rest.size else []
+        pending_size = rest.size
+        done += rows * width
+        progress(done)
+
+
+def export_png(f, file_path: str, key: str, np):
+    """导出预览图：1 维数组先做 min/max 降采样，2 维以上取左上角 100x100"""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        raise ImportError("需要安装matplotlib: pip install matplotlib")
+    arr = get_array(file_path, key)
+    plt.figure(figsize=(10, 8))
+    if arr.ndim <= 1:
+        x, y = downsample_minmax(arr.reshape(-1), np, PLOT_POINTS)
+        plt.plot(x, y)
+    else:
+        view = arr[(0,) * (arr.ndim - 2)] if arr.ndim > 2 else arr
+        plt.imshow(np.asarray(view[:100, :100]))
+        plt.colorbar()
+    plt.savefig(f, format='png', dpi=150)
+    plt.close()
+
+
+def export_data(file_path: str, key: str, format: str, output: str):
+    """
+    流式导出数据
+    按块读取源张量并逐块写出，内存占用与张量大小无关；
+    常驻模式下汇报进度并响应取消，输出先写入临时文件，完成后才替换目标文件
+    """
+    np = load_numpy()
+    if format not in ('csv', 'json', 'npy', 'txt', 'png'):
+        raise ValueError(f'不支持的导出格式: {format}')
+
+    def write(f):
+        if format == 'png':
+            export_png(f, file_path, key, np)
+            return
+
+        shape, dtype, chunks = iter_export_chunks(file_path, key, np)
+        total = 1
+        for dim in shape:
+            total *= dim
+
+        def progress(done):
+            check_cancelled()
+            report_progress(done, total)
+
+        if format == 'npy':
+            if dtype.hasobject:
+                chunks.close()
+                np.save(f, get_array(file_path, key), allow_pickle=True)
+            else:
+                write_npy_stream(f, shape, dtype, chunks, np, progress)
+            return
+
+        text = io.TextIOWrapper(f, encoding='utf-8', newline='')
+        if format == 'json':
+            write_json_stream(text, shape, chunks, np, progress)
+        elif format == 'csv':
+            write_text_stream(text, shape, chunks, np, progress, delimiter=',')
+        else:
+            write_text_stream(text, shape, chunks, np, progress)
+        text.flush()
+        text.detach()
+
+    atomic_write(output, write)
+    return {'success': True, 'output': output}
+
+
+def get_tensor_info(file_path: str) -> list:
+    """获取张量信息（不加载完整数据）"""
+    file_type = get_file_type(file_path)
+    ext = Path(file_path).suffix.lower()
+
+    with telemetry_phase('open'):
+        if file_type == 'numpy':
+            if ext == '.npy':
+                return [read_npy_info(file_path)]
+            return read_npz_info(file_path)
+
+        if file_type == 'safetensors':
+            return read_safetensors_info(file_path)
+
+        if file_type == 'hdf5':
+            return read_hdf5_info(file_path)
+
+        if zipfile.is_zipfile(file_path):
+            return read_torch_info(file_path)
+
+    # 旧版（非zip）PyTorch格式没有可单独解析的元数据，只能完整加载；加载结果按文件身份缓存，
+    # 检查点树、筛选与随后的读取共用同一次加载，不计算统计
+    arrays = open_tensor_arrays(file_path)
+    return [make_header_info(key, list(arr.shape), str(arr.dtype), arr.dtype.itemsize)
+            for key, arr in arrays.items()]
+
+
+# ========== 元数据读取（只解析文件头，不读取张量数据） ==========
+
+def read_npy_header(fp, np) -> dict:
+    """从文件对象当前位置解析 .npy 头部，返回形状、dtype、数据起始偏移"""
+    start = fp.tell()
+    version = np.lib.format.read_magic(fp)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+    return {
+        'shape': list(shape),
+        'dtype': dtype,
+        'fortranOrder': bool(fortran_order),
+        'headerSize': fp.tell() - start
+    }
+
+
+def make_header_info(key: str, shape: list, dtype: str, itemsize: int) -> dict:
+    """根据头部信息构造张量信息"""
+    size = 1
+    for dim in shape:
+        size *= int(dim)
+    return {
+        'key': key,
+        'shape': [int(d) for d in shape],
+        'dtype': dtype,
+        'size': size,
+        'nbytes': size * itemsize
+    }
+
+
+def read_npy_info(file_path: str) -> dict:
+    """读取 .npy 文件头"""
+    np = load_numpy()
+    with open_binary(file_path) as f:
+        header = read_npy_header(f, np)
+    dtype = header['dtype']
+    return make_header_info('data', header['shape'], str(dtype), dtype.itemsize)
+
+
+def read_npz_info(file_path: str) -> list:
+    """通过 zip 中央目录逐个读取 .npz 成员的 .npy 头部（只解压头部几百字节）"""
+    np = load_numpy()
+    infos = []
+    with open_zip(file_path) as zf:
+        for member in zf.infolist():
+            if not member.filename.endswith('.npy'):
+                continue
+            with zf.open(member) as f:
+                header = read_npy_header(f, np)
+            dtype = header['dtype']
+            info = make_header_info(member.filename[:-4], header['shape'], str(dtype), dtype.itemsize)
+            info['compressed'] = member.compress_type != zipfile.ZIP_STORED
+            info['compressedSize'] = member.compress_size
+            infos.append(info)
+    return infos
+
+
+# PyTorch 存储类型名 -> (dtype, 字节数)
+TORCH_STORAGE_DTYPES = {
+    'DoubleStorage': ('float64', 8),
+    'FloatStorage': ('float32', 4),
+    'HalfStorage': ('float16', 2),
+    'BFloat16Storage': ('bfloat16', 2),
+    'LongStorage': ('int64', 8),
+    'IntStorage': ('int32', 4),
+    'ShortStorage': ('int16', 2),
+    'CharStorage': ('int8', 1),
+    'ByteStorage': ('uint8', 1),
+    'BoolStorage': ('bool', 1),
+    'ComplexDoubleStorage': ('complex128', 16),
+    'ComplexFloatStorage': ('complex64', 8),
+    'Float8_e4m3fnStorage': ('float8_e4m3fn', 1),
+    'Float8_e5m2Storage': ('float8_e5m2', 1),
+}
+
+# PyTorch dtype 名 -> (dtype, 字节数)，用于 _rebuild_tensor_v3
+TORCH_DTYPES = {
+    'float64': ('float64', 8), 'double': ('float64', 8),
+    'float32': ('float32', 4), 'float': ('float32', 4),
+    'float16': ('float16', 2), 'half': ('float16', 2),
+    'bfloat16': ('bfloat16', 2),
+    'int64': ('int64', 8), 'long': ('int64', 8),
+    'int32': ('int32', 4), 'int': ('int32', 4),
+    'int16': ('int16', 2), 'short': ('int16', 2),
+    'int8': ('int8', 1), 'uint8': ('uint8', 1), 'bool': ('bool', 1),
+    'complex128': ('complex128', 16), 'complex64': ('complex64', 8),
+    'float8_e4m3fn': ('float8_e4m3fn', 1), 'float8_e5m2': ('float8_e5m2', 1),
+}
+
+
+class TorchStorageRef:
+    """PyTorch 存储引用（只记录位置，不读取数据）"""
+
+    def __init__(self, key: str, dtype: str, itemsize: int, location: str, numel: int):
+        self.key = key
+        self.dtype = dtype
+        self.itemsize = itemsize
+        self.location = location
+        self.numel = numel
+
+
+class TorchTensorMeta:
+    """PyTorch 张量元数据"""
+
+    def __init__(self, storage: TorchStorageRef, offset: int, shape, stride, dtype=None):
+        self.storage = storage
+        self.offset = int(offset)
+        self.shape = [int(d) for d in shape]
+        self.stride = [int(s) for s in stride]
+        if dtype is not None:
+            self.dtype, self.itemsize = dtype
+        else:
+            self.dtype, self.itemsize = storage.dtype, storage.itemsize
+
+
+class _PickleStub(dict):
+    """元数据解析时代替未知类的占位对象，吸收构造参数和状态"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.args = args
+        self.items_list = []
+
+    def __setstate__(self, state):
+        self.state = state
+
+    def append(self, item):
+        self.items_list.append(item)
+
+    def extend(self, items):
+        self.items_list.extend(items)
+
+
+_stub_classes = {}
+_stub_classes_lock = threading.Lock()
+
+
+def pickle_stub_class(module: str, name: str) -> type:
+    """为每个未知类生成一个同名的占位子类，检查点树据此显示原始类名（如 argparse.Namespace）"""
+    with _stub_classes_lock:
+        cls = _stub_classes.get((module, name))
+        if cls is None:
+            cls = type(name, (_PickleStub,), {'stub_name': f'{module}.{name}'})
+            _stub_classes[(module, name)] = cls
+        return cls
+
+
+class _TorchDtypeName(str):
+    """torch.float32 等 dtype 全局对象的占位"""
+
+
+def _rebuild_tensor_meta(storage, storage_offset, size, stride, *args, **kwargs):
+    return TorchTensorMeta(storage, storage_offset, size, stride)
+
+
+def _rebuild_tensor_meta_v3(storage, storage_offset, size, stride, requires_grad, backward_hooks, dtype, *args):
+    return TorchTensorMeta(storage, storage_offset, size, stride, TORCH_DTYPES.get(str(dtype)))
+
+
+def _rebuild_parameter_meta(data, *args, **kwargs):
+    return data
+
+
+def _rebuild_from_type_meta(func, new_type, args, state):
+    return func(*args)
+
+
+class TorchMetaUnpickler(pickle.Unpickler):
+    """
+    只解析 data.pkl 中对象结构的反序列化器
+    张量被替换为 TorchTensorMeta，存储只记录键名和元素数，不加载任何数据，
+    也不导入 torch 或执行检查点中的自定义类。
+    """
+
+    SAFE_BUILTINS = {'dict', 'list', 'tuple', 'set', 'frozenset', 'slice', 'complex', 'int', 'float', 'str', 'bytes', 'bytearray', 'bool', 'range'}
+
+    def find_class(self, module, name):
+        if module == 'torch._utils':
+            if name in ('_rebuild_tensor', '_rebuild_tensor_v2'):
+                return _rebuild_tensor_meta
+            if name == '_rebuild_tensor_v3':
+                return _rebuild_tensor_meta_v3
+            if name in ('_rebuild_parameter', '_rebuild_parameter_with_state'):
+                return _rebuild_parameter_meta
+        if module == 'torch._tensor' and name == '_rebuild_from_type_v2':
+            return _rebuild_from_type_meta
+        if module == 'torch':
+            if name.endswith('Storage'):
+                return name
+            if name == 'Size':
+                return tuple
+            if name in TORCH_DTYPES:
+                return _TorchDtypeName(name)
+        if module == 'collections' and name in ('OrderedDict', 'defaultdict'):
+            return collections.OrderedDict
+        if module in ('builtins', '__builtin__') and name in self.SAFE_BUILTINS:
+            return getattr(builtins, name)
+        return pickle_stub_class(module, name)
+
+    def persistent_load(self, pid):
+        # ('storage', storage_type, key, location, numel)
+        if isinstance(pid, tuple) and pid and pid[0] == 'storage':
+            _, storage_type, key, location, numel = pid
+            type_name = storage_type if isinstance(storage_type, str) else getattr(storage_type, '__name__', '')
+            dtype, itemsize = TORCH_STORAGE_DTYPES.get(type_name, ('uint8', 1))
+            return TorchStorageRef(str(key), dtype, itemsize, str(location), int(numel))
+        raise pickle.UnpicklingError(f'不支持的持久化对象: {pid!r}')
+
+
+def torch_archive_prefix(zf: zipfile.ZipFile) -> str:
+    """zip 格式检查点的顶层目录（如 'archive/'），data.pkl 与 data/ 存储记录都在其下"""
+    pkl_name = next((n for n in zf.namelist() if n.endswith('data.pkl') and n.count('/') == 1), None)
+    if pkl_name is None:
+        raise ValueError('无法找到检查点中的 data.pkl')
+    return pkl_name[:-len('data.pkl')]
+
+
+def read_torch_meta(file_path: str, zf: zipfile.ZipFile = None):
+    """读取 zip 格式 PyTorch 检查点的对象结构（张量为 TorchTensorMeta）；zf 为已打开的压缩包时直接复用"""
+    if zf is None:
+        with zipfile.ZipFile(file_path) as zf:
+            return read_torch_meta(file_path, zf)
+    with zf.open(torch_archive_prefix(zf) + 'data.pkl') as f:
+        return TorchMetaUnpickler(f).load()
+
+
+def read_torch_info(file_path: str) -> list:
+    """从 data.pkl 读取 PyTorch 张量的形状和 dtype"""
+    data = read_torch_meta(file_path)
+    infos = []
+    for key, meta in iter_checkpoint_tensors(data, lambda v: isinstance(v, TorchTensorMeta)):
+        infos.append(make_header_info(key, meta.shape, meta.dtype, meta.itemsize))
+    return infos
+
+
+# ========== 压缩包成员（不解压直接读取） ==========
+
+# 'shards.zip::part0/x.npy' 表示压缩包内的成员；.npy/.npz 成员直接从压缩包中读取，不解压到临时目录
+ARCHIVE_MEMBER_SEP = '::'
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+ARCHIVE_MEMBER_TYPES = ('.npy', '.npz')
+
+# 压缩 tar 的解压流：文件开头的魔数 -> 打开函数
+TAR_COMPRESSIONS = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'lzma'),
+)
+
+# 已定位的压缩包成员：文件身份 -> ArchiveMember，避免每次请求重新扫描 tar 头
+_archive_members = collections.OrderedDict()
+_archive_members_lock = threading.Lock()
+MAX_ARCHIVE_MEMBERS = 256
+
+
+def split_archive_path(file_path: str) -> tuple:
+    """'压缩包路径::成员路径' -> (压缩包路径, 成员路径)；普通文件返回 (file_path, None)"""
+    start = 0
+    while True:
+        pos = file_path.find(ARCHIVE_MEMBER_SEP, start)
+        if pos < 0:
+            return file_path, None
+        if file_path[:pos].lower().endswith(ARCHIVE_SUFFIXES):
+            return file_path[:pos], file_path[pos + len(ARCHIVE_MEMBER_SEP):].replace('\\', '/')
+        start = pos + 1
+
+
+def file_identity(file_path: str) -> tuple:
+    """
+    文件身份 (绝对路径, 大小, 修改时间, inode)；压缩包成员取压缩包的文件状态，路径后附成员名
+    分片检查点的索引文件再附上各分片的 (路径, 大小, 修改时间, inode)，原地改写分片后身份随之改变
+    """
+    archive, member = split_archive_path(file_path)
+    stat = os.stat(archive)
+    path = os.path.abspath(archive)
+    if member is not None:
+        path += ARCHIVE_MEMBER_SEP + member
+    elif is_safetensors_index(path):
+        shards = sorted(set(read_safetensors_index(path).values()))
+        return path, stat.st_size, stat.st_mtime_ns, stat.st_ino, tuple(file_identity(shard) for shard in shards)
+    return path, stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+class SegmentFile(io.RawIOBase):
+    """底层文件对象中 [offset, offset + size) 区间的只读视图，关闭时一并关闭底层文件"""
+
+    def __init__(self, fp, offset: int, size: int):
+        self._fp = fp
+        self._offset = offset
+        self._size = size
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            pos += self._pos
+        elif whence == io.SEEK_END:
+            pos += self._size
+        if pos < 0:
+            raise ValueError(f'无效的定位偏移: {pos}')
+        self._pos = pos
+        return pos
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast('B')
+        count = max(0, min(len(view), self._size - self._pos))
+        if self._fp.tell() != self._offset + self._pos:
+            self._fp.seek(self._offset + self._pos)
+        done = 0
+        while done < count:
+            n = self._fp.readinto(view[done:count])
+            if not n:
+                break
+            done += n
+        self._pos += done
+        return done
+
+    def readall(self) -> bytes:
+        return self.read(max(0, self._size - self._pos))
+
+    def close(self):
+        if not self.closed:
+            self._fp.close()
+        super().close()
+
+
+class ArchiveMember:
+    """
+    压缩包内的一个成员
+    未压缩的成员（zip 的 stored 成员、未压缩 tar 中的文件）记录数据在压缩包中的绝对偏移，可以直接内存映射；
+    deflate 压缩的 zip 成员与 gzip/bzip2/xz 压缩 tar 中的文件只能流式解压，向后定位时从头重新解压
+    """
+
+    def __init__(self, archive: str, name: str, size: int, offset: int = None, open_stream=None):
+        self.archive = archive
+        self.name = name
+        self.size = size
+        self.offset = offset
+        self._open_stream = open_stream
+
+    @property
+    def mappable(self) -> bool:
+        return self.offset is not None
+
+    def open(self):
+        """打开成员数据，返回可定位的只读文件对象"""
+        with telemetry_phase('open'):
+            if self.mappable:
+                return SegmentFile(open(self.archive, 'rb'), self.offset, self.size)
+            return self._open_stream()
+
+
+def resolve_zip_member(archive: str, name: str) -> ArchiveMember:
+    """通过中央目录定位 zip 成员"""
+    with zipfile.ZipFile(archive) as zf:
+        try:
+            info = zf.getinfo(name)
+        except KeyError:
+            raise FileNotFoundError(f'压缩包中不存在: {name}') from None
+    if info.flag_bits & 0x1:
+        raise ValueError(f'不支持读取加密的压缩包成员: {name}')
+    if info.compress_type == zipfile.ZIP_STORED:
+        return ArchiveMember(archive, name, info.file_size, offset=zip_member_data_offset(archive, info))
+
+    def open_stream():
+        # 关闭 ZipFile 后已打开的成员仍持有底层文件，成员关闭时才真正关闭
+        with zipfile.ZipFile(archive) as zf:
+            return zf.open(info)
+
+    return ArchiveMember(archive, name, info.file_size, open_stream=open_stream)
+
+
+def open_tar_stream(archive: str) -> tuple:
+    """打开 tar 数据流，返回 (文件对象, 是否未压缩)；压缩的 tar 返回解压流"""
+    with open(archive, 'rb') as f:
+        magic = f.read(6)
+    for prefix, module in TAR_COMPRESSIONS:
+        if magic.startswith(prefix):
+            return importlib.import_module(module).open(archive, 'rb'), False
+    return open(archive, 'rb'), True
+
+
+def resolve_tar_member(archive: str, name: str) -> ArchiveMember:
+    """
+    顺序扫描 tar 头定位成员，找到即停止（未压缩的 tar 扫描时跳过数据区，不读取成员数据）
+    压缩的 tar 没有索引，只能解压到成员所在位置
+    """
+    import tarfile
+    target = posixpath.normpath(name)
+    fp, plain = open_tar_stream(archive)
+    with fp, tarfile.open(fileobj=fp, mode='r:') as tf:
+        info = tf.next()
+        while info is not None and posixpath.normpath(info.name) != target:
+            info = tf.next()
+    if info is None:
+        raise FileNotFoundError(f'压缩包中不存在: {name}')
+    if not info.isfile() or info.issparse():
+        raise ValueError(f'不是普通文件，无法直接读取: {name}')
+    if plain:
+        return ArchiveMember(archive, name, info.size, offset=info.offset_data)
+    return ArchiveMember(archive, name, info.size,
+                         open_stream=lambda: SegmentFile(open_tar_stream(archive)[0], info.offset_data, info.size))
+
+
+def get_archive_member(file_path: str) -> ArchiveMember:
+    """定位 '压缩包路径::成员路径' 指向的成员，按文件身份缓存"""
+    identity = file_identity(file_path)
+    with _archive_members_lock:
+        member = _archive_members.get(identity)
+        if member is not None:
+            _archive_members.move_to_end(identity)
+            return member
+
+    archive, name = split_archive_path(file_path)
+    with telemetry_phase('open'):
+        if archive.lower().endswith('.zip'):
+            member = resolve_zip_member(archive, name)
+        else:
+            member = resolve_tar_member(archive, name)
+    with _archive_members_lock:
+        _archive_members[identity] = member
+        while len(_archive_members) > MAX_ARCHIVE_MEMBERS:
+            _archive_members.popitem(last=False)
+    return member
+
+
+def open_binary(file_path: str):
+    """以二进制只读方式打开文件；压缩包成员返回成员数据的文件对象"""
+    if split_archive_path(file_path)[1] is None:
+        return open(file_path, 'rb')
+    return get_archive_member(file_path).open()
+
+
+def mapped_location(file_path: str):
+    """文件数据可以内存映射的位置 (实际文件路径, 起始偏移)；只能解压读取的压缩包成员返回 None"""
+    if split_archive_path(file_path)[1] is None:
+        return file_path, 0
+    member = get_archive_member(file_path)
+    return (member.archive, member.offset) if member.mappable else None
+
+
+# ========== 惰性数组层（内存映射） ==========
+
+# 已打开文件的缓存：文件身份（见 file_identity） -> LazyArrayMap，常驻模式下跨请求复用
+_open_files = collections.OrderedDict()
+_open_files_lock = threading.Lock()
+MAX_OPEN_FILES = 16
+
+
+class LazyArrayMap(collections.abc.Mapping):
+    """
+    键名 -> 数组的惰性映射
+    每个键对应一个加载函数，首次访问时才打开（通常是内存映射），切片只读取实际访问的页；
+    costs 记录加载时需要在内存中完整生成的字节数（如压缩成员、需要转换类型的存储），内存映射为 0；
+    streams 为只能流式解压的 .npy 数据（压缩成员）记录打开数据流的函数，供一次性扫描按块读取；
+    resources 为映射持有的共享映射、文件句柄等（带 close 方法），从缓存淘汰时一并释放
+    """
+
+    def __init__(self, loaders: dict, costs: dict = None, upcasts: dict = None, streams: dict = None,
+                 resources: list = None):
+        self._loaders = loaders
+        self._costs = costs or {}
+        # 键名 -> bf16/fp8 等 dtype 名：这些键的加载函数返回原始位模式视图，访问时转换为 float32
+        self._upcasts = upcasts or {}
+        self._streams = streams or {}
+        self._resources = resources or []
+        self._arrays = {}
+        # zip 格式 PyTorch 检查点 data.pkl 的对象图（张量为 TorchTensorMeta），供检查点树复用
+        self.graph = None
+
+    def __getitem__(self, key):
+        if key not in self._arrays:
+            if key not in self._loaders:
+                raise KeyError(key)
+            self._arrays[key] = self._load(key)
+        return self._arrays[key]
+
+    def _load(self, key):
+        with telemetry_phase('read'):
+            data = self._loaders[key]()
+            if key in self._upcasts:
+                data = upcast_raw(data, self._upcasts[key], load_numpy())
+        return data
+
+    def __iter__(self):
+        return iter(self._loaders)
+
+    def __len__(self):
+        return len(self._loaders)
+
+    def __contains__(self, key):
+        # Mapping 默认通过 __getitem__ 判断，会把数组加载出来
+        return key in self._loaders
+
+    def is_loaded(self, key) -> bool:
+        """该键对应的数组是否已经打开"""
+        return key in self._arrays
+
+    def load_cost(self, key) -> int:
+        """加载该键需要在内存中生成的字节数"""
+        return self._costs.get(key, 0)
+
+    def load_uncached(self, key):
+        """调用加载函数但不缓存结果，用于一次性处理（如统计）后即可释放的大数组"""
+        if key in self._arrays:
+            return self._arrays[key]
+        return self._load(key)
+
+    def raw_view(self, key):
+        """
+        需要类型转换且尚未加载的键返回 (原始位模式视图, dtype 名)，供调用方按块转换；其余返回 None
+        """
+        if key not in self._upcasts or key in self._arrays:
+            return None
+        with telemetry_phase('read'):
+            return self._loaders[key](), self._upcasts[key]
+
+    def stream_opener(self, key):
+        """尚未加载且只能流式解压的键返回打开 .npy 数据流的函数（返回值可用于 with），其余返回 None"""
+        if key in self._arrays:
+            return None
+        return self._streams.get(key)
+
+    def close(self):
+        """释放已打开的数组与共享资源；之后不应再访问该映射"""
+        self._arrays.clear()
+        for resource in self._resources:
+            resource.close()
+
+
+class FileMappings:
+    """
+    文件的共享只读内存映射：每个文件在首次访问时整体映射一次，张量是映射上按偏移建立的视图
+    每个映射占用一个文件描述符，按张量分别映射时张量一多就会耗尽描述符（macOS 默认上限 256）
+    """
+
+    def __init__(self, np):
+        self._np = np
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def buffer(self, file_path: str):
+        """整个文件的 uint8 只读映射"""
+        with self._lock:
+            if file_path not in self._maps:
+                self._maps[file_path] = self._np.memmap(file_path, dtype=self._np.uint8, mode='r')
+            return self._maps[file_path]
+
+    def view(self, file_path: str, offset: int, dtype, shape: tuple, order: str = 'C'):
+        """映射上从 offset 字节处开始的只读数组视图"""
+        return self._np.ndarray(shape, dtype=dtype, buffer=self.buffer(file_path), offset=offset, order=order)
+
+    def close(self):
+        """丢弃映射的引用，仍被视图引用的映射在视图释放后关闭"""
+        with self._lock:
+            self._maps.clear()
+
+
+def memmap_npy(file_path: str, offset: int, np, fallback, mode: str = 'r', mappings: FileMappings = None):
+    """
+    从给定偏移处解析 .npy 头并建立内存映射（默认只读，mode 同 np.memmap）
+    给定 mappings 时在文件的共享映射上建立视图，不单独映射；对象数组或空数组使用 fallback 完整加载
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        header = read_npy_header(f, np)
+    dtype = header['dtype']
+    shape = tuple(header['shape'])
+    size = 1
+    for dim in shape:
+        size *= dim
+    if dtype.hasobject or size == 0:
+        return fallback()
+    order = 'F' if header['fortranOrder'] else 'C'
+    if mappings is not None:
+        return mappings.view(file_path, offset + header['headerSize'], dtype, shape, order)
+    return np.memmap(
+        file_path,
+        dtype=dtype,
+        mode=mode,
+        offset=offset + header['headerSize'],
+        shape=shape,
+        order=order
+    )
+
+
+def zip_member_data_offset(file_path: str, member) -> int:
+    """通过本地文件头计算 zip 成员数据在文件中的起始偏移（file_path 为压缩包成员时相对于成员数据起点）"""
+    with open_binary(file_path) as f:
+        f.seek(member.header_offset)
+        local_header = f.read(30)
+    if local_header[:4] != b'PK\x03\x04':
+        raise ValueError(f'zip 本地文件头损坏: {member.filename}')
+    name_len, extra_len = struct.unpack('<HH', local_header[26:30])
+    return member.header_offset + 30 + name_len + extra_len
+
+
+def open_numpy_arrays(file_path: str) -> LazyArrayMap:
+    """
+    打开 .npy/.npz 文件（也可以是压缩包成员）
+    .npy 与未压缩的 .npz 成员按偏移内存映射（所有成员共用 .npz 所在文件的一个映射），
+    压缩成员在访问时解压，一次性扫描时流式解压
+    """
+    np = load_numpy()
+    ext = Path(file_path).suffix.lower()
+    location = mapped_location(file_path)
+
+    if ext == '.npy':
+        if location is None:
+            opener = lambda: open_binary(file_path)
+            size = get_archive_member(file_path).size
+            return LazyArrayMap({'data': lambda: read_npy_stream(opener, np)}, {'data': size},
+                                streams={'data': opener})
+        path, base = location
+        if base == 0:
+            full_load = lambda: np.load(path, allow_pickle=True)
+        else:
+            full_load = lambda: read_npy_stream(lambda: open_binary(file_path), np)
+        return LazyArrayMap({'data': lambda: memmap_npy(path, base, np, full_load)})
+
+    loaders = {}
+    costs = {}
+    streams = {}
+    mappings = FileMappings(np)
+    with open_zip(file_path) as zf:
+        for member in zf.infolist():
+            if not member.filename.endswith('.npy'):
+                continue
+            key = member.filename[:-4]
+            loaders[key] = make_npz_loader(file_path, member, np, location, mappings)
+            if member.compress_type != zipfile.ZIP_STORED or location is None:
+                costs[key] = member.file_size
+                streams[key] = functools.partial(open_npz_member, file_path, member)
+    return LazyArrayMap(loaders, costs, streams=streams, resources=[mappings])
+
+
+@contextlib.contextmanager
+def open_zip(file_path: str):
+    """打开 zip 格式的文件（.npz 等），file_path 也可以是压缩包成员"""
+    with open_binary(file_path) as f, zipfile.ZipFile(f) as zf:
+        yield zf
+
+
+@contextlib.contextmanager
+def open_npz_member(file_path: str, member):
+    """打开 .npz 中的成员数据流（压缩成员边读边解压）"""
+    with open_zip(file_path) as zf, zf.open(member) as f:
+        yield f
+
+
+def read_npy_stream(open_stream, np):
+    """
+    从数据流完整读取 .npy
+    数据部分一次读出，整段解压在 zlib 中完成（期间释放 GIL），便于多线程并行解压
+    """
+    with open_stream() as f:
+        header = read_npy_header(f, np)
+        if not header['dtype'].hasobject:
+            data = f.read()
+            order = 'F' if header['fortranOrder'] else 'C'
+            return np.frombuffer(data, dtype=header['dtype']).reshape(header['shape'], order=order)
+    with open_stream() as f:
+        return np.lib.format.read_array(f, allow_pickle=True)
+
+
+def read_npz_member(file_path: str, member, np):
+    """完整解压并读取 .npz 成员"""
+    return read_npy_stream(functools.partial(open_npz_member, file_path, member), np)
+
+
+def make_npz_loader(file_path: str, member, np, location: tuple = None, mappings: FileMappings = None):
+    """
+    生成 .npz 成员的加载函数
+    location 为 .npz 数据可内存映射的位置 (实际文件路径, 起始偏移)，None 表示只能解压读取；
+    mappings 为同一文件各成员共用的映射
+    """
+    def full_load():
+        return read_npz_member(file_path, member, np)
+
+    if member.compress_type != zipfile.ZIP_STORED or location is None:
+        return full_load
+    path, base = location
+    return lambda: memmap_npy(path, base + zip_member_data_offset(file_path, member), np, full_load,
+                              mappings=mappings)
+
+
+def iter_npy_stream_chunks(open_stream, np, chunk_bytes: int = CHUNK_BYTES):
+    """
+    边解压边读取 .npy 数据流：先产出头部信息，再依次产出一维数据块
+    只在内存中保留当前块，用于一次性扫描压缩成员
+    """
+    with open_stream() as f:
+        header = read_npy_header(f, np)
+        yield header
+
+        dtype = header['dtype']
+        remaining = 1
+        for dim in header['shape']:
+            remaining *= dim
+        per_chunk = chunk_elements(dtype, chunk_bytes)
+        while remaining > 0:
+            count = min(per_chunk, remaining)
+            buf = f.read(count * dtype.itemsize)
+            if len(buf) < count * dtype.itemsize:
+                raise ValueError('.npy 数据不完整')
+            yield np.frombuffer(buf, dtype=dtype)
+            remaining -= count
+
+
+def iter_tensor_chunks(file_path: str, key: str, arrays, np, chunk_bytes: int = CHUNK_BYTES):
+    """
+    按块遍历张量元素，返回 (形状, dtype, 展平顺序, 块迭代器)
+    块按展平顺序（'C' 或 'F'）排列，可据此把块内偏移换算为多维位置；
+    尚未打开的压缩成员（.npz 成员、压缩包内的 .npy）直接从压缩流读取，不解压出完整数组；
+    bf16/fp8 张量从原始位模式按块转换；
+    对象数组不支持流式读取
+    """
+    raw = arrays.raw_view(key) if isinstance(arrays, LazyArrayMap) else None
+    if raw is not None:
+        view, upcast = raw
+        chunks = (upcast_raw(chunk, upcast, np)
+                  for chunk in iter_flat_chunks(view, np, max(1, chunk_bytes // 4), order='C'))
+        return view.shape, np.dtype(np.float32), 'C', chunks
+
+    opener = arrays.stream_opener(key) if isinstance(arrays, LazyArrayMap) else None
+    if opener is not None:
+        chunks = iter_npy_stream_chunks(opener, np, chunk_bytes)
+        header = next(chunks)
+        if not header['dtype'].hasobject:
+            order = 'F' if header['fortranOrder'] else 'C'
+            return tuple(header['shape']), header['dtype'], order, chunks
+        chunks.close()
+
+    arr = arrays[key]
+    if isinstance(arr, Hdf5Array):
+        return arr.shape, arr.dtype, 'C', iter_flat_chunks(arr, np, chunk_elements(arr.dtype, chunk_bytes))
+    order = 'F' if arr.flags['F_CONTIGUOUS'] and not arr.flags['C_CONTIGUOUS'] else 'C'
+    return arr.shape, arr.dtype, order, iter_flat_chunks(arr, np, chunk_elements(arr.dtype, chunk_bytes))
+
+
+def open_tensor_arrays(file_path: str):
+    """
+    打开张量文件，返回 键名 -> 数组 的映射
+    numpy、safetensors 与 zip 格式的 PyTorch 文件都以内存映射方式惰性打开；所有文件都按文件身份缓存，
+    以便表格窗口等高频请求跨请求复用，不必每次重新加载
+    """
+    identity = file_identity(file_path)
+    with _open_files_lock:
+        arrays = _open_files.get(identity)
+        if arrays is not None:
+            _open_files.move_to_end(identity)
+            return arrays
+
+    file_type = get_file_type(file_path)
+    with telemetry_phase('open'):
+        if file_type == 'numpy':
+            arrays = open_numpy_arrays(file_path)
+        elif file_type == 'safetensors':
+            arrays = open_safetensors_arrays(file_path)
+        elif file_type == 'hdf5':
+            arrays = open_hdf5_arrays(file_path)
+        elif zipfile.is_zipfile(file_path):
+            arrays = open_torch_arrays(file_path)
+        else:
+            arrays = load_torch_arrays(file_path)
+    evicted = []
+    with _open_files_lock:
+        existing = _open_files.get(identity)
+        if existing is not None:
+            # 其他线程已经打开了同一文件，沿用它的映射
+            evicted.append(arrays)
+            arrays = existing
+        else:
+            _open_files[identity] = arrays
+            while len(_open_files) > MAX_OPEN_FILES:
+                evicted.append(_open_files.popitem(last=False)[1])
+    for old in evicted:
+        close_arrays(old)
+    return arrays
+
+
+def close_arrays(arrays):
+    """释放映射持有的共享映射与文件句柄；旧版 PyTorch 文件加载得到的普通字典无需释放"""
+    if isinstance(arrays, LazyArrayMap):
+        arrays.close()
+
+
+def get_array(file_path: str, key: str):
+    """获取单个张量；单张量文件忽略键名"""
+    arrays = open_tensor_arrays(file_path)
+    if len(arrays) == 1:
+        return next(iter(arrays.values()))
+    if key not in arrays:
+        raise KeyError(f'张量不存在: {key}')
+    return arrays[key]
+
+
+def release_file(file_path: str):
+    """释放文件的缓存映射（写入文件前调用，Windows 下映射会阻止覆盖文件）"""
+    path = os.path.abspath(file_path)
+    released = []
+    with _open_files_lock:
+        for identity in [k for k in _open_files if k[0] == path]:
+            released.append(_open_files.pop(identity))
+    for arrays in released:
+        close_arrays(arrays)
+    with _checkpoint_trees_lock:
+        for identity in [k for k in _checkpoint_trees if k[0] == path]:
+            del _checkpoint_trees[identity]
+
+
+# numpy 没有对应类型的存储：按位模式读取为无符号整数，访问时转换为 float32
+TORCH_RAW_DTYPES = {
+    'bfloat16': 'uint16',
+    'float8_e4m3fn': 'uint8',
+    'float8_e5m2': 'uint8',
+}
+
+
+def bfloat16_to_float32(raw, np):
+    """bfloat16 是 float32 的高 16 位，左移后按 float32 解释即可无损转换"""
+    return (raw.astype(np.uint32) << 16).view(np.float32)
+
+
+def float8_table(name: str, np):
+    """生成 float8（e4m3fn / e5m2）全部 256 个位模式对应的 float32 值"""
+    bits = np.arange(256, dtype=np.int64)
+    exp_bits, man_bits, bias = (4, 3, 7) if name == 'float8_e4m3fn' else (5, 2, 15)
+    sign = np.where(bits & 0x80, -1.0, 1.0)
+    exp = (bits >> man_bits) & ((1 << exp_bits) - 1)
+    man = (bits & ((1 << man_bits) - 1)) / float(1 << man_bits)
+    values = sign * np.where(exp == 0, man * 2.0 ** (1 - bias), (1 + man) * 2.0 ** (exp - bias))
+    if name == 'float8_e4m3fn':
+        # fn：没有无穷大，只有全 1 的位模式表示 NaN
+        values[(bits & 0x7f) == 0x7f] = np.nan
+    else:
+        top = exp == (1 << exp_bits) - 1
+        values[top & (man == 0)] = sign[top & (man == 0)] * np.inf
+        values[top & (man != 0)] = np.nan
+    return values.astype(np.float32)
+
+
+def upcast_raw(raw, dtype_name: str, np):
+    """把按位模式读取的 bf16/fp8 数据转换为 float32"""
+    if dtype_name == 'bfloat16':
+        return bfloat16_to_float32(raw, np)
+    return float8_table(dtype_name, np)[raw]
+
+
+def map_torch_storage(file_path: str, member, dtype, np, mappings: FileMappings):
+    """
+    把检查点中的一条存储记录（data/<key>）映射为一维数组
+    torch.save 写入的存储不压缩，直接取检查点共享映射上的偏移视图；被重新压缩过的记录只解压这一条
+    """
+    count = member.file_size // dtype.itemsize
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    if member.compress_type != zipfile.ZIP_STORED:
+        with zipfile.ZipFile(file_path) as zf:
+            return np.frombuffer(zf.read(member), dtype=dtype, count=count)
+    return mappings.view(file_path, zip_member_data_offset(file_path, member), dtype, (count,))
+
+
+def torch_tensor_view(storage, meta: TorchTensorMeta, np):
+    """按张量的存储偏移、形状和步长在存储上建立只读视图"""
+    shape = tuple(meta.shape)
+    if any(dim == 0 for dim in shape):
+        return np.empty(shape, dtype=storage.dtype)
+    if meta.offset < 0 or any(stride < 0 for stride in meta.stride):
+        raise ValueError('不支持的张量偏移或步长')
+    last = meta.offset + sum((dim - 1) * stride for dim, stride in zip(shape, meta.stride))
+    if last >= storage.size:
+        raise ValueError(f'张量超出存储范围: 需要 {last + 1} 个元素，存储只有 {storage.size} 个')
+    return np.lib.stride_tricks.as_strided(
+        storage[meta.offset:],
+        shape=shape,
+        strides=tuple(stride * storage.itemsize for stride in meta.stride),
+        writeable=False
+    )
+
+
+def make_torch_loader(file_path: str, member, meta: TorchTensorMeta, byteorder: str, np, mappings: FileMappings):
+    """生成检查点张量的加载函数：只读取该张量引用的存储记录，bf16/fp8 返回原始位模式"""
+    def load():
+        raw_name = TORCH_RAW_DTYPES.get(meta.dtype, meta.dtype)
+        dtype = np.dtype(raw_name).newbyteorder('<' if byteorder == 'little' else '>')
+        return torch_tensor_view(map_torch_storage(file_path, member, dtype, np, mappings), meta, np)
+    return load
+
+
+def open_torch_arrays(file_path: str) -> LazyArrayMap:
+    """
+    惰性打开 zip 格式的 PyTorch 检查点
+    只解析 data.pkl 得到每个张量的存储记录、偏移、形状和步长，不导入 torch；
+    整个检查点只映射一次，张量在首次访问时才在它引用的那条存储记录上建立视图，
+    打开单个参数的开销只与该参数大小有关
+    """
+    np = load_numpy()
+    with zipfile.ZipFile(file_path) as zf:
+        data = read_torch_meta(file_path, zf)
+        prefix = torch_archive_prefix(zf)
+        members = {member.filename: member for member in zf.infolist()}
+        byteorder = 'little'
+        if prefix + 'byteorder' in members:
+            byteorder = zf.read(prefix + 'byteorder').decode('ascii').strip()
+
+    loaders = {}
+    costs = {}
+    upcasts = {}
+    mappings = FileMappings(np)
+    for key, meta in iter_checkpoint_tensors(data, lambda v: isinstance(v, TorchTensorMeta)):
+        member = members.get(f'{prefix}data/{meta.storage.key}')
+        if member is None:
+            raise ValueError(f'检查点缺少存储记录: {meta.storage.key}（张量 {key}）')
+        loaders[key] = make_torch_loader(file_path, member, meta, byteorder, np, mappings)
+        if meta.dtype in TORCH_RAW_DTYPES:
+            upcasts[key] = meta.dtype
+            size = 1
+            for dim in meta.shape:
+                size *= dim
+            costs[key] = size * 4
+    arrays = LazyArrayMap(loaders, costs, upcasts, resources=[mappings])
+    arrays.graph = data
+    return arrays
+
+
+def load_torch_arrays(file_path: str) -> dict:
+    """加载旧版（非 zip）PyTorch 文件中的所有张量为 numpy 数组，这种格式无法按需读取"""
+    torch = load_torch()
+    loaded = torch.load(file_path, map_location='cpu', weights_only=False)
+    return {
+        key: value.detach().numpy()
+        for key, value in iter_checkpoint_tensors(loaded, lambda v: isinstance(v, torch.Tensor))
+    }
+
+
+# ========== safetensors ==========
+
+# safetensors dtype 名 -> numpy / TORCH_RAW_DTYPES 中的 dtype 名
+SAFETENSORS_DTYPES = {
+    'F64': 'float64', 'F32': 'float32', 'F16': 'float16', 'BF16': 'bfloat16',
+    'I64': 'int64', 'I32': 'int32', 'I16': 'int16', 'I8': 'int8',
+    'U64': 'uint64', 'U32': 'uint32', 'U16': 'uint16', 'U8': 'uint8',
+    'BOOL': 'bool', 'C64': 'complex64',
+    'F8_E4M3': 'float8_e4m3fn', 'F8_E5M2': 'float8_e5m2',
+}
+
+# 规范规定头部不超过 100MB，超出视为文件损坏
+MAX_SAFETENSORS_HEADER = 100 * 1024 * 1024
+
+
+def is_safetensors_index(file_path: str) -> bool:
+    """是否为分片检查点的索引文件（model.safetensors.index.json）"""
+    return Path(file_path).name.lower().endswith('.safetensors.index.json')
+
+
+# 已解析的分片检查点索引：索引文件自身的状态 -> weight_map，与打开文件缓存一样按 LRU 淘汰
+_safetensors_indexes = collections.OrderedDict()
+_safetensors_indexes_lock = threading.Lock()
+
+
+def read_safetensors_index(file_path: str) -> dict:
+    """读取分片检查点索引的 weight_map（张量名 -> 分片的绝对路径），按索引文件自身的状态缓存"""
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    identity = (path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    with _safetensors_indexes_lock:
+        weight_map = _safetensors_indexes.get(identity)
+        if weight_map is not None:
+            _safetensors_indexes.move_to_end(identity)
+            return weight_map
+
+    with open(path, 'r', encoding='utf-8') as f:
+        shards = json.load(f).get('weight_map', {})
+    directory = os.path.dirname(path)
+    weight_map = {name: os.path.join(directory, shard) for name, shard in shards.items()}
+    with _safetensors_indexes_lock:
+        _safetensors_indexes[identity] = weight_map
+        while len(_safetensors_indexes) > MAX_OPEN_FILES:
+            _safetensors_indexes.popitem(last=False)
+    return weight_map
+
+
+def read_safetensors_header(file_path: str) -> tuple:
+    """
+    解析 safetensors 头部，返回 (张量名 -> {dtype, shape, data_offsets}, 数据区起始偏移)
+    文件开头是 8 字节小端头部长度，随后是 JSON 头部，数据偏移相对于头部之后
+    """
+    with open(file_path, 'rb') as f:
+        prefix = f.read(8)
+        if len(prefix) < 8:
+            raise ValueError(f'safetensors 文件不完整: {file_path}')
+        (header_size,) = struct.unpack('<Q', prefix)
+        if header_size > MAX_SAFETENSORS_HEADER:
+            raise ValueError(f'safetensors 头部过大（{header_size} 字节），文件可能已损坏')
+        header = json.loads(f.read(header_size).decode('utf-8'))
+    header.pop('__metadata__', None)
+    return header, 8 + header_size
+
+
+def iter_safetensors_entries(file_path: str):
+    """
+    遍历张量，产出 (张量名, 分片路径, 头部条目, 数据区起始偏移)
+    索引文件按 weight_map 的顺序遍历，每个分片的头部只读取一次；分片路径相对于索引文件所在目录
+    """
+    if not is_safetensors_index(file_path):
+        header, data_start = read_safetensors_header(file_path)
+        for name, entry in header.items():
+            yield name, file_path, entry, data_start
+        return
+
+    directory = os.path.dirname(os.path.abspath(file_path))
+    headers = {}
+    for name, shard_path in read_safetensors_index(file_path).items():
+        if shard_path not in headers:
+            headers[shard_path] = read_safetensors_header(shard_path)
+        header, data_start = headers[shard_path]
+        if name not in header:
+            raise ValueError(f'分片 {os.path.relpath(shard_path, directory)} 中不存在张量: {name}')
+        yield name, shard_path, header[name], data_start
+
+
+def safetensors_dtype(entry: dict) -> str:
+    """头部条目的 dtype 名；不支持的类型抛出 ValueError"""
+    name = SAFETENSORS_DTYPES.get(entry['dtype'])
+    if name is None:
+        raise ValueError(f"不支持的 safetensors 类型: {entry['dtype']}")
+    return name
+
+
+def read_safetensors_info(file_path: str) -> list:
+    """只读取头部得到各张量的形状和 dtype，分片检查点逐个读取分片头部"""
+    np = load_numpy()
+    infos = []
+    for name, _, entry, _ in iter_safetensors_entries(file_path):
+        dtype = safetensors_dtype(entry)
+        itemsize = np.dtype(TORCH_RAW_DTYPES.get(dtype, dtype)).itemsize
+        infos.append(make_header_info(name, entry['shape'], dtype, itemsize))
+    return infos
+
+
+def open_safetensors_arrays(file_path: str) -> LazyArrayMap:
+    """
+    惰性打开 safetensors 文件或分片检查点
+    每个分片在首次访问其中的张量时整体内存映射一次，张量是映射上的零拷贝视图；
+    bf16/fp8 张量以原始位模式提供，统计与流式读取时按块转换，直接访问时才生成 float32 副本
+    """
+    np = load_numpy()
+    mappings = FileMappings(np)
+
+    def make_loader(shard: str, entry: dict, data_start: int, dtype):
+        shape = tuple(int(dim) for dim in entry['shape'])
+        begin, end = (int(x) for x in entry['data_offsets'])
+
+        def load():
+            size = 1
+            for dim in shape:
+                size *= dim
+            if end - begin != size * dtype.itemsize:
+                raise ValueError(f'张量数据长度与形状不符: {shape} x {dtype.itemsize} 字节 != {end - begin} 字节')
+            if size == 0:
+                return np.empty(shape, dtype=dtype)
+            return mappings.view(shard, data_start + begin, dtype, shape)
+        return load
+
+    loaders = {}
+    costs = {}
+    upcasts = {}
+    for name, shard, entry, data_start in iter_safetensors_entries(file_path):
+        dtype_name = safetensors_dtype(entry)
+        dtype = np.dtype(TORCH_RAW_DTYPES.get(dtype_name, dtype_name)).newbyteorder('<')
+        loaders[name] = make_loader(shard, entry, data_start, dtype)
+        if dtype_name in TORCH_RAW_DTYPES:
+            upcasts[name] = dtype_name
+            size = 1
+            for dim in entry['shape']:
+                size *= int(dim)
+            costs[name] = size * 4
+    return LazyArrayMap(loaders, costs, upcasts, resources=[mappings])
+
+
+# ========== HDF5 ==========
+
+# 超过该大小的数据集在打开时不做全量统计，统计推迟到直方图等按需命令
+HDF5_STATS_MAX_BYTES = 1024 * 1024 * 1024
+
+
+class ChunkCache:
+    """按字节数限制容量的 LRU 缓存，存放解压后的 HDF5 数据块，常驻模式下跨请求共享"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if value.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._items[key] = value
+            self._bytes += value.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+
+_hdf5_chunk_cache = None
+_hdf5_chunk_cache_lock = threading.Lock()
+
+
+def get_hdf5_chunk_cache() -> ChunkCache:
+    """获取全局数据块缓存（首次调用时按设置创建）"""
+    global _hdf5_chunk_cache
+    with _hdf5_chunk_cache_lock:
+        if _hdf5_chunk_cache is None:
+            _hdf5_chunk_cache = ChunkCache(get_hdf5_cache_bytes())
+        return _hdf5_chunk_cache
+
+
+def hdf5_storage_info(ds) -> dict:
+    """数据集的存储布局：分块形状、压缩方式与参数、实际占用的字节数（只读元数据）"""
+    opts = ds.compression_opts
+    return {
+        'chunks': list(ds.chunks) if ds.chunks else None,
+        'compression': ds.compression,
+        'compressionOpts': list(opts) if isinstance(opts, tuple) else opts,
+        'storageSize': int(ds.id.get_storage_size())
+    }
+
+
+class Hdf5Dataset:
+    """
+    HDF5 数据集的只读访问
+    分块存储时按数据块读取，解压后的块放入全局 LRU 缓存；连续存储时直接读取选中的超平面
+    """
+
+    def __init__(self, ds, identity: tuple):
+        self.ds = ds
+        self.name = ds.name
+        self.shape = tuple(ds.shape)
+        self.dtype = ds.dtype
+        self.chunks = ds.chunks
+        self.identity = identity
+        self.storage_info = hdf5_storage_info(ds)
+
+    def read_chunk(self, coords: tuple):
+        """读取（或从缓存取出）一个完整的数据块"""
+        cache = get_hdf5_chunk_cache()
+        key = (self.identity, self.name, coords)
+        block = cache.get(key)
+        if block is None:
+            with telemetry_phase('read'):
+                block = self.ds[tuple(
+                    slice(c * size, min((c + 1) * size, dim))
+                    for c, size, dim in zip(coords, self.chunks, self.shape)
+                )]
+            cache.put(key, block)
+        return block
+
+    def read(self, ranges: list):
+        """
+        读取各轴上 range 选中的下标的外积区域（range 可带步长或逆序）
+        只访问与所选下标相交的数据块
+        """
+        np = load_numpy()
+        shape = tuple(len(r) for r in ranges)
+        if not self.shape:
+            with telemetry_phase('read'):
+                return np.asarray(self.ds[()])
+        if 0 in shape:
+            return np.empty(shape, dtype=self.dtype)
+
+        if self.chunks is None:
+            # 连续存储：按正向步长读取超平面，逆序的轴读出后再翻转
+            with telemetry_phase('read'):
+                block = self.ds[tuple(slice(min(r), max(r) + 1, abs(r.step)) for r in ranges)]
+            flips = tuple(slice(None, None, -1) if r.step < 0 else slice(None) for r in ranges)
+            return block[flips]
+
+        out = np.empty(shape, dtype=self.dtype)
+        # 每个轴上按数据块分组：(块坐标, 输出中的位置, 块内下标)
+        groups = []
+        for r, size in zip(ranges, self.chunks):
+            idx = np.arange(r.start, r.stop, r.step)
+            ids = idx // size
+            bounds = np.flatnonzero(np.diff(ids)) + 1
+            axis_groups = []
+            for positions in np.split(np.arange(idx.size), bounds):
+                chunk_id = int(ids[positions[0]])
+                axis_groups.append((chunk_id, positions, idx[positions] - chunk_id * size))
+            groups.append(axis_groups)
+
+        for combo in itertools.product(*groups):
+            block = self.read_chunk(tuple(chunk_id for chunk_id, _, _ in combo))
+            out[np.ix_(*(positions for _, positions, _ in combo))] = block[np.ix_(*(local for _, _, local in combo))]
+        return out
+
+
+class Hdf5Array:
+    """
+    HDF5 数据集（或其基本索引视图）的惰性数组
+    整数、切片、None、... 索引只组合出新的视图，不读取数据；需要数据时（np.asarray、分块遍历）
+    才读取所选区域相交的数据块。提供本模块用到的 ndarray 接口子集。
+    """
+
+    flags = {'C_CONTIGUOUS': False, 'F_CONTIGUOUS': False}
+
+    def __init__(self, dataset: Hdf5Dataset, fixed: dict = None, dims: list = None):
+        self.dataset = dataset
+        # 被整数索引固定的原始轴 -> 下标
+        self._fixed = fixed or {}
+        # 视图的各维：(原始轴 或 None 表示新增轴, 该轴上选中的下标 range)
+        self._dims = dims if dims is not None else [(axis, range(n)) for axis, n in enumerate(dataset.shape)]
+
+    @property
+    def shape(self) -> tuple:
+        return tuple(len(r) for _, r in self._dims)
+
+    @property
+    def ndim(self) -> int:
+        return len(self._dims)
+
+    @property
+    def size(self) -> int:
+        size = 1
+        for dim in self.shape:
+            size *= dim
+        return size
+
+    @property
+    def dtype(self):
+        return self.dataset.dtype
+
+    @property
+    def itemsize(self) -> int:
+        return self.dtype.itemsize
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.dtype.itemsize
+
+    def __len__(self):
+        if not self._dims:
+            raise TypeError('len() of unsized object')
+        return self.shape[0]
+
+    def _expand(self, key: tuple) -> tuple:
+        """展开 ... 并补齐省略的尾部维度"""
+        real = sum(1 for k in key if k is not None and k is not Ellipsis)
+        if real > self.ndim:
+            raise IndexError(f'too many indices for array: array is {self.ndim}-dimensional, but {real} were indexed')
+        if any(k is Ellipsis for k in key):
+            i = next(i for i, k in enumerate(key) if k is Ellipsis)
+            return key[:i] + (slice(None),) * (self.ndim - real) + key[i + 1:]
+        return key + (slice(None),) * (self.ndim - real)
+
+    def __getitem__(self, key):
+        np = load_numpy()
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = self._expand(key)
+        if any(isinstance(k, (list, np.ndarray)) for k in key):
+            return self._fancy(key)
+
+        fixed = dict(self._fixed)
+        dims = []
+        d = 0
+        for k in key:
+            if k is None:
+                dims.append((None, range(1)))
+                continue
+            axis, r = self._dims[d]
+            if isinstance(k, slice):
+                dims.append((axis, r[k]))
+            else:
+                i = operator.index(k)
+                if not -len(r) <= i < len(r):
+                    raise IndexError(f'index {i} is out of bounds for axis {d} with size {len(r)}')
+                if axis is not None:
+                    fixed[axis] = r[i]
+            d += 1
+        return Hdf5Array(self.dataset, fixed, dims)
+
+    def _fancy(self, key: tuple):
+        """
+        含索引列表时先读取覆盖各列表范围的区域，再在内存中按原索引取值，结果与 numpy 语义一致
+        整数在这里也按高级索引处理（与列表一起广播）
+        """
+        np = load_numpy()
+        box_key, local_key = [], []
+        d = 0
+        for k in key:
+            if k is None:
+                box_key.append(None)
+                local_key.append(slice(None))
+                continue
+            n = self.shape[d]
+            if isinstance(k, slice):
+                box_key.append(k)
+                local_key.append(slice(None))
+            elif isinstance(k, (list, np.ndarray)):
+                idx = np.asarray(k, dtype=np.intp)
+                if idx.size and (idx.min() < -n or idx.max() >= n):
+                    raise IndexError(f'index out of bounds for axis {d} with size {n}')
+                idx = np.where(idx < 0, idx + n, idx)
+                lo = int(idx.min()) if idx.size else 0
+                box_key.append(slice(lo, int(idx.max()) + 1 if idx.size else 0))
+                local_key.append(idx - lo)
+            else:
+                i = operator.index(k)
+                if not -n <= i < n:
+                    raise IndexError(f'index {i} is out of bounds for axis {d} with size {n}')
+                i = i + n if i < 0 else i
+                box_key.append(slice(i, i + 1))
+                local_key.append(0)
+            d += 1
+        return self[tuple(box_key)].read()[tuple(local_key)]
+
+    def read(self):
+        """读取视图对应的全部数据"""
+        np = load_numpy()
+        if self.size == 0:
+            return np.empty(self.shape, dtype=self.dtype)
+        ranges = {axis: range(i, i + 1) for axis, i in self._fixed.items()}
+        for axis, r in self._dims:
+            if axis is not None:
+                ranges[axis] = r
+        block = self.dataset.read([ranges[axis] for axis in range(len(self.dataset.shape))])
+        return block.reshape(self.shape)
+
+    def __array__(self, dtype=None, copy=None):
+        data = self.read()
+        return data.astype(dtype) if dtype is not None else data
+
+    def astype(self, dtype, copy=True):
+        return self.read().astype(dtype)
+
+    def item(self):
+        return self.read().item()
+
+    @property
+    def flat(self):
+        """只支持按单个展平下标取值（如 arr.flat[i]）"""
+        array = self
+
+        class FlatIndexer:
+            def __getitem__(self, i):
+                np = load_numpy()
+                index = np.unravel_index(operator.index(i) % array.size, array.shape)
+                return array[tuple(int(j) for j in index)].read()[()]
+        return FlatIndexer()
+
+    def reshape(self, *shape):
+        """
+        只插入/去掉长度为 1 的维度时返回视图；
+        合并前若干维为行、其余为列的二维形状返回 Hdf5Rows；其他形状读取后在内存中变形
+        """
+        np = load_numpy()
+        if len(shape) == 1 and isinstance(shape[0], (tuple, list)):
+            shape = tuple(shape[0])
+        shape = tuple(int(dim) for dim in shape)
+        if shape.count(-1) == 1:
+            known = 1
+            for dim in shape:
+                if dim != -1:
+                    known *= dim
+            shape = tuple(self.size // known if dim == -1 and known else dim for dim in shape)
+        if shape == self.shape:
+            return self
+        if 1 not in self.shape and [dim for dim in shape if dim != 1] == list(self.shape):
+            return self[tuple(None if dim == 1 else slice(None) for dim in shape)]
+        if len(shape) == 2 and self.ndim > 2:
+            for split in range(1, self.ndim):
+                rows = 1
+                for dim in self.shape[:split]:
+                    rows *= dim
+                if rows == shape[0] and rows * shape[1] == self.size:
+                    return Hdf5Rows(self, split)
+        return self.read().reshape(shape)
+
+    def iter_chunks(self, max_elems: int):
+        """按逻辑行优先顺序产出不超过 max_elems 个元素的一维块，沿第0维按数据块边界对齐"""
+        if self.ndim == 0:
+            yield self.read().reshape(1)
+            return
+        if self.size == 0:
+            return
+        if self.size <= max_elems:
+            yield self.read().reshape(-1)
+            return
+        row_elems = self.size // self.shape[0]
+        if row_elems > max_elems:
+            for i in range(self.shape[0]):
+                yield from self[i].iter_chunks(max_elems)
+            return
+        rows = max(1, max_elems // row_elems)
+        axis, r = self._dims[0]
+        if axis is not None and self.dataset.chunks and abs(r.step) == 1:
+            chunk_rows = self.dataset.chunks[axis]
+            rows = max(rows // chunk_rows * chunk_rows, min(rows, chunk_rows))
+        for start in range(0, self.shape[0], rows):
+            yield self[start:start + rows].read().reshape(-1)
+
+
+class Hdf5Rows:
+    """
+    HDF5 视图合并维度后的二维视图：前 split 维合并为行，其余维合并为列
+    （对应 reshape(-1, last)、reshape(n, -1)），只支持按行、列范围读取矩形区域
+    """
+
+    flags = Hdf5Array.flags
+
+    def __init__(self, array: Hdf5Array, split: int):
+        self.array = array
+        self.split = split
+        rows = 1
+        for dim in array.shape[:split]:
+            rows *= dim
+        self.shape = (rows, array.size // rows if rows else 0)
+        self.ndim = 2
+        self.dtype = array.dtype
+        self.size = array.size
+        self.nbytes = array.nbytes
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = key + (slice(None),) * (2 - len(key))
+        bounds = []
+        for k, dim in zip(key, self.shape):
+            if not isinstance(k, slice) or k.step not in (None, 1):
+                raise IndexError('合并维度后的 HDF5 视图只支持连续的行、列范围')
+            start, stop, _ = k.indices(dim)
+            bounds.append((start, max(start, stop)))
+        return self.read(bounds[0][0], bounds[0][1], bounds[1][0], bounds[1][1])
+
+    def read(self, r0: int, r1: int, c0: int, c1: int):
+        """读取 [r0, r1) 行、[c0, c1) 列；最后一个行维度上连续的行一次读取"""
+        np = load_numpy()
+        out = np.empty((r1 - r0, c1 - c0), dtype=self.dtype)
+        if out.size == 0:
+            return out
+        lead = self.array.shape[:self.split]
+        trail = self.array.shape[self.split:]
+        inner = 1
+        for dim in trail[1:]:
+            inner *= dim
+        first, last = c0 // inner, -(-c1 // inner)
+
+        r = r0
+        while r < r1:
+            index = tuple(int(i) for i in np.unravel_index(r, lead))
+            n = min(r1 - r, lead[-1] - index[-1])
+            rows = self.array[index[:-1] + (slice(index[-1], index[-1] + n), slice(first, last))].read()
+            out[r - r0:r - r0 + n] = rows.reshape(n, -1)[:, c0 - first * inner:c1 - first * inner]
+            r += n
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        data = self.read(0, self.shape[0], 0, self.shape[1])
+        return data.astype(dtype) if dtype is not None else data
+
+    def iter_chunks(self, max_elems: int):
+        yield from self.array.iter_chunks(max_elems)
+
+
+def iter_hdf5_datasets(f, h5py):
+    """按层级遍历文件中的数据集，键名为去掉开头 '/' 的完整路径（如 'group/sub/data'）"""
+    names = []
+    f.visititems(lambda name, obj: names.append(name) if isinstance(obj, h5py.Dataset) else None)
+    return names
+
+
+def read_hdf5_info(file_path: str) -> list:
+    """只读取元数据：各数据集的形状、dtype、分块与压缩方式"""
+    h5py = load_h5py()
+    infos = []
+    with h5py.File(file_path, 'r') as f:
+        for name in iter_hdf5_datasets(f, h5py):
+            ds = f[name]
+            info = make_header_info(name, list(ds.shape), str(ds.dtype), ds.dtype.itemsize)
+            info.update(hdf5_storage_info(ds))
+            infos.append(info)
+    return infos
+
+
+def make_hdf5_loader(f, name: str, identity: tuple, h5py):
+    """生成数据集的加载函数：数值数据集返回惰性数组，字符串等其他类型完整读取"""
+    def load():
+        np = load_numpy()
+        ds = f[name]
+        if ds.dtype.kind in 'biuf' and ds.dtype.names is None:
+            return Hdf5Array(Hdf5Dataset(ds, identity))
+        if h5py.check_string_dtype(ds.dtype) is not None:
+            return np.asarray(ds.asstr()[()], dtype=object)
+        return np.asarray(ds[()])
+    return load
+
+
+def open_hdf5_arrays(file_path: str) -> LazyArrayMap:
+    """
+    惰性打开 HDF5 文件：遍历各层分组得到数据集列表，不读取数据
+    文件句柄随映射一起缓存，映射被淘汰或释放时关闭；数据集在访问时按需读取相交的数据块。
+    数据块缓存的键包含文件身份（含 inode），原子替换后大小与修改时间相同的文件也不会读到旧数据块
+    """
+    h5py = load_h5py()
+    identity = file_identity(file_path)
+    f = h5py.File(file_path, 'r')
+    try:
+        loaders = {name: make_hdf5_loader(f, name, identity, h5py) for name in iter_hdf5_datasets(f, h5py)}
+    except Exception:
+        f.close()
+        raise
+    return LazyArrayMap(loaders, resources=[f])
+
+
+# ========== 并行处理 ==========
+
+DEFAULT_MEMORY_BUDGET_MB = 2048
+DEFAULT_HDF5_CACHE_MB = 256
+
+
+def get_worker_count() -> int:
+    """并行处理的线程数：TENSORLENS_WORKERS，未设置或为 0 时使用 CPU 核数"""
+    try:
+        workers = int(os.environ.get('TENSORLENS_WORKERS') or 0)
+    except ValueError:
+        workers = 0
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def get_memory_budget() -> int:
+    """并行解压时同时驻留内存的数据上限（字节）：TENSORLENS_MEMORY_BUDGET_MB"""
+    try:
+        budget_mb = float(os.environ.get('TENSORLENS_MEMORY_BUDGET_MB') or DEFAULT_MEMORY_BUDGET_MB)
+    except ValueError:
+        budget_mb = DEFAULT_MEMORY_BUDGET_MB
+    return max(1, int(budget_mb * 1024 * 1024))
+
+
+def get_hdf5_cache_bytes() -> int:
+    """HDF5 解压数据块缓存的容量（字节），由 TENSORLENS_HDF5_CACHE_MB 指定"""
+    try:
+        mb = int(os.environ.get('TENSORLENS_HDF5_CACHE_MB', DEFAULT_HDF5_CACHE_MB))
+    except ValueError:
+        mb = DEFAULT_HDF5_CACHE_MB
+    return max(0, mb) * 1024 * 1024
+
+
+class MemoryBudget:
+    """
+    按字节计数的内存预算（计数信号量）
+    申请量超过总预算时按总预算计，即该任务独占预算、与其他任务串行执行
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.available = capacity
+        self.cond = threading.Condition()
+
+    def acquire(self, nbytes: int) -> int:
+        nbytes = min(max(0, int(nbytes)), self.capacity)
+        with self.cond:
+            while self.available < nbytes:
+                self.cond.wait()
+            self.available -= nbytes
+        return nbytes
+
+    def release(self, nbytes: int):
+        with self.cond:
+            self.available += nbytes
+            self.cond.notify_all()
+
+
+def summarize_tensors(file_path: str, arrays, keys: list, np) -> dict:
+    """
+    在线程池中并行计算多个张量的信息、统计与预览（zlib 解压和 numpy 归约都会释放 GIL）
+    压缩的 .npz 成员在工作线程中整体解压，用完即释放，不留在打开文件缓存中；bf16/fp8 张量按块转换类型；
+    同时驻留的解压数据总量受内存预算限制
+    """
+    if not keys:
+        return {}
+
+    costs = {}
+    if isinstance(arrays, LazyArrayMap):
+        for key in keys:
+            if arrays.load_cost(key) and not arrays.is_loaded(key):
+                costs[key] = arrays.load_cost(key)
+    budget = MemoryBudget(get_memory_budget())
+
+    def summarize(key):
+        raw = arrays.raw_view(key) if isinstance(arrays, LazyArrayMap) else None
+        if raw is not None:
+            # 类型转换按块进行，不需要预留内存
+            return create_tensor_item(key, raw[0], np, upcast=raw[1])
+        reserved = budget.acquire(costs.get(key, 0))
+        try:
+            data = arrays.load_uncached(key) if key in costs else arrays[key]
+            return create_tensor_item(key, data, np)
+        finally:
+            budget.release(reserved)
+
+    workers = min(get_worker_count(), len(keys))
+    if workers <= 1:
+        return {key: summarize(key) for key in keys}
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(keys, executor.map(bind_request(summarize), keys)))
+
+
+# ========== 张量比较 ==========
+
+DIFF_RTOL = 1e-5
+DIFF_ATOL = 1e-8
+DIFF_MAX_INDICES = 10
+DIFF_CHUNK_BYTES = 4 * 1024 * 1024
+# 分布式训练与 torch.compile 给参数名加的前缀，两侧键名不一致时去掉后再配对
+DIFF_KEY_PREFIXES = ('module.', '_orig_mod.')
+
+
+def normalize_diff_key(key: str) -> str:
+    """去掉包装前缀后的键名"""
+    changed = True
+    while changed:
+        changed = False
+        for prefix in DIFF_KEY_PREFIXES:
+            if key.startswith(prefix):
+                key = key[len(prefix):]
+                changed = True
+    return key
+
+
+def match_diff_keys(keys_a: list, keys_b: list) -> tuple:
+    """
+    配对两个文件的键名：先按完全相同的键名，其余按去掉包装前缀后的键名（两侧都唯一时）；
+    两个文件都只有一个张量时直接配对
+    返回 (配对列表 [(键A, 键B)], 只在A中的键, 只在B中的键)
+    """
+    if len(keys_a) == 1 and len(keys_b) == 1:
+        return [(keys_a[0], keys_b[0])], [], []
+
+    set_b = set(keys_b)
+    pairs = [(key, key) for key in keys_a if key in set_b]
+    paired = {key for key, _ in pairs}
+    rest_a = [key for key in keys_a if key not in paired]
+    rest_b = [key for key in keys_b if key not in paired]
+
+    def by_normal(keys):
+        groups = {}
+        for key in keys:
+            groups.setdefault(normalize_diff_key(key), []).append(key)
+        return {normal: group[0] for normal, group in groups.items() if len(group) == 1}
+
+    normal_b = by_normal(rest_b)
+    for normal, key_a in by_normal(rest_a).items():
+        key_b = normal_b.get(normal)
+        if key_b is not None:
+            pairs.append((key_a, key_b))
+            paired.add(key_a)
+            paired.add(key_b)
+    only_a = [key for key in rest_a if key not in paired]
+    only_b = [key for key in rest_b if key not in paired]
+    return pairs, only_a, only_b
+
+
+def iter_aligned_chunks(chunks_a, chunks_b):
+    """把两个块长度不同的展平块序列重新切分为等长的块对"""
+    it_a, it_b = iter(chunks_a), iter(chunks_b)
+    a = b = None
+    while True:
+        while a is None or not len(a):
+            a = next(it_a, None)
+            if a is None:
+                break
+        while b is None or not len(b):
+            b = next(it_b, None)
+            if b is None:
+                break
+        if a is None or b is None:
+            if a is not None or b is not None:
+                raise ValueError('两个张量的元素数不一致')
+            return
+        n = min(len(a), len(b))
+        yield a[:n], b[:n]
+        a, b = a[n:], b[n:]
+
+
+class DiffAccumulator:
+    """
+    逐块累积两个张量的差异：最大/平均绝对差与相对差、不相等的元素数、超出容差的元素数，
+    以及前若干个超出容差的位置。相对差为 |a-b| / max(|a|, |b|)，取值在 [0, 2]；
+    差值非有限（一侧为 NaN，或 Inf 对有限值）的元素不参与最大/平均值，单独计数
+    """
+
+    def __init__(self, np, rtol: float, atol: float, equal_nan: bool, max_indices: int):
+        self.np = np
+        self.rtol = rtol
+        self.atol = atol
+        self.equal_nan = equal_nan
+        self.max_indices = max_indices
+        self.count = 0
+        self.diff_count = 0
+        self.mismatch_count = 0
+        self.non_finite_count = 0
+        self.finite_count = 0
+        self.max_abs = 0.0
+        self.sum_abs = 0.0
+        self.max_rel = 0.0
+        self.sum_rel = 0.0
+        self.first = []   # (展平下标, A 的值, B 的值)
+
+    def update(self, a, b):
+        np = self.np
+        offset = self.count
+        self.count += a.size
+        if a.dtype.kind not in 'biufc' or b.dtype.kind not in 'biufc':
+            # 非数值类型只比较是否相等
+            mismatch = np.asarray(a != b)
+            self.diff_count += int(np.count_nonzero(mismatch))
+            self.mismatch_count = self.diff_count
+            self._record(mismatch, a, b, offset)
+            return
+
+        work = np.complex128 if a.dtype.kind == 'c' or b.dtype.kind == 'c' else np.float64
+        x = a.astype(work, copy=False)
+        y = b.astype(work, copy=False)
+        unequal = x != y
+        if self.equal_nan and work is np.float64:
+            unequal &= ~(np.isnan(x) & np.isnan(y))
+        self.diff_count += int(np.count_nonzero(unequal))
+        if not unequal.any():
+            return
+
+        diff = np.abs(x - y)
+        diff[~unequal] = 0
+        mismatch = ~(diff <= self.atol + self.rtol * np.abs(y))
+        if self.equal_nan:
+            mismatch &= unequal
+        self.mismatch_count += int(np.count_nonzero(mismatch))
+
+        finite = np.isfinite(diff)
+        n_finite = int(np.count_nonzero(finite))
+        self.non_finite_count += diff.size - n_finite
+        if n_finite != diff.size:
+            diff = diff[finite]
+            x = x[finite]
+            y = y[finite]
+        if n_finite:
+            denom = np.maximum(np.abs(x), np.abs(y))
+            rel = np.divide(diff, denom, out=np.zeros_like(diff), where=denom > 0)
+            self.finite_count += n_finite
+            self.max_abs = max(self.max_abs, float(diff.max()))
+            self.sum_abs += float(diff.sum())
+            self.max_rel = max(self.max_rel, float(rel.max()))
+            self.sum_rel += float(rel.sum())
+        self._record(mismatch, a, b, offset)
+
+    def _record(self, mismatch, a, b, offset: int):
+        need = self.max_indices - len(self.first)
+        if need <= 0:
+            return
+        for idx in self.np.flatnonzero(mismatch)[:need]:
+            self.first.append((offset + int(idx), str(a[idx]), str(b[idx])))
+
+    def result(self, shape: tuple, order: str) -> dict:
+        np = self.np
+        # 平均值按全部元素计（相同元素的差为 0）
+        n = max(1, self.count - self.non_finite_count)
+        return {
+            'maxAbsDiff': self.max_abs,
+            'meanAbsDiff': self.sum_abs / n,
+            'maxRelDiff': self.max_rel,
+            'meanRelDiff': self.sum_rel / n,
+            'diffCount': self.diff_count,
+            'mismatchCount': self.mismatch_count,
+            'nonFiniteCount': self.non_finite_count,
+            'allclose': self.mismatch_count == 0,
+            'firstDiffs': [{
+                'index': [int(i) for i in np.unravel_index(flat, shape, order=order)] if shape else [],
+                'a': va,
+                'b': vb
+            } for flat, va, vb in self.first]
+        }
+
+
+def open_diff_chunks(file_path: str, key: str, arrays, np, budget: MemoryBudget = None):
+    """
+    打开张量的展平块迭代器，返回 (形状, dtype, 展平顺序, 块迭代器, 预留的内存)
+    给出 budget 时保证按行优先顺序遍历：列优先存储的张量在预算内整体读取后按行块遍历
+    """
+    shape, dtype, order, chunks = iter_tensor_chunks(file_path, key, arrays, np, DIFF_CHUNK_BYTES)
+    if budget is None or order == 'C' or len(shape) <= 1:
+        return shape, dtype, order, chunks, 0
+    chunks.close()
+    lazy = isinstance(arrays, LazyArrayMap)
+    reserved = budget.acquire(arrays.load_cost(key) if lazy and not arrays.is_loaded(key) else 0)
+    arr = arrays.load_uncached(key) if lazy else arrays[key]
+    chunks = iter_flat_chunks(arr, np, chunk_elements(arr.dtype, DIFF_CHUNK_BYTES), order='C')
+    return shape, arr.dtype, 'C', chunks, reserved
+
+
+def tensor_sizes(file_path: str, arrays) -> dict:
+    """各张量的元素数，惰性打开的文件只读取文件头"""
+    if isinstance(arrays, LazyArrayMap):
+        return {info['key']: info['size'] for info in get_tensor_info(file_path)}
+    return {key: int(arrays[key].size) for key in arrays}
+
+
+def diff_tensor_pair(file_a: str, key_a: str, arrays_a, file_b: str, key_b: str, arrays_b, np,
+                     options: dict, budget: MemoryBudget, progress) -> dict:
+    """比较一对张量：形状不同时只报告形状，否则两侧按块同步读取并累积差异"""
+    entry = {'key': key_a}
+    if key_b != key_a:
+        entry['keyB'] = key_b
+    chunks_a = chunks_b = None
+    reserved = [0, 0]
+    try:
+        shape_a, dtype_a, order_a, chunks_a, _ = open_diff_chunks(file_a, key_a, arrays_a, np)
+        shape_b, dtype_b, order_b, chunks_b, _ = open_diff_chunks(file_b, key_b, arrays_b, np)
+        entry.update({
+            'shapeA': [int(d) for d in shape_a],
+            'shapeB': [int(d) for d in shape_b],
+            'dtypeA': str(dtype_a),
+            'dtypeB': str(dtype_b)
+        })
+        if tuple(shape_a) != tuple(shape_b):
+            entry['status'] = 'shape'
+            return entry
+
+        if order_a != order_b:
+            # 两侧展平顺序不同时，列优先的一侧改为按行优先顺序遍历
+            if order_a == 'F':
+                chunks_a.close()
+                shape_a, dtype_a, order_a, chunks_a, reserved[0] = open_diff_chunks(file_a, key_a, arrays_a, np, budget)
+            else:
+                chunks_b.close()
+                shape_b, dtype_b, order_b, chunks_b, reserved[1] = open_diff_chunks(file_b, key_b, arrays_b, np, budget)
+
+        acc = DiffAccumulator(np, options['rtol'], options['atol'], options['equal_nan'], options['max_indices'])
+        with telemetry_phase('compute'):
+            for a, b in iter_aligned_chunks(chunks_a, chunks_b):
+                check_cancelled()
+                acc.update(a, b)
+                progress(a.size)
+        entry.update(acc.result(tuple(shape_a), order_a))
+        entry['size'] = acc.count
+        if acc.diff_count == 0:
+            entry['status'] = 'identical'
+        else:
+            entry['status'] = 'close' if acc.mismatch_count == 0 else 'different'
+        return entry
+    except RequestCancelled:
+        raise
+    except Exception as e:
+        entry['status'] = 'error'
+        entry['error'] = str(e)
+        return entry
+    finally:
+        for chunks in (chunks_a, chunks_b):
+            if chunks is not None and hasattr(chunks, 'close'):
+                chunks.close()
+        budget.release(sum(reserved))
+
+
+def diff_files(file_a: str, file_b: str, keys: list = None, rtol: float = DIFF_RTOL, atol: float = DIFF_ATOL,
+               equal_nan: bool = True, max_indices: int = DIFF_MAX_INDICES) -> dict:
+    """
+    比较两个张量文件（格式可以不同）：配对键名后在线程池中并行比较各对张量
+    每对张量都按块流式读取，同时驻留的只有两侧的当前数据块，两个大检查点无需载入内存；
+    结果按键给出差异统计、allclose 判定与前若干个超出容差的位置
+    """
+    np = load_numpy()
+    arrays_a = open_tensor_arrays(file_a)
+    arrays_b = open_tensor_arrays(file_b)
+    pairs, only_a, only_b = match_diff_keys(list(arrays_a), list(arrays_b))
+    if keys is not None:
+        wanted = set(keys)
+        pairs = [pair for pair in pairs if pair[0] in wanted]
+
+    sizes = tensor_sizes(file_a, arrays_a) if pairs else {}
+    total = sum(sizes.get(key, 0) for key, _ in pairs)
+    done = [0]
+    lock = threading.Lock()
+
+    def progress(count: int):
+        with lock:
+            done[0] += count
+            report_progress(done[0], max(total, done[0]))
+
+    options = {'rtol': rtol, 'atol': atol, 'equal_nan': equal_nan, 'max_indices': max_indices}
+    budget = MemoryBudget(get_memory_budget())
+
+    def compare(pair):
+        return diff_tensor_pair(file_a, pair[0], arrays_a, file_b, pair[1], arrays_b, np, options, budget, progress)
+
+    # 大张量先开始，避免最后只剩一个大张量串行处理
+    order = sorted(range(len(pairs)), key=lambda i: -sizes.get(pairs[i][0], 0))
+    workers = min(get_worker_count(), len(pairs))
+    if workers <= 1:
+        results = {i: compare(pairs[i]) for i in order}
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = dict(zip(order, executor.map(bind_request(compare), [pairs[i] for i in order])))
+    entries = [results[i] for i in range(len(pairs))]
+
+    summary = {status: 0 for status in ('identical', 'close', 'different', 'shape', 'error')}
+    for entry in entries:
+        summary[entry['status']] += 1
+    return {
+        'fileA': file_a,
+        'fileB': file_b,
+        'rtol': rtol,
+        'atol': atol,
+        'entries': entries,
+        'onlyA': only_a,
+        'onlyB': only_b,
+        'summary': summary
+    }
+
+
+# ========== 统计与元数据磁盘缓存 ==========
+
+class StatsCache:
+    """
+    按文件身份缓存每个张量的信息、统计、直方图和预览
+    键为 (路径, 大小, 修改时间, inode, 张量键名, 类别)，存储在 SQLite 单文件中，
+    按最近访问时间做 LRU 淘汰，总大小超过上限时删除最久未用的条目。
+    未设置缓存目录（TENSORLENS_CACHE_DIR）时缓存不启用。
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.conn = None
+        self.lock = threading.Lock()
+        if not cache_dir:
+            return
         try:
-            import matplotlib.pyplot as plt
-            plt.figure(figsize=(10, 8))
-            if arr.ndim == 1:
-                plt.plot(arr)
-            else:
-                plt.imshow(arr[:100, :100] if arr.ndim >= 2 else arr)
-                plt.colorbar()
-            plt.savefig(output, dpi=150)
-            plt.close()
-        except ImportError:
-            raise ImportError("需要安装matplotlib: pip install matplotlib")
-    
-    return {'success': True, 'output': output}
+            import sqlite3
+            os.makedirs(cache_dir, exist_ok=True)
+            self.conn = sqlite3.connect(os.path.join(cache_dir, 'stats_cache.db'), timeout=5, check_same_thread=False)
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'path TEXT, tensor_key TEXT, kind TEXT, '
+                'size INTEGER, mtime INTEGER, inode INTEGER, '
+                'value BLOB, nbytes INTEGER, accessed REAL, '
+                'PRIMARY KEY (path, tensor_key, kind))'
+            )
+            self.conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+            self.conn.commit()
+        except Exception as e:
+            print(f'统计缓存不可用: {e}', file=sys.stderr)
+            self.conn = None
 
+    @property
+    def enabled(self) -> bool:
+        return self.conn is not None
 
-def get_tensor_info(file_path: str) -> list:
-    """获取张量信息（不加载完整数据）"""
-    data = load_tensor_file(file_path)
-    return [t['info'] for t in data['tensors']]
+    @staticmethod
+    def identity(file_path: str, key: str) -> tuple:
+        """条目的文件身份；分片检查点的张量按所在分片记录，改写一个分片只使该分片的条目失效"""
+        if is_safetensors_index(file_path):
+            shard = read_safetensors_index(file_path).get(key)
+            if shard is not None:
+                return file_identity(shard)
+        return file_identity(file_path)[:4]
+
+    def get(self, file_path: str, key: str, kind: str):
+        """读取缓存；文件身份不一致（已被修改）时视为未命中并删除旧条目"""
+        if not self.enabled:
+            return None
+        path, size, mtime, inode = self.identity(file_path, key)
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT size, mtime, inode, value FROM entries WHERE path = ? AND tensor_key = ? AND kind = ?',
+                (path, key, kind)
+            ).fetchone()
+            if row is None:
+                return None
+            if tuple(row[:3]) != (size, mtime, inode):
+                self.conn.execute('DELETE FROM entries WHERE path = ?', (path,))
+                self.conn.commit()
+                return None
+            self.conn.execute(
+                'UPDATE entries SET accessed = ? WHERE path = ? AND tensor_key = ? AND kind = ?',
+                (time.time(), path, key, kind)
+            )
+            self.conn.commit()
+        return json.loads(zlib.decompress(row[3]).decode('utf-8'), object_hook=cache_json_object_hook)
+
+    def put(self, file_path: str, key: str, kind: str, value):
+        """写入缓存并按总大小淘汰最久未访问的条目"""
+        if not self.enabled:
+            return
+        path, size, mtime, inode = self.identity(file_path, key)
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False, default=cache_json_default).encode('utf-8'))
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (path, key, kind, size, mtime, inode, blob, len(blob), time.time())
+            )
+            total = self.conn.execute('SELECT COALESCE(SUM(nbytes), 0) FROM entries').fetchone()[0]
+            if total > self.max_bytes:
+                rows = self.conn.execute('SELECT rowid, nbytes FROM entries ORDER BY accessed').fetchall()
+                evict = []
+                for rowid, nbytes in rows:
+                    if total <= self.max_bytes:
+                        break
+                    evict.append((rowid,))
+                    total -= nbytes
+                self.conn.executemany('DELETE FROM entries WHERE rowid = ?', evict)
+            self.conn.commit()
+
+    def get_or_compute(self, file_path: str, key: str, kind: str, compute):
+        value = self.get(file_path, key, kind)
+        if value is None:
+            value = compute()
+            self.put(file_path, key, kind, value)
+        return value
+
+    def invalidate(self, file_path: str):
+        """删除文件的所有缓存条目（文件被改写时调用）"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.conn.execute('DELETE FROM entries WHERE path = ?', (os.path.abspath(file_path),))
+            self.conn.commit()
+
+
+_stats_cache = None
+_stats_cache_lock = threading.Lock()
+
+
+def get_stats_cache() -> StatsCache:
+    """获取进程内共享的统计缓存"""
+    global _stats_cache
+    with _stats_cache_lock:
+        if _stats_cache is None:
+            max_mb = int(os.environ.get('TENSORLENS_CACHE_MAX_MB', '256'))
+            _stats_cache = StatsCache(os.environ.get('TENSORLENS_CACHE_DIR'), max_mb * 1024 * 1024)
+    return _stats_cache
+
+
+# ========== 切片表达式 ==========
+
+MAX_SLICE_BYTES = 8 * 1024 * 1024
+
+SLICE_SYNTAX_HELP = (
+    "正确格式示例：\n- 单个索引：0 或 -1\n- 多个索引：0,1,2\n- 范围切片：:10 或 5: 或 2:8 或 ::2\n"
+    "- 组合：0,1,:5 或 ...,0\n- 新增维度：None,:\n- 索引列表：[0,2,5],:\n- 链式：[0][1][:5]"
+)
+
+_SLICE_TOKEN = re.compile(r'\s*(\.\.\.|[-+]?\d+|np\.newaxis|newaxis|None|[:,\[\]])')
+_CHAINED_SLICE = re.compile(r'(\s*\[[^\[\]]*\]\s*){2,}')
+
+
+def tokenize_slice(spec: str) -> list:
+    """把切片表达式拆分为记号，遇到无法识别的字符时报错"""
+    tokens = []
+    pos = 0
+    spec = spec.rstrip()
+    while pos < len(spec):
+        match = _SLICE_TOKEN.match(spec, pos)
+        if not match:
+            raise ValueError(f"切片语法错误：'{spec}' 第 {pos + 1} 个字符无法识别\n\n{SLICE_SYNTAX_HELP}")
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+
+def parse_index_expr(spec: str) -> tuple:
+    """
+    解析逗号分隔的索引表达式为索引元组（不使用 eval）
+    支持整数（含负数）、带步长的范围、...、None/newaxis 以及整数列表
+    """
+    tokens = tokenize_slice(spec)
+    pos = 0
 
+    def fail(reason):
+        raise ValueError(f"切片语法错误：'{spec}'（{reason}）\n\n{SLICE_SYNTAX_HELP}")
 
-def get_slice(file_path: str, key: str, slice_spec: str):
-    """获取张量切片"""
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take_int():
+        nonlocal pos
+        token = peek()
+        if token is not None and token not in (':', ',', '[', ']', '...') and token[-1].isdigit():
+            pos += 1
+            return int(token)
+        return None
+
+    def parse_item():
+        nonlocal pos
+        token = peek()
+        if token == '...':
+            pos += 1
+            return Ellipsis
+        if token in ('None', 'newaxis', 'np.newaxis'):
+            pos += 1
+            return None
+        if token == '[':
+            pos += 1
+            values = []
+            while peek() != ']':
+                value = take_int()
+                if value is None:
+                    fail('索引列表只能包含整数')
+                values.append(value)
+                if peek() == ',':
+                    pos += 1
+                elif peek() != ']':
+                    fail('索引列表缺少 ]')
+            pos += 1
+            return values
+
+        parts = [take_int()]
+        while peek() == ':' and len(parts) < 3:
+            pos += 1
+            parts.append(take_int())
+        if len(parts) == 1:
+            if parts[0] is None:
+                fail(f"意外的 '{token}'" if token else '缺少索引')
+            return parts[0]
+        if parts[-1] == 0 and len(parts) == 3:
+            fail('步长不能为 0')
+        return slice(*parts)
+
+    if not tokens:
+        return ()
+    items = [parse_item()]
+    while peek() == ',':
+        pos += 1
+        if peek() is None:
+            break   # 允许末尾逗号，与 Python 一致
+        items.append(parse_item())
+    if peek() is not None:
+        fail(f"意外的 '{peek()}'")
+    if sum(1 for item in items if item is Ellipsis) > 1:
+        fail('只能包含一个 ...')
+    return tuple(items)
+
+
+def parse_slice_spec(spec: str) -> list:
+    """
+    解析切片表达式，返回依次应用的索引元组列表
+    "0,1,:5" 为单次索引；"[0][1][:5]" 为链式索引，逐个应用
+    """
+    spec = spec.strip()
+    if _CHAINED_SLICE.fullmatch(spec):
+        return [parse_index_expr(group) for group in re.findall(r'\[([^\[\]]*)\]', spec)]
+    return [parse_index_expr(spec)]
+
+
+def apply_slice(arr, spec: str):
+    """
+    在（内存映射的）数组上应用切片表达式
+    基本索引只返回视图，不读取数据；索引列表只读取选中的部分
+    """
+    result = arr
+    for index in parse_slice_spec(spec):
+        try:
+            result = result[index]
+        except IndexError as e:
+            shape_str = ' × '.join(map(str, arr.shape))
+            raise ValueError(f"切片索引错误：{str(e)}\n\n数组形状：{shape_str}\n{SLICE_SYNTAX_HELP}")
+    return result
+
+
+def get_slice(file_path: str, key: str, slice_spec: str, offset: int = 0, max_bytes: int = MAX_SLICE_BYTES):
+    """
+    获取张量切片
+    结果不超过 max_bytes 时直接返回；否则沿第0维分页，返回从 offset 开始能放下的若干行及分页信息
+    """
     np = load_numpy()
-    file_type = get_file_type(file_path)
-    
-    if file_type == 'numpy':
-        ext = Path(file_path).suffix.lower()
-        if ext == '.npy':
-            arr = np.load(file_path, allow_pickle=True)
-        else:
-            npz = np.load(file_path, allow_pickle=True)
-            arr = npz[key]
+    sliced = apply_slice(get_array(file_path, key), slice_spec)
+    if np.ndim(sliced) == 0:
+        return np.asarray(sliced).tolist()
+
+    if sliced.nbytes <= max_bytes:
+        return to_payload(sliced, np)
+
+    total = sliced.shape[0]
+    row_bytes = sliced.nbytes // total if total else sliced.nbytes
+    count = max_bytes // row_bytes if row_bytes else total
+    if count == 0:
+        shape_str = ' × '.join(map(str, sliced.shape))
+        raise ValueError(
+            f"切片结果过大：形状 {shape_str}，单行 {row_bytes:,} 字节超过上限 {max_bytes:,} 字节，请缩小切片范围"
+        )
+    offset = max(0, min(int(offset), total))
+    page = sliced[offset:offset + count]
+    return {
+        'paged': True,
+        'shape': list(sliced.shape),
+        'offset': offset,
+        'count': page.shape[0],
+        'data': to_payload(page, np)
+    }
+
+
+# ========== 窗口读取 ==========
+
+MAX_WINDOW_ROWS = 1024
+MAX_WINDOW_COLS = 512
+
+
+def window_view(arr, index=None):
+    """
+    把张量整理为二维视图，供表格按窗口读取
+    0维 -> (1, 1)，1维 -> (n, 1)，2维保持不变；
+    更高维度时若给出前 ndim-2 维的索引则取对应的二维切片，否则把前面各维合并为行
+    """
+    if arr.ndim == 0:
+        return arr.reshape(1, 1)
+    if arr.ndim == 1:
+        return arr.reshape(-1, 1)
+    if arr.ndim == 2:
+        return arr
+    if index:
+        if len(index) != arr.ndim - 2:
+            raise ValueError(f"索引维度错误：预期 {arr.ndim - 2} 个，实际 {len(index)} 个")
+        return arr[tuple(int(i) for i in index)]
+    return arr.reshape(-1, arr.shape[-1])
+
+
+def get_window(file_path: str, key: str, row_start: int, row_count: int,
+               col_start: int, col_count: int, index: list = None) -> dict:
+    """
+    读取张量二维视图中的一个矩形窗口
+    数据通过内存映射按需读取，只有窗口内的元素会被拷贝
+    """
+    np = load_numpy()
+    view = window_view(get_array(file_path, key), index)
+    rows, cols = view.shape
+
+    row_start = max(0, min(int(row_start), rows))
+    col_start = max(0, min(int(col_start), cols))
+    row_end = min(rows, row_start + max(0, min(int(row_count), MAX_WINDOW_ROWS)))
+    col_end = min(cols, col_start + max(0, min(int(col_count), MAX_WINDOW_COLS)))
+
+    tile = np.ascontiguousarray(view[row_start:row_end, col_start:col_end])
+    return {
+        'key': key,
+        'rows': rows,
+        'cols': cols,
+        'rowStart': row_start,
+        'colStart': col_start,
+        'data': to_payload(tile, np)
+    }
+
+
+# ========== 增量保存 ==========
+
+def edit_index(shape: tuple, rows, cols, index, np) -> tuple:
+    """
+    把二维视图（见 window_view）中的坐标换算为原数组上的高级索引
+    直接索引原数组而不经过 reshape 后的视图，Fortran 顺序等非连续数组也能原地写入；
+    坐标越界时抛出 IndexError，参数为第一个越界修改的序号
+    """
+    ndim = len(shape)
+    if ndim == 0:
+        view_shape = (1, 1)
+    elif ndim == 1:
+        view_shape = (shape[0], 1)
+    elif ndim == 2 or index:
+        if ndim > 2 and len(index) != ndim - 2:
+            raise ValueError(f"索引维度错误：预期 {ndim - 2} 个，实际 {len(index)} 个")
+        view_shape = tuple(shape[-2:])
     else:
-        torch = load_torch()
-        loaded = torch.load(file_path, map_location='cpu', weights_only=False)
-        if isinstance(loaded, dict):
-            arr = loaded[key].detach().numpy()
-        else:
-            arr = loaded.detach().numpy()
-    
-    # 解析切片
+        view_shape = (int(np.prod(shape[:-1])), shape[-1])
+
+    bad = (rows < 0) | (rows >= view_shape[0]) | (cols < 0) | (cols >= view_shape[1])
+    if bad.any():
+        raise IndexError(int(np.argmax(bad)))
+
+    if ndim == 0:
+        return ()
+    if ndim == 1:
+        return (rows,)
+    if ndim == 2:
+        return (rows, cols)
+    if index:
+        return tuple(int(i) for i in index) + (rows, cols)
+    return np.unravel_index(rows, shape[:-1]) + (cols,)
+
+
+def scatter_edits(arr, target: tuple, values):
+    """一次性写入全部修改；0维数组只有一个位置，取最后一次修改"""
+    if arr.ndim == 0:
+        arr[()] = values[-1]
+    else:
+        arr[target] = values
+
+
+def atomic_write(file_path: str, write):
+    """
+    写入同目录下的临时文件后原子替换目标文件
+    写入过程中出错时删除临时文件，原文件保持不变
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{Path(file_path).name}.', suffix='.tmp', dir=directory)
     try:
-        sliced = eval(f"arr[{slice_spec}]")
-        return sliced.tolist()
-    except IndexError as e:
-        shape_str = ' × '.join(map(str, arr.shape))
-        error_msg = f"切片索引错误：{str(e)}\n\n数组形状：{shape_str}\n切片格式示例：\n- 单层：0 或 1\n- 多层：0,1 或 0,1,:5\n- 完整：使用冒号 : 表示全部，如 :,:,0"
-        raise ValueError(error_msg)
-    except SyntaxError:
-        raise ValueError(f"切片语法错误：'{slice_spec}'\n\n正确格式示例：\n- 单个索引：0\n- 多个索引：0,1,2\n- 范围切片：:10 或 5: 或 2:8\n- 组合：0,1,:5")
-
-
-def save_edits(file_path: str, key: str, changes: list) -> dict:
-    """保存单元格编辑"""
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, tmp_path)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+def read_npz_member_header(file_path: str, member, np) -> dict:
+    """只读取 .npz 成员的 .npy 头部"""
+    with zipfile.ZipFile(file_path) as zf, zf.open(member) as f:
+        return read_npy_header(f, np)
+
+
+def load_npz_member_writable(file_path: str, member, np):
+    """
+    读取 .npz 成员为可写数组
+    未压缩成员使用写时复制的内存映射，只有被修改的页会占用内存；
+    压缩成员边解压边填入预先分配的数组，不保留解压缓冲区的副本
+    """
+    def full_load():
+        with zipfile.ZipFile(file_path) as zf, zf.open(member) as f:
+            return np.lib.format.read_array(f, allow_pickle=True)
+
+    if member.compress_type == zipfile.ZIP_STORED:
+        return memmap_npy(file_path, zip_member_data_offset(file_path, member), np, full_load, mode='c')
+
+    chunks = iter_npy_stream_chunks(functools.partial(open_npz_member, file_path, member), np)
+    header = next(chunks)
+    if header['dtype'].hasobject:
+        chunks.close()
+        return full_load()
+    order = 'F' if header['fortranOrder'] else 'C'
+    arr = np.empty(header['shape'], dtype=header['dtype'], order=order)
+    flat = arr.reshape(-1, order=order)
+    pos = 0
+    for chunk in chunks:
+        flat[pos:pos + chunk.size] = chunk
+        pos += chunk.size
+    return arr
+
+
+def copy_zip_member_raw(src, member, zout: zipfile.ZipFile):
+    """
+    把 zip 成员的压缩数据原样拷贝到另一个正在写入的 zip 中，不解压也不重新压缩
+    src 为源文件对象；本地文件头按成员信息重新生成，CRC 与大小直接沿用
+    """
+    info = zipfile.ZipInfo(member.filename, date_time=member.date_time)
+    info.compress_type = member.compress_type
+    info.external_attr = member.external_attr
+    info.create_system = member.create_system
+    info.flag_bits = member.flag_bits & ~0x08  # 大小已知，不再使用数据描述符
+    info.CRC = member.CRC
+    info.compress_size = member.compress_size
+    info.file_size = member.file_size
+    info.header_offset = zout.fp.tell()
+
+    src.seek(member.header_offset)
+    local_header = src.read(30)
+    if local_header[:4] != b'PK\x03\x04':
+        raise ValueError(f'zip 本地文件头损坏: {member.filename}')
+    name_len, extra_len = struct.unpack('<HH', local_header[26:30])
+    src.seek(member.header_offset + 30 + name_len + extra_len)
+
+    zout.fp.write(info.FileHeader())
+    remaining = member.compress_size
+    while remaining > 0:
+        buf = src.read(min(CHUNK_BYTES, remaining))
+        if not buf:
+            raise ValueError(f'成员数据不完整: {member.filename}')
+        zout.fp.write(buf)
+        remaining -= len(buf)
+
+    zout.filelist.append(info)
+    zout.NameToInfo[info.filename] = info
+    zout.start_dir = zout.fp.tell()
+
+
+def rewrite_npz_member(file_path: str, member_name: str, edit, np):
+    """
+    只重写 .npz 中被编辑的成员，并保持其原有的压缩方式
+    其余成员的压缩数据原样拷贝；新文件写完后原子替换原文件
+    """
+    def write(f):
+        with open(file_path, 'rb') as src, zipfile.ZipFile(file_path) as zin, \
+                zipfile.ZipFile(f, 'w', allowZip64=True) as zout:
+            for member in zin.infolist():
+                if member.filename != member_name:
+                    copy_zip_member_raw(src, member, zout)
+                    continue
+                arr = load_npz_member_writable(file_path, member, np)
+                edit(arr)
+                info = zipfile.ZipInfo(member.filename, date_time=member.date_time)
+                info.compress_type = member.compress_type
+                info.external_attr = member.external_attr
+                with zout.open(info, 'w', force_zip64=True) as dst:
+                    np.lib.format.write_array(dst, arr, allow_pickle=True)
+                del arr
+
+    atomic_write(file_path, write)
+
+
+def save_edits(file_path: str, key: str, changes: list, index: list = None) -> dict:
+    """
+    保存单元格编辑
+    row/col 为二维视图（见 window_view）中从0开始的坐标，index 为高维张量前 ndim-2 维的索引
+    """
     try:
         np = load_numpy()
         file_type = get_file_type(file_path)
@@ -513,63 +3992,69 @@ def save_edits(file_path: str, key: str, changes: list) -> dict:
             raise ValueError(f"数据类型错误：无法将 '{value_str}' 保存为 {dtype} 类型。{str(e)}")
     
     try:
-        # 加载原始数据
-        if file_type == 'numpy':
-            ext = Path(file_path).suffix.lower()
-            if ext == '.npy':
+        if split_archive_path(file_path)[1] is not None:
+            raise ValueError("压缩包内的张量为只读，请解压后再编辑")
+        if file_type != 'numpy':
+            # PyTorch / safetensors / HDF5 文件暂不支持保存
+            names = {'torch': 'PyTorch', 'safetensors': 'safetensors ', 'hdf5': 'HDF5'}
+            raise ValueError(f"{names.get(file_type, file_type)}文件暂不支持编辑保存")
+
+        # 只读取头部得到 dtype 与形状，写入前完成全部校验，任何一处修改有误都不改动文件
+        ext = Path(file_path).suffix.lower()
+        if ext == '.npy':
+            with open(file_path, 'rb') as f:
+                header = read_npy_header(f, np)
+        else:
+            member_name = key + '.npy'
+            with zipfile.ZipFile(file_path) as zf:
+                member = zf.getinfo(member_name)
+            header = read_npz_member_header(file_path, member, np)
+        dtype = header['dtype']
+        shape = tuple(header['shape'])
+
+        rows, cols, values = [], [], []
+        for i, change in enumerate(changes):
+            try:
+                row, col = int(change['row']), int(change['col'])
+                values.append(convert_value(change['value'], dtype))
+                rows.append(row)
+                cols.append(col)
+            except ValueError as ve:
+                # 添加位置信息
+                return {'error': f"第 {i+1} 处修改失败（位置 [{change.get('row')}, {change.get('col')}]）：{str(ve)}"}
+        if not values:
+            return {'success': True, 'modified': 0, 'message': '没有需要保存的修改'}
+
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = np.asarray(cols, dtype=np.intp)
+        values = np.asarray(values, dtype=dtype)
+        try:
+            target = edit_index(shape, rows, cols, index, np)
+        except IndexError as ie:
+            i = ie.args[0]
+            return {'error': f"第 {i+1} 处修改失败：位置 [{rows[i]}, {cols[i]}] 超出数组范围"}
+
+        # 写入前释放缓存的内存映射，并使统计缓存失效
+        release_file(file_path)
+        get_stats_cache().invalidate(file_path)
+
+        edit = lambda arr: scatter_edits(arr, target, values)
+        if ext == '.npy':
+            if dtype.hasobject:
+                # 对象数组无法内存映射，完整加载后整体写回
                 arr = np.load(file_path, allow_pickle=True)
-                
-                # 应用修改
-                for i, change in enumerate(changes):
-                    try:
-                        row, col = change['row'], change['col']
-                        value = convert_value(change['value'], arr.dtype)
-                        if arr.ndim == 1:
-                            arr[row] = value
-                        elif arr.ndim == 2:
-                            arr[row, col] = value
-                        else:
-                            # 多维数组，展平后修改
-                            flat_idx = row * arr.shape[-1] + col
-                            arr.flat[flat_idx] = value
-                    except ValueError as ve:
-                        # 添加位置信息
-                        return {'error': f"第 {i+1} 处修改失败（位置 [{row}, {col}]）：{str(ve)}"}
-                    except IndexError:
-                        return {'error': f"第 {i+1} 处修改失败：位置 [{row}, {col}] 超出数组范围"}
-                
-                # 保存回文件
-                np.save(file_path, arr)
-                
-            else:  # .npz
-                npz = np.load(file_path, allow_pickle=True)
-                arrays = {k: npz[k] for k in npz.files}
-                arr = arrays[key].copy()
-                
-                # 应用修改
-                for i, change in enumerate(changes):
-                    try:
-                        row, col = change['row'], change['col']
-                        value = convert_value(change['value'], arr.dtype)
-                        if arr.ndim == 1:
-                            arr[row] = value
-                        elif arr.ndim == 2:
-                            arr[row, col] = value
-                        else:
-                            flat_idx = row * arr.shape[-1] + col
-                            arr.flat[flat_idx] = value
-                    except ValueError as ve:
-                        return {'error': f"第 {i+1} 处修改失败（位置 [{row}, {col}]）：{str(ve)}"}
-                    except IndexError:
-                        return {'error': f"第 {i+1} 处修改失败：位置 [{row}, {col}] 超出数组范围"}
-                
-                arrays[key] = arr
-                # 保存回文件
-                np.savez(file_path, **arrays)
+                edit(arr)
+                atomic_write(file_path, lambda f: np.save(f, arr, allow_pickle=True))
+            else:
+                # 以读写方式映射文件，只有被修改元素所在的页会写回磁盘
+                arr = memmap_npy(file_path, 0, np, None, mode='r+')
+                edit(arr)
+                arr.flush()
+                del arr
         else:
-            # PyTorch文件暂不支持保存
-            raise ValueError("PyTorch文件暂不支持编辑保存")
-        
+            rewrite_npz_member(file_path, member_name, edit, np)
+        release_file(file_path)
+
         return {'success': True, 'modified': len(changes), 'message': f'已成功保存 {len(changes)} 处修改'}
     
     except PermissionError:
@@ -579,7 +4064,780 @@ def save_edits(file_path: str, key: str, changes: list) -> dict:
         return {'error': f'保存失败：{type(e).__name__}: {str(e)}'}
 
 
+# ========== 工作区索引 ==========
+
+INDEX_MAX_SHAPES = 256  # 每个文件最多记录的不同形状数，参数很多的检查点形状大多重复
+
+
+def read_header_summary(file_path: str) -> dict:
+    """只解析文件头，汇总张量数量、dtype、不同形状与总字节数"""
+    if get_file_type(file_path) == 'torch' and not zipfile.is_zipfile(file_path):
+        # get_tensor_info 对旧版格式会完整加载，后台索引不能承受这种开销
+        raise ValueError('旧版 PyTorch 格式没有独立的元数据，打开文件后才能读取')
+    infos = get_tensor_info(file_path)
+    dtypes = []
+    shapes = []
+    seen = set()
+    for info in infos:
+        if info['dtype'] not in dtypes:
+            dtypes.append(info['dtype'])
+        shape = tuple(info['shape'])
+        if shape not in seen and len(shapes) < INDEX_MAX_SHAPES:
+            seen.add(shape)
+            shapes.append(list(shape))
+    return {
+        'tensorCount': len(infos),
+        'elements': sum(info['size'] for info in infos),
+        'nbytes': sum(info['nbytes'] for info in infos),
+        'dtypes': dtypes,
+        'shapes': shapes
+    }
+
+
+def index_headers(files: list) -> list:
+    """
+    工作区索引批量读取文件头元数据
+    单个文件失败只记录在该文件的结果中，不影响同一批的其他文件
+    """
+    results = []
+    for done, file_path in enumerate(files):
+        check_cancelled()
+        try:
+            results.append({'file': file_path, **read_header_summary(file_path)})
+        except RequestCancelled:
+            raise
+        except Exception as e:
+            results.append({'file': file_path, 'error': str(e)})
+        report_progress(done + 1, len(files))
+    return results
+
+
+# ========== 检查点树 ==========
+
+CHILDREN_PAGE_SIZE = 200   # children 命令每页返回的子节点数
+VALUE_PREVIEW_CHARS = 80   # 非张量值（如 epoch、学习率）显示的最大字符数
+
+# 已构建的检查点树：文件身份 -> 根节点，与打开文件缓存一样按 LRU 淘汰
+_checkpoint_trees = collections.OrderedDict()
+_checkpoint_trees_lock = threading.Lock()
+
+
+class CheckpointNode:
+    """
+    检查点树的节点
+    kind 为 container（字典、列表、自定义对象）、group（键名按 '.' 或 '/' 拆分出的公共前缀）、
+    tensor（只有形状、dtype 等元数据）或 value（其他值，只保留简短的文本）；
+    tensors/params/nbytes 是整棵子树的张量数、元素数与字节数，建树时计算一次
+    """
+
+    __slots__ = ('kind', 'type', 'children', 'info', 'value', 'tensors', 'params', 'nbytes')
+
+    def __init__(self, kind: str, type_name: str, info: dict = None, value: str = None):
+        self.kind = kind
+        self.type = type_name
+        self.children = {} if kind in ('container', 'group') else None
+        self.info = info
+        self.value = value
+        self.tensors = 0
+        self.params = 0
+        self.nbytes = 0
+
+    def describe(self) -> dict:
+        result = {
+            'kind': self.kind,
+            'type': self.type,
+            'tensors': self.tensors,
+            'params': self.params,
+            'nbytes': self.nbytes
+        }
+        if self.children is not None:
+            result['childCount'] = len(self.children)
+        if self.info is not None:
+            result.update(self.info)
+        if self.value is not None:
+            result['value'] = self.value
+        return result
+
+
+def object_type_name(value) -> str:
+    """容器或值的类型名；元数据解析得到的占位对象显示原始类名"""
+    return getattr(type(value), 'stub_name', type(value).__name__)
+
+
+def value_summary(value) -> str:
+    """非张量值的简短文本"""
+    if value is None or isinstance(value, (bool, int, float, complex, str)):
+        text = repr(value)
+    elif isinstance(value, (bytes, bytearray)):
+        text = f'<{len(value)} 字节>'
+    else:
+        text = f'<{object_type_name(value)}>'
+    if len(text) > VALUE_PREVIEW_CHARS:
+        text = text[:VALUE_PREVIEW_CHARS - 1] + '…'
+    return text
+
+
+def insert_tree_node(parent: CheckpointNode, name: str, node: CheckpointNode, separator: str = '.'):
+    """
+    按名称中的分隔符逐级插入节点，中间层缺少的节点创建为分组
+    路径上已有同名的张量或值时不拆分，整个名称作为一个子节点；
+    已有同名分组被真实容器替代时合并两者的子节点
+    """
+    names = name.split(separator)
+    target = parent
+    for part in names[:-1]:
+        child = target.children.get(part)
+        if child is None:
+            child = target.children[part] = CheckpointNode('group', 'group')
+        elif child.children is None:
+            target, names = parent, [name]
+            break
+        target = child
+
+    existing = target.children.get(names[-1])
+    if existing is not None and existing.children is not None:
+        if node.children is not None:
+            node.children = {**existing.children, **node.children}
+        elif existing.kind == 'group':
+            # 张量或值与已拆分出的分组同名（如 'a' 与 'a.b'），分组内的节点恢复完整名称
+            del target.children[names[-1]]
+            for child_name, child in existing.children.items():
+                target.children[f'{names[-1]}{separator}{child_name}'] = child
+    target.children[names[-1]] = node
+
+
+def build_object_tree(data, tensor_info) -> CheckpointNode:
+    """
+    按对象图构建检查点树，展开规则与 iter_checkpoint_tensors 一致，因此张量节点的键名可直接用于其他命令
+    tensor_info(value, key) 对张量返回头部信息，其他值返回 None
+    """
+    root = CheckpointNode('container', object_type_name(data))
+    info = tensor_info(data, 'data')
+    if info is not None:
+        root.children['data'] = CheckpointNode('tensor', 'tensor', info=info)
+        return root
+
+    visiting = {id(data)}
+
+    def fill(node: CheckpointNode, items: list, prefix: str, depth: int):
+        for name, child in items:
+            name = str(name)
+            key = f'{prefix}.{name}' if prefix else name
+            info = tensor_info(child, key)
+            grandchildren = None if info is not None else checkpoint_children(child)
+            if info is not None:
+                sub = CheckpointNode('tensor', 'tensor', info=info)
+            elif grandchildren is None:
+                sub = CheckpointNode('value', object_type_name(child), value=value_summary(child))
+            elif depth + 1 >= CHECKPOINT_MAX_DEPTH or id(child) in visiting:
+                sub = CheckpointNode('value', object_type_name(child), value='<循环引用或层级过深，未展开>')
+            else:
+                sub = CheckpointNode('container', object_type_name(child))
+                visiting.add(id(child))
+                fill(sub, grandchildren, key, depth + 1)
+                visiting.discard(id(child))
+            # 字典键中的 '.'（如 state_dict 的 'layers.0.weight'）再拆分为分组，键名不变
+            insert_tree_node(node, name, sub)
+
+    items = checkpoint_children(data)
+    if items is not None:
+        fill(root, items, '', 0)
+    else:
+        root.children['data'] = CheckpointNode('value', object_type_name(data), value=value_summary(data))
+    return root
+
+
+def build_key_tree(infos: list, root_type: str, separator: str = '.') -> CheckpointNode:
+    """没有对象图的格式（npz、safetensors、HDF5）按键名中的分隔符构建分组树"""
+    root = CheckpointNode('container', root_type)
+    for info in infos:
+        insert_tree_node(root, info['key'], CheckpointNode('tensor', 'tensor', info=info), separator)
+    return root
+
+
+def finalize_tree(node: CheckpointNode):
+    """自底向上计算每棵子树的张量数、元素数与字节数"""
+    if node.kind == 'tensor':
+        node.tensors = 1
+        node.params = node.info['size']
+        node.nbytes = node.info['nbytes']
+    elif node.children:
+        for child in node.children.values():
+            finalize_tree(child)
+            node.tensors += child.tensors
+            node.params += child.params
+            node.nbytes += child.nbytes
+
+
+def build_checkpoint_tree(file_path: str) -> CheckpointNode:
+    """
+    构建文件的检查点树，只读取元数据
+    zip 格式的 PyTorch 检查点按 data.pkl 的对象图展开（优化器状态、张量列表、嵌套模块与自定义容器都保留）；
+    旧版 PyTorch 文件只能完整加载后按键名分组；其他格式按键名分组
+    """
+    file_type = get_file_type(file_path)
+    if file_type == 'torch' and zipfile.is_zipfile(file_path):
+        def tensor_info(value, key):
+            if isinstance(value, TorchTensorMeta):
+                return make_header_info(key, value.shape, value.dtype, value.itemsize)
+            return None
+        # 对象图在打开检查点时已经解析，张量随后被选中时也不必再次解析 data.pkl
+        root = build_object_tree(open_tensor_arrays(file_path).graph, tensor_info)
+    elif file_type == 'torch':
+        root = build_key_tree(get_tensor_info(file_path), 'torch')
+    else:
+        root = build_key_tree(get_tensor_info(file_path), file_type, '/' if file_type == 'hdf5' else '.')
+    finalize_tree(root)
+    return root
+
+
+def get_checkpoint_tree(file_path: str) -> CheckpointNode:
+    """获取文件的检查点树，按文件身份缓存，文件被修改后重新构建"""
+    identity = file_identity(file_path)
+    with _checkpoint_trees_lock:
+        root = _checkpoint_trees.get(identity)
+        if root is not None:
+            _checkpoint_trees.move_to_end(identity)
+            return root
+
+    with telemetry_phase('open'):
+        root = build_checkpoint_tree(file_path)
+    with _checkpoint_trees_lock:
+        _checkpoint_trees[identity] = root
+        while len(_checkpoint_trees) > MAX_OPEN_FILES:
+            _checkpoint_trees.popitem(last=False)
+    return root
+
+
+def find_tree_node(file_path: str, path: list) -> CheckpointNode:
+    """按从根开始的各级节点名查找检查点树中的节点"""
+    node = get_checkpoint_tree(file_path)
+    for depth, name in enumerate(path):
+        if node.children is None or name not in node.children:
+            raise KeyError(f"节点不存在: {'.'.join(path[:depth + 1])}")
+        node = node.children[name]
+    return node
+
+
+def subtree_tensor_keys(file_path: str, path: list = None) -> list:
+    """检查点树中一个节点下所有张量的键名，按树中的顺序排列"""
+    keys = []
+
+    def collect(node: CheckpointNode):
+        if node.kind == 'tensor':
+            keys.append(node.info['key'])
+        elif node.children:
+            for child in node.children.values():
+                collect(child)
+
+    collect(find_tree_node(file_path, [str(name) for name in (path or [])]))
+    return keys
+
+
+def list_children(file_path: str, path: list = None, offset: int = 0, limit: int = CHILDREN_PAGE_SIZE) -> dict:
+    """
+    列出检查点树中一个节点的一页子节点
+    path 为从根开始的各级节点名；子节点只包含元数据与子树汇总，不读取任何张量数据
+    """
+    path = [str(name) for name in (path or [])]
+    node = find_tree_node(file_path, path)
+    if node.children is None:
+        raise ValueError(f"节点没有子节点: {'.'.join(path)}")
+
+    offset = max(0, int(offset))
+    page = itertools.islice(node.children.items(), offset, offset + max(1, int(limit)))
+    return {
+        'file': file_path,
+        'path': path,
+        'node': node.describe(),
+        'offset': offset,
+        'total': len(node.children),
+        'children': [{'name': name, **child.describe()} for name, child in page]
+    }
+
+
+def describe_tensor(file_path: str, key: str) -> dict:
+    """单个张量的信息、统计与预览（与 load 返回的张量项相同），按需计算并写入统计缓存"""
+    np = load_numpy()
+    arrays = open_tensor_arrays(file_path)
+    if key not in arrays:
+        raise KeyError(f'张量不存在: {key}')
+    cache = get_stats_cache()
+    item = cache.get(file_path, key, 'item')
+    if item is None:
+        item = summarize_tensors(file_path, arrays, [key], np)[key]
+        cache.put(file_path, key, 'item', item)
+    return item
+
+
+# ========== 请求上下文（进度与取消） ==========
+
+class RequestCancelled(Exception):
+    """请求已被客户端取消"""
+
+
+class RequestContext:
+    """
+    常驻模式下单个请求的上下文：向客户端发送进度消息，并记录客户端发来的取消请求
+    命令行模式下没有上下文，进度汇报与取消检查都是空操作
+    """
+
+    # 进度消息的最小间隔（秒），避免频繁写 stdout
+    PROGRESS_INTERVAL = 0.2
+
+    def __init__(self, request_id, send):
+        self.request_id = request_id
+        self.cancelled = threading.Event()
+        self._send = send
+        self._last_report = 0.0
+
+    def report(self, done: int, total: int):
+        now = time.monotonic()
+        if now - self._last_report < self.PROGRESS_INTERVAL and done < total:
+            return
+        self._last_report = now
+        self._send({'id': self.request_id, 'progress': {'done': int(done), 'total': int(total)}})
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise RequestCancelled('请求已取消')
+
+
+_request_local = threading.local()
+
+
+def current_request():
+    """当前线程正在处理的请求上下文"""
+    return getattr(_request_local, 'context', None)
+
+
+def report_progress(done: int, total: int):
+    """汇报当前请求的进度"""
+    context = current_request()
+    if context is not None:
+        context.report(done, total)
+
+
+def check_cancelled():
+    """当前请求已被取消时抛出 RequestCancelled，供长时间运行的命令在块之间调用"""
+    context = current_request()
+    if context is not None:
+        context.check()
+
+
+def current_telemetry():
+    """当前线程正在处理的请求的遥测；没有时返回 None"""
+    return getattr(_request_local, 'telemetry', None)
+
+
+def bind_request(fn):
+    """包装在线程池中执行的函数，使工作线程继承当前请求的上下文（取消检查）与遥测"""
+    context = current_request()
+    telemetry = current_telemetry()
+
+    def run(*args, **kwargs):
+        _request_local.context = context
+        _request_local.telemetry = telemetry
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _request_local.context = None
+            _request_local.telemetry = None
+    return run
+
+
+# ========== 性能遥测 ==========
+
+# 进程级计数器（读取字节、峰值内存）每次阶段切换都采样，超过 TELEMETRY_EAGER_SAMPLES 次后
+# 两次采样至少间隔 TELEMETRY_SAMPLE_INTERVAL 秒，限制逐张量频繁切换阶段时的采样开销
+TELEMETRY_EAGER_SAMPLES = 64
+TELEMETRY_SAMPLE_INTERVAL = 0.002
+
+TELEMETRY_PHASES = ('import', 'open', 'read', 'compute', 'serialize')
+
+
+class ProcessProbe:
+    """
+    读取进程级的资源计数：read 系统调用读取的字节数（/proc/self/io 的 rchar）与峰值常驻内存
+    Linux 下峰值取 VmHWM，并可通过 /proc/self/clear_refs 重置；其他平台只有进程生命周期内的峰值
+    """
+
+    def __init__(self):
+        self._io = self._open('/proc/self/io', os.O_RDONLY)
+        self._status = self._open('/proc/self/status', os.O_RDONLY)
+        self._clear_refs = self._open('/proc/self/clear_refs', os.O_WRONLY)
+        # 读取 /proc 本身也计入 rchar，累计后扣除
+        self._own_bytes = 0
+
+    @staticmethod
+    def _open(path: str, flags: int):
+        try:
+            return os.open(path, flags)
+        except (OSError, AttributeError):
+            return None
+
+    def bytes_read(self):
+        if self._io is None:
+            return None
+        try:
+            data = os.pread(self._io, 1024, 0)
+        except OSError:
+            return None
+        match = re.search(rb'^rchar:\s*(\d+)', data, re.M)
+        value = int(match.group(1)) - self._own_bytes if match else None
+        self._own_bytes += len(data)
+        return value
+
+    def peak_rss(self):
+        if self._status is not None:
+            try:
+                data = os.pread(self._status, 8192, 0)
+                self._own_bytes += len(data)
+                match = re.search(rb'^VmHWM:\s*(\d+)\s*kB', data, re.M)
+                if match:
+                    return int(match.group(1)) * 1024
+            except OSError:
+                pass
+        try:
+            import resource
+        except ImportError:
+            return None
+        # macOS 上 ru_maxrss 单位为字节，Linux 上为 KB
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    def reset_peak(self) -> bool:
+        """把峰值内存重置为当前值，成功时此后读到的峰值只属于重置之后"""
+        if self._clear_refs is None:
+            return False
+        try:
+            os.write(self._clear_refs, b'5')
+            return True
+        except OSError:
+            return False
+
+
+_process_probe = None
+_telemetry_lock = threading.Lock()
+_telemetry_active = 0
+
+
+def get_process_probe() -> ProcessProbe:
+    global _process_probe
+    with _telemetry_lock:
+        if _process_probe is None:
+            _process_probe = ProcessProbe()
+        return _process_probe
+
+
+class Telemetry:
+    """
+    单个请求的分阶段耗时、读取字节数与峰值内存
+    阶段：import（首次导入依赖）、open（打开文件、解析头部）、read（读取、解压张量数据）、
+    compute（其余处理，包括内存映射数据在访问时的缺页读取）、serialize（序列化响应）。
+    每个线程维护阶段栈，进入子阶段时父阶段暂停计时，因此各阶段记录的是独占时间；
+    线程池中的阶段同样计时，并行时各阶段之和可能超过总耗时。
+    读取字节与峰值内存是进程级计数器，只在请求所在线程切换阶段时采样（频繁切换时限流），增量计入刚结束的阶段；
+    峰值内存只在没有其他请求并发时按阶段重置，否则 peakRssScope 为 'process'（包含并发请求与之前的峰值）。
+    """
+
+    def __init__(self):
+        global _telemetry_active
+        self._probe = get_process_probe()
+        self._lock = threading.Lock()
+        self._owner = threading.get_ident()
+        self._phases = {}
+        self._result = None
+        with _telemetry_lock:
+            _telemetry_active += 1
+            exclusive = _telemetry_active == 1
+        self._peak_per_phase = exclusive and self._probe.reset_peak()
+        self.start = time.perf_counter()
+        self._sample_time = self.start
+        self._samples = 0
+        self._sample_bytes = self._probe.bytes_read()
+        # 线程 -> [阶段栈, 上次计时点]；请求线程的栈底是 compute
+        self._stacks = {self._owner: [['compute'], self.start]}
+
+    def _entry(self, name: str) -> dict:
+        return self._phases.setdefault(name, {'seconds': 0.0, 'bytesRead': 0, 'peakRssBytes': None})
+
+    def _switch(self, push: str = None):
+        """切换阶段：把上次计时点以来的时间计入栈顶阶段，然后压入 push 或弹出栈顶"""
+        now = time.perf_counter()
+        ident = threading.get_ident()
+        with self._lock:
+            state = self._stacks.setdefault(ident, [[], now])
+            stack = state[0]
+            left = stack[-1] if stack else None
+            if left is not None:
+                self._entry(left)['seconds'] += now - state[1]
+            if push is not None:
+                stack.append(push)
+            elif stack:
+                stack.pop()
+            state[1] = now
+            if ident == self._owner and left is not None and (
+                    self._samples < TELEMETRY_EAGER_SAMPLES or now - self._sample_time >= TELEMETRY_SAMPLE_INTERVAL):
+                self._sample(left, now)
+
+    def _sample(self, name: str, now: float):
+        """采样进程级计数器，增量计入 name 阶段（调用方持有锁）"""
+        entry = self._entry(name)
+        read = self._probe.bytes_read()
+        if read is not None and self._sample_bytes is not None:
+            entry['bytesRead'] += read - self._sample_bytes
+        self._sample_bytes = read
+        if self._peak_per_phase and _telemetry_active == 1:
+            peak = self._probe.peak_rss()
+            if peak is not None:
+                entry['peakRssBytes'] = max(entry['peakRssBytes'] or 0, peak)
+            self._probe.reset_peak()
+        self._sample_time = now
+        self._samples += 1
+
+    def enter(self, name: str):
+        self._switch(push=name)
+
+    def exit(self):
+        self._switch()
+
+    def finish(self) -> dict:
+        """结束计时并返回可序列化的结果（毫秒、字节）；重复调用返回同一结果"""
+        global _telemetry_active
+        with self._lock:
+            if self._result is not None:
+                return self._result
+            now = time.perf_counter()
+            state = self._stacks[self._owner]
+            name = state[0][-1] if state[0] else 'compute'
+            self._entry(name)['seconds'] += now - state[1]
+            state[1] = now
+            self._sample(name, now)
+            peak_scope = 'request' if self._peak_per_phase and _telemetry_active == 1 else 'process'
+            with _telemetry_lock:
+                _telemetry_active -= 1
+
+            phases = {}
+            for phase in sorted(self._phases, key=lambda p: TELEMETRY_PHASES.index(p) if p in TELEMETRY_PHASES else len(TELEMETRY_PHASES)):
+                entry = self._phases[phase]
+                item = {'ms': round(entry['seconds'] * 1000, 3)}
+                if self._sample_bytes is not None:
+                    item['bytesRead'] = entry['bytesRead']
+                if entry['peakRssBytes'] is not None:
+                    item['peakRssBytes'] = entry['peakRssBytes']
+                phases[phase] = item
+
+            result = {'totalMs': round((now - self.start) * 1000, 3), 'phases': phases}
+            if self._sample_bytes is not None:
+                result['bytesRead'] = sum(item['bytesRead'] for item in phases.values())
+            peaks = [item['peakRssBytes'] for item in phases.values() if 'peakRssBytes' in item]
+            peak = max(peaks) if peak_scope == 'request' and peaks else self._probe.peak_rss()
+            if peak is not None:
+                result['peakRssBytes'] = peak
+                result['peakRssScope'] = peak_scope
+            self._result = result
+            return result
+
+
+@contextlib.contextmanager
+def telemetry_phase(name: str):
+    """把代码块计入当前请求的遥测阶段；没有遥测时不做任何事"""
+    telemetry = current_telemetry()
+    if telemetry is None:
+        yield
+        return
+    telemetry.enter(name)
+    try:
+        yield
+    finally:
+        telemetry.exit()
+
+
+def dispatch(command: str, args: dict):
+    """按命令名分发请求"""
+    if command == 'load':
+        return load_tensor_file(args['file'])
+    elif command == 'search':
+        return search_tensor(
+            args['file'], 
+            args['query'],
+            args.get('regex', False),
+            args.get('caseSensitive', False),
+            args.get('tolerance', DEFAULT_TOLERANCE),
+            args.get('maxResults', 100),
+            args.get('countAll', False)
+        )
+    elif command == 'filter':
+        return filter_tensor(
+            args['file'],
+            args.get('key'),
+            args.get('shape'),
+            args.get('dtype')
+        )
+    elif command == 'plot':
+        return prepare_plot_data(
+            args['file'],
+            args['type'],
+            args['keys'],
+            args.get('options', {})
+        )
+    elif command == 'export':
+        return export_data(
+            args['file'],
+            args['key'],
+            args['format'],
+            args['output']
+        )
+    elif command == 'info':
+        return get_tensor_info(args['file'])
+    elif command == 'diff':
+        return diff_files(
+            args['fileA'],
+            args['fileB'],
+            args.get('keys'),
+            args.get('rtol', DIFF_RTOL),
+            args.get('atol', DIFF_ATOL),
+            args.get('equalNan', True),
+            args.get('maxIndices', DIFF_MAX_INDICES)
+        )
+    elif command == 'children':
+        return list_children(
+            args['file'],
+            args.get('path'),
+            args.get('offset', 0),
+            args.get('limit', CHILDREN_PAGE_SIZE)
+        )
+    elif command == 'describe':
+        return describe_tensor(args['file'], args['key'])
+    elif command == 'indexHeaders':
+        return index_headers(args['files'])
+    elif command == 'slice':
+        return get_slice(args['file'], args['key'], args['slice'], args.get('offset', 0))
+    elif command == 'save':
+        return save_edits(args['file'], args['key'], args['changes'], args.get('index'))
+    elif command == 'window':
+        return get_window(
+            args['file'],
+            args.get('key'),
+            args.get('rowStart', 0),
+            args.get('rowCount', 64),
+            args.get('colStart', 0),
+            args.get('colCount', 32),
+            args.get('index')
+        )
+    elif command == 'histogram':
+        options = {
+            'bins': args.get('bins', DEFAULT_BINS),
+            'scale': args.get('scale', 'linear'),
+            'slice_spec': args.get('slice'),
+            'axis': args.get('axis'),
+            'value_range': args.get('range')
+        }
+        if 'path' in args:
+            # 检查点树中一个节点下的每个张量（如一层的全部权重）分别统计
+            return compute_histograms(args['file'], subtree_tensor_keys(args['file'], args['path']), **options)
+        if 'keys' in args:
+            return compute_histograms(args['file'], args['keys'], **options)
+        return compute_histogram(args['file'], args.get('key'), **options)
+    elif command == 'ping':
+        return {'pong': True, 'pid': os.getpid()}
+    else:
+        return {'error': f'未知命令: {command}'}
+
+
+def serve(max_workers: int = 4):
+    """
+    常驻服务模式
+    从 stdin 逐行读取 JSON 请求 {"id", "command", "args"}，
+    向 stdout 逐行写出 JSON 响应 {"id", "result"} 或 {"id", "error"}，均附带本次请求的 telemetry。
+    请求在线程池中执行，因此多个请求可以并发处理，响应顺序不保证与请求一致。
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    # stdout 专用于协议帧，其他库的 print 输出重定向到 stderr
+    sys.stdout.flush()
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    write_lock = threading.Lock()
+
+    # 二进制载荷直接写入底层字节流
+    out_bytes = out.buffer
+
+    def respond(message: dict):
+        line = json.dumps(message, ensure_ascii=False)
+        with write_lock:
+            out_bytes.write(line.encode('utf-8') + b'\n')
+            out_bytes.flush()
+
+    contexts = {}
+    contexts_lock = threading.Lock()
+
+    def handle(context: RequestContext, command: str, args: dict):
+        request_id = context.request_id
+        telemetry = Telemetry()
+        _request_local.context = context
+        _request_local.telemetry = telemetry
+        try:
+            # 排队期间已被取消的请求直接回复，不开始执行（多数命令不会在执行中检查取消）
+            check_cancelled()
+            line, buffers = encode_response(request_id, dispatch(command, args))
+        except RequestCancelled as e:
+            respond({'id': request_id, 'error': str(e), 'cancelled': True, 'telemetry': telemetry.finish()})
+            return
+        except Exception as e:
+            respond({'id': request_id, 'error': str(e), 'telemetry': telemetry.finish()})
+            return
+        finally:
+            _request_local.context = None
+            _request_local.telemetry = None
+            with contexts_lock:
+                contexts.pop(request_id, None)
+        with write_lock:
+            out_bytes.write(line.encode('utf-8') + b'\n')
+            for buffer in buffers:
+                out_bytes.write(buffer)
+            out_bytes.flush()
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    respond({'id': None, 'ready': True, 'pid': os.getpid()})
+
+    try:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                respond({'id': None, 'error': f'请求解析失败: {str(e)}'})
+                continue
+
+            request_id = request.get('id')
+            command = request.get('command')
+            if command == 'shutdown':
+                break
+            if command == 'cancel':
+                # 取消请求直接在读取线程处理，不进入线程池排队
+                with contexts_lock:
+                    context = contexts.get((request.get('args') or {}).get('id'))
+                if context is not None:
+                    context.cancelled.set()
+                continue
+            context = RequestContext(request_id, respond)
+            with contexts_lock:
+                contexts[request_id] = context
+            executor.submit(handle, context, command, request.get('args') or {})
+    finally:
+        executor.shutdown(wait=True)
+
+
 def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == '--server':
+        workers = int(sys.argv[2]) if len(sys.argv) >= 3 else 4
+        serve(max(1, workers))
+        return
+
     if len(sys.argv) < 3:
         print(json.dumps({'error': '参数不足'}))
         sys.exit(1)
@@ -588,46 +4846,8 @@ def main():
     args = json.loads(sys.argv[2])
     
     try:
-        if command == 'load':
-            result = load_tensor_file(args['file'])
-        elif command == 'search':
-            result = search_tensor(
-                args['file'], 
-                args['query'],
-                args.get('regex', False),
-                args.get('caseSensitive', False)
-            )
-        elif command == 'filter':
-            result = filter_tensor(
-                args['file'],
-                args.get('key'),
-                args.get('shape'),
-                args.get('dtype')
-            )
-        elif command == 'plot':
-            result = prepare_plot_data(
-                args['file'],
-                args['type'],
-                args['keys'],
-                args.get('options', {})
-            )
-        elif command == 'export':
-            result = export_data(
-                args['file'],
-                args['key'],
-                args['format'],
-                args['output']
-            )
-        elif command == 'info':
-            result = get_tensor_info(args['file'])
-        elif command == 'slice':
-            result = get_slice(args['file'], args['key'], args['slice'])
-        elif command == 'save':
-            result = save_edits(args['file'], args['key'], args['changes'])
-        else:
-            result = {'error': f'未知命令: {command}'}
-        
-        print(json.dumps(result, ensure_ascii=False))
+        result = dispatch(command, args)
+        print(json.dumps(result, ensure_ascii=False, default=json_default))
     
     except Exception as e:
         print(json.dumps({'error': str(e)}, ensure_ascii=False))
@@ -4,7 +4,9 @@
 import * as vscode from 'vscode';
 import * as path from 'path';
 import * as fs from 'fs';
+import * as crypto from 'crypto';
 import { ArchiveService } from '../services/archiveService';
+import { canStreamFromArchive, toArchiveMemberPath } from '../utils';
 
 export class ArchiveCommands {
     private archiveService: ArchiveService;
@@ -175,7 +177,7 @@ export class ArchiveCommands {
         // 如果指定了entryPath，检查是否是张量文件
         if (entryPath) {
             const fileExt = path.extname(entryPath).toLowerCase();
-            if (['.npy', '.npz', '.pt', '.pth'].includes(fileExt)) {
+            if (['.npy', '.npz', '.pt', '.pth', '.safetensors', '.h5', '.hdf5'].includes(fileExt)) {
                 // 预览张量文件（只读模式）
                 await this.previewTensorInArchive(uri.fsPath, entryPath);
                 return;
@@ -192,35 +194,55 @@ export class ArchiveCommands {
 
     /**
      * 预览压缩包内的张量文件（只读）
+     * zip/tar 中的 .npy/.npz 由 Python 端直接从压缩包读取：未压缩成员按偏移内存映射，压缩成员流式解压；
+     * 其他格式（以及 7z/rar）先把单个成员解压到插件存储目录再打开
      */
     private async previewTensorInArchive(archivePath: string, entryPath: string) {
         try {
-            // 显示加载提示
-            await vscode.window.withProgress({
-                location: vscode.ProgressLocation.Notification,
-                title: `正在预览: ${path.basename(entryPath)}`,
-                cancellable: false
-            }, async () => {
-                // 读取文件内容
-                const preview = await this.archiveService.readFileContent(archivePath, entryPath);
-                
-                // 创建虚拟文档URI
-                const virtualUri = vscode.Uri.parse(
-                    `tensorlens-archive://${Buffer.from(archivePath).toString('base64')}/${entryPath}?readonly=true`
-                );
-                
-                // 在自定义编辑器中打开
-                await vscode.commands.executeCommand(
-                    'vscode.openWith',
-                    virtualUri,
-                    'tensorLens.tensorEditor'
-                );
-            });
+            const tensorPath = canStreamFromArchive(archivePath, entryPath)
+                ? toArchiveMemberPath(archivePath, entryPath)
+                : await vscode.window.withProgress({
+                    location: vscode.ProgressLocation.Notification,
+                    title: `正在解压: ${path.basename(entryPath)}`,
+                    cancellable: false
+                }, () => this.extractForPreview(archivePath, entryPath));
+
+            // 在自定义编辑器中打开，成员路径原样传给 Python 端
+            await vscode.commands.executeCommand(
+                'vscode.openWith',
+                vscode.Uri.file(tensorPath),
+                'tensorLens.tensorEditor'
+            );
         } catch (error) {
             vscode.window.showErrorMessage(`预览失败: ${error}`);
         }
     }
 
+    /**
+     * 把单个成员解压到插件存储目录下的预览目录；同一成员在压缩包未修改时复用上次解压的文件
+     */
+    private async extractForPreview(archivePath: string, entryPath: string): Promise<string> {
+        const id = crypto.createHash('sha1').update(`${archivePath}\u0000${entryPath}`).digest('hex').substring(0, 16);
+        const targetDir = path.join(this.context.globalStorageUri.fsPath, 'archive-preview', id);
+        const candidates = [path.join(targetDir, entryPath), path.join(targetDir, path.basename(entryPath))];
+
+        const archiveMtime = fs.statSync(archivePath).mtimeMs;
+        const cached = candidates.find(p => fs.existsSync(p) && fs.statSync(p).mtimeMs >= archiveMtime);
+        if (cached) {
+            return cached;
+        }
+
+        fs.rmSync(targetDir, { recursive: true, force: true });
+        fs.mkdirSync(targetDir, { recursive: true });
+        await this.archiveService.extractSingle(archivePath, entryPath, targetDir);
+        // zip 只解压出文件本身，7z 保留成员的目录结构
+        const extracted = candidates.find(p => fs.existsSync(p));
+        if (!extracted) {
+            throw new Error(`解压后未找到文件: ${entryPath}`);
+        }
+        return extracted;
+    }
+
     /**
      * 解压单个文件到指定目录
      */
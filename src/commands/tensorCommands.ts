@@ -16,7 +16,7 @@ export class TensorCommands {
                 canSelectFolders: false,
                 canSelectMany: false,
                 filters: {
-                    'Tensor': ['npy', 'npz', 'pt', 'pth']
+                    'Tensor': ['npy', 'npz', 'pt', 'pth', 'safetensors', 'json', 'h5', 'hdf5']
                 }
             });
 
@@ -5,6 +5,9 @@ import * as vscode from 'vscode';
 import { ArchiveService } from '../services/archiveService';
 import { WebviewManager } from '../webview/webviewManager';
 
+const DIRECTORY_PAGE_SIZE = 500;    // 目录树每页加载的子项数
+const SEARCH_RESULT_LIMIT = 1000;   // 搜索最多返回的条数
+
 export class ArchiveEditorProvider implements vscode.CustomReadonlyEditorProvider<ArchiveDocument> {
     public static readonly viewType = 'tensorLens.archiveEditor';
 
@@ -67,13 +70,17 @@ export class ArchiveEditorProvider implements vscode.CustomReadonlyEditorProvide
         );
     }
 
+    /**
+     * 加载压缩包概况与根目录的第一页；大型压缩包的目录树在展开时按页加载
+     */
     private async loadArchiveEntries(uri: vscode.Uri, webview: vscode.Webview) {
         try {
-            const entries = await this.archiveService.listEntries(uri.fsPath);
+            const summary = await this.archiveService.getSummary(uri.fsPath);
             webview.postMessage({
-                type: 'archiveEntries',
-                data: entries
+                type: 'archiveSummary',
+                data: summary
             });
+            await this.handleListDirectory(uri, '', 0, webview);
         } catch (error) {
             webview.postMessage({
                 type: 'error',
@@ -82,6 +89,21 @@ export class ArchiveEditorProvider implements vscode.CustomReadonlyEditorProvide
         }
     }
 
+    private async handleListDirectory(uri: vscode.Uri, dirPath: string, offset: number, webview: vscode.Webview) {
+        try {
+            const page = await this.archiveService.listDirectory(uri.fsPath, dirPath, offset, DIRECTORY_PAGE_SIZE);
+            webview.postMessage({
+                type: 'directoryPage',
+                data: page
+            });
+        } catch (error) {
+            webview.postMessage({
+                type: 'error',
+                message: `加载目录失败: ${error}`
+            });
+        }
+    }
+
     private async handleMessage(
         message: { command: string; [key: string]: unknown },
         uri: vscode.Uri,
@@ -97,6 +119,9 @@ export class ArchiveEditorProvider implements vscode.CustomReadonlyEditorProvide
             case 'previewFile':
                 await this.handlePreviewFile(uri, message.entryPath as string, webview);
                 break;
+            case 'listDirectory':
+                await this.handleListDirectory(uri, message.path as string, (message.offset as number) || 0, webview);
+                break;
             case 'search':
                 await this.handleSearch(message.query as string, uri, webview);
                 break;
@@ -162,7 +187,7 @@ export class ArchiveEditorProvider implements vscode.CustomReadonlyEditorProvide
             const fileExt = require('path').extname(entryPath).toLowerCase();
             
             // 如果是张量文件，调用命令打开预览
-            if (['.npy', '.npz', '.pt', '.pth'].includes(fileExt)) {
+            if (['.npy', '.npz', '.pt', '.pth', '.safetensors', '.h5', '.hdf5'].includes(fileExt)) {
                 await vscode.commands.executeCommand(
                     'tensorLens.previewArchive',
                     uri,
@@ -188,13 +213,11 @@ export class ArchiveEditorProvider implements vscode.CustomReadonlyEditorProvide
 
     private async handleSearch(query: string, uri: vscode.Uri, webview: vscode.Webview) {
         try {
-            const entries = await this.archiveService.listEntries(uri.fsPath);
-            const filtered = entries.filter(e =>
-                e.name.toLowerCase().includes(query.toLowerCase())
-            );
+            const result = await this.archiveService.search(uri.fsPath, query, SEARCH_RESULT_LIMIT);
             webview.postMessage({
                 type: 'searchResults',
-                data: filtered
+                data: result.entries,
+                total: result.total
             });
         } catch (error) {
             webview.postMessage({
@@ -3,14 +3,19 @@
  */
 import * as vscode from 'vscode';
 import { TensorService } from '../services/tensorService';
+import { RequestPriority, ScheduleOptions } from '../services/requestScheduler';
 import { WebviewManager } from '../webview/webviewManager';
 import { DependencyChecker } from '../services/dependencyChecker';
+import { SearchOptions, HistogramOptions } from '../types';
 
 export class TensorEditorProvider implements vscode.CustomReadonlyEditorProvider<TensorDocument> {
     public static readonly viewType = 'tensorLens.tensorEditor';
 
     private tensorService: TensorService;
     private webviewManager: WebviewManager;
+    private nextEditorId = 1;
+    private owners = new WeakMap<vscode.WebviewPanel, string>();  // 编辑器发出的请求归属，关闭时一起取消
+    private grids = new WeakMap<vscode.WebviewPanel, string>();   // 编辑器当前数据块所属的张量与切片
 
     constructor(private readonly context: vscode.ExtensionContext) {
         this.tensorService = new TensorService(context);
@@ -55,20 +60,42 @@ export class TensorEditorProvider implements vscode.CustomReadonlyEditorProvider
             document.uri.fsPath
         );
 
+        const owner = `tensorEditor:${this.nextEditorId++}`;
+        this.owners.set(webviewPanel, owner);
+        webviewPanel.onDidDispose(() => this.tensorService.cancelRequests(owner));
+
         // 加载张量数据
-        this.loadTensorData(document.uri, webviewPanel.webview);
+        this.loadTensorData(document.uri, webviewPanel);
 
         // 处理webview消息
         webviewPanel.webview.onDidReceiveMessage(
             async (message) => {
-                await this.handleMessage(message, document.uri, webviewPanel.webview);
+                await this.handleMessage(message, document.uri, webviewPanel);
             },
             undefined,
             this.context.subscriptions
         );
     }
 
-    private async loadTensorData(uri: vscode.Uri, webview: vscode.Webview) {
+    /**
+     * 编辑器请求的调度选项：同一槽位上的新请求取代旧请求，隐藏的编辑器降为后台优先级
+     */
+    private schedule(
+        panel: vscode.WebviewPanel,
+        slot: string | undefined,
+        priority: RequestPriority,
+        supersede: boolean = true
+    ): ScheduleOptions {
+        return {
+            owner: this.owners.get(panel),
+            slot,
+            supersede,
+            priority: panel.visible ? priority : 'background'
+        };
+    }
+
+    private async loadTensorData(uri: vscode.Uri, panel: vscode.WebviewPanel) {
+        const webview = panel.webview;
         try {
             // 先发送依赖状态
             const checker = DependencyChecker.getInstance();
@@ -80,9 +107,13 @@ export class TensorEditorProvider implements vscode.CustomReadonlyEditorProvider
                 });
             }
             
-            const data = await this.tensorService.loadTensor(uri.fsPath);
+            // 只列出检查点树的根节点，子节点在展开时再请求，张量的统计与预览在选中时才计算
+            const data = await this.tensorService.listChildren(uri.fsPath, [], 0, undefined, this.schedule(panel, undefined, 'visible'));
+            if (!data) {
+                return;
+            }
             webview.postMessage({
-                type: 'tensorData',
+                type: 'treeData',
                 data: data
             });
         } catch (error) {
@@ -96,14 +127,15 @@ export class TensorEditorProvider implements vscode.CustomReadonlyEditorProvider
     private async handleMessage(
         message: { command: string; [key: string]: unknown },
         uri: vscode.Uri,
-        webview: vscode.Webview
+        panel: vscode.WebviewPanel
     ) {
+        const webview = panel.webview;
         switch (message.command) {
             case 'search':
-                await this.handleSearch(message.query as string, message.options as { regex: boolean; caseSensitive: boolean }, uri, webview);
+                await this.handleSearch(message.query as string, message.options as SearchOptions, uri, panel);
                 break;
             case 'filter':
-                await this.handleFilter(message.filter as { key?: string; shape?: number[]; dtype?: string }, uri, webview);
+                await this.handleFilter(message.filter as { key?: string; shape?: number[]; dtype?: string }, uri, panel);
                 break;
             case 'plot':
                 // 从message.key和message.params获取参数
@@ -114,33 +146,107 @@ export class TensorEditorProvider implements vscode.CustomReadonlyEditorProvider
                         options: message.params as Record<string, unknown> || {}
                     },
                     uri,
-                    webview
+                    panel
                 );
                 break;
             case 'refresh':
-                await this.loadTensorData(uri, webview);
+                // 刷新时丢弃缓存结果，重新从文件读取
+                this.tensorService.invalidate(uri.fsPath);
+                await this.loadTensorData(uri, panel);
                 break;
             case 'export':
                 await this.handleExport(message.format as string, message.key as string, uri);
                 break;
             case 'saveEdits':
-                await this.handleSaveEdits(message.key as string, message.changes as Array<{ row: number; col: number; value: string }>, uri, webview);
+                await this.handleSaveEdits(
+                    message.key as string,
+                    message.changes as Array<{ row: number; col: number; value: string }>,
+                    message.index as number[] | undefined,
+                    uri,
+                    webview
+                );
+                break;
+            case 'window':
+                await this.handleWindow(message, uri, panel);
                 break;
             case 'slice':
-                await this.handleSlice(message.key as string, message.slice as string, uri, webview);
+                await this.handleSlice(message.key as string, message.slice as string, (message.offset as number) || 0, uri, panel);
                 break;
+            case 'compare':
+                await this.handleCompare(uri, webview);
+                break;
+            case 'children':
+                await this.handleChildren(message.path as string[], (message.offset as number) || 0, uri, panel);
+                break;
+            case 'describe':
+                await this.handleDescribe(message.key as string, uri, panel);
+                break;
+            case 'layerHistograms':
+                await this.handleLayerHistograms(message.path as string[], message.options as HistogramOptions || {}, uri, panel);
+                break;
+        }
+    }
+
+    private async handleChildren(nodePath: string[], offset: number, uri: vscode.Uri, panel: vscode.WebviewPanel) {
+        const webview = panel.webview;
+        try {
+            // 展开不同节点互不取代，只在编辑器关闭时取消
+            const data = await this.tensorService.listChildren(uri.fsPath, nodePath, offset, undefined, this.schedule(panel, undefined, 'visible'));
+            if (data) {
+                webview.postMessage({ type: 'treeData', data });
+            }
+        } catch (error) {
+            webview.postMessage({
+                type: 'treeError',
+                path: nodePath,
+                message: `展开失败: ${error instanceof Error ? error.message : error}`
+            });
+        }
+    }
+
+    private async handleDescribe(key: string, uri: vscode.Uri, panel: vscode.WebviewPanel) {
+        const webview = panel.webview;
+        try {
+            // 快速切换选中的张量时，只计算最后选中的那个
+            const data = await this.tensorService.describeTensor(uri.fsPath, key, this.schedule(panel, 'describe', 'visible'));
+            if (data) {
+                webview.postMessage({ type: 'tensorItem', data });
+            }
+        } catch (error) {
+            webview.postMessage({
+                type: 'error',
+                message: `读取张量失败: ${error instanceof Error ? error.message : error}`
+            });
+        }
+    }
+
+    private async handleLayerHistograms(nodePath: string[], options: HistogramOptions, uri: vscode.Uri, panel: vscode.WebviewPanel) {
+        const webview = panel.webview;
+        try {
+            // 与绘图共用槽位：新的绘图或分布请求取代尚未完成的旧请求
+            const data = await this.tensorService.getHistograms(uri.fsPath, nodePath, options, this.schedule(panel, 'plot', 'normal'));
+            if (isCancelled(data)) {
+                return;
+            }
+            webview.postMessage({ type: 'layerHistograms', path: nodePath, data });
+        } catch (error) {
+            webview.postMessage({
+                type: 'error',
+                message: `统计分布失败: ${error instanceof Error ? error.message : error}`
+            });
         }
     }
 
     private async handleSaveEdits(
         key: string,
         changes: Array<{ row: number; col: number; value: string }>,
+        index: number[] | undefined,
         uri: vscode.Uri,
         webview: vscode.Webview
     ) {
         try {
             // 调用 tensorService 保存修改
-            const result = await this.tensorService.saveEdits(uri.fsPath, key, changes);
+            const result = await this.tensorService.saveEdits(uri.fsPath, key, changes, index);
             
             // 检查Python脚本返回的结果
             if (result.error) {
@@ -169,27 +275,65 @@ export class TensorEditorProvider implements vscode.CustomReadonlyEditorProvider
         }
     }
 
+    private async handleWindow(
+        message: { [key: string]: unknown },
+        uri: vscode.Uri,
+        panel: vscode.WebviewPanel
+    ) {
+        const webview = panel.webview;
+        // 同一视图的数据块并行请求；切换到其他张量或切片后，旧视图未完成的数据块全部取消
+        const grid = JSON.stringify([message.key, message.index]);
+        if (this.grids.get(panel) !== grid) {
+            this.grids.set(panel, grid);
+            const owner = this.owners.get(panel);
+            if (owner) {
+                this.tensorService.cancelRequests(owner, 'window');
+            }
+        }
+        try {
+            const data = await this.tensorService.getWindow(
+                uri.fsPath,
+                message.key as string,
+                message.rowStart as number,
+                message.rowCount as number,
+                message.colStart as number,
+                message.colCount as number,
+                message.index as number[] | undefined,
+                this.schedule(panel, 'window', 'visible', false)
+            );
+            if (isCancelled(data)) {
+                return;
+            }
+            webview.postMessage({
+                type: 'windowData',
+                requestId: message.requestId,
+                data: data
+            });
+        } catch (error) {
+            const errorMsg = error instanceof Error ? error.message : String(error);
+            webview.postMessage({
+                type: 'windowData',
+                requestId: message.requestId,
+                data: { error: errorMsg }
+            });
+        }
+    }
+
     private async handleSlice(
         key: string,
         sliceStr: string,
+        offset: number,
         uri: vscode.Uri,
-        webview: vscode.Webview
+        panel: vscode.WebviewPanel
     ) {
+        const webview = panel.webview;
         try {
-            const data = await this.tensorService.getSlice(uri.fsPath, key, sliceStr);
-            
-            // 检查是否有错误
-            if (data && typeof data === 'object' && 'error' in data) {
-                webview.postMessage({
-                    type: 'sliceData',
-                    data: data  // 包含 error 字段
-                });
-            } else {
-                webview.postMessage({
-                    type: 'sliceData',
-                    data: data
-                });
+            const data = await this.tensorService.getSlice(uri.fsPath, key, sliceStr, offset, this.schedule(panel, 'slice', 'visible'));
+            if (isCancelled(data)) {
+                return;
             }
+            // 出错时 data 带 error 字段，由前端显示
+            webview.postMessage({ type: 'sliceData', data });
         } catch (error) {
             const errorMsg = error instanceof Error ? error.message : String(error);
             webview.postMessage({
@@ -201,12 +345,17 @@ export class TensorEditorProvider implements vscode.CustomReadonlyEditorProvider
 
     private async handleSearch(
         query: string,
-        options: { regex: boolean; caseSensitive: boolean },
+        options: SearchOptions,
         uri: vscode.Uri,
-        webview: vscode.Webview
+        panel: vscode.WebviewPanel
     ) {
+        const webview = panel.webview;
         try {
-            const results = await this.tensorService.search(uri.fsPath, query, options);
+            // 输入过程中的旧搜索被新搜索取代，Python 端在下一个数据块处停止扫描
+            const results = await this.tensorService.search(uri.fsPath, query, options, this.schedule(panel, 'search', 'normal'));
+            if (isCancelled(results)) {
+                return;
+            }
             webview.postMessage({
                 type: 'searchResults',
                 data: results
@@ -222,10 +371,14 @@ export class TensorEditorProvider implements vscode.CustomReadonlyEditorProvider
     private async handleFilter(
         filter: { key?: string; shape?: number[]; dtype?: string },
         uri: vscode.Uri,
-        webview: vscode.Webview
+        panel: vscode.WebviewPanel
     ) {
+        const webview = panel.webview;
         try {
-            const data = await this.tensorService.filter(uri.fsPath, filter);
+            const data = await this.tensorService.filter(uri.fsPath, filter, this.schedule(panel, 'filter', 'normal'));
+            if (isCancelled(data)) {
+                return;
+            }
             webview.postMessage({
                 type: 'filteredData',
                 data: data
@@ -241,10 +394,15 @@ export class TensorEditorProvider implements vscode.CustomReadonlyEditorProvider
     private async handlePlot(
         plotConfig: { type: string; keys: string[]; options: Record<string, unknown> },
         uri: vscode.Uri,
-        webview: vscode.Webview
+        panel: vscode.WebviewPanel
     ) {
+        const webview = panel.webview;
         try {
-            const plotData = await this.tensorService.preparePlotData(uri.fsPath, plotConfig);
+            // 连续缩放或切换图表类型时只保留最后一次绘图请求
+            const plotData = await this.tensorService.preparePlotData(uri.fsPath, plotConfig, this.schedule(panel, 'plot', 'normal'));
+            if (isCancelled(plotData)) {
+                return;
+            }
             webview.postMessage({
                 type: 'plotData',
                 data: plotData
@@ -257,16 +415,38 @@ export class TensorEditorProvider implements vscode.CustomReadonlyEditorProvider
         }
     }
 
+    private async handleCompare(uri: vscode.Uri, webview: vscode.Webview) {
+        try {
+            const result = await this.tensorService.compareWith(uri.fsPath);
+            if (result) {
+                webview.postMessage({
+                    type: 'diffResult',
+                    data: result
+                });
+            }
+        } catch (error) {
+            vscode.window.showErrorMessage(`比较失败: ${error}`);
+        }
+    }
+
     private async handleExport(format: string, key: string, uri: vscode.Uri) {
         try {
-            await this.tensorService.exportData(uri.fsPath, key, format);
-            vscode.window.showInformationMessage('导出成功！');
+            if (await this.tensorService.exportData(uri.fsPath, key, format)) {
+                vscode.window.showInformationMessage('导出成功！');
+            }
         } catch (error) {
             vscode.window.showErrorMessage(`导出失败: ${error}`);
         }
     }
 }
 
+/**
+ * 请求被取消或被新请求取代时不再回复 webview
+ */
+function isCancelled(result: unknown): boolean {
+    return !!result && typeof result === 'object' && (result as { cancelled?: boolean }).cancelled === true;
+}
+
 /**
  * 张量文档类
  */
@@ -2,12 +2,20 @@
  * 插件入口文件
  */
 import * as vscode from 'vscode';
+import * as path from 'path';
 import { TensorEditorProvider } from './editors/tensorEditor';
 import { ArchiveEditorProvider } from './editors/archiveEditor';
 import { registerCommands } from './commands';
 import { DependencyChecker } from './services/dependencyChecker';
+import { PythonWorker } from './services/pythonWorker';
+import { ArchiveIndexStore } from './services/archiveIndex';
+import { WorkspaceIndex } from './services/workspaceIndex';
+import { TensorService } from './services/tensorService';
 import { I18nManager } from './utils/i18n';
 import { SidebarViewProvider } from './views/sidebarView';
+import { DiagnosticsViewProvider } from './views/diagnosticsView';
+import { DiagnosticsLog } from './services/diagnosticsLog';
+import { RequestScheduler } from './services/requestScheduler';
 import zhCN from './locales/zh-cn/index';
 import enUS from './locales/en/index';
 
@@ -19,15 +27,50 @@ export async function activate(context: vscode.ExtensionContext) {
     i18n.registerTranslations('zh-cn', zhCN);
     i18n.registerTranslations('en', enUS);
 
+    // 压缩包索引持久化目录：再次打开未修改的压缩包时直接读取索引
+    ArchiveIndexStore.getInstance().setStorageDir(path.join(context.globalStorageUri.fsPath, 'archive-index'));
+
     // 获取工作区根目录
     const workspaceRoot = vscode.workspace.workspaceFolders?.[0]?.uri.fsPath;
 
-    // 注册自定义侧边栏 WebView
-    const sidebarProvider = new SidebarViewProvider(context.extensionUri, workspaceRoot);
+    // 后台索引工作区中的张量文件与压缩包，侧边栏直接查询索引
+    const tensorService = new TensorService(context);
+    let workspaceIndex: WorkspaceIndex | undefined;
+    if (workspaceRoot) {
+        workspaceIndex = new WorkspaceIndex(
+            workspaceRoot,
+            path.join(context.globalStorageUri.fsPath, 'workspace-index'),
+            tensorService
+        );
+        context.subscriptions.push(workspaceIndex);
+        workspaceIndex.start();
+    }
+
+    // 注册自定义侧边栏 WebView（张量文件可展开为检查点树）
+    const sidebarProvider = new SidebarViewProvider(context.extensionUri, workspaceRoot, workspaceIndex, tensorService);
     context.subscriptions.push(
         vscode.window.registerWebviewViewProvider('tensorlens-sidebar', sidebarProvider)
     );
 
+    // 注册诊断视图：最近的 Python 请求及各阶段耗时
+    const diagnostics = DiagnosticsLog.getInstance();
+    context.subscriptions.push(
+        vscode.window.registerTreeDataProvider('tensorlens-diagnostics', new DiagnosticsViewProvider(diagnostics)),
+        vscode.commands.registerCommand('tensorLens.clearDiagnostics', () => diagnostics.clear()),
+        vscode.commands.registerCommand('tensorLens.copyDiagnostics', async () => {
+            await vscode.env.clipboard.writeText(JSON.stringify(diagnostics.getEntries(), null, 2));
+            vscode.window.showInformationMessage('诊断记录已复制到剪贴板');
+        }),
+        vscode.workspace.onDidChangeConfiguration(event => {
+            if (event.affectsConfiguration('tensorLens.diagnosticsHistorySize')) {
+                diagnostics.setCapacity(vscode.workspace.getConfiguration('tensorLens').get<number>('diagnosticsHistorySize', 200));
+            }
+            if (event.affectsConfiguration('tensorLens.resultCacheMB')) {
+                RequestScheduler.getInstance().setCacheSize(vscode.workspace.getConfiguration('tensorLens').get<number>('resultCacheMB', 64));
+            }
+        })
+    );
+
     // 初始化依赖检测器
     const checker = DependencyChecker.getInstance();
 
@@ -133,5 +176,6 @@ export async function activate(context: vscode.ExtensionContext) {
 }
 
 export function deactivate() {
+    PythonWorker.disposeAll();
     console.log('TensorLens extension is now deactivated!');
 }
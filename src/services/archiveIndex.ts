@@ -0,0 +1,834 @@
+/**
+ * 压缩包索引
+ * zip 只读取中央目录，tar 顺序扫描一次文件头得到各成员的数据偏移；索引按压缩包文件身份持久化到插件存储目录，
+ * 列表、目录分页、搜索和单个成员读取都基于索引，按成员偏移定位读取，不把整个压缩包读入内存
+ */
+import * as path from 'path';
+import * as fs from 'fs';
+import * as zlib from 'zlib';
+import * as crypto from 'crypto';
+import { Readable } from 'stream';
+import { pipeline } from 'stream/promises';
+import type { ArchiveEntry, ArchiveDirectoryPage, ArchiveSummary } from '../types';
+
+const INDEX_VERSION = 1;
+const MAX_MEMORY_INDEXES = 4;    // 内存中保留的索引数
+const MAX_STORED_INDEXES = 64;   // 磁盘上保留的索引文件数，超出时删除最久未用的
+
+export type ArchiveFormat = 'zip' | 'tar' | 'tar.gz' | '7z';
+
+/**
+ * 索引的持久化形式：按列存储，数十万成员时比对象数组紧凑得多
+ */
+interface ArchiveIndexData {
+    version: number;
+    format: ArchiveFormat;
+    paths: string[];             // 成员路径（目录不带结尾的 /）
+    directories: number[];       // 1 表示目录
+    sizes: number[];
+    compressedSizes: number[];
+    mtimes: number[];            // 毫秒时间戳，0 表示未知
+    offsets: number[];           // zip: 本地文件头偏移；tar: 数据在（解压后的）tar 流中的偏移；7z: -1
+    methods: number[];           // zip 压缩方法（0 存储，8 deflate），其余为 0
+}
+
+interface DirectoryNode {
+    name: string;
+    path: string;
+    entry: number;               // 压缩包中显式存在的目录成员下标，没有时为 -1
+    dirs: Map<string, DirectoryNode>;
+    files: number[];
+    fileCount: number;           // 子树中的文件数
+    size: number;                // 子树中的文件总大小
+    sorted: boolean;
+}
+
+/**
+ * 规范化成员路径：统一为 /，去掉开头的 ./ 与 /、结尾的 /
+ */
+export function normalizeEntryPath(entryPath: string): string {
+    return entryPath.replace(/\\/g, '/').replace(/^(\.\/|\/)+/, '').replace(/\/+$/, '');
+}
+
+function compareNames(a: string, b: string): number {
+    return a < b ? -1 : a > b ? 1 : 0;
+}
+
+export class ArchiveIndex {
+    private lookup: Map<string, number> | null = null;
+    private root: DirectoryNode | null = null;
+
+    constructor(readonly archivePath: string, readonly data: ArchiveIndexData) { }
+
+    get format(): ArchiveFormat {
+        return this.data.format;
+    }
+
+    get count(): number {
+        return this.data.paths.length;
+    }
+
+    /**
+     * 成员是否可以按偏移直接读取（7z/rar 等只能交给 7z 解压）
+     */
+    get seekable(): boolean {
+        return this.data.format !== '7z';
+    }
+
+    entry(i: number): ArchiveEntry {
+        const d = this.data;
+        return {
+            name: path.posix.basename(d.paths[i]),
+            path: d.paths[i],
+            isDirectory: d.directories[i] === 1,
+            size: d.sizes[i],
+            compressedSize: d.compressedSizes[i],
+            modifiedTime: d.mtimes[i] ? new Date(d.mtimes[i]) : undefined
+        };
+    }
+
+    entries(): ArchiveEntry[] {
+        const result: ArchiveEntry[] = new Array(this.count);
+        for (let i = 0; i < this.count; i++) {
+            result[i] = this.entry(i);
+        }
+        return result;
+    }
+
+    /**
+     * 按路径查找成员下标，不存在返回 -1
+     */
+    find(entryPath: string): number {
+        if (!this.lookup) {
+            this.lookup = new Map();
+            this.data.paths.forEach((p, i) => this.lookup!.set(p, i));
+        }
+        return this.lookup.get(normalizeEntryPath(entryPath)) ?? -1;
+    }
+
+    summary(): ArchiveSummary {
+        const root = this.getRoot();
+        let dirCount = 0;
+        const countDirs = (node: DirectoryNode) => {
+            for (const child of node.dirs.values()) {
+                dirCount++;
+                countDirs(child);
+            }
+        };
+        countDirs(root);
+        let compressedSize = 0;
+        for (let i = 0; i < this.count; i++) {
+            if (this.data.directories[i] !== 1) {
+                compressedSize += this.data.compressedSizes[i];
+            }
+        }
+        return {
+            format: this.data.format,
+            fileCount: root.fileCount,
+            dirCount,
+            totalSize: root.size,
+            compressedSize
+        };
+    }
+
+    /**
+     * 分页列出目录的直接子项：子目录在前、文件在后，各自按名称排序
+     */
+    listDirectory(dirPath: string, offset: number, limit: number): ArchiveDirectoryPage {
+        const node = this.getDirectory(dirPath);
+        if (!node) {
+            throw new Error(`目录不存在: ${dirPath}`);
+        }
+        if (!node.sorted) {
+            node.dirs = new Map([...node.dirs.entries()].sort((a, b) => compareNames(a[0], b[0])));
+            node.files.sort((a, b) => compareNames(this.data.paths[a], this.data.paths[b]));
+            node.sorted = true;
+        }
+
+        const dirs = [...node.dirs.values()];
+        const total = dirs.length + node.files.length;
+        const start = Math.max(0, Math.min(offset, total));
+        const end = Math.min(total, start + limit);
+        const entries: ArchiveEntry[] = [];
+        for (let k = start; k < end; k++) {
+            entries.push(k < dirs.length ? this.directoryEntry(dirs[k]) : this.entry(node.files[k - dirs.length]));
+        }
+        return { path: node.path, entries, offset: start, total };
+    }
+
+    /**
+     * 按名称子串搜索（不区分大小写），最多返回 limit 条，total 为全部匹配数
+     */
+    search(query: string, limit: number): { entries: ArchiveEntry[]; total: number } {
+        const needle = query.toLowerCase();
+        const entries: ArchiveEntry[] = [];
+        let total = 0;
+        for (let i = 0; i < this.count; i++) {
+            if (path.posix.basename(this.data.paths[i]).toLowerCase().includes(needle)) {
+                total++;
+                if (entries.length < limit) {
+                    entries.push(this.entry(i));
+                }
+            }
+        }
+        return { entries, total };
+    }
+
+    /**
+     * 目录（含压缩包中没有显式目录成员的隐式目录）下的全部文件下标；文件路径返回其自身
+     */
+    filesUnder(entryPath: string): number[] {
+        const i = this.find(entryPath);
+        if (i >= 0 && this.data.directories[i] !== 1) {
+            return [i];
+        }
+        const node = this.getDirectory(entryPath);
+        if (!node) {
+            return [];
+        }
+        const result: number[] = [];
+        const visit = (n: DirectoryNode) => {
+            result.push(...n.files);
+            n.dirs.forEach(visit);
+        };
+        visit(node);
+        return result;
+    }
+
+    private directoryEntry(node: DirectoryNode): ArchiveEntry {
+        const mtime = node.entry >= 0 ? this.data.mtimes[node.entry] : 0;
+        return {
+            name: node.name,
+            path: node.path,
+            isDirectory: true,
+            size: node.size,
+            childCount: node.dirs.size + node.files.length,
+            modifiedTime: mtime ? new Date(mtime) : undefined
+        };
+    }
+
+    private getDirectory(dirPath: string): DirectoryNode | null {
+        let node: DirectoryNode | undefined = this.getRoot();
+        for (const part of normalizeEntryPath(dirPath).split('/').filter(p => p)) {
+            node = node.dirs.get(part);
+            if (!node) {
+                return null;
+            }
+        }
+        return node;
+    }
+
+    /**
+     * 首次访问时由成员路径建立目录树，路径中出现但没有目录成员的目录也会补全
+     */
+    private getRoot(): DirectoryNode {
+        if (this.root) {
+            return this.root;
+        }
+        const makeNode = (name: string, nodePath: string): DirectoryNode => ({
+            name, path: nodePath, entry: -1, dirs: new Map(), files: [], fileCount: 0, size: 0, sorted: false
+        });
+        const root = makeNode('', '');
+        const d = this.data;
+        for (let i = 0; i < this.count; i++) {
+            const parts = d.paths[i].split('/');
+            const isDir = d.directories[i] === 1;
+            const depth = isDir ? parts.length : parts.length - 1;
+            let node = root;
+            if (!isDir) {
+                node.fileCount++;
+                node.size += d.sizes[i];
+            }
+            for (let k = 0; k < depth; k++) {
+                let child = node.dirs.get(parts[k]);
+                if (!child) {
+                    child = makeNode(parts[k], parts.slice(0, k + 1).join('/'));
+                    node.dirs.set(parts[k], child);
+                }
+                node = child;
+                if (!isDir) {
+                    node.fileCount++;
+                    node.size += d.sizes[i];
+                }
+            }
+            if (isDir) {
+                node.entry = i;
+            } else {
+                node.files.push(i);
+            }
+        }
+        this.root = root;
+        return root;
+    }
+
+    /**
+     * 由成员列表（如 7z 的列表输出）建立索引，成员不能按偏移读取
+     */
+    static fromEntries(archivePath: string, entries: ArchiveEntry[]): ArchiveIndex {
+        const builder = new IndexBuilder('7z');
+        for (const e of entries) {
+            builder.add(e.path, e.isDirectory, e.size, e.compressedSize ?? 0,
+                e.modifiedTime ? new Date(e.modifiedTime).getTime() : 0, -1, 0);
+        }
+        return new ArchiveIndex(archivePath, builder.data);
+    }
+}
+
+class IndexBuilder {
+    readonly data: ArchiveIndexData;
+
+    constructor(format: ArchiveFormat) {
+        this.data = {
+            version: INDEX_VERSION, format,
+            paths: [], directories: [], sizes: [], compressedSizes: [], mtimes: [], offsets: [], methods: []
+        };
+    }
+
+    add(entryPath: string, isDirectory: boolean, size: number, compressedSize: number,
+        mtime: number, offset: number, method: number): void {
+        const normalized = normalizeEntryPath(entryPath);
+        if (!normalized) {
+            return;
+        }
+        const d = this.data;
+        d.paths.push(normalized);
+        d.directories.push(isDirectory ? 1 : 0);
+        d.sizes.push(size);
+        d.compressedSizes.push(compressedSize);
+        d.mtimes.push(mtime);
+        d.offsets.push(offset);
+        d.methods.push(method);
+    }
+}
+
+// ========== zip 中央目录 ==========
+
+const ZIP_EOCD_SIGNATURE = 0x06054b50;
+const ZIP64_LOCATOR_SIGNATURE = 0x07064b50;
+const ZIP64_EOCD_SIGNATURE = 0x06064b50;
+const ZIP_CD_SIGNATURE = 0x02014b50;
+const ZIP_LOCAL_SIGNATURE = 0x04034b50;
+const ZIP_MAX_COMMENT = 0xffff;
+
+async function readAt(handle: fs.promises.FileHandle, position: number, length: number): Promise<Buffer> {
+    const buffer = Buffer.alloc(length);
+    let done = 0;
+    while (done < length) {
+        const { bytesRead } = await handle.read(buffer, done, length - done, position + done);
+        if (bytesRead === 0) {
+            break;
+        }
+        done += bytesRead;
+    }
+    return buffer.subarray(0, done);
+}
+
+function dosDateTime(date: number, time: number): number {
+    if (date === 0) {
+        return 0;
+    }
+    return new Date(
+        ((date >> 9) & 0x7f) + 1980, ((date >> 5) & 0x0f) - 1, date & 0x1f,
+        (time >> 11) & 0x1f, (time >> 5) & 0x3f, (time & 0x1f) * 2
+    ).getTime();
+}
+
+/**
+ * 只读取 zip 末尾的目录结束记录与中央目录建立索引（支持 zip64）
+ */
+export async function buildZipIndex(archivePath: string): Promise<ArchiveIndex> {
+    const handle = await fs.promises.open(archivePath, 'r');
+    try {
+        const { size: fileSize } = await handle.stat();
+        const tailLength = Math.min(fileSize, 22 + ZIP_MAX_COMMENT);
+        const tailStart = fileSize - tailLength;
+        const tail = await readAt(handle, tailStart, tailLength);
+
+        let eocd = -1;
+        for (let p = tail.length - 22; p >= 0; p--) {
+            if (tail.readUInt32LE(p) === ZIP_EOCD_SIGNATURE) {
+                eocd = p;
+                break;
+            }
+        }
+        if (eocd < 0) {
+            throw new Error('不是有效的 zip 文件：找不到中央目录');
+        }
+
+        let count = tail.readUInt16LE(eocd + 10);
+        let cdSize = tail.readUInt32LE(eocd + 12);
+        let cdOffset = tail.readUInt32LE(eocd + 16);
+
+        // zip64：目录结束记录前紧邻 20 字节的定位记录，指向 zip64 目录结束记录
+        const locator = eocd - 20;
+        const locatorBuffer = locator >= 0
+            ? tail.subarray(locator, eocd)
+            : tailStart + locator >= 0 ? await readAt(handle, tailStart + locator, 20) : null;
+        if (locatorBuffer && locatorBuffer.length === 20 && locatorBuffer.readUInt32LE(0) === ZIP64_LOCATOR_SIGNATURE) {
+            const record = await readAt(handle, Number(locatorBuffer.readBigUInt64LE(8)), 56);
+            if (record.readUInt32LE(0) !== ZIP64_EOCD_SIGNATURE) {
+                throw new Error('zip64 目录结束记录损坏');
+            }
+            count = Number(record.readBigUInt64LE(32));
+            cdSize = Number(record.readBigUInt64LE(40));
+            cdOffset = Number(record.readBigUInt64LE(48));
+        }
+
+        const cd = await readAt(handle, cdOffset, cdSize);
+        const builder = new IndexBuilder('zip');
+        let p = 0;
+        for (let n = 0; n < count; n++) {
+            if (p + 46 > cd.length || cd.readUInt32LE(p) !== ZIP_CD_SIGNATURE) {
+                throw new Error('zip 中央目录损坏');
+            }
+            const flags = cd.readUInt16LE(p + 8);
+            const method = cd.readUInt16LE(p + 10);
+            const time = cd.readUInt16LE(p + 12);
+            const date = cd.readUInt16LE(p + 14);
+            let compressedSize = cd.readUInt32LE(p + 20);
+            let size = cd.readUInt32LE(p + 24);
+            const nameLength = cd.readUInt16LE(p + 28);
+            const extraLength = cd.readUInt16LE(p + 30);
+            const commentLength = cd.readUInt16LE(p + 32);
+            let localOffset = cd.readUInt32LE(p + 42);
+            // 不论是否设置 UTF-8 标志（第 11 位）都按 UTF-8 解码，与大多数压缩工具的实际行为一致
+            const name = cd.toString('utf8', p + 46, p + 46 + nameLength);
+
+            // zip64 扩展字段：按顺序只包含取值为 0xFFFFFFFF 的字段
+            let e = p + 46 + nameLength;
+            const extraEnd = e + extraLength;
+            while (e + 4 <= extraEnd) {
+                const id = cd.readUInt16LE(e);
+                const length = cd.readUInt16LE(e + 2);
+                if (id === 0x0001) {
+                    let q = e + 4;
+                    if (size === 0xffffffff) { size = Number(cd.readBigUInt64LE(q)); q += 8; }
+                    if (compressedSize === 0xffffffff) { compressedSize = Number(cd.readBigUInt64LE(q)); q += 8; }
+                    if (localOffset === 0xffffffff) { localOffset = Number(cd.readBigUInt64LE(q)); q += 8; }
+                }
+                e += 4 + length;
+            }
+
+            // 加密成员记录为特殊的压缩方法，读取时报错
+            const effectiveMethod = flags & 0x1 ? -1 : method;
+            builder.add(name, name.endsWith('/'), size, compressedSize, dosDateTime(date, time), localOffset, effectiveMethod);
+            p = extraEnd + commentLength;
+        }
+        return new ArchiveIndex(archivePath, builder.data);
+    } finally {
+        await handle.close();
+    }
+}
+
+// ========== tar 文件头扫描 ==========
+
+const TAR_BLOCK = 512;
+
+/**
+ * 顺序读取的数据源：未压缩的 tar 按位置读取并直接跳过数据区，gzip 压缩的 tar 边解压边读取
+ */
+interface TarSource {
+    position: number;
+    read(length: number): Promise<Buffer>;
+    skip(length: number): Promise<void>;
+    close(): Promise<void>;
+}
+
+class FileTarSource implements TarSource {
+    position = 0;
+
+    constructor(private readonly handle: fs.promises.FileHandle) { }
+
+    async read(length: number): Promise<Buffer> {
+        const buffer = await readAt(this.handle, this.position, length);
+        this.position += buffer.length;
+        return buffer;
+    }
+
+    async skip(length: number): Promise<void> {
+        this.position += length;
+    }
+
+    close(): Promise<void> {
+        return this.handle.close();
+    }
+}
+
+class StreamTarSource implements TarSource {
+    position = 0;
+    private pending: Buffer = Buffer.alloc(0);
+    private readonly iterator: AsyncIterator<Buffer>;
+
+    constructor(private readonly stream: Readable) {
+        this.iterator = stream[Symbol.asyncIterator]();
+    }
+
+    private async fill(): Promise<boolean> {
+        const { value, done } = await this.iterator.next();
+        if (done) {
+            return false;
+        }
+        this.pending = this.pending.length ? Buffer.concat([this.pending, value]) : value;
+        return true;
+    }
+
+    async read(length: number): Promise<Buffer> {
+        while (this.pending.length < length && await this.fill()) { }
+        const out = this.pending.subarray(0, length);
+        this.pending = this.pending.subarray(out.length);
+        this.position += out.length;
+        return out;
+    }
+
+    async skip(length: number): Promise<void> {
+        while (length > 0) {
+            if (!this.pending.length && !await this.fill()) {
+                return;
+            }
+            const count = Math.min(length, this.pending.length);
+            this.pending = this.pending.subarray(count);
+            this.position += count;
+            length -= count;
+        }
+    }
+
+    async close(): Promise<void> {
+        this.stream.destroy();
+    }
+}
+
+function tarString(block: Buffer, start: number, length: number): string {
+    const end = block.indexOf(0, start);
+    return block.toString('utf8', start, end >= 0 && end < start + length ? end : start + length);
+}
+
+function tarNumber(block: Buffer, start: number, length: number): number {
+    // GNU 扩展：最高位为 1 时其余字节为大端二进制数
+    if (block[start] & 0x80) {
+        let value = 0;
+        for (let i = start + 1; i < start + length; i++) {
+            value = value * 256 + block[i];
+        }
+        return value;
+    }
+    const text = tarString(block, start, length).trim();
+    return text ? parseInt(text, 8) : 0;
+}
+
+function tarChecksumValid(block: Buffer): boolean {
+    let sum = 0;
+    for (let i = 0; i < TAR_BLOCK; i++) {
+        sum += i >= 148 && i < 156 ? 0x20 : block[i];
+    }
+    return sum === tarNumber(block, 148, 8);
+}
+
+/**
+ * 解析 pax 扩展头（"长度 键=值\n" 序列）
+ */
+function parsePax(data: Buffer): Map<string, string> {
+    const result = new Map<string, string>();
+    let p = 0;
+    while (p < data.length) {
+        const space = data.indexOf(0x20, p);
+        if (space < 0) {
+            break;
+        }
+        const length = parseInt(data.toString('utf8', p, space), 10);
+        if (!length) {
+            break;
+        }
+        const record = data.toString('utf8', space + 1, p + length - 1);
+        const eq = record.indexOf('=');
+        if (eq > 0) {
+            result.set(record.substring(0, eq), record.substring(eq + 1));
+        }
+        p += length;
+    }
+    return result;
+}
+
+/**
+ * 扫描 tar 的全部文件头，记录每个普通文件与目录的数据偏移；支持 GNU 长文件名、pax 扩展头与 ustar 前缀
+ */
+async function scanTar(source: TarSource, archivePath: string, format: ArchiveFormat): Promise<ArchiveIndex> {
+    const builder = new IndexBuilder(format);
+    let longName: string | null = null;
+    let pax = new Map<string, string>();
+
+    try {
+        for (;;) {
+            const block = await source.read(TAR_BLOCK);
+            if (block.length < TAR_BLOCK || block.every(b => b === 0)) {
+                break;
+            }
+            if (!tarChecksumValid(block)) {
+                throw new Error(`不是有效的 tar 文件：偏移 ${source.position - TAR_BLOCK} 处的文件头校验失败`);
+            }
+
+            const type = String.fromCharCode(block[156] || 0x30);
+            const size = pax.has('size') ? Number(pax.get('size')) : tarNumber(block, 124, 12);
+            const padded = Math.ceil(size / TAR_BLOCK) * TAR_BLOCK;
+
+            if (type === 'L' || type === 'x' || type === 'g') {
+                const data = (await source.read(padded)).subarray(0, size);
+                if (type === 'L') {
+                    longName = tarString(data, 0, data.length);
+                } else if (type === 'x') {
+                    pax = parsePax(data);
+                }
+                continue;
+            }
+
+            let name = longName ?? pax.get('path') ?? '';
+            if (!name) {
+                name = tarString(block, 0, 100);
+                if (block.toString('latin1', 257, 262) === 'ustar') {
+                    const prefix = tarString(block, 345, 155);
+                    if (prefix) {
+                        name = `${prefix}/${name}`;
+                    }
+                }
+            }
+            const mtime = pax.has('mtime') ? Number(pax.get('mtime')) * 1000 : tarNumber(block, 136, 12) * 1000;
+            const dataOffset = source.position;
+            longName = null;
+            pax = new Map();
+
+            if (type === '5') {
+                builder.add(name, true, 0, 0, mtime, dataOffset, 0);
+            } else if (type === '0' || type === '7') {
+                builder.add(name, false, size, size, mtime, dataOffset, 0);
+            }
+            // 链接、设备文件等没有可读取的数据，不列出
+            await source.skip(padded);
+        }
+    } finally {
+        await source.close();
+    }
+    return new ArchiveIndex(archivePath, builder.data);
+}
+
+/**
+ * 扫描 tar 建立偏移索引；gzip 压缩的 tar 需要完整解压一遍，偏移为解压后流中的位置
+ */
+export async function buildTarIndex(archivePath: string, gzipped: boolean): Promise<ArchiveIndex> {
+    if (gzipped) {
+        const stream = fs.createReadStream(archivePath).pipe(zlib.createGunzip());
+        return scanTar(new StreamTarSource(stream), archivePath, 'tar.gz');
+    }
+    return scanTar(new FileTarSource(await fs.promises.open(archivePath, 'r')), archivePath, 'tar');
+}
+
+// ========== 按偏移读取成员 ==========
+
+/**
+ * 从数据流中截取 [start, start + length) 区间，取完后销毁源流（gzip 压缩的 tar 不必解压到文件末尾）
+ */
+async function* sliceStream(source: Readable, start: number, length: number): AsyncGenerator<Buffer> {
+    let position = 0;
+    let remaining = length;
+    try {
+        if (remaining <= 0) {
+            return;
+        }
+        for await (const chunk of source) {
+            const buffer = chunk as Buffer;
+            const begin = Math.max(0, start - position);
+            position += buffer.length;
+            if (begin >= buffer.length) {
+                continue;
+            }
+            const piece = buffer.subarray(begin, begin + remaining);
+            remaining -= piece.length;
+            yield piece;
+            if (remaining <= 0) {
+                break;
+            }
+        }
+    } finally {
+        source.destroy();
+    }
+}
+
+/**
+ * 打开成员数据流：zip 成员从本地文件头之后开始读取（deflate 成员边读边解压），tar 成员按数据偏移读取
+ */
+export async function openEntryStream(index: ArchiveIndex, i: number): Promise<Readable> {
+    const d = index.data;
+    if (d.directories[i] === 1) {
+        throw new Error(`不能读取目录: ${d.paths[i]}`);
+    }
+    const size = d.sizes[i];
+
+    switch (index.format) {
+        case 'zip': {
+            const method = d.methods[i];
+            if (method !== 0 && method !== 8) {
+                throw new Error(method === -1
+                    ? `不支持读取加密的成员: ${d.paths[i]}`
+                    : `不支持的 zip 压缩方法 ${method}: ${d.paths[i]}`);
+            }
+            const handle = await fs.promises.open(index.archivePath, 'r');
+            let header: Buffer;
+            try {
+                header = await readAt(handle, d.offsets[i], 30);
+            } finally {
+                await handle.close();
+            }
+            if (header.length < 30 || header.readUInt32LE(0) !== ZIP_LOCAL_SIGNATURE) {
+                throw new Error(`zip 本地文件头损坏: ${d.paths[i]}`);
+            }
+            const start = d.offsets[i] + 30 + header.readUInt16LE(26) + header.readUInt16LE(28);
+            const compressedSize = d.compressedSizes[i];
+            if (compressedSize === 0) {
+                return Readable.from([]);
+            }
+            const raw = fs.createReadStream(index.archivePath, { start, end: start + compressedSize - 1 });
+            return method === 8 ? raw.pipe(zlib.createInflateRaw()) : raw;
+        }
+        case 'tar':
+            return size === 0
+                ? Readable.from([])
+                : fs.createReadStream(index.archivePath, { start: d.offsets[i], end: d.offsets[i] + size - 1 });
+        case 'tar.gz': {
+            const stream = fs.createReadStream(index.archivePath).pipe(zlib.createGunzip());
+            return Readable.from(sliceStream(stream, d.offsets[i], size));
+        }
+        default:
+            throw new Error('该格式的成员不能按偏移读取');
+    }
+}
+
+/**
+ * 读取成员的前 maxBytes 字节（默认全部）
+ */
+export async function readEntry(index: ArchiveIndex, i: number, maxBytes: number = Infinity): Promise<Buffer> {
+    const stream = await openEntryStream(index, i);
+    const chunks: Buffer[] = [];
+    let total = 0;
+    try {
+        for await (const chunk of stream) {
+            chunks.push(chunk as Buffer);
+            total += (chunk as Buffer).length;
+            if (total >= maxBytes) {
+                break;
+            }
+        }
+    } finally {
+        stream.destroy();
+    }
+    const buffer = Buffer.concat(chunks);
+    return total > maxBytes ? buffer.subarray(0, maxBytes) : buffer;
+}
+
+/**
+ * 把成员流式写入目标文件
+ */
+export async function extractEntry(index: ArchiveIndex, i: number, targetFile: string): Promise<void> {
+    await fs.promises.mkdir(path.dirname(targetFile), { recursive: true });
+    await pipeline(await openEntryStream(index, i), fs.createWriteStream(targetFile));
+}
+
+// ========== 持久化 ==========
+
+/**
+ * 按压缩包文件身份（路径、大小、修改时间、inode）缓存索引：内存中保留最近几个，磁盘上以 JSON 持久化；
+ * 同一压缩包的并发请求共用一次构建
+ */
+export class ArchiveIndexStore {
+    private static instance: ArchiveIndexStore;
+
+    private memory = new Map<string, ArchiveIndex>();
+    private building = new Map<string, Promise<ArchiveIndex>>();
+    private storageDir: string | null = null;
+
+    private constructor() { }
+
+    static getInstance(): ArchiveIndexStore {
+        if (!ArchiveIndexStore.instance) {
+            ArchiveIndexStore.instance = new ArchiveIndexStore();
+        }
+        return ArchiveIndexStore.instance;
+    }
+
+    /**
+     * 设置索引的持久化目录；未设置时索引只保存在内存中
+     */
+    setStorageDir(dir: string): void {
+        this.storageDir = dir;
+    }
+
+    async get(archivePath: string, build: () => Promise<ArchiveIndex>): Promise<ArchiveIndex> {
+        const key = await this.identity(archivePath);
+        const cached = this.memory.get(key);
+        if (cached) {
+            this.memory.delete(key);
+            this.memory.set(key, cached);
+            return cached;
+        }
+
+        let pending = this.building.get(key);
+        if (!pending) {
+            pending = this.loadOrBuild(archivePath, key, build).finally(() => this.building.delete(key));
+            this.building.set(key, pending);
+        }
+        const index = await pending;
+        this.memory.set(key, index);
+        while (this.memory.size > MAX_MEMORY_INDEXES) {
+            this.memory.delete(this.memory.keys().next().value as string);
+        }
+        return index;
+    }
+
+    private async identity(archivePath: string): Promise<string> {
+        const resolved = path.resolve(archivePath);
+        const stat = await fs.promises.stat(resolved);
+        return crypto.createHash('sha1')
+            .update(`${resolved}\u0000${stat.size}\u0000${stat.mtimeMs}\u0000${stat.ino}`)
+            .digest('hex');
+    }
+
+    private async loadOrBuild(archivePath: string, key: string, build: () => Promise<ArchiveIndex>): Promise<ArchiveIndex> {
+        const file = this.storageDir ? path.join(this.storageDir, `${key}.json`) : null;
+        if (file) {
+            try {
+                const data = JSON.parse(await fs.promises.readFile(file, 'utf8')) as ArchiveIndexData;
+                if (data.version === INDEX_VERSION) {
+                    // 更新访问时间，供淘汰时判断最久未用
+                    const now = new Date();
+                    fs.promises.utimes(file, now, now).catch(() => undefined);
+                    return new ArchiveIndex(archivePath, data);
+                }
+            } catch {
+                // 没有持久化的索引或已损坏，重新构建
+            }
+        }
+
+        const index = await build();
+        if (file) {
+            this.save(file, index.data).catch(error => console.error(`保存压缩包索引失败: ${error}`));
+        }
+        return index;
+    }
+
+    private async save(file: string, data: ArchiveIndexData): Promise<void> {
+        const dir = path.dirname(file);
+        await fs.promises.mkdir(dir, { recursive: true });
+        const tmp = `${file}.${process.pid}.tmp`;
+        await fs.promises.writeFile(tmp, JSON.stringify(data));
+        await fs.promises.rename(tmp, file);
+
+        const names = (await fs.promises.readdir(dir)).filter(name => name.endsWith('.json'));
+        if (names.length > MAX_STORED_INDEXES) {
+            const stats = await Promise.all(names.map(async name => ({
+                file: path.join(dir, name),
+                mtime: (await fs.promises.stat(path.join(dir, name))).mtimeMs
+            })));
+            stats.sort((a, b) => a.mtime - b.mtime);
+            for (const old of stats.slice(0, stats.length - MAX_STORED_INDEXES)) {
+                await fs.promises.rm(old.file, { force: true });
+            }
+        }
+    }
+}
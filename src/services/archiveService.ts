@@ -1,169 +1,185 @@
 /**
  * 压缩文件处理服务
+ * zip 与 tar 通过索引按成员偏移读取（见 archiveIndex.ts），7z/rar 等格式交给 7z 处理，其列表同样缓存为索引
  */
 import * as path from 'path';
 import * as fs from 'fs';
-import AdmZip from 'adm-zip';
 // @ts-ignore
 import Seven from 'node-7z';
-import { ArchiveEntry, FilePreview } from '../types';
+import { ArchiveEntry, ArchiveDirectoryPage, ArchiveSummary, FilePreview } from '../types';
+import {
+    ArchiveFormat, ArchiveIndex, ArchiveIndexStore, buildTarIndex, buildZipIndex, extractEntry, readEntry
+} from './archiveIndex';
+
+// 预览文本与图片时最多读取的字节数，二进制文件只读取开头用于十六进制显示
+const PREVIEW_MAX_BYTES = 5 * 1024 * 1024;
+const HEX_PREVIEW_BYTES = 1024;
+const TEXT_EXTENSIONS = ['.txt', '.md', '.json', '.xml', '.html', '.css', '.js', '.ts', '.py', '.yaml', '.yml', '.ini', '.cfg', '.log'];
+const IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.svg'];
 
 export class ArchiveService {
+    private indexStore = ArchiveIndexStore.getInstance();
+
+    /**
+     * 获取压缩包索引：首次访问时构建并持久化，压缩包未修改时直接复用
+     */
+    async getIndex(archivePath: string): Promise<ArchiveIndex> {
+        return this.indexStore.get(archivePath, () => this.buildIndex(archivePath));
+    }
+
     /**
      * 列出压缩包内容
      */
     async listEntries(archivePath: string): Promise<ArchiveEntry[]> {
-        const ext = path.extname(archivePath).toLowerCase();
-
-        switch (ext) {
-            case '.zip':
-                return this.listZipEntries(archivePath);
-            case '.rar':
-            case '.7z':
-            case '.tar':
-            case '.gz':
-                return this.list7zEntries(archivePath);
-            default:
-                throw new Error(`不支持的压缩格式: ${ext}`);
-        }
+        return (await this.getIndex(archivePath)).entries();
+    }
+
+    /**
+     * 压缩包概况（文件数、目录数、总大小）
+     */
+    async getSummary(archivePath: string): Promise<ArchiveSummary> {
+        return (await this.getIndex(archivePath)).summary();
+    }
+
+    /**
+     * 分页列出压缩包内某个目录的直接子项，dirPath 为空字符串表示根目录
+     */
+    async listDirectory(archivePath: string, dirPath: string, offset: number, limit: number): Promise<ArchiveDirectoryPage> {
+        return (await this.getIndex(archivePath)).listDirectory(dirPath, offset, limit);
+    }
+
+    /**
+     * 按文件名搜索，最多返回 limit 条，total 为全部匹配数
+     */
+    async search(archivePath: string, query: string, limit: number): Promise<{ entries: ArchiveEntry[]; total: number }> {
+        return (await this.getIndex(archivePath)).search(query, limit);
     }
 
     /**
      * 解压整个压缩包
      */
     async extract(archivePath: string, targetPath: string): Promise<void> {
-        const ext = path.extname(archivePath).toLowerCase();
-
-        switch (ext) {
-            case '.zip':
-                return this.extractZip(archivePath, targetPath);
-            case '.rar':
-            case '.7z':
-            case '.tar':
-            case '.gz':
-                return this.extract7z(archivePath, targetPath);
-            default:
-                throw new Error(`不支持的压缩格式: ${ext}`);
+        const format = this.getFormat(archivePath);
+        // gzip 压缩的 tar 逐个成员读取需要反复从头解压，整体解压交给 7z
+        if (format === 'zip' || format === 'tar') {
+            const index = await this.getIndex(archivePath);
+            return this.extractIndexed(index, index.filesUnder(''), '', targetPath);
         }
+        return this.extract7z(archivePath, targetPath);
     }
 
     /**
-     * 解压单个文件
+     * 解压单个文件；entryPath 为目录时解压其下全部文件到 targetPath/目录名
      */
     async extractSingle(
         archivePath: string,
         entryPath: string,
         targetPath: string
     ): Promise<void> {
-        const ext = path.extname(archivePath).toLowerCase();
-
-        switch (ext) {
-            case '.zip':
-                return this.extractZipSingle(archivePath, entryPath, targetPath);
-            case '.rar':
-            case '.7z':
-            case '.tar':
-            case '.gz':
-                return this.extract7zSingle(archivePath, entryPath, targetPath);
-            default:
-                throw new Error(`不支持的压缩格式: ${ext}`);
+        const index = await this.getIndex(archivePath);
+        if (!index.seekable) {
+            return this.extract7zSingle(archivePath, entryPath, targetPath);
+        }
+
+        const files = index.filesUnder(entryPath);
+        if (files.length === 0) {
+            throw new Error(`文件不存在: ${entryPath}`);
         }
+        const i = index.find(entryPath);
+        const isFile = i >= 0 && !index.entry(i).isDirectory;
+        const base = isFile ? path.posix.dirname(index.entry(i).path) : path.posix.dirname(entryPath.replace(/\/$/, ''));
+        return this.extractIndexed(index, files, base === '.' ? '' : base, targetPath);
     }
 
     /**
      * 读取压缩包内文件内容（用于预览）
+     * zip/tar 按成员偏移只读取需要的部分：二进制文件只读开头，文本和图片最多读取 PREVIEW_MAX_BYTES
      */
     async readFileContent(archivePath: string, entryPath: string): Promise<FilePreview> {
-        const ext = path.extname(archivePath).toLowerCase();
         const fileExt = path.extname(entryPath).toLowerCase();
+        const index = await this.getIndex(archivePath);
 
-        let buffer: Buffer;
-
-        if (ext === '.zip') {
-            const zip = new AdmZip(archivePath);
-            const entry = zip.getEntry(entryPath);
-            if (!entry) {
+        if (index.seekable) {
+            const i = index.find(entryPath);
+            if (i < 0) {
                 throw new Error(`文件不存在: ${entryPath}`);
             }
-            buffer = entry.getData();
-        } else if (['.rar', '.7z', '.tar', '.gz'].includes(ext)) {
-            // 对于7z/rar/tar格式，先解压到临时目录再读取
-            const tmpDir = path.join(require('os').tmpdir(), 'tensorlens-' + Date.now());
-            if (!fs.existsSync(tmpDir)) {
-                fs.mkdirSync(tmpDir, { recursive: true });
+            const size = index.entry(i).size;
+            const limit = this.isTextOrImage(fileExt) ? PREVIEW_MAX_BYTES : HEX_PREVIEW_BYTES;
+            const buffer = await readEntry(index, i, limit);
+            return this.parseFileContent(buffer, fileExt, entryPath, size);
+        }
+
+        // 7z/rar 只能先解压到临时目录再读取
+        const tmpDir = path.join(require('os').tmpdir(), 'tensorlens-' + Date.now());
+        if (!fs.existsSync(tmpDir)) {
+            fs.mkdirSync(tmpDir, { recursive: true });
+        }
+
+        try {
+            await this.extract7zSingle(archivePath, entryPath, tmpDir);
+            const candidates = [path.join(tmpDir, entryPath), path.join(tmpDir, path.basename(entryPath))];
+            const tmpFile = candidates.find(p => fs.existsSync(p));
+            if (!tmpFile) {
+                throw new Error(`文件不存在: ${entryPath}`);
             }
-            
+            const buffer = fs.readFileSync(tmpFile);
+            return this.parseFileContent(buffer, fileExt, entryPath, buffer.length);
+        } finally {
+            // 清理临时目录
             try {
-                await this.extract7zSingle(archivePath, entryPath, tmpDir);
-                const tmpFile = path.join(tmpDir, path.basename(entryPath));
-                buffer = fs.readFileSync(tmpFile);
-                
-                // 清理临时文件
-                fs.unlinkSync(tmpFile);
-                fs.rmdirSync(tmpDir);
-            } catch (error) {
-                // 清理临时目录
-                if (fs.existsSync(tmpDir)) {
-                    try {
-                        fs.rmSync(tmpDir, { recursive: true, force: true });
-                    } catch {}
-                }
-                throw error;
-            }
-        } else {
-            throw new Error('暂不支持此格式的在线预览');
+                fs.rmSync(tmpDir, { recursive: true, force: true });
+            } catch {}
         }
-
-        return this.parseFileContent(buffer, fileExt, entryPath);
     }
 
-    // ========== ZIP格式处理 ==========
-
-    private listZipEntries(archivePath: string): ArchiveEntry[] {
-        const zip = new AdmZip(archivePath);
-        const entries = zip.getEntries();
+    // ========== 索引 ==========
 
-        return entries.map(entry => ({
-            name: entry.name,
-            path: entry.entryName,
-            isDirectory: entry.isDirectory,
-            size: entry.header.size,
-            compressedSize: entry.header.compressedSize,
-            modifiedTime: entry.header.time
-        }));
+    private getFormat(archivePath: string): ArchiveFormat {
+        const lower = archivePath.toLowerCase();
+        if (lower.endsWith('.zip')) {
+            return 'zip';
+        }
+        if (lower.endsWith('.tar')) {
+            return 'tar';
+        }
+        if (lower.endsWith('.tar.gz') || lower.endsWith('.tgz')) {
+            return 'tar.gz';
+        }
+        const ext = path.extname(lower);
+        if (['.rar', '.7z', '.gz'].includes(ext)) {
+            return '7z';
+        }
+        throw new Error(`不支持的压缩格式: ${ext}`);
     }
 
-    private extractZip(archivePath: string, targetPath: string): Promise<void> {
-        return new Promise((resolve, reject) => {
-            try {
-                const zip = new AdmZip(archivePath);
-                zip.extractAllTo(targetPath, true);
-                resolve();
-            } catch (error) {
-                reject(error);
-            }
-        });
+    private async buildIndex(archivePath: string): Promise<ArchiveIndex> {
+        switch (this.getFormat(archivePath)) {
+            case 'zip':
+                return buildZipIndex(archivePath);
+            case 'tar':
+                return buildTarIndex(archivePath, false);
+            case 'tar.gz':
+                return buildTarIndex(archivePath, true);
+            default:
+                return ArchiveIndex.fromEntries(archivePath, await this.list7zEntries(archivePath));
+        }
     }
 
-    private extractZipSingle(
-        archivePath: string,
-        entryPath: string,
-        targetPath: string
-    ): Promise<void> {
-        return new Promise((resolve, reject) => {
-            try {
-                const zip = new AdmZip(archivePath);
-                const entry = zip.getEntry(entryPath);
-                if (!entry) {
-                    reject(new Error(`文件不存在: ${entryPath}`));
-                    return;
-                }
-                zip.extractEntryTo(entry, targetPath, false, true);
-                resolve();
-            } catch (error) {
-                reject(error);
+    /**
+     * 按索引逐个流式解压文件，目标路径为成员路径去掉 base 前缀；拒绝解压到目标目录之外的路径
+     */
+    private async extractIndexed(index: ArchiveIndex, files: number[], base: string, targetPath: string): Promise<void> {
+        const root = path.resolve(targetPath);
+        for (const i of files) {
+            const entryPath = index.entry(i).path;
+            const relative = base ? entryPath.substring(base.length + 1) : entryPath;
+            const file = path.resolve(root, relative);
+            if (!file.startsWith(root + path.sep)) {
+                throw new Error(`非法的成员路径: ${entryPath}`);
             }
-        });
+            await extractEntry(index, i, file);
+        }
     }
 
     // ========== 7z/RAR等格式处理 ==========
@@ -247,11 +263,12 @@ export class ArchiveService {
 
     // ========== 文件内容解析 ==========
 
-    private parseFileContent(buffer: Buffer, ext: string, filePath: string): FilePreview {
-        const textExtensions = ['.txt', '.md', '.json', '.xml', '.html', '.css', '.js', '.ts', '.py', '.yaml', '.yml', '.ini', '.cfg', '.log'];
-        const imageExtensions = ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.svg'];
+    private isTextOrImage(ext: string): boolean {
+        return TEXT_EXTENSIONS.includes(ext) || IMAGE_EXTENSIONS.includes(ext);
+    }
 
-        if (textExtensions.includes(ext)) {
+    private parseFileContent(buffer: Buffer, ext: string, filePath: string, size: number): FilePreview {
+        if (TEXT_EXTENSIONS.includes(ext)) {
             return {
                 type: 'text',
                 content: buffer.toString('utf-8'),
@@ -260,7 +277,7 @@ export class ArchiveService {
             };
         }
 
-        if (imageExtensions.includes(ext)) {
+        if (IMAGE_EXTENSIONS.includes(ext)) {
             const base64 = buffer.toString('base64');
             const mimeType = this.getMimeType(ext);
             return {
@@ -273,9 +290,9 @@ export class ArchiveService {
         // 二进制文件，显示十六进制
         return {
             type: 'binary',
-            content: this.formatHex(buffer.slice(0, 1024)),
+            content: this.formatHex(buffer.slice(0, HEX_PREVIEW_BYTES)),
             path: filePath,
-            size: buffer.length
+            size: size
         };
     }
 
@@ -0,0 +1,76 @@
+/**
+ * 诊断记录
+ * 在内存环形缓冲区中保存最近的 Python 请求（命令、耗时、结果、各阶段遥测），供诊断视图展示
+ */
+import * as vscode from 'vscode';
+import { WorkerTelemetry } from '../types';
+
+export interface DiagnosticEntry {
+    id: number;
+    command: string;
+    file?: string;
+    startedAt: number;                          // 请求发出的时间（毫秒时间戳）
+    durationMs: number;                         // 扩展端测得的往返耗时，包括排队与传输
+    status: 'ok' | 'error' | 'cancelled';
+    error?: string;
+    telemetry?: WorkerTelemetry;
+}
+
+export class DiagnosticsLog {
+    private static instance: DiagnosticsLog;
+
+    private entries: DiagnosticEntry[] = [];
+    private head = 0;  // 缓冲区已满时下一条记录写入的位置（即最旧的记录）
+    private nextId = 1;
+    private readonly changed = new vscode.EventEmitter<void>();
+    readonly onDidChange: vscode.Event<void> = this.changed.event;
+
+    private constructor(private capacity: number) { }
+
+    static getInstance(): DiagnosticsLog {
+        if (!DiagnosticsLog.instance) {
+            const capacity = vscode.workspace.getConfiguration('tensorLens').get<number>('diagnosticsHistorySize', 200);
+            DiagnosticsLog.instance = new DiagnosticsLog(Math.max(1, capacity));
+        }
+        return DiagnosticsLog.instance;
+    }
+
+    /**
+     * 追加一条记录，缓冲区已满时覆盖最旧的记录
+     */
+    record(entry: Omit<DiagnosticEntry, 'id'>): void {
+        const item: DiagnosticEntry = { id: this.nextId++, ...entry };
+        if (this.entries.length < this.capacity) {
+            this.entries.push(item);
+        } else {
+            this.entries[this.head] = item;
+            this.head = (this.head + 1) % this.capacity;
+        }
+        this.changed.fire();
+    }
+
+    /**
+     * 按时间从新到旧返回全部记录
+     */
+    getEntries(): DiagnosticEntry[] {
+        const ordered = this.entries.slice(this.head).concat(this.entries.slice(0, this.head));
+        return ordered.reverse();
+    }
+
+    /**
+     * 修改容量，缩小时丢弃最旧的记录
+     */
+    setCapacity(capacity: number): void {
+        const entries = this.getEntries().slice(0, Math.max(1, capacity)).reverse();
+        this.capacity = Math.max(1, capacity);
+        this.entries = entries;
+        this.head = 0;
+        this.changed.fire();
+    }
+
+    clear(): void {
+        this.entries = [];
+        this.head = 0;
+        this.changed.fire();
+    }
+}
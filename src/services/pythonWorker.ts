@@ -0,0 +1,370 @@
+/**
+ * 常驻 Python 工作进程
+ * 以 JSON Lines 协议与 tensor_handler.py --server 通信，按请求ID复用同一个进程
+ */
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+import { CancellationToken } from 'vscode';
+import { BinaryArrayPayload, WorkerProgress, WorkerTelemetry } from '../types';
+
+interface BinaryFrame {
+    message: any;
+    data: Uint8Array;
+    filled: number;
+}
+
+interface PendingRequest {
+    command: string;
+    resolve: (value: any) => void;
+    reject: (reason: Error) => void;
+    onProgress?: (progress: WorkerProgress) => void;
+    onTelemetry?: (telemetry: WorkerTelemetry) => void;
+}
+
+export interface RequestOptions {
+    onProgress?: (progress: WorkerProgress) => void;     // 长时间运行的命令（如导出）汇报的进度
+    token?: CancellationToken;                           // 取消时通知 Python 端在下一个数据块处停止
+    onTelemetry?: (telemetry: WorkerTelemetry) => void;  // 响应附带的分阶段遥测，在请求完成前回调
+}
+
+export class PythonWorker {
+    private static workers = new Map<string, PythonWorker>();
+
+    private proc: ChildProcessWithoutNullStreams | null = null;
+    private ready: Promise<void> | null = null;
+    private pending = new Map<number, PendingRequest>();
+    private nextId = 1;
+    private lineBuffer: Buffer = Buffer.alloc(0);
+    private binaryFrame: BinaryFrame | null = null;
+    private stderrTail = '';
+    private startupMs: number | null = null;  // 进程启动耗时，计入启动后第一个响应的遥测
+    private retiring = false;                 // 已被使用新环境变量的进程取代，处理完未完成的请求后退出
+    private starting = 0;                     // 正在等待进程启动、尚未发出的请求数
+
+    private constructor(
+        private readonly pythonPath: string,
+        private readonly scriptPath: string,
+        private readonly env: NodeJS.ProcessEnv
+    ) { }
+
+    /**
+     * 获取指定解释器对应的工作进程（每个解释器一个）
+     * 环境变量（线程数、内存预算、缓存大小等设置）与现有进程不同时启动新进程，
+     * 旧进程处理完已发出的请求后退出
+     */
+    static get(pythonPath: string, scriptPath: string, env: NodeJS.ProcessEnv = {}): PythonWorker {
+        const id = `${pythonPath}\u0000${scriptPath}`;
+        let worker = PythonWorker.workers.get(id);
+        if (worker && !sameEnv(worker.env, env)) {
+            worker.retire();
+            worker = undefined;
+        }
+        if (!worker) {
+            worker = new PythonWorker(pythonPath, scriptPath, env);
+            PythonWorker.workers.set(id, worker);
+        }
+        return worker;
+    }
+
+    /**
+     * 关闭所有工作进程
+     */
+    static disposeAll(): void {
+        for (const worker of PythonWorker.workers.values()) {
+            worker.dispose();
+        }
+        PythonWorker.workers.clear();
+    }
+
+    /**
+     * 发送请求，进程未启动或已崩溃时自动（重新）启动
+     * 被取消的请求以 { error, cancelled: true } 返回
+     */
+    async request<T>(command: string, args: object, options: RequestOptions = {}): Promise<T> {
+        this.starting++;
+        try {
+            await this.ensureStarted();
+        } finally {
+            this.starting--;
+        }
+
+        const id = this.nextId++;
+        const cancellation = options.token?.onCancellationRequested(() => this.cancel(id));
+        return new Promise<T>((resolve, reject) => {
+            this.pending.set(id, {
+                command,
+                resolve: (value) => { cancellation?.dispose(); resolve(value); },
+                reject: (reason) => { cancellation?.dispose(); reject(reason); },
+                onProgress: options.onProgress,
+                onTelemetry: options.onTelemetry
+            });
+            try {
+                this.proc!.stdin.write(JSON.stringify({ id, command, args }) + '\n');
+            } catch (error) {
+                this.pending.delete(id);
+                cancellation?.dispose();
+                reject(new Error(`发送请求失败: ${error}`));
+                return;
+            }
+            if (options.token?.isCancellationRequested) {
+                this.cancel(id);
+            }
+        });
+    }
+
+    /**
+     * 请求 Python 端取消指定请求；已完成的请求忽略
+     */
+    private cancel(id: number): void {
+        if (!this.proc || !this.pending.has(id)) {
+            return;
+        }
+        try {
+            this.proc.stdin.write(JSON.stringify({ command: 'cancel', args: { id } }) + '\n');
+        } catch { }
+    }
+
+    /**
+     * 不再接收新请求：没有未完成的请求时立即关闭，否则在最后一个请求完成后关闭
+     */
+    private retire(): void {
+        this.retiring = true;
+        this.exitIfRetired();
+    }
+
+    private exitIfRetired(): void {
+        if (this.retiring && this.pending.size === 0 && this.starting === 0) {
+            this.dispose();
+        }
+    }
+
+    dispose(): void {
+        if (this.proc) {
+            try {
+                this.proc.stdin.write(JSON.stringify({ command: 'shutdown' }) + '\n');
+                this.proc.stdin.end();
+            } catch { }
+            this.proc.kill();
+        }
+        this.handleExit('工作进程已关闭');
+    }
+
+    private ensureStarted(): Promise<void> {
+        if (this.proc && this.ready) {
+            return this.ready;
+        }
+
+        this.lineBuffer = Buffer.alloc(0);
+        this.binaryFrame = null;
+        this.stderrTail = '';
+        this.startupMs = null;
+        console.log(`启动Python工作进程: ${this.pythonPath} ${this.scriptPath} --server`);
+        const spawnedAt = Date.now();
+
+        const proc = spawn(this.pythonPath, [this.scriptPath, '--server'], {
+            env: {
+                ...process.env,
+                ...this.env,
+                PYTHONIOENCODING: 'utf-8',  // 强制 Python 使用 UTF-8 输出
+                PYTHONUNBUFFERED: '1'
+            }
+        });
+        this.proc = proc;
+
+        this.ready = new Promise<void>((resolve, reject) => {
+            let settled = false;
+
+            proc.stderr.setEncoding('utf8');
+
+            proc.stdout.on('data', (data: Buffer) => {
+                this.feed(data, (message) => {
+                    if (message.ready && !settled) {
+                        settled = true;
+                        this.startupMs = Date.now() - spawnedAt;
+                        resolve();
+                    } else {
+                        this.handleMessage(message);
+                    }
+                });
+            });
+
+            proc.stderr.on('data', (data: string) => {
+                // 只保留最近的错误输出，用于崩溃时的报错信息
+                this.stderrTail = (this.stderrTail + data).slice(-2000);
+                console.log(`[Python STDERR] ${data}`);
+            });
+
+            proc.on('error', (error) => {
+                if (this.proc === proc) {
+                    this.handleExit(`启动Python失败: ${error.message}`);
+                }
+                if (!settled) {
+                    settled = true;
+                    reject(new Error(`启动Python失败: ${error.message}`));
+                }
+            });
+
+            proc.on('close', (code) => {
+                const reason = `Python工作进程退出，退出码: ${code}, 错误: ${this.stderrTail.substring(0, 200)}`;
+                if (this.proc === proc) {
+                    this.handleExit(reason);
+                }
+                if (!settled) {
+                    settled = true;
+                    reject(new Error(reason));
+                }
+            });
+        });
+
+        return this.ready;
+    }
+
+    /**
+     * 解析 stdout 字节流：每条消息是一行 JSON，若带 binaryLength 则其后紧跟相应长度的原始字节
+     */
+    private feed(data: Buffer, onMessage: (message: any) => void): void {
+        let offset = 0;
+        while (offset < data.length) {
+            if (this.binaryFrame) {
+                const frame = this.binaryFrame;
+                const count = Math.min(frame.data.length - frame.filled, data.length - offset);
+                frame.data.set(data.subarray(offset, offset + count), frame.filled);
+                frame.filled += count;
+                offset += count;
+                if (frame.filled === frame.data.length) {
+                    this.binaryFrame = null;
+                    onMessage(this.attachBinary(frame.message, frame.data.buffer as ArrayBuffer));
+                }
+                continue;
+            }
+
+            const newline = data.indexOf(0x0a, offset);
+            if (newline < 0) {
+                this.lineBuffer = Buffer.concat([this.lineBuffer, data.subarray(offset)]);
+                return;
+            }
+
+            const lineBytes = this.lineBuffer.length
+                ? Buffer.concat([this.lineBuffer, data.subarray(offset, newline)])
+                : data.subarray(offset, newline);
+            this.lineBuffer = Buffer.alloc(0);
+            offset = newline + 1;
+
+            const line = lineBytes.toString('utf8').trim();
+            if (!line) {
+                continue;
+            }
+            const message = this.parseLine(line);
+            if (!message) {
+                continue;
+            }
+            if (message.binaryLength > 0) {
+                this.binaryFrame = { message, data: new Uint8Array(message.binaryLength), filled: 0 };
+            } else {
+                onMessage(message);
+            }
+        }
+    }
+
+    /**
+     * 把响应中的二进制描述符替换为带独立 ArrayBuffer 的载荷，可直接 postMessage 到 webview
+     */
+    private attachBinary(message: any, data: ArrayBuffer): any {
+        const visit = (value: any): any => {
+            if (Array.isArray(value)) {
+                return value.map(visit);
+            }
+            if (value && typeof value === 'object') {
+                if (value.__binary__ === true && typeof value.offset === 'number') {
+                    const payload: BinaryArrayPayload = {
+                        __binary__: true,
+                        dtype: value.dtype,
+                        shape: value.shape,
+                        strides: value.strides,
+                        buffer: value.offset === 0 && value.length === data.byteLength
+                            ? data
+                            : data.slice(value.offset, value.offset + value.length)
+                    };
+                    return payload;
+                }
+                for (const key of Object.keys(value)) {
+                    value[key] = visit(value[key]);
+                }
+            }
+            return value;
+        };
+        message.result = visit(message.result);
+        return message;
+    }
+
+    private parseLine(line: string): any {
+        try {
+            return JSON.parse(line);
+        } catch {
+            console.error(`解析Python输出失败: ${line.substring(0, 200)}`);
+            return null;
+        }
+    }
+
+    private handleMessage(message: {
+        id: number | null;
+        result?: unknown;
+        error?: string;
+        cancelled?: boolean;
+        progress?: WorkerProgress;
+        telemetry?: WorkerTelemetry;
+    }): void {
+        if (message.id === null || message.id === undefined) {
+            if (message.error) {
+                console.error('Python工作进程错误:', message.error);
+            }
+            return;
+        }
+
+        const request = this.pending.get(message.id);
+        if (!request) {
+            return;
+        }
+        if (message.progress) {
+            request.onProgress?.(message.progress);
+            return;
+        }
+        this.pending.delete(message.id);
+        this.exitIfRetired();
+
+        if (message.telemetry) {
+            if (this.startupMs !== null) {
+                message.telemetry.phases = { startup: { ms: this.startupMs }, ...message.telemetry.phases };
+                this.startupMs = null;
+            }
+            request.onTelemetry?.(message.telemetry);
+        }
+
+        // 与单次执行模式一致：错误以 { error } 对象返回，而不是 reject
+        if (message.cancelled) {
+            request.resolve({ error: message.error, cancelled: true });
+        } else if (message.error !== undefined) {
+            console.log('检测到 Python 返回的错误信息:', message.error);
+            request.resolve({ error: message.error });
+        } else {
+            request.resolve(message.result);
+        }
+    }
+
+    /**
+     * 进程退出时拒绝所有未完成请求，下次请求时重新启动
+     */
+    private handleExit(reason: string): void {
+        this.proc = null;
+        this.ready = null;
+        const pending = Array.from(this.pending.values());
+        this.pending.clear();
+        for (const request of pending) {
+            request.reject(new Error(`${request.command}: ${reason}`));
+        }
+    }
+}
+
+function sameEnv(a: NodeJS.ProcessEnv, b: NodeJS.ProcessEnv): boolean {
+    const keys = Object.keys(a);
+    return keys.length === Object.keys(b).length && keys.every(key => a[key] === b[key]);
+}
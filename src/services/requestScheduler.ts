@@ -0,0 +1,413 @@
+/**
+ * 请求调度器
+ * 发往 Python 工作进程的请求先在扩展端排队：按优先级出队并限制并发数；
+ * 同一编辑器同一槽位上被新请求取代的请求被取消，相同的只读请求合并为一次执行，
+ * 结果按文件标识与参数保存在有大小上限的 LRU 缓存中
+ */
+import * as vscode from 'vscode';
+import * as fs from 'fs';
+import * as path from 'path';
+import { splitArchiveMemberPath, isSafetensorsIndex } from '../utils';
+
+/**
+ * visible: 可见区域的数据块、预览等用户正在等待的请求
+ * normal: 搜索、绘图等用户发起但允许稍候的请求
+ * background: 工作区索引、隐藏编辑器发出的请求
+ */
+export type RequestPriority = 'visible' | 'normal' | 'background';
+
+export interface ScheduleOptions {
+    priority?: RequestPriority;       // 默认 normal
+    owner?: string;                   // 发起请求的编辑器或视图，关闭时取消其全部请求
+    slot?: string;                    // 请求所在槽位，可按 owner + slot 取消
+    supersede?: boolean;              // 发出前取消同一 owner + slot 上未完成的请求（默认 true）
+    cacheable?: boolean;              // 只读命令：相同的进行中请求合并执行，成功结果进入缓存
+    token?: vscode.CancellationToken;
+}
+
+/** 被取消或被取代的请求以此形式返回，与工作进程的取消响应一致 */
+export interface CancelledResult {
+    error: string;
+    cancelled: true;
+}
+
+const PRIORITY_ORDER: Record<RequestPriority, number> = { visible: 0, normal: 1, background: 2 };
+
+// 与 tensor_handler.py --server 的默认线程数一致，多发的请求只会在 Python 端排队且无法调整顺序
+const MAX_CONCURRENT = 4;
+// 后台请求最多占用的并发数，始终为交互请求留出一个空位
+const MAX_BACKGROUND = MAX_CONCURRENT - 1;
+// 超过缓存容量这一比例的单个结果不缓存，避免一次大结果清空整个缓存
+const MAX_ENTRY_FRACTION = 0.25;
+
+const SUPERSEDED = '请求已被新的请求取代';
+const CANCELLED = '请求已取消';
+
+interface Job {
+    key: string | null;               // 合并与缓存使用的键，不可缓存的请求为 null
+    file?: string;
+    priority: number;
+    seq: number;
+    run: (token: vscode.CancellationToken) => Promise<unknown>;
+    source: vscode.CancellationTokenSource;
+    tickets: Set<Ticket>;
+    started: boolean;
+}
+
+interface Ticket {
+    owner?: string;
+    slot?: string;
+    job: Job | null;
+    done: boolean;
+    cancelReason?: string;            // 加入任务前已被取消时记录原因
+    resolve?: (value: unknown) => void;
+    reject?: (reason: Error) => void;
+}
+
+interface CacheEntry {
+    file?: string;
+    value: unknown;
+    size: number;
+}
+
+export class RequestScheduler {
+    private static instance: RequestScheduler;
+
+    private queue: Job[] = [];
+    private inflight = new Map<string, Job>();
+    private tickets = new Set<Ticket>();
+    private running = 0;
+    private runningBackground = 0;
+    private nextSeq = 1;
+
+    private cache = new Map<string, CacheEntry>();
+    private cacheBytes = 0;
+    // 分片检查点索引解析出的分片路径：索引路径 -> { 索引自身的标识, 分片路径 }
+    private indexShards = new Map<string, { identity: string; shards: string[] }>();
+
+    private constructor(private maxCacheBytes: number) { }
+
+    static getInstance(): RequestScheduler {
+        if (!RequestScheduler.instance) {
+            const sizeMB = vscode.workspace.getConfiguration('tensorLens').get<number>('resultCacheMB', 64);
+            RequestScheduler.instance = new RequestScheduler(Math.max(0, sizeMB) * 1024 * 1024);
+        }
+        return RequestScheduler.instance;
+    }
+
+    /**
+     * 调度一个请求，run 在轮到它时执行并收到用于取消的令牌
+     * 被取消或被取代时返回 CancelledResult，而不是 reject
+     */
+    async schedule<T>(
+        command: string,
+        args: object,
+        options: ScheduleOptions,
+        run: (token: vscode.CancellationToken) => Promise<T>
+    ): Promise<T> {
+        // 取代与登记同步完成，保证先到的请求先被取代
+        if (options.owner && options.slot && options.supersede !== false) {
+            this.cancel(options.owner, options.slot, SUPERSEDED);
+        }
+        const ticket: Ticket = { owner: options.owner, slot: options.slot, job: null, done: false };
+        this.tickets.add(ticket);
+        const cancellation = options.token?.onCancellationRequested(() => this.cancelTicket(ticket, CANCELLED));
+
+        try {
+            const file = (args as { file?: string }).file;
+            const key = options.cacheable && this.maxCacheBytes > 0
+                ? await this.cacheKey(command, args, file)
+                : null;
+            if (ticket.cancelReason || options.token?.isCancellationRequested) {
+                return cancelled(ticket.cancelReason ?? CANCELLED) as unknown as T;
+            }
+
+            const cached = key ? this.cache.get(key) : undefined;
+            if (cached) {
+                // 刷新最近使用顺序
+                this.cache.delete(key!);
+                this.cache.set(key!, cached);
+                // 缓存中的结果只有调度器持有，调用方拿到的是副本，修改它不会影响之后的命中
+                return structuredClone(cached.value) as T;
+            }
+
+            return await new Promise<T>((resolve, reject) => {
+                ticket.resolve = resolve as (value: unknown) => void;
+                ticket.reject = reject;
+
+                const priority = PRIORITY_ORDER[options.priority ?? 'normal'];
+                let job = key ? this.inflight.get(key) : undefined;
+                if (job) {
+                    // 合并到相同的进行中请求，排队中的任务按最高的优先级出队
+                    job.priority = Math.min(job.priority, priority);
+                } else {
+                    job = {
+                        key,
+                        file,
+                        priority,
+                        seq: this.nextSeq++,
+                        run,
+                        source: new vscode.CancellationTokenSource(),
+                        tickets: new Set(),
+                        started: false
+                    };
+                    this.queue.push(job);
+                    if (key) {
+                        this.inflight.set(key, job);
+                    }
+                }
+                job.tickets.add(ticket);
+                ticket.job = job;
+                this.pump();
+            });
+        } finally {
+            cancellation?.dispose();
+            this.tickets.delete(ticket);
+        }
+    }
+
+    /**
+     * 取消 owner 的请求；指定 slot 时只取消该槽位上的请求
+     */
+    cancel(owner: string, slot?: string, reason: string = CANCELLED): void {
+        for (const ticket of Array.from(this.tickets)) {
+            if (ticket.owner === owner && (slot === undefined || ticket.slot === slot)) {
+                this.cancelTicket(ticket, reason);
+            }
+        }
+    }
+
+    /**
+     * 丢弃某个文件的缓存结果（保存修改、用户刷新后）
+     */
+    invalidate(filePath: string): void {
+        for (const [key, entry] of Array.from(this.cache)) {
+            if (entry.file === filePath) {
+                this.cache.delete(key);
+                this.cacheBytes -= entry.size;
+            }
+        }
+    }
+
+    /**
+     * 修改缓存容量，缩小时淘汰最久未用的结果；0 表示不缓存
+     */
+    setCacheSize(sizeMB: number): void {
+        this.maxCacheBytes = Math.max(0, sizeMB) * 1024 * 1024;
+        this.evict();
+    }
+
+    private cancelTicket(ticket: Ticket, reason: string): void {
+        if (ticket.done) {
+            return;
+        }
+        ticket.done = true;
+        const job = ticket.job;
+        if (!job) {
+            // 还在计算缓存键，加入任务前检查
+            ticket.cancelReason = reason;
+            return;
+        }
+        job.tickets.delete(ticket);
+        ticket.resolve!(cancelled(reason));
+        if (job.tickets.size === 0) {
+            this.abandon(job);
+        }
+    }
+
+    /**
+     * 没有等待者的任务：排队中的直接移出，执行中的通知 Python 端在下一个检查点停止
+     */
+    private abandon(job: Job): void {
+        if (job.key && this.inflight.get(job.key) === job) {
+            this.inflight.delete(job.key);
+        }
+        if (job.started) {
+            job.source.cancel();
+        } else {
+            this.queue.splice(this.queue.indexOf(job), 1);
+            job.source.dispose();
+        }
+    }
+
+    /**
+     * 在并发上限内按优先级（同级按先后）启动排队的任务
+     */
+    private pump(): void {
+        while (this.running < MAX_CONCURRENT) {
+            let best = -1;
+            for (let i = 0; i < this.queue.length; i++) {
+                const job = this.queue[i];
+                if (job.priority === PRIORITY_ORDER.background && this.runningBackground >= MAX_BACKGROUND) {
+                    continue;
+                }
+                if (best < 0 || job.priority < this.queue[best].priority
+                    || (job.priority === this.queue[best].priority && job.seq < this.queue[best].seq)) {
+                    best = i;
+                }
+            }
+            if (best < 0) {
+                return;
+            }
+            const [job] = this.queue.splice(best, 1);
+            this.start(job);
+        }
+    }
+
+    private start(job: Job): void {
+        const background = job.priority === PRIORITY_ORDER.background;
+        job.started = true;
+        this.running++;
+        if (background) {
+            this.runningBackground++;
+        }
+
+        const finish = (settle: (ticket: Ticket) => void) => {
+            this.running--;
+            if (background) {
+                this.runningBackground--;
+            }
+            if (job.key && this.inflight.get(job.key) === job) {
+                this.inflight.delete(job.key);
+            }
+            job.source.dispose();
+            for (const ticket of job.tickets) {
+                ticket.done = true;
+                settle(ticket);
+            }
+            job.tickets.clear();
+            this.pump();
+        };
+
+        job.run(job.source.token).then(
+            (value) => {
+                if (job.key && !job.source.token.isCancellationRequested && !isFailure(value)) {
+                    this.store(job.key, job.file, value);
+                }
+                // 合并执行的多个等待者各自拿到一份结果，互不影响
+                let shared = true;
+                finish(ticket => {
+                    ticket.resolve!(shared ? value : structuredClone(value));
+                    shared = false;
+                });
+            },
+            (error) => {
+                const reason = error instanceof Error ? error : new Error(String(error));
+                finish(ticket => ticket.reject!(reason));
+            }
+        );
+    }
+
+    private store(key: string, file: string | undefined, value: unknown): void {
+        const size = estimateSize(value);
+        if (size > this.maxCacheBytes * MAX_ENTRY_FRACTION) {
+            return;
+        }
+        const previous = this.cache.get(key);
+        if (previous) {
+            this.cache.delete(key);
+            this.cacheBytes -= previous.size;
+        }
+        // 保存副本：首个调用方拿到的原对象可能被修改
+        this.cache.set(key, { file, value: structuredClone(value), size });
+        this.cacheBytes += size;
+        this.evict();
+    }
+
+    private evict(): void {
+        while (this.cacheBytes > this.maxCacheBytes && this.cache.size > 0) {
+            const [key, entry] = this.cache.entries().next().value as [string, CacheEntry];
+            this.cache.delete(key);
+            this.cacheBytes -= entry.size;
+        }
+    }
+
+    /**
+     * 缓存键：文件标识（路径、大小、修改时间、inode）+ 命令 + 参数
+     * 压缩包成员以所在压缩包的标识为准；分片检查点的索引文件附上各分片的标识，原地改写分片后不再命中；
+     * 无法读取文件状态时返回 null，不缓存
+     */
+    private async cacheKey(command: string, args: object, file?: string): Promise<string | null> {
+        let identity = '';
+        if (file) {
+            const member = splitArchiveMemberPath(file);
+            const resolved = path.resolve(member ? member.archivePath : file);
+            try {
+                identity = statIdentity(await fs.promises.stat(resolved));
+                if (!member && isSafetensorsIndex(resolved)) {
+                    for (const shard of await this.shardsOf(resolved, identity)) {
+                        identity += `\u0000${statIdentity(await fs.promises.stat(shard))}`;
+                    }
+                }
+            } catch {
+                return null;
+            }
+        }
+        return `${identity}\u0000${command}\u0000${JSON.stringify(args)}`;
+    }
+
+    /**
+     * 索引文件 weight_map 引用的分片（去重、排序后的绝对路径），索引文件未变时复用上次的解析结果
+     */
+    private async shardsOf(indexPath: string, identity: string): Promise<string[]> {
+        const known = this.indexShards.get(indexPath);
+        if (known && known.identity === identity) {
+            return known.shards;
+        }
+        const index = JSON.parse(await fs.promises.readFile(indexPath, 'utf8'));
+        const directory = path.dirname(indexPath);
+        const shards = [...new Set(Object.values<string>(index.weight_map ?? {}))]
+            .map(shard => path.resolve(directory, shard))
+            .sort();
+        this.indexShards.set(indexPath, { identity, shards });
+        return shards;
+    }
+}
+
+function statIdentity(stat: fs.Stats): string {
+    return `${stat.size}\u0000${stat.mtimeMs}\u0000${stat.ino}`;
+}
+
+function cancelled(reason: string): CancelledResult {
+    return { error: reason, cancelled: true };
+}
+
+/**
+ * 错误与取消以 { error } 对象返回，这类结果不缓存
+ */
+function isFailure(value: unknown): boolean {
+    return !!value && typeof value === 'object' && !Array.isArray(value)
+        && (value as { error?: unknown }).error !== undefined;
+}
+
+/**
+ * 粗略估计结果占用的内存：二进制载荷按字节数，字符串按 UTF-16，其余按固定开销
+ */
+function estimateSize(value: unknown): number {
+    let size = 0;
+    const stack: unknown[] = [value];
+    while (stack.length) {
+        const item = stack.pop();
+        if (typeof item === 'string') {
+            size += 16 + item.length * 2;
+        } else if (item instanceof ArrayBuffer) {
+            size += item.byteLength;
+        } else if (ArrayBuffer.isView(item)) {
+            size += item.byteLength;
+        } else if (Array.isArray(item)) {
+            size += 16 + item.length * 8;
+            for (const element of item) {
+                stack.push(element);
+            }
+        } else if (item && typeof item === 'object') {
+            const values = Object.values(item);
+            size += 16 + values.length * 16;
+            for (const element of values) {
+                stack.push(element);
+            }
+        } else {
+            size += 8;
+        }
+    }
+    return size;
+}
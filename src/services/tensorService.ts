@@ -4,10 +4,12 @@
  */
 import * as vscode from 'vscode';
 import * as path from 'path';
-import * as fs from 'fs';
-import { spawn } from 'child_process';
-import { TensorData, TensorInfo, SearchResult, PlotData } from '../types';
+import { TensorData, TensorInfo, TensorWindow, SearchResult, SearchOptions, PlotData, HistogramOptions, HistogramResult, WorkerTelemetry, IndexedHeader, DiffResult, CheckpointChildren, TensorItem } from '../types';
 import { DependencyChecker } from './dependencyChecker';
+import { PythonWorker, RequestOptions } from './pythonWorker';
+import { RequestScheduler, ScheduleOptions } from './requestScheduler';
+import { DiagnosticsLog } from './diagnosticsLog';
+import { splitArchiveMemberPath } from '../utils';
 
 export class TensorService {
     private scriptPath: string;
@@ -23,10 +25,61 @@ export class TensorService {
     }
 
     /**
-     * 加载张量文件
+     * 取消 owner（编辑器或视图）发出的未完成请求；指定 slot 时只取消该槽位上的请求
      */
-    async loadTensor(filePath: string): Promise<TensorData> {
-        return this.runPythonScript('load', { file: filePath });
+    cancelRequests(owner: string, slot?: string): void {
+        RequestScheduler.getInstance().cancel(owner, slot);
+    }
+
+    /**
+     * 丢弃文件的缓存结果，下次请求重新从文件读取
+     */
+    invalidate(filePath: string): void {
+        RequestScheduler.getInstance().invalidate(filePath);
+    }
+
+    /**
+     * 列出检查点树中一个节点的一页子节点（只含元数据与子树汇总），path 为空时列出根节点
+     * 请求被取消时返回 null
+     */
+    async listChildren(
+        filePath: string,
+        nodePath: string[] = [],
+        offset: number = 0,
+        limit?: number,
+        schedule: ScheduleOptions = {}
+    ): Promise<CheckpointChildren | null> {
+        const result = await this.runPythonScript<CheckpointChildren & { error?: string; cancelled?: boolean }>('children', {
+            file: filePath,
+            path: nodePath,
+            offset: offset,
+            limit: limit
+        }, { ...schedule, cacheable: true });
+        if (result?.cancelled) {
+            return null;
+        }
+        if (result?.error) {
+            throw new Error(result.error);
+        }
+        return result;
+    }
+
+    /**
+     * 获取单个张量的信息、统计与预览，选中张量时按需计算
+     * 请求被取消（如已选中其他张量）时返回 null
+     */
+    async describeTensor(filePath: string, key: string, schedule: ScheduleOptions = {}): Promise<TensorItem | null> {
+        const result = await this.runPythonScript<TensorItem & { error?: string; cancelled?: boolean }>('describe', {
+            file: filePath,
+            key: key
+        }, { ...schedule, cacheable: true });
+        if (result?.cancelled) {
+            return null;
+        }
+        if (result?.error) {
+            throw new Error(result.error);
+        }
+        return result;
     }
 
     /**
@@ -35,14 +88,18 @@ export class TensorService {
     async search(
         filePath: string,
         query: string,
-        options: { regex: boolean; caseSensitive: boolean }
+        options: SearchOptions,
+        schedule: ScheduleOptions = {}
     ): Promise<SearchResult[]> {
         return this.runPythonScript('search', {
             file: filePath,
             query: query,
             regex: options.regex,
-            caseSensitive: options.caseSensitive
-        });
+            caseSensitive: options.caseSensitive,
+            tolerance: options.tolerance,
+            maxResults: options.maxResults,
+            countAll: options.countAll
+        }, { ...schedule, cacheable: true });
     }
 
     /**
@@ -50,12 +107,13 @@ export class TensorService {
      */
     async filter(
         filePath: string,
-        filter: { key?: string; shape?: number[]; dtype?: string }
+        filter: { key?: string; shape?: number[]; dtype?: string },
+        schedule: ScheduleOptions = {}
     ): Promise<TensorData> {
         return this.runPythonScript('filter', {
             file: filePath,
             ...filter
-        });
+        }, { ...schedule, cacheable: true });
     }
 
     /**
@@ -63,72 +121,206 @@ export class TensorService {
      */
     async preparePlotData(
         filePath: string,
-        plotConfig: { type: string; keys: string[]; options: Record<string, unknown> }
+        plotConfig: { type: string; keys: string[]; options: Record<string, unknown> },
+        schedule: ScheduleOptions = {}
     ): Promise<PlotData> {
         return this.runPythonScript('plot', {
             file: filePath,
             ...plotConfig
-        });
+        }, { ...schedule, cacheable: true });
     }
 
     /**
      * 导出数据
+     * Python 端分块流式写出，通知栏显示进度并可取消；返回 false 表示用户取消了保存或导出
      */
-    async exportData(filePath: string, key: string, format: string): Promise<void> {
+    async exportData(filePath: string, key: string, format: string): Promise<boolean> {
+        // 压缩包内的张量默认导出到压缩包所在目录
+        const member = splitArchiveMemberPath(filePath);
+        const basePath = member
+            ? path.join(path.dirname(member.archivePath), path.basename(member.entryPath))
+            : filePath;
         const saveUri = await vscode.window.showSaveDialog({
             filters: this.getExportFilters(format),
             defaultUri: vscode.Uri.file(
-                filePath.replace(/\.(npz|npy|pt|pth)$/, `_${key}.${format}`)
+                basePath.replace(/\.(npz|npy|pt|pth|safetensors|safetensors\.index\.json|h5|hdf5)$/, `_${key}.${format}`)
             )
         });
 
         if (!saveUri) {
-            return;
+            return false;
         }
 
-        await this.runPythonScript('export', {
-            file: filePath,
-            key: key,
-            format: format,
-            output: saveUri.fsPath
+        const result = await vscode.window.withProgress({
+            location: vscode.ProgressLocation.Notification,
+            title: `正在导出 ${key} 为 ${format.toUpperCase()}`,
+            cancellable: true
+        }, (progress, token) => {
+            let reported = 0;
+            return this.runPythonScript<{ error?: string; cancelled?: boolean }>('export', {
+                file: filePath,
+                key: key,
+                format: format,
+                output: saveUri.fsPath
+            }, {
+                token,
+                onProgress: ({ done, total }) => {
+                    const percent = total > 0 ? Math.floor(done / total * 100) : 100;
+                    progress.report({ increment: percent - reported, message: `${percent}%` });
+                    reported = percent;
+                }
+            });
+        });
+
+        if (result?.cancelled) {
+            return false;
+        }
+        if (result?.error) {
+            throw new Error(result.error);
+        }
+        return true;
+    }
+
+    /**
+     * 选择另一个张量文件并与当前文件逐键比较；两侧张量按块流式读取，进度以已比较的元素数计
+     * 取消选择或取消比较时返回 null
+     */
+    async compareWith(filePath: string): Promise<DiffResult | null> {
+        const member = splitArchiveMemberPath(filePath);
+        const picked = await vscode.window.showOpenDialog({
+            canSelectMany: false,
+            openLabel: '比较',
+            defaultUri: vscode.Uri.file(path.dirname(member ? member.archivePath : filePath)),
+            filters: { '张量文件': ['npz', 'npy', 'pt', 'pth', 'safetensors', 'json', 'h5', 'hdf5'] }
         });
+        if (!picked || picked.length === 0) {
+            return null;
+        }
+        const otherPath = picked[0].fsPath;
+
+        const result = await vscode.window.withProgress({
+            location: vscode.ProgressLocation.Notification,
+            title: `正在比较 ${path.basename(filePath)} 与 ${path.basename(otherPath)}`,
+            cancellable: true
+        }, (progress, token) => {
+            let reported = 0;
+            return this.runPythonScript<DiffResult & { error?: string; cancelled?: boolean }>('diff', {
+                fileA: filePath,
+                fileB: otherPath
+            }, {
+                token,
+                onProgress: ({ done, total }) => {
+                    const percent = total > 0 ? Math.floor(done / total * 100) : 100;
+                    progress.report({ increment: percent - reported, message: `${percent}%` });
+                    reported = percent;
+                }
+            });
+        });
+
+        if (result?.cancelled) {
+            return null;
+        }
+        if (result?.error) {
+            throw new Error(result.error);
+        }
+        return result;
     }
 
     /**
      * 获取张量信息（不加载完整数据）
      */
     async getTensorInfo(filePath: string): Promise<TensorInfo[]> {
-        return this.runPythonScript('info', { file: filePath });
+        return this.runPythonScript('info', { file: filePath }, { cacheable: true });
+    }
+
+    /**
+     * 批量读取文件头元数据，供工作区索引使用；单个文件的失败记录在对应结果的 error 中
+     * 以后台优先级执行，不占用为交互请求保留的并发
+     */
+    async indexHeaders(files: string[], token?: vscode.CancellationToken): Promise<IndexedHeader[]> {
+        return this.runPythonScript('indexHeaders', { files }, { token, priority: 'background' });
     }
 
     /**
      * 获取张量切片
+     * 结果过大时 Python 端沿第0维分页，返回 SlicePage，offset 指定起始行
      */
     async getSlice(
         filePath: string,
         key: string,
-        sliceSpec: string
+        sliceSpec: string,
+        offset: number = 0,
+        schedule: ScheduleOptions = {}
     ): Promise<unknown> {
         return this.runPythonScript('slice', {
             file: filePath,
             key: key,
-            slice: sliceSpec
-        });
+            slice: sliceSpec,
+            offset: offset
+        }, { ...schedule, cacheable: true });
+    }
+
+    /**
+     * 获取张量二维视图中的一个矩形窗口（按需从文件读取）
+     */
+    async getWindow(
+        filePath: string,
+        key: string,
+        rowStart: number,
+        rowCount: number,
+        colStart: number,
+        colCount: number,
+        index?: number[],
+        schedule: ScheduleOptions = {}
+    ): Promise<TensorWindow> {
+        return this.runPythonScript('window', {
+            file: filePath,
+            key: key,
+            rowStart: rowStart,
+            rowCount: rowCount,
+            colStart: colStart,
+            colCount: colCount,
+            index: index
+        }, { ...schedule, cacheable: true });
+    }
+
+    /**
+     * 计算检查点树中一个节点下每个张量的直方图（服务端并行分块分箱，只返回分箱边界和计数）
+     * 不支持的张量（如非数值类型）在结果中带 error
+     */
+    async getHistograms(
+        filePath: string,
+        nodePath: string[],
+        options: HistogramOptions = {},
+        schedule: ScheduleOptions = {}
+    ): Promise<HistogramResult[]> {
+        return this.runPythonScript('histogram', {
+            file: filePath,
+            path: nodePath,
+            ...options
+        }, { ...schedule, cacheable: true });
     }
 
     /**
      * 保存编辑的单元格
+     * row/col 为二维视图中的坐标，index 为高维张量前 ndim-2 维的索引
      */
     async saveEdits(
         filePath: string,
         key: string,
-        changes: Array<{ row: number; col: number; value: string }>
+        changes: Array<{ row: number; col: number; value: string }>,
+        index?: number[]
     ): Promise<any> {
-        return await this.runPythonScript('save', {
-            file: filePath,
-            key: key,
-            changes: changes
-        });
+        try {
+            return await this.runPythonScript('save', {
+                file: filePath,
+                key: key,
+                changes: changes,
+                index: index
+            });
+        } finally {
+            this.invalidate(filePath);
+        }
     }
 
     private getExportFilters(format: string): { [name: string]: string[] } {
@@ -142,113 +334,76 @@ export class TensorService {
         return filters[format] || { 'All': ['*'] };
     }
 
-    private async runPythonScript<T>(command: string, args: object): Promise<T> {
-        const pythonPath = await this.getPythonPath();
-        const argsStr = JSON.stringify(args);
-        const timestamp = new Date().toISOString().replace(/[:.]/g, '-');
-        const logDir = path.join(this.context.extensionPath, 'logs');
-        const logFile = path.join(logDir, `python_${command}_${timestamp}.log`);
-        
-        // 确保日志目录存在
-        if (!fs.existsSync(logDir)) {
-            fs.mkdirSync(logDir, { recursive: true });
-        }
-        
-        console.log(`执行Python脚本: ${pythonPath} ${this.scriptPath} ${command} ${argsStr.substring(0, 100)}`);
-        console.log(`日志文件: ${logFile}`);
-        
-        // 写入日志文件头部
-        const logHeader = `=== Python脚本执行日志 ===
-时间: ${new Date().toISOString()}
-命令: ${command}
-参数: ${argsStr}
-Python路径: ${pythonPath}
-脚本路径: ${this.scriptPath}
-
-=== 输出 ===
-`;
-        fs.writeFileSync(logFile, logHeader, 'utf8');
-        
-        return new Promise((resolve, reject) => {
-            const proc = spawn(pythonPath, [
-                this.scriptPath,
-                command,
-                argsStr
-            ], {
-                env: {
-                    ...process.env,
-                    PYTHONIOENCODING: 'utf-8'  // 强制 Python 使用 UTF-8 输出
-                }
-            });
+    /**
+     * 工作进程环境变量：统计缓存存放在插件的全局存储目录下，并行线程数与内存预算来自设置
+     */
+    private getWorkerEnv(): NodeJS.ProcessEnv {
+        const config = vscode.workspace.getConfiguration('tensorLens');
+        return {
+            TENSORLENS_CACHE_DIR: path.join(this.context.globalStorageUri.fsPath, 'cache'),
+            TENSORLENS_CACHE_MAX_MB: String(config.get<number>('cacheMaxSizeMB', 256)),
+            TENSORLENS_WORKERS: String(config.get<number>('workerThreads', 0)),
+            TENSORLENS_MEMORY_BUDGET_MB: String(config.get<number>('memoryBudgetMB', 2048)),
+            TENSORLENS_HDF5_CACHE_MB: String(config.get<number>('hdf5ChunkCacheMB', 256))
+        };
+    }
 
-            let stdout = '';
-            let stderr = '';
+    /**
+     * 经请求调度器排队后执行命令：按优先级出队，可被取代或取消，只读命令合并相同请求并缓存结果
+     */
+    private runPythonScript<T>(command: string, args: object, options: RequestOptions & ScheduleOptions = {}): Promise<T> {
+        return RequestScheduler.getInstance().schedule<T>(command, args, options, (token) => this.execute<T>(command, args, {
+            onProgress: options.onProgress,
+            token
+        }));
+    }
 
-            // 设置编码为 UTF-8
-            proc.stdout.setEncoding('utf8');
-            proc.stderr.setEncoding('utf8');
+    /**
+     * 通过常驻工作进程执行命令，并把耗时与遥测记录到诊断视图的环形缓冲区
+     */
+    private async execute<T>(command: string, args: object, options: RequestOptions = {}): Promise<T> {
+        const pythonPath = await this.getPythonPath();
+        console.log(`执行Python命令: ${pythonPath} ${this.scriptPath} ${command} ${JSON.stringify(args).substring(0, 100)}`);
 
-            proc.stdout.on('data', (data) => {
-                const text = data.toString();
-                stdout += text;
-                // 追加到日志文件
-                fs.appendFileSync(logFile, text, 'utf8');
-            });
+        const diagnostics = DiagnosticsLog.getInstance();
+        const file = (args as { file?: string }).file;
+        const startedAt = Date.now();
+        let telemetry: WorkerTelemetry | undefined;
 
-            proc.stderr.on('data', (data) => {
-                const text = data.toString();
-                stderr += text;
-                // 追加到日志文件
-                fs.appendFileSync(logFile, `[STDERR] ${text}`, 'utf8');
+        // 请求通过常驻工作进程执行，避免每次重新启动解释器和导入 numpy/torch
+        const worker = PythonWorker.get(pythonPath, this.scriptPath, this.getWorkerEnv());
+        try {
+            const result = await worker.request<T>(command, args, {
+                ...options,
+                onTelemetry: (value) => { telemetry = value; }
             });
-
-            proc.on('close', (code) => {
-                // 写入日志文件尾部
-                const logFooter = `\n=== 执行完成 ===
-退出码: ${code}
-STDOUT长度: ${stdout.length} 字节
-STDERR长度: ${stderr.length} 字节
-`;
-                fs.appendFileSync(logFile, logFooter, 'utf8');
-                
-                console.log(`Python脚本执行完成，日志已保存: ${logFile}`);
-                
-                // 先尝试解析 stdout
-                if (stdout.trim()) {
-                    try {
-                        const result = JSON.parse(stdout);
-                        // 如果有 error 字段，返回该对象（而不是 reject）
-                        if (result && typeof result === 'object' && 'error' in result) {
-                            console.log('检测到 Python 返回的错误信息:', result.error);
-                            resolve(result as T);
-                            return;
-                        }
-                        // 正常的成功响应
-                        if (code === 0) {
-                            resolve(result);
-                            return;
-                        }
-                    } catch (parseErr) {
-                        // JSON 解析失败
-                        if (code === 0) {
-                            const error = `解析Python输出失败: ${stdout.substring(0, 200)}... (完整输出见日志文件)`;
-                            console.error(error);
-                            reject(new Error(error));
-                            return;
-                        }
-                    }
-                }
-                
-                // 如果运行到这里，说明退出码不为0且没有有效的 JSON 输出
-                const error = `Python脚本退出码: ${code}, 错误: ${stderr.substring(0, 200)}... (完整输出见日志文件)`;
-                console.error(error);
-                reject(new Error(error));
+            // 错误与取消以 { error, cancelled } 对象返回
+            const failure = result && typeof result === 'object' && !Array.isArray(result)
+                ? result as unknown as { error?: string; cancelled?: boolean }
+                : undefined;
+            diagnostics.record({
+                command,
+                file,
+                startedAt,
+                durationMs: Date.now() - startedAt,
+                status: failure?.cancelled ? 'cancelled' : failure?.error !== undefined ? 'error' : 'ok',
+                error: failure?.error,
+                telemetry
             });
-
-            proc.on('error', (error) => {
-                fs.appendFileSync(logFile, `\n[ERROR] ${error.message}`, 'utf8');
-                reject(new Error(`启动Python失败: ${error.message}`));
+            return result;
+        } catch (error) {
+            const message = error instanceof Error ? error.message : String(error);
+            diagnostics.record({
+                command,
+                file,
+                startedAt,
+                durationMs: Date.now() - startedAt,
+                status: 'error',
+                error: message,
+                telemetry
             });
-        });
+            console.error(message);
+            throw new Error(message);
+        }
     }
 }
@@ -0,0 +1,588 @@
+/**
+ * 工作区文件索引
+ * 后台并发遍历工作区（遵循忽略规则）找出张量文件与压缩包，张量文件通过 Python 工作进程只读取文件头，
+ * 得到张量数量、dtype、形状与字节数；索引持久化到插件存储目录，之后由文件监视事件增量更新。
+ * 侧边栏的分页、排序和过滤都直接查询内存中的索引，不再重新扫描工作区
+ */
+import * as vscode from 'vscode';
+import * as path from 'path';
+import * as fs from 'fs';
+import * as crypto from 'crypto';
+import { TensorService } from './tensorService';
+import { isTensorFile, isArchiveFile } from '../utils';
+import {
+    IndexedHeader,
+    WorkspaceFileEntry,
+    WorkspaceFileKind,
+    WorkspaceFilePage,
+    WorkspaceFileQuery
+} from '../types';
+
+const INDEX_VERSION = 1;
+const CRAWL_CONCURRENCY = 8;      // 同时读取的目录数
+const HEADER_BATCH_SIZE = 16;     // 每次请求 Python 读取文件头的文件数
+const SAVE_DELAY_MS = 2000;       // 索引变化后延迟写盘，合并连续的变化
+const CHANGE_DELAY_MS = 300;      // 合并连续的变化通知，避免侧边栏频繁刷新
+
+// 始终跳过的目录（另外所有以 . 开头的目录也会跳过）
+const ALWAYS_SKIPPED_DIRECTORIES = ['node_modules'];
+
+interface PersistedIndex {
+    version: number;
+    root: string;
+    files: WorkspaceFileEntry[];
+}
+
+export class WorkspaceIndex implements vscode.Disposable {
+    private files = new Map<string, WorkspaceFileEntry>();
+    private pendingHeaders = new Set<string>();   // 等待读取文件头的张量文件
+    private headerBatch = 0;                      // 正在读取文件头的文件数
+    private headerCancellation: vscode.CancellationTokenSource | null = null;
+    private scanning: Promise<void> | null = null;
+    private rescanRequested = false;
+    private excludes: RegExp[] = [];
+    private saveTimer: NodeJS.Timeout | null = null;
+    private changeTimer: NodeJS.Timeout | null = null;
+    private disposed = false;
+    private disposables: vscode.Disposable[] = [];
+    private readonly storageFile: string;
+    private readonly collator = new Intl.Collator(undefined, { numeric: true, sensitivity: 'base' });
+    private readonly changed = new vscode.EventEmitter<void>();
+    readonly onDidChange: vscode.Event<void> = this.changed.event;
+
+    constructor(
+        private readonly root: string,
+        storageDir: string,
+        private readonly tensorService: TensorService
+    ) {
+        const key = crypto.createHash('sha1').update(path.resolve(root)).digest('hex');
+        this.storageFile = path.join(storageDir, `${key}.json`);
+    }
+
+    /**
+     * 加载持久化的索引并立即可查询，然后在后台重新扫描核对，并开始监视文件变化
+     */
+    start(): void {
+        this.loadExcludes();
+
+        const watcher = vscode.workspace.createFileSystemWatcher(new vscode.RelativePattern(this.root, '**/*'));
+        this.disposables.push(
+            watcher,
+            watcher.onDidCreate(uri => this.handleCreate(uri.fsPath)),
+            watcher.onDidChange(uri => this.handleUpdate(uri.fsPath)),
+            watcher.onDidDelete(uri => this.handleDelete(uri.fsPath)),
+            vscode.workspace.onDidChangeConfiguration(event => {
+                if (event.affectsConfiguration('tensorLens.indexExclude') || event.affectsConfiguration('files.exclude')) {
+                    this.loadExcludes();
+                    this.rescan();
+                }
+            })
+        );
+
+        this.load()
+            .then(() => this.rescan())
+            .catch(error => console.error(`工作区索引初始化失败: ${error}`));
+    }
+
+    /**
+     * 重新遍历工作区并与索引核对：删除已不存在的文件，大小或修改时间变化的文件重新读取文件头
+     * 扫描进行中再次调用时，在本次扫描结束后再扫描一次
+     */
+    rescan(): Promise<void> {
+        if (this.scanning) {
+            this.rescanRequested = true;
+            return this.scanning;
+        }
+        this.scanning = this.runScan().finally(() => {
+            this.scanning = null;
+            this.notifyChanged();
+            if (this.rescanRequested && !this.disposed) {
+                this.rescanRequested = false;
+                this.rescan();
+            }
+        });
+        this.notifyChanged();
+        return this.scanning;
+    }
+
+    /**
+     * 按条件过滤、排序并返回一页文件
+     */
+    query(query: WorkspaceFileQuery): WorkspaceFilePage {
+        const text = query.text?.trim().toLowerCase();
+        const shape = query.shape ? parseShapePattern(query.shape) : null;
+        const dtypes = new Set<string>();
+        const matched: WorkspaceFileEntry[] = [];
+
+        for (const entry of this.files.values()) {
+            if (entry.kind !== query.kind) {
+                continue;
+            }
+            entry.dtypes?.forEach(dtype => dtypes.add(dtype));
+            if (text && !path.relative(this.root, entry.path).toLowerCase().includes(text)) {
+                continue;
+            }
+            if (query.dtype && !entry.dtypes?.includes(query.dtype)) {
+                continue;
+            }
+            if (shape && !entry.shapes?.some(dims => matchShape(shape, dims))) {
+                continue;
+            }
+            if (query.minSize !== undefined && entry.size < query.minSize) {
+                continue;
+            }
+            if (query.maxSize !== undefined && entry.size > query.maxSize) {
+                continue;
+            }
+            matched.push(entry);
+        }
+
+        const compare = this.comparator(query.sortBy || 'name');
+        const sign = query.descending ? -1 : 1;
+        matched.sort((a, b) => sign * compare(a, b) || this.collator.compare(a.path, b.path));
+
+        const offset = Math.max(0, Math.min(query.offset, matched.length));
+        return {
+            files: matched.slice(offset, offset + query.limit),
+            offset,
+            total: matched.length,
+            dtypes: Array.from(dtypes).sort(),
+            progress: this.getProgress()
+        };
+    }
+
+    dispose(): void {
+        this.disposed = true;
+        this.headerCancellation?.cancel();
+        this.pendingHeaders.clear();
+        if (this.changeTimer) {
+            clearTimeout(this.changeTimer);
+        }
+        if (this.saveTimer) {
+            clearTimeout(this.saveTimer);
+            this.saveTimer = null;
+            this.save().catch(() => undefined);
+        }
+        this.disposables.forEach(disposable => disposable.dispose());
+        this.changed.dispose();
+    }
+
+    // ========== 扫描 ==========
+
+    private async runScan(): Promise<void> {
+        const found = new Map<string, WorkspaceFileEntry>();
+        await this.crawl(this.root, found);
+        if (this.disposed) {
+            return;
+        }
+
+        for (const file of Array.from(this.files.keys())) {
+            if (!found.has(file)) {
+                this.files.delete(file);
+                this.pendingHeaders.delete(file);
+            }
+        }
+        for (const entry of found.values()) {
+            this.upsert(entry);
+        }
+        this.scheduleSave();
+        this.pumpHeaders();
+    }
+
+    /**
+     * 从 start 开始遍历目录树，最多同时读取 CRAWL_CONCURRENCY 个目录
+     */
+    private crawl(start: string, found: Map<string, WorkspaceFileEntry>): Promise<void> {
+        const queue = [start];
+        let active = 0;
+        return new Promise<void>(resolve => {
+            const next = () => {
+                if (queue.length === 0 && active === 0) {
+                    resolve();
+                    return;
+                }
+                while (active < CRAWL_CONCURRENCY && queue.length > 0 && !this.disposed) {
+                    const dir = queue.pop()!;
+                    active++;
+                    this.readDirectory(dir, queue, found).finally(() => {
+                        active--;
+                        next();
+                    });
+                }
+                if (this.disposed && active === 0) {
+                    resolve();
+                }
+            };
+            next();
+        });
+    }
+
+    private async readDirectory(dir: string, queue: string[], found: Map<string, WorkspaceFileEntry>): Promise<void> {
+        let entries: fs.Dirent[];
+        try {
+            entries = await fs.promises.readdir(dir, { withFileTypes: true });
+        } catch {
+            // 忽略无权限访问的目录
+            return;
+        }
+
+        const stats: Promise<void>[] = [];
+        for (const entry of entries) {
+            const fullPath = path.join(dir, entry.name);
+            if (entry.isDirectory()) {
+                if (!this.isIgnored(fullPath, true)) {
+                    queue.push(fullPath);
+                }
+            } else if (entry.isFile() && this.classify(fullPath) && !this.isIgnored(fullPath, false)) {
+                stats.push(this.statEntry(fullPath).then(item => {
+                    if (item) {
+                        found.set(fullPath, item);
+                    }
+                }));
+            }
+        }
+        await Promise.all(stats);
+    }
+
+    private async statEntry(filePath: string): Promise<WorkspaceFileEntry | null> {
+        const kind = this.classify(filePath);
+        if (!kind) {
+            return null;
+        }
+        try {
+            const stat = await fs.promises.stat(filePath);
+            if (!stat.isFile()) {
+                return null;
+            }
+            return { path: filePath, name: path.basename(filePath), kind, size: stat.size, mtime: stat.mtimeMs };
+        } catch {
+            return null;
+        }
+    }
+
+    /**
+     * 写入扫描或文件事件得到的条目；文件未变化时保留已读取的元数据，变化时重新排队读取文件头
+     */
+    private upsert(entry: WorkspaceFileEntry): void {
+        const existing = this.files.get(entry.path);
+        if (existing && existing.size === entry.size && existing.mtime === entry.mtime) {
+            if (existing.kind === 'tensor' && existing.tensorCount === undefined && existing.error === undefined) {
+                this.pendingHeaders.add(existing.path);
+            }
+            return;
+        }
+        this.files.set(entry.path, entry);
+        if (entry.kind === 'tensor') {
+            this.pendingHeaders.add(entry.path);
+        }
+    }
+
+    private classify(filePath: string): WorkspaceFileKind | null {
+        if (isTensorFile(filePath)) {
+            return 'tensor';
+        }
+        if (isArchiveFile(filePath)) {
+            return 'archive';
+        }
+        return null;
+    }
+
+    // ========== 忽略规则 ==========
+
+    /**
+     * 忽略规则：以 . 开头的目录、node_modules、files.exclude 中启用的模式和 tensorLens.indexExclude
+     */
+    private loadExcludes(): void {
+        const patterns = vscode.workspace.getConfiguration('tensorLens').get<string[]>('indexExclude', []).slice();
+        const filesExclude = vscode.workspace.getConfiguration('files').get<Record<string, boolean>>('exclude', {});
+        for (const [pattern, enabled] of Object.entries(filesExclude)) {
+            if (enabled === true) {
+                patterns.push(pattern);
+            }
+        }
+        this.excludes = patterns.map(globToRegExp);
+    }
+
+    /**
+     * 判断路径（或它的任一上级目录）是否被忽略
+     */
+    private isIgnored(fullPath: string, isDirectory: boolean): boolean {
+        const relative = path.relative(this.root, fullPath).split(path.sep).join('/');
+        if (!relative || relative.startsWith('..')) {
+            return !!relative;
+        }
+        const segments = relative.split('/');
+        for (let i = 0; i < segments.length; i++) {
+            const isDir = i < segments.length - 1 || isDirectory;
+            if (isDir && (segments[i].startsWith('.') || ALWAYS_SKIPPED_DIRECTORIES.includes(segments[i]))) {
+                return true;
+            }
+            const prefix = segments.slice(0, i + 1).join('/');
+            if (this.excludes.some(re => re.test(prefix) || (isDir && re.test(`${prefix}/`)))) {
+                return true;
+            }
+        }
+        return false;
+    }
+
+    // ========== 文件监视 ==========
+
+    private async handleCreate(filePath: string): Promise<void> {
+        let stat: fs.Stats;
+        try {
+            stat = await fs.promises.stat(filePath);
+        } catch {
+            return;
+        }
+        if (stat.isDirectory()) {
+            // 新建或移入的目录，其中的文件不一定逐个产生事件
+            if (this.isIgnored(filePath, true)) {
+                return;
+            }
+            const found = new Map<string, WorkspaceFileEntry>();
+            await this.crawl(filePath, found);
+            found.forEach(entry => this.upsert(entry));
+            this.afterUpdate();
+        } else {
+            await this.handleUpdate(filePath);
+        }
+    }
+
+    private async handleUpdate(filePath: string): Promise<void> {
+        if (!this.classify(filePath) || this.isIgnored(filePath, false)) {
+            return;
+        }
+        const entry = await this.statEntry(filePath);
+        if (entry) {
+            this.upsert(entry);
+        } else {
+            this.files.delete(filePath);
+        }
+        this.afterUpdate();
+    }
+
+    private handleDelete(filePath: string): void {
+        // 删除的可能是目录，同时移除其下的所有条目
+        const prefix = filePath + path.sep;
+        let removed = false;
+        for (const file of Array.from(this.files.keys())) {
+            if (file === filePath || file.startsWith(prefix)) {
+                this.files.delete(file);
+                this.pendingHeaders.delete(file);
+                removed = true;
+            }
+        }
+        if (removed) {
+            this.afterUpdate();
+        }
+    }
+
+    private afterUpdate(): void {
+        this.scheduleSave();
+        this.notifyChanged();
+        this.pumpHeaders();
+    }
+
+    // ========== 文件头元数据 ==========
+
+    /**
+     * 分批请求 Python 读取排队文件的文件头；同一时间只有一批在处理，不占满工作进程
+     * Python 不可用时清空队列，下次重新扫描时再尝试
+     */
+    private async pumpHeaders(): Promise<void> {
+        if (this.headerCancellation || this.disposed) {
+            return;
+        }
+        const cancellation = new vscode.CancellationTokenSource();
+        this.headerCancellation = cancellation;
+        try {
+            while (this.pendingHeaders.size > 0 && !this.disposed) {
+                const batch = Array.from(this.pendingHeaders).slice(0, HEADER_BATCH_SIZE);
+                batch.forEach(file => this.pendingHeaders.delete(file));
+                // 记录请求时的条目，文件在读取期间被修改或删除时丢弃过时的结果
+                const requested = new Map<string, WorkspaceFileEntry | undefined>(batch.map(file => [file, this.files.get(file)]));
+                this.headerBatch = batch.length;
+
+                let results: IndexedHeader[] | { error?: string };
+                try {
+                    results = await this.tensorService.indexHeaders(batch, cancellation.token);
+                } catch (error) {
+                    results = { error: error instanceof Error ? error.message : String(error) };
+                }
+                if (!Array.isArray(results)) {
+                    if (!cancellation.token.isCancellationRequested) {
+                        console.error(`读取张量文件头失败: ${results.error}`);
+                    }
+                    this.pendingHeaders.clear();
+                    break;
+                }
+
+                for (const header of results) {
+                    const entry = this.files.get(header.file);
+                    if (!entry || entry !== requested.get(header.file)) {
+                        continue;
+                    }
+                    if (header.error !== undefined) {
+                        entry.error = header.error;
+                    } else {
+                        entry.tensorCount = header.tensorCount;
+                        entry.elements = header.elements;
+                        entry.nbytes = header.nbytes;
+                        entry.dtypes = header.dtypes;
+                        entry.shapes = header.shapes;
+                    }
+                }
+                this.scheduleSave();
+                this.notifyChanged();
+            }
+        } finally {
+            this.headerBatch = 0;
+            this.headerCancellation = null;
+            cancellation.dispose();
+            this.notifyChanged();
+        }
+    }
+
+    private getProgress(): WorkspaceFilePage['progress'] {
+        let count = 0;
+        let indexed = 0;
+        for (const entry of this.files.values()) {
+            if (entry.kind === 'tensor') {
+                count++;
+                if (entry.tensorCount !== undefined || entry.error !== undefined) {
+                    indexed++;
+                }
+            }
+        }
+        return {
+            scanning: this.scanning !== null,
+            pending: this.pendingHeaders.size + this.headerBatch,
+            indexed,
+            count
+        };
+    }
+
+    // ========== 排序 ==========
+
+    private comparator(sortBy: string): (a: WorkspaceFileEntry, b: WorkspaceFileEntry) => number {
+        switch (sortBy) {
+            case 'path':
+                return (a, b) => this.collator.compare(a.path, b.path);
+            case 'size':
+                return (a, b) => a.size - b.size;
+            case 'mtime':
+                return (a, b) => a.mtime - b.mtime;
+            case 'tensorCount':
+                // 没有元数据的文件排在最前（降序时最后）
+                return (a, b) => (a.tensorCount ?? -1) - (b.tensorCount ?? -1);
+            default:
+                return (a, b) => this.collator.compare(a.name, b.name);
+        }
+    }
+
+    // ========== 持久化 ==========
+
+    private async load(): Promise<void> {
+        try {
+            const data = JSON.parse(await fs.promises.readFile(this.storageFile, 'utf8')) as PersistedIndex;
+            if (data.version !== INDEX_VERSION || data.root !== path.resolve(this.root)) {
+                return;
+            }
+            for (const entry of data.files) {
+                this.files.set(entry.path, entry);
+            }
+            this.notifyChanged();
+        } catch {
+            // 没有持久化的索引或已损坏，由首次扫描重新建立
+        }
+    }
+
+    private async save(): Promise<void> {
+        const data: PersistedIndex = {
+            version: INDEX_VERSION,
+            root: path.resolve(this.root),
+            files: Array.from(this.files.values())
+        };
+        await fs.promises.mkdir(path.dirname(this.storageFile), { recursive: true });
+        const tmp = `${this.storageFile}.${process.pid}.tmp`;
+        await fs.promises.writeFile(tmp, JSON.stringify(data));
+        await fs.promises.rename(tmp, this.storageFile);
+    }
+
+    private scheduleSave(): void {
+        if (this.saveTimer || this.disposed) {
+            return;
+        }
+        this.saveTimer = setTimeout(() => {
+            this.saveTimer = null;
+            this.save().catch(error => console.error(`保存工作区索引失败: ${error}`));
+        }, SAVE_DELAY_MS);
+    }
+
+    private notifyChanged(): void {
+        if (this.changeTimer || this.disposed) {
+            return;
+        }
+        this.changeTimer = setTimeout(() => {
+            this.changeTimer = null;
+            this.changed.fire();
+        }, CHANGE_DELAY_MS);
+    }
+}
+
+/**
+ * 把 glob 模式转换为匹配工作区相对路径（/ 分隔）的正则，支持 **、*、? 和 {a,b}
+ */
+function globToRegExp(glob: string): RegExp {
+    let source = '';
+    let inBraces = false;
+    for (let i = 0; i < glob.length; i++) {
+        const c = glob[i];
+        if (c === '*') {
+            if (glob[i + 1] === '*') {
+                const slash = glob[i + 2] === '/';
+                source += slash ? '(?:.*/)?' : '.*';
+                i += slash ? 2 : 1;
+            } else {
+                source += '[^/]*';
+            }
+        } else if (c === '?') {
+            source += '[^/]';
+        } else if (c === '{') {
+            inBraces = true;
+            source += '(?:';
+        } else if (c === '}' && inBraces) {
+            inBraces = false;
+            source += ')';
+        } else if (c === ',' && inBraces) {
+            source += '|';
+        } else {
+            source += c.replace(/[.+^$()|[\]\\]/g, '\\$&');
+        }
+    }
+    return new RegExp(`^${source}$`);
+}
+
+/**
+ * 解析形状过滤模式："3x224x224"、"*,768"、"[2, 768]"；* 匹配任意长度的一维，单个数字表示任一维等于该值
+ */
+function parseShapePattern(pattern: string): { dims: (number | null)[]; anyDim: boolean } | null {
+    const trimmed = pattern.trim().replace(/^[[(]|[\])]$/g, '');
+    const tokens = trimmed.split(/[x×,\s]+/i).filter(token => token.length > 0);
+    if (tokens.length === 0) {
+        return null;
+    }
+    const dims = tokens.map(token => token === '*' || token === '?' ? null : Number(token));
+    if (dims.some(dim => dim !== null && !Number.isInteger(dim))) {
+        return null;
+    }
+    return { dims, anyDim: tokens.length === 1 && !/[x×,\s]/i.test(trimmed) };
+}
+
+function matchShape(pattern: { dims: (number | null)[]; anyDim: boolean }, shape: number[]): boolean {
+    if (pattern.anyDim) {
+        return pattern.dims[0] === null || shape.includes(pattern.dims[0]);
+    }
+    return pattern.dims.length === shape.length
+        && pattern.dims.every((dim, i) => dim === null || dim === shape[i]);
+}
@@ -9,29 +9,87 @@ export interface TensorInfo {
     shape: number[];
     dtype: string;
     size: number;
+    nbytes?: number;            // 数据字节数（由文件头计算）
+    compressed?: boolean;       // .npz 成员是否压缩
+    compressedSize?: number;    // .npz 成员压缩后字节数
+    chunks?: number[] | null;   // HDF5 分块形状（连续存储为 null）
+    compression?: string | null;  // HDF5 压缩过滤器（如 gzip、lzf）
+    compressionOpts?: unknown;  // HDF5 压缩参数（如 gzip 级别）
+    storageSize?: number;       // HDF5 数据集在磁盘上实际占用的字节数
+    statsDeferred?: boolean;    // 数据集过大，打开时未计算统计信息
     min?: number;
     max?: number;
     mean?: number;
     std?: number;
+    nanCount?: number;
+    infCount?: number;
+    zeroCount?: number;
+    quantiles?: Record<string, number>;  // 近似分位数，键为分位点（如 "0.5"）
 }
 
 export interface TensorData {
     file: string;
-    fileType: 'npz' | 'npy' | 'pt' | 'pth';
+    fileType: 'npz' | 'npy' | 'pt' | 'pth' | 'safetensors' | 'hdf5';
     tensors: TensorItem[];
     totalSize: number;
 }
 
+/**
+ * 二进制数组载荷：Python 端以原始小端字节发送，前端通过 TypedArray 读取
+ */
+export interface BinaryArrayPayload {
+    __binary__: true;
+    dtype: string;
+    shape: number[];
+    strides: number[];
+    buffer: ArrayBuffer;
+}
+
 export interface TensorItem {
     key: string;
     info: TensorInfo;
-    preview?: unknown[][];  // 预览数据（前N行）
+    preview?: unknown[][] | BinaryArrayPayload;  // 预览数据（前N行）
     fullData?: unknown;     // 完整数据（按需加载）
 }
 
+/**
+ * 张量二维视图中的一个矩形窗口
+ */
+export interface TensorWindow {
+    key: string;
+    rows: number;       // 二维视图总行数
+    cols: number;       // 二维视图总列数
+    rowStart: number;
+    colStart: number;
+    data: unknown[][] | BinaryArrayPayload;
+}
+
+/**
+ * 分页的切片结果：完整结果超过大小上限时只返回从 offset 开始的 count 行
+ */
+export interface SlicePage {
+    paged: true;
+    shape: number[];    // 完整切片结果的形状
+    offset: number;
+    count: number;
+    data: unknown[][] | BinaryArrayPayload;
+}
+
 export interface SearchResult {
     key: string;
     matches: SearchMatch[];
+    totalMatches?: number;
+    query?: string;            // 解析后的数值条件描述
+    hitCount?: number;         // 数值命中数
+    hitCountExact?: boolean;   // 提前结束扫描时为 false，hitCount 为下限
+}
+
+export interface SearchOptions {
+    regex: boolean;
+    caseSensitive: boolean;
+    tolerance?: number;        // 浮点数值匹配的容差
+    maxResults?: number;       // 每个张量最多返回的匹配位置数
+    countAll?: boolean;        // 达到上限后继续统计命中数
 }
 
 export interface SearchMatch {
@@ -45,13 +103,38 @@ export interface PlotData {
     title: string;
     data: PlotSeries[];
     layout?: PlotLayout;
+    region?: PlotRegion | null;     // 缩放请求的可见区域，总览时为空
+}
+
+/**
+ * 缩放时的可见区域：一维序列为展平下标区间，热力图为行列区间（均为左闭右开）
+ */
+export interface PlotRegion {
+    start?: number;
+    end?: number;
+    rowStart?: number;
+    rowEnd?: number;
+    colStart?: number;
+    colEnd?: number;
 }
 
 export interface PlotSeries {
     name: string;
-    x?: number[];
-    y: number[];
-    z?: number[][];
+    x?: number[] | BinaryArrayPayload;
+    y?: number[] | BinaryArrayPayload;
+    z?: number[][] | BinaryArrayPayload;
+    x0?: number;                // 等间距坐标的起点和步长（未降采样的序列、金字塔层级）
+    dx?: number;
+    y0?: number;
+    dy?: number;
+    total?: number;             // 一维序列的原始点数
+    downsample?: string;        // 使用的降采样方法（minmax/lttb/stride）
+    shape?: number[];           // 热力图二维视图的原始形状
+    factor?: number[];          // 金字塔层级的行、列聚合倍数
+    edges?: number[] | BinaryArrayPayload;  // 直方图分箱边界（y 为各分箱计数）
+    nanCount?: number;
+    posInfCount?: number;
+    negInfCount?: number;
 }
 
 export interface PlotLayout {
@@ -61,6 +144,55 @@ export interface PlotLayout {
     height?: number;
 }
 
+export interface WorkerProgress {
+    done: number;   // 已处理的元素数
+    total: number;  // 元素总数
+}
+
+/**
+ * Python 端单个阶段的遥测
+ */
+export interface PhaseTelemetry {
+    ms: number;                 // 该阶段的独占耗时
+    bytesRead?: number;         // 该阶段 read 系统调用读取的字节数（Linux）
+    peakRssBytes?: number;      // 该阶段的峰值常驻内存
+}
+
+/**
+ * 工作进程随每个响应附带的遥测
+ * 阶段：startup（解释器启动，只出现在进程启动后的第一个请求）、import、open、read、compute、serialize
+ */
+export interface WorkerTelemetry {
+    totalMs: number;
+    phases: { [phase: string]: PhaseTelemetry };
+    bytesRead?: number;
+    peakRssBytes?: number;
+    peakRssScope?: 'request' | 'process';  // process 表示峰值包含并发请求或之前的请求
+}
+
+export interface HistogramOptions {
+    bins?: number;
+    scale?: 'linear' | 'log' | 'quantile';
+    slice?: string;             // 只统计切片表达式选中的部分
+    axis?: number;              // 沿该轴为每个下标分别统计
+    range?: [number, number];   // 指定分箱范围，范围外的值计入 underflow/overflow
+}
+
+export interface HistogramResult {
+    key: string;
+    scale: string;
+    size: number;
+    edges: number[] | BinaryArrayPayload;
+    counts: number[] | number[][] | BinaryArrayPayload;
+    axis?: number;
+    nanCount: number | number[];
+    posInfCount: number | number[];
+    negInfCount: number | number[];
+    underflow: number | number[];
+    overflow: number | number[];
+    error?: string;
+}
+
 // ========== 压缩文件相关类型 ==========
 
 export interface ArchiveEntry {
@@ -70,6 +202,22 @@ export interface ArchiveEntry {
     size: number;
     compressedSize?: number;
     modifiedTime?: Date;
+    childCount?: number;        // 目录的直接子项数（目录分页时提供）
+}
+
+export interface ArchiveDirectoryPage {
+    path: string;               // 目录路径，根目录为空字符串
+    entries: ArchiveEntry[];    // 子目录在前、文件在后，各自按名称排序
+    offset: number;
+    total: number;              // 直接子项总数
+}
+
+export interface ArchiveSummary {
+    format: 'zip' | 'tar' | 'tar.gz' | '7z';
+    fileCount: number;
+    dirCount: number;
+    totalSize: number;
+    compressedSize: number;
 }
 
 export interface FilePreview {
@@ -80,6 +228,126 @@ export interface FilePreview {
     size?: number;
 }
 
+// ========== 检查点树 ==========
+
+// container: 字典、列表或自定义对象；group: 键名按 '.' 或 '/' 拆分出的公共前缀；tensor: 张量；value: 其他值
+export type CheckpointNodeKind = 'container' | 'group' | 'tensor' | 'value';
+
+export interface CheckpointNode {
+    kind: CheckpointNodeKind;
+    type: string;              // 容器或值的类型名，如 OrderedDict、argparse.Namespace
+    tensors: number;           // 子树中的张量数
+    params: number;            // 子树中的元素总数
+    nbytes: number;            // 子树中的张量字节数
+    childCount?: number;       // 容器与分组的直接子节点数
+    key?: string;              // 张量键名，可直接用于 window、describe 等命令
+    shape?: number[];
+    dtype?: string;
+    size?: number;
+    value?: string;            // 非张量值的简短文本
+}
+
+export interface CheckpointChild extends CheckpointNode {
+    name: string;
+}
+
+export interface CheckpointChildren {
+    file: string;
+    path: string[];            // 从根开始的各级节点名
+    node: CheckpointNode;
+    offset: number;
+    total: number;
+    children: CheckpointChild[];
+}
+
+// ========== 张量比较 ==========
+
+// identical: 完全相同；close: 在容差内；different: 超出容差；shape: 形状不同；error: 无法比较
+export type DiffStatus = 'identical' | 'close' | 'different' | 'shape' | 'error';
+
+export interface DiffEntry {
+    key: string;
+    keyB?: string;             // 另一文件中配对的键名（与 key 不同时才有，如去掉了 module. 前缀）
+    status: DiffStatus;
+    shapeA?: number[];
+    shapeB?: number[];
+    dtypeA?: string;
+    dtypeB?: string;
+    size?: number;
+    maxAbsDiff?: number;
+    meanAbsDiff?: number;
+    maxRelDiff?: number;       // 相对差为 |a-b| / max(|a|, |b|)
+    meanRelDiff?: number;
+    diffCount?: number;        // 不相等的元素数
+    mismatchCount?: number;    // 超出容差的元素数
+    nonFiniteCount?: number;   // 差值为 NaN/Inf 的元素数，不计入最大/平均差
+    allclose?: boolean;
+    firstDiffs?: Array<{ index: number[]; a: string; b: string }>;
+    error?: string;
+}
+
+export interface DiffResult {
+    fileA: string;
+    fileB: string;
+    rtol: number;
+    atol: number;
+    entries: DiffEntry[];
+    onlyA: string[];
+    onlyB: string[];
+    summary: Record<DiffStatus, number>;
+}
+
+// ========== 工作区索引 ==========
+
+export type WorkspaceFileKind = 'tensor' | 'archive';
+
+export interface WorkspaceFileEntry {
+    path: string;
+    name: string;
+    kind: WorkspaceFileKind;
+    size: number;
+    mtime: number;
+    tensorCount?: number;      // 以下为文件头元数据，尚未读取时不存在
+    elements?: number;
+    nbytes?: number;
+    dtypes?: string[];
+    shapes?: number[][];
+    error?: string;            // 读取文件头失败的原因（如旧版 PyTorch 格式）
+}
+
+export interface IndexedHeader {
+    file: string;
+    tensorCount?: number;
+    elements?: number;
+    nbytes?: number;
+    dtypes?: string[];
+    shapes?: number[][];
+    error?: string;
+}
+
+export type WorkspaceSortKey = 'name' | 'path' | 'size' | 'mtime' | 'tensorCount';
+
+export interface WorkspaceFileQuery {
+    kind: WorkspaceFileKind;
+    offset: number;
+    limit: number;
+    sortBy?: WorkspaceSortKey;
+    descending?: boolean;
+    text?: string;             // 文件名或相对路径包含的文本（不区分大小写）
+    dtype?: string;            // 文件中任一张量为该 dtype
+    shape?: string;            // 形状模式，如 "3x224x224"、"*,768"；单个数字匹配任一维
+    minSize?: number;          // 文件大小范围（字节）
+    maxSize?: number;
+}
+
+export interface WorkspaceFilePage {
+    files: WorkspaceFileEntry[];
+    offset: number;
+    total: number;             // 满足过滤条件的文件总数
+    dtypes: string[];          // 索引中出现过的全部 dtype，供过滤选项使用
+    progress: { scanning: boolean; pending: number; indexed: number; count: number };
+}
+
 // ========== 消息类型 ==========
 
 export interface WebviewMessage {
@@ -28,7 +28,15 @@ export function getFileExtension(filePath: string): string {
  */
 export function isTensorFile(filePath: string): boolean {
     const ext = getFileExtension(filePath);
-    return ['.npz', '.npy', '.pt', '.pth'].includes(ext);
+    return ['.npz', '.npy', '.pt', '.pth', '.safetensors', '.h5', '.hdf5'].includes(ext)
+        || isSafetensorsIndex(filePath);
+}
+
+/**
+ * 判断是否为分片检查点的索引文件（model.safetensors.index.json）
+ */
+export function isSafetensorsIndex(filePath: string): boolean {
+    return filePath.toLowerCase().endsWith('.safetensors.index.json');
 }
 
 /**
@@ -39,6 +47,51 @@ export function isArchiveFile(filePath: string): boolean {
     return ['.zip', '.rar', '.7z', '.tar', '.gz', '.tar.gz'].includes(ext);
 }
 
+/**
+ * 压缩包成员路径（'压缩包路径::成员路径'）的分隔符，与 tensor_handler.py 中的 ARCHIVE_MEMBER_SEP 一致
+ */
+export const ARCHIVE_MEMBER_SEPARATOR = '::';
+
+/**
+ * 构造压缩包成员路径，Python 端据此直接从压缩包读取成员
+ */
+export function toArchiveMemberPath(archivePath: string, entryPath: string): string {
+    return `${archivePath}${ARCHIVE_MEMBER_SEPARATOR}${entryPath}`;
+}
+
+/**
+ * 拆分压缩包成员路径；普通文件路径返回 null
+ */
+export function splitArchiveMemberPath(filePath: string): { archivePath: string; entryPath: string } | null {
+    let start = 0;
+    for (;;) {
+        const pos = filePath.indexOf(ARCHIVE_MEMBER_SEPARATOR, start);
+        if (pos < 0) {
+            return null;
+        }
+        const archivePath = filePath.substring(0, pos);
+        if (isStreamableArchive(archivePath)) {
+            return { archivePath, entryPath: filePath.substring(pos + ARCHIVE_MEMBER_SEPARATOR.length) };
+        }
+        start = pos + 1;
+    }
+}
+
+/**
+ * 是否为 Python 端可以按成员直接读取的压缩包（zip 与 tar，tar 可以是 gzip/bzip2/xz 压缩的）
+ */
+export function isStreamableArchive(archivePath: string): boolean {
+    const lower = archivePath.toLowerCase();
+    return ['.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz'].some(ext => lower.endsWith(ext));
+}
+
+/**
+ * 压缩包内的张量能否不解压直接打开（目前支持 zip/tar 中的 .npy 与 .npz）
+ */
+export function canStreamFromArchive(archivePath: string, entryPath: string): boolean {
+    return isStreamableArchive(archivePath) && ['.npy', '.npz'].includes(getFileExtension(entryPath));
+}
+
 /**
  * 防抖函数
  */
@@ -0,0 +1,130 @@
+/**
+ * 诊断视图提供器
+ * 列出最近的 Python 请求，展开后显示各阶段的耗时、读取字节数与峰值内存
+ */
+import * as vscode from 'vscode';
+import * as path from 'path';
+import { DiagnosticEntry, DiagnosticsLog } from '../services/diagnosticsLog';
+import { PhaseTelemetry } from '../types';
+
+const PHASE_LABELS: { [phase: string]: string } = {
+    startup: '启动解释器',
+    import: '导入依赖',
+    open: '打开文件',
+    read: '读取数据',
+    compute: '计算',
+    serialize: '序列化'
+};
+
+type DiagnosticNode = RequestItem | PhaseItem;
+
+export class DiagnosticsViewProvider implements vscode.TreeDataProvider<DiagnosticNode> {
+    private _onDidChangeTreeData: vscode.EventEmitter<DiagnosticNode | undefined | null | void> = new vscode.EventEmitter<DiagnosticNode | undefined | null | void>();
+    readonly onDidChangeTreeData: vscode.Event<DiagnosticNode | undefined | null | void> = this._onDidChangeTreeData.event;
+
+    constructor(private log: DiagnosticsLog) {
+        log.onDidChange(() => this.refresh());
+    }
+
+    refresh(): void {
+        this._onDidChangeTreeData.fire();
+    }
+
+    getTreeItem(element: DiagnosticNode): vscode.TreeItem {
+        return element;
+    }
+
+    getChildren(element?: DiagnosticNode): DiagnosticNode[] {
+        if (!element) {
+            return this.log.getEntries().map(entry => new RequestItem(entry));
+        }
+        if (!(element instanceof RequestItem)) {
+            return [];
+        }
+
+        const entry = element.entry;
+        const telemetry = entry.telemetry;
+        if (!telemetry) {
+            return [];
+        }
+        const items: DiagnosticNode[] = Object.entries(telemetry.phases)
+            .map(([phase, data]) => new PhaseItem(PHASE_LABELS[phase] || phase, data));
+        // 往返耗时中 Python 端没有计入的部分：排队、管道传输、扩展端解析
+        const startupMs = telemetry.phases.startup?.ms ?? 0;
+        const overhead = entry.durationMs - telemetry.totalMs - startupMs;
+        if (overhead > 0) {
+            items.push(new PhaseItem('排队与传输', { ms: overhead }));
+        }
+        return items;
+    }
+}
+
+function formatBytes(bytes: number): string {
+    if (bytes < 1024) {
+        return `${bytes} B`;
+    }
+    const units = ['KB', 'MB', 'GB', 'TB'];
+    let value = bytes / 1024;
+    let unit = 0;
+    while (value >= 1024 && unit < units.length - 1) {
+        value /= 1024;
+        unit++;
+    }
+    return `${value.toFixed(1)} ${units[unit]}`;
+}
+
+function formatMs(ms: number): string {
+    return ms >= 1000 ? `${(ms / 1000).toFixed(2)} s` : `${ms.toFixed(1)} ms`;
+}
+
+class RequestItem extends vscode.TreeItem {
+    constructor(public readonly entry: DiagnosticEntry) {
+        super(
+            `${entry.command}  ${formatMs(entry.durationMs)}`,
+            entry.telemetry ? vscode.TreeItemCollapsibleState.Collapsed : vscode.TreeItemCollapsibleState.None
+        );
+        const time = new Date(entry.startedAt).toLocaleTimeString();
+        this.description = entry.file ? `${path.basename(entry.file)} · ${time}` : time;
+
+        const lines = [
+            `命令: ${entry.command}`,
+            entry.file ? `文件: ${entry.file}` : '',
+            `开始: ${new Date(entry.startedAt).toLocaleString()}`,
+            `往返耗时: ${formatMs(entry.durationMs)}`,
+            entry.telemetry ? `Python 端耗时: ${formatMs(entry.telemetry.totalMs)}` : '',
+            entry.telemetry?.bytesRead !== undefined ? `读取: ${formatBytes(entry.telemetry.bytesRead)}` : '',
+            entry.telemetry?.peakRssBytes !== undefined
+                ? `峰值内存: ${formatBytes(entry.telemetry.peakRssBytes)}${entry.telemetry.peakRssScope === 'process' ? '（进程级，含并发请求）' : ''}`
+                : '',
+            entry.error ? `错误: ${entry.error}` : ''
+        ];
+        this.tooltip = lines.filter(line => line).join('\n');
+
+        switch (entry.status) {
+            case 'ok':
+                this.iconPath = new vscode.ThemeIcon('pass', new vscode.ThemeColor('testing.iconPassed'));
+                break;
+            case 'cancelled':
+                this.iconPath = new vscode.ThemeIcon('circle-slash', new vscode.ThemeColor('testing.iconSkipped'));
+                break;
+            case 'error':
+                this.iconPath = new vscode.ThemeIcon('error', new vscode.ThemeColor('testing.iconFailed'));
+                break;
+        }
+    }
+}
+
+class PhaseItem extends vscode.TreeItem {
+    constructor(label: string, data: PhaseTelemetry) {
+        super(`${label}  ${formatMs(data.ms)}`, vscode.TreeItemCollapsibleState.None);
+        const details: string[] = [];
+        if (data.bytesRead) {
+            details.push(`读取 ${formatBytes(data.bytesRead)}`);
+        }
+        if (data.peakRssBytes !== undefined) {
+            details.push(`峰值 ${formatBytes(data.peakRssBytes)}`);
+        }
+        this.description = details.join(' · ');
+        this.iconPath = new vscode.ThemeIcon('dash');
+    }
+}
@@ -5,17 +5,33 @@ import * as vscode from 'vscode';
 import * as path from 'path';
 import * as fs from 'fs';
 import { DependencyChecker } from '../services/dependencyChecker';
+import { WorkspaceIndex } from '../services/workspaceIndex';
+import { TensorService } from '../services/tensorService';
+import { WorkspaceFileKind, WorkspaceFilePage, WorkspaceFileQuery } from '../types';
+
+const DEFAULT_PAGE_SIZE = 50;
 
 export class SidebarViewProvider implements vscode.WebviewViewProvider {
     public static readonly viewType = 'tensorlens-sidebar';
     private _view?: vscode.WebviewView;
     private checker: DependencyChecker;
+    // webview 最近一次查询的条件，索引变化时按相同条件重新推送当前页
+    private queries = new Map<WorkspaceFileKind, WorkspaceFileQuery>();
 
     constructor(
         private readonly _extensionUri: vscode.Uri,
-        private workspaceRoot: string | undefined
+        private workspaceRoot: string | undefined,
+        private readonly index?: WorkspaceIndex,
+        private readonly tensorService?: TensorService
     ) {
         this.checker = DependencyChecker.getInstance();
+
+        // 索引扫描进度或文件变化时刷新文件列表，不重新扫描工作区
+        index?.onDidChange(() => {
+            for (const kind of this.queries.keys()) {
+                this.postFilePage(kind);
+            }
+        });
         
         // 监听Python配置变化
         vscode.workspace.onDidChangeConfiguration(e => {
@@ -47,9 +63,19 @@ export class SidebarViewProvider implements vscode.WebviewViewProvider {
             try {
                 switch (data.command) {
                     case 'init':
+                        await this.updateView();
+                        break;
                     case 'refresh':
+                        this.index?.rescan();
                         await this.updateView();
                         break;
+                    case 'queryFiles':
+                        this.queries.set(data.query.kind, data.query);
+                        this.postFilePage(data.query.kind);
+                        break;
+                    case 'children':
+                        await this.postChildren(data.path, data.nodePath || [], data.offset || 0);
+                        break;
                     case 'openFile':
                         vscode.commands.executeCommand('tensorLens.openFile', vscode.Uri.file(data.path));
                         break;
@@ -102,8 +128,6 @@ export class SidebarViewProvider implements vscode.WebviewViewProvider {
             this._view.webview.postMessage({
                 type: 'update',
                 data: {
-                    tensorFiles: [],
-                    archiveFiles: [],
                     dependencies: this.getDefaultDependencies()
                 }
             });
@@ -111,57 +135,54 @@ export class SidebarViewProvider implements vscode.WebviewViewProvider {
     }
 
     private async collectData() {
-        const [tensorFiles, archiveFiles, dependencies] = await Promise.all([
-            this.findFiles(['.npz', '.npy', '.pt', '.pth']).catch(() => []),
-            this.findFiles(['.zip', '.rar', '.7z', '.tar', '.gz']).catch(() => []),
-            this.getDependencyStatus().catch(() => this.getDefaultDependencies())
-        ]);
-
-        return {
-            tensorFiles: tensorFiles.map(f => ({
-                name: path.basename(f),
-                path: f,
-                size: this.formatSize(f),
-                type: path.extname(f).toUpperCase().substring(1),
-                icon: this.getFileIcon(f)
-            })),
-            archiveFiles: archiveFiles.map(f => ({
-                name: path.basename(f),
-                path: f,
-                size: this.formatSize(f),
-                icon: this.getArchiveIcon(f)
-            })),
-            dependencies
-        };
+        const dependencies = await this.getDependencyStatus().catch(() => this.getDefaultDependencies());
+        return { dependencies };
     }
 
-    private async findFiles(extensions: string[]): Promise<string[]> {
-        if (!this.workspaceRoot) {
-            return [];
+    /**
+     * 按 webview 的查询条件从工作区索引取一页文件并发送
+     */
+    private postFilePage(kind: WorkspaceFileKind): void {
+        if (!this._view) {
+            return;
         }
-
-        const files: string[] = [];
-        const scan = async (dir: string) => {
-            try {
-                const entries = await fs.promises.readdir(dir, { withFileTypes: true });
-                for (const entry of entries) {
-                    const fullPath = path.join(dir, entry.name);
-                    if (entry.isDirectory() && !entry.name.startsWith('.') && entry.name !== 'node_modules') {
-                        await scan(fullPath);
-                    } else if (entry.isFile()) {
-                        const ext = path.extname(entry.name).toLowerCase();
-                        if (extensions.includes(ext)) {
-                            files.push(fullPath);
-                        }
-                    }
-                }
-            } catch {
-                // 忽略无权限目录
+        const query: WorkspaceFileQuery = { offset: 0, limit: DEFAULT_PAGE_SIZE, ...this.queries.get(kind), kind };
+        const page: WorkspaceFilePage = this.index
+            ? this.index.query(query)
+            : { files: [], offset: 0, total: 0, dtypes: [], progress: { scanning: false, pending: 0, indexed: 0, count: 0 } };
+        this._view.webview.postMessage({
+            type: 'filePage',
+            kind,
+            page: {
+                ...page,
+                files: page.files.map(file => ({
+                    ...file,
+                    directory: this.workspaceRoot ? path.relative(this.workspaceRoot, path.dirname(file.path)) : path.dirname(file.path)
+                }))
             }
-        };
+        });
+    }
 
-        await scan(this.workspaceRoot);
-        return files.slice(0, 20);
+    /**
+     * 展开文件或检查点树节点：按页返回子节点的元数据与子树汇总，不读取张量数据
+     */
+    private async postChildren(filePath: string, nodePath: string[], offset: number): Promise<void> {
+        if (!this._view || !this.tensorService) {
+            return;
+        }
+        try {
+            const data = await this.tensorService.listChildren(filePath, nodePath, offset, undefined, { priority: 'visible' });
+            if (data) {
+                this._view.webview.postMessage({ type: 'children', file: filePath, data });
+            }
+        } catch (error) {
+            this._view.webview.postMessage({
+                type: 'childrenError',
+                file: filePath,
+                nodePath,
+                error: error instanceof Error ? error.message : String(error)
+            });
+        }
     }
 
     private async selectPythonInterpreter() {
@@ -329,62 +350,6 @@ export class SidebarViewProvider implements vscode.WebviewViewProvider {
         }
     }
 
-    private formatSize(filePath: string): string {
-        try {
-            const stats = fs.statSync(filePath);
-            const size = stats.size;
-            if (size < 1024) {
-                return `${size}B`;
-            }
-            if (size < 1024 * 1024) {
-                return `${(size / 1024).toFixed(1)}KB`;
-            }
-            if (size < 1024 * 1024 * 1024) {
-                return `${(size / (1024 * 1024)).toFixed(1)}MB`;
-            }
-            return `${(size / (1024 * 1024 * 1024)).toFixed(1)}GB`;
-        } catch {
-            return '';
-        }
-    }
-
-    private getFileIcon(filePath: string): string {
-        const ext = path.extname(filePath).toLowerCase();
-        if (ext === '.pt' || ext === '.pth') {
-            return `<svg width="24" height="24" viewBox="0 0 24 24" fill="var(--vscode-charts-orange)">
-                <path d="M12 2L4 6v6c0 5.5 3.8 10.7 8 12 4.2-1.3 8-6.5 8-12V6l-8-4zm0 2.2l6 3v5.3c0 4.6-3.1 9-6 10.3-2.9-1.3-6-5.7-6-10.3V7.2l6-3z"/>
-                <path d="M12 6c-3.3 0-6 2.7-6 6s2.7 6 6 6 6-2.7 6-6-2.7-6-6-6zm0 10c-2.2 0-4-1.8-4-4s1.8-4 4-4 4 1.8 4 4-1.8 4-4 4z"/>
-            </svg>`;
-        }
-        return `<svg width="24" height="24" viewBox="0 0 24 24" fill="var(--vscode-charts-blue)">
-            <path d="M4 4h4v4H4V4zm0 6h4v4H4v-4zm0 6h4v4H4v-4zm6-12h4v4h-4V4zm0 6h4v4h-4v-4zm0 6h4v4h-4v-4zm6-12h4v4h-4V4zm0 6h4v4h-4v-4zm0 6h4v4h-4v-4z"/>
-            <circle cx="6" cy="6" r="1.5" fill="var(--vscode-charts-green)"/>
-            <circle cx="12" cy="12" r="1.5" fill="var(--vscode-charts-yellow)"/>
-            <circle cx="18" cy="18" r="1.5" fill="var(--vscode-charts-red)"/>
-        </svg>`;
-    }
-
-    private getArchiveIcon(filePath: string): string {
-        const ext = path.extname(filePath).toLowerCase();
-        if (ext === '.zip') {
-            return `<svg width="24" height="24" viewBox="0 0 24 24" fill="var(--vscode-charts-purple)">
-                <path d="M14 2H6c-1.1 0-2 .9-2 2v16c0 1.1.9 2 2 2h12c1.1 0 2-.9 2-2V8l-6-6zM6 20V4h7v5h5v11H6z"/>
-                <rect x="10" y="6" width="2" height="2"/><rect x="10" y="10" width="2" height="2"/>
-                <rect x="10" y="14" width="2" height="2"/><rect x="10" y="18" width="2" height="2"/>
-            </svg>`;
-        }
-        if (ext === '.rar' || ext === '.7z') {
-            return `<svg width="24" height="24" viewBox="0 0 24 24" fill="var(--vscode-charts-orange)">
-                <path d="M14 2H6c-1.1 0-2 .9-2 2v16c0 1.1.9 2 2 2h12c1.1 0 2-.9 2-2V8l-6-6z"/>
-                <path d="M14 2v6h6M10 11v8l4-4-4-4z" fill="var(--vscode-editor-background)"/>
-            </svg>`;
-        }
-        return `<svg width="24" height="24" viewBox="0 0 24 24" fill="var(--vscode-charts-green)">
-            <path d="M20 6h-8l-2-2H4c-1.1 0-2 .9-2 2v12c0 1.1.9 2 2 2h16c1.1 0 2-.9 2-2V8c0-1.1-.9-2-2-2z"/>
-            <path d="M8 13h8v2H8v-2z" fill="var(--vscode-editor-background)"/>
-        </svg>`;
-    }
-
     private _getHtmlForWebview(webview: vscode.Webview) {
         const htmlPath = vscode.Uri.joinPath(this._extensionUri, 'media', 'templates', 'sidebarView.html');
         const html = fs.readFileSync(htmlPath.fsPath, 'utf8');
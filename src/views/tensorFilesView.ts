@@ -3,13 +3,16 @@
  */
 import * as vscode from 'vscode';
 import * as path from 'path';
-import * as fs from 'fs';
+import { WorkspaceIndex } from '../services/workspaceIndex';
+import { WorkspaceFileEntry } from '../types';
 
 export class TensorFilesViewProvider implements vscode.TreeDataProvider<FileItem> {
     private _onDidChangeTreeData: vscode.EventEmitter<FileItem | undefined | null | void> = new vscode.EventEmitter<FileItem | undefined | null | void>();
     readonly onDidChangeTreeData: vscode.Event<FileItem | undefined | null | void> = this._onDidChangeTreeData.event;
 
-    constructor(private workspaceRoot: string | undefined) {}
+    constructor(private index: WorkspaceIndex | undefined) {
+        index?.onDidChange(() => this.refresh());
+    }
 
     refresh(): void {
         this._onDidChangeTreeData.fire();
@@ -20,7 +23,7 @@ export class TensorFilesViewProvider implements vscode.TreeDataProvider<FileItem
     }
 
     async getChildren(element?: FileItem): Promise<FileItem[]> {
-        if (!this.workspaceRoot) {
+        if (!this.index) {
             return [];
         }
 
@@ -28,48 +31,21 @@ export class TensorFilesViewProvider implements vscode.TreeDataProvider<FileItem
             return [];
         }
 
-        // 查找工作区中的张量文件
-        const tensorFiles = await this.findTensorFiles(this.workspaceRoot);
-        return tensorFiles.map(file => new FileItem(
-            path.basename(file),
+        // 张量文件来自后台维护的工作区索引，不再每次刷新都遍历工作区
+        const page = this.index.query({ kind: 'tensor', offset: 0, limit: Number.MAX_SAFE_INTEGER });
+        return page.files.map(file => new FileItem(
+            file.name,
             file,
-            this.getFileIcon(file),
+            this.getFileIcon(file.path),
             vscode.TreeItemCollapsibleState.None,
             {
                 command: 'tensorLens.openFile',
                 title: '打开文件',
-                arguments: [vscode.Uri.file(file)]
+                arguments: [vscode.Uri.file(file.path)]
             }
         ));
     }
 
-    private async findTensorFiles(dir: string): Promise<string[]> {
-        const files: string[] = [];
-        const extensions = ['.npz', '.npy', '.pt', '.pth'];
-
-        const scan = async (directory: string) => {
-            try {
-                const entries = await fs.promises.readdir(directory, { withFileTypes: true });
-                for (const entry of entries) {
-                    const fullPath = path.join(directory, entry.name);
-                    if (entry.isDirectory() && !entry.name.startsWith('.')) {
-                        await scan(fullPath);
-                    } else if (entry.isFile()) {
-                        const ext = path.extname(entry.name).toLowerCase();
-                        if (extensions.includes(ext)) {
-                            files.push(fullPath);
-                        }
-                    }
-                }
-            } catch (err) {
-                // 忽略无权限访问的目录
-            }
-        };
-
-        await scan(dir);
-        return files.slice(0, 50); // 限制显示数量
-    }
-
     private getFileIcon(filePath: string): string {
         const ext = path.extname(filePath).toLowerCase();
         switch (ext) {
@@ -79,6 +55,11 @@ export class TensorFilesViewProvider implements vscode.TreeDataProvider<FileItem
             case '.pt':
             case '.pth':
                 return '🔥';
+            case '.safetensors':
+                return '🤗';
+            case '.h5':
+            case '.hdf5':
+                return '🗄️';
             default:
                 return '📄';
         }
@@ -88,27 +69,24 @@ export class TensorFilesViewProvider implements vscode.TreeDataProvider<FileItem
 class FileItem extends vscode.TreeItem {
     constructor(
         public readonly label: string,
-        public readonly filePath: string,
+        public readonly entry: WorkspaceFileEntry,
         public readonly icon: string,
         public readonly collapsibleState: vscode.TreeItemCollapsibleState,
         public readonly command?: vscode.Command
     ) {
         super(label, collapsibleState);
-        this.tooltip = filePath;
-        this.description = this.getFileSize(filePath);
+        this.tooltip = entry.path;
+        this.description = this.getDescription(entry);
         this.iconPath = new vscode.ThemeIcon('file');
     }
 
-    private getFileSize(filePath: string): string {
-        try {
-            const stats = fs.statSync(filePath);
-            const size = stats.size;
-            if (size < 1024) return `${size}B`;
-            if (size < 1024 * 1024) return `${(size / 1024).toFixed(1)}KB`;
-            if (size < 1024 * 1024 * 1024) return `${(size / (1024 * 1024)).toFixed(1)}MB`;
-            return `${(size / (1024 * 1024 * 1024)).toFixed(1)}GB`;
-        } catch {
-            return '';
-        }
+    private getDescription(entry: WorkspaceFileEntry): string {
+        const size = entry.size;
+        let text: string;
+        if (size < 1024) text = `${size}B`;
+        else if (size < 1024 * 1024) text = `${(size / 1024).toFixed(1)}KB`;
+        else if (size < 1024 * 1024 * 1024) text = `${(size / (1024 * 1024)).toFixed(1)}MB`;
+        else text = `${(size / (1024 * 1024 * 1024)).toFixed(1)}GB`;
+        return entry.tensorCount !== undefined ? `${text} · ${entry.tensorCount} 个张量` : text;
     }
 }
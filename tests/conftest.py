@@ -0,0 +1,41 @@
+"""
+tensor_handler.py 的测试公共设置
+脚本不是包，直接把 scripts 目录加入导入路径；统计缓存写入每次测试会话独立的临时目录
+"""
+import os
+import sys
+import tempfile
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+os.environ.setdefault('TENSORLENS_CACHE_DIR', tempfile.mkdtemp(prefix='tensorlens-test-cache-'))
+
+import pytest  # noqa: E402
+
+import tensor_handler  # noqa: E402
+
+
+@pytest.fixture
+def th():
+    """tensor_handler 模块；测试结束后清空已打开文件的缓存，避免测试之间共享映射"""
+    yield tensor_handler
+    with tensor_handler._open_files_lock:
+        opened = list(tensor_handler._open_files.values())
+        tensor_handler._open_files.clear()
+    for arrays in opened:
+        tensor_handler.close_arrays(arrays)
+    with tensor_handler._checkpoint_trees_lock:
+        tensor_handler._checkpoint_trees.clear()
+
+
+@pytest.fixture
+def low_fd_limit():
+    """把进程可打开的文件描述符数临时降到 256（macOS 的默认值）"""
+    resource = pytest.importorskip('resource')
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    limit = 256 if hard == resource.RLIM_INFINITY else min(256, hard)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+    try:
+        yield limit
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
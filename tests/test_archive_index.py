@@ -0,0 +1,217 @@
+"""
+扩展端压缩包索引（src/services/archiveIndex.ts）与 zipfile/tarfile 的交叉验证
+用 Python 写出 zip64、加密标志、GNU 长文件名、pax 扩展头与 ustar 前缀等文件，由 node 直接加载 TypeScript 源码建立索引并读取成员；
+node 不支持 --experimental-transform-types（低于 22.7）时跳过
+"""
+import base64
+import io
+import json
+import os
+import shutil
+import subprocess
+import tarfile
+import zipfile
+
+import pytest
+
+ARCHIVE_INDEX = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'services', 'archiveIndex.ts')
+
+DRIVER = '''
+import { pathToFileURL } from 'url';
+const m = await import(pathToFileURL(process.argv[2]).href);
+const args = JSON.parse(process.argv[3]);
+const build = () => args.format === 'zip' ? m.buildZipIndex(args.archive) : m.buildTarIndex(args.archive, args.format === 'tar.gz');
+let result;
+if (args.op === 'index') {
+    const index = await build();
+    const entries = [];
+    for (let i = 0; i < index.count; i++) {
+        const entry = { ...index.entry(i), method: index.data.methods[i] };
+        if (!entry.isDirectory) {
+            try {
+                entry.data = (await m.readEntry(index, i)).toString('base64');
+            } catch (error) {
+                entry.error = error.message;
+            }
+        }
+        entries.push(entry);
+    }
+    result = { format: index.format, entries };
+} else {
+    m.ArchiveIndexStore.getInstance().setStorageDir(args.storage);
+    let built = false;
+    const index = await m.ArchiveIndexStore.getInstance().get(args.archive, () => { built = true; return build(); });
+    result = { built, paths: index.data.paths };
+}
+console.log(JSON.stringify(result));
+'''
+
+
+@pytest.fixture(scope='module')
+def node(tmp_path_factory):
+    executable = shutil.which('node')
+    if executable is None:
+        pytest.skip('没有 node')
+    flags = ['--experimental-transform-types', '--no-warnings']
+    if subprocess.run([executable, *flags, '-e', '0'], capture_output=True).returncode != 0:
+        pytest.skip('node 不支持直接加载 TypeScript')
+    driver = tmp_path_factory.mktemp('node') / 'driver.mjs'
+    driver.write_text(DRIVER)
+
+    def run(**args):
+        output = subprocess.run(
+            [executable, *flags, str(driver), ARCHIVE_INDEX, json.dumps({k: str(v) for k, v in args.items()})],
+            capture_output=True, check=True, timeout=60
+        ).stdout
+        return json.loads(output)
+    return run
+
+
+def index_entries(node, path, format):
+    result = node(op='index', archive=path, format=format)
+    assert result['format'] == format
+    entries = {}
+    for entry in result['entries']:
+        if 'data' in entry:
+            entry['data'] = base64.b64decode(entry['data'])
+        entries[entry['path']] = entry
+    return entries
+
+
+def assert_matches_zipfile(entries, path):
+    with zipfile.ZipFile(path) as zf:
+        infos = zf.infolist()
+        assert set(entries) == {info.filename.rstrip('/') for info in infos}
+        for info in infos:
+            entry = entries[info.filename.rstrip('/')]
+            assert entry['isDirectory'] == info.is_dir()
+            assert entry['size'] == info.file_size and entry['compressedSize'] == info.compress_size
+            if not info.is_dir():
+                assert entry['data'] == zf.read(info)
+
+
+def assert_matches_tarfile(entries, path):
+    with tarfile.open(path) as tf:
+        members = [member for member in tf.getmembers() if member.isfile() or member.isdir()]
+        assert set(entries) == {member.name for member in members}
+        for member in members:
+            entry = entries[member.name]
+            assert entry['isDirectory'] == member.isdir()
+            assert entry['size'] == (member.size if member.isfile() else 0)
+            if member.isfile():
+                assert entry['data'] == tf.extractfile(member).read()
+
+
+def fill_zip(path, comment=b''):
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('weights/', '')
+        zf.writestr('weights/层0.npy', os.urandom(3000))
+        zf.writestr(zipfile.ZipInfo('weights/stored.bin'), b'abc' * 100)
+        zf.writestr('weights/empty.bin', b'')
+        zf.comment = comment
+
+
+@pytest.mark.parametrize('comment', [b'', b'x' * 60000], ids=['plain', 'long-comment'])
+def test_zip_central_directory(node, tmp_path, comment):
+    path = str(tmp_path / 'a.zip')
+    fill_zip(path, comment)
+    entries = index_entries(node, path, 'zip')
+    assert_matches_zipfile(entries, path)
+    assert entries['weights/stored.bin']['method'] == 0 and entries['weights/层0.npy']['method'] == 8
+
+
+def test_zip64_records_and_extra_fields(node, tmp_path, monkeypatch):
+    # 降低 zip64 阈值：成员数写入 zip64 目录结束记录，大小与偏移写入中央目录的 zip64 扩展字段
+    monkeypatch.setattr(zipfile, 'ZIP64_LIMIT', 100)
+    monkeypatch.setattr(zipfile, 'ZIP_FILECOUNT_LIMIT', 2)
+    path = str(tmp_path / 'a.zip')
+    fill_zip(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert b'PK\x06\x06' in data and b'PK\x06\x07' in data
+    assert b'\xff\xff\xff\xff' in data[data.index(b'PK\x01\x02'):]
+    assert_matches_zipfile(index_entries(node, path, 'zip'), path)
+
+
+def test_zip_encrypted_flag(node, tmp_path):
+    path = str(tmp_path / 'a.zip')
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr('secret.bin', b'x' * 10)
+        zf.writestr('plain.bin', b'y' * 10)
+    # zipfile 不能写出加密成员，直接在中央目录中设置第一个成员的加密标志位
+    with open(path, 'r+b') as f:
+        data = f.read()
+        flags = data.index(b'PK\x01\x02') + 8
+        f.seek(flags)
+        f.write(bytes([data[flags] | 1]))
+    entries = index_entries(node, path, 'zip')
+    assert entries['secret.bin']['method'] == -1 and '加密' in entries['secret.bin']['error']
+    assert entries['plain.bin']['data'] == b'y' * 10
+
+
+@pytest.mark.parametrize('compression', ['tar', 'tar.gz'])
+@pytest.mark.parametrize('tar_format', [tarfile.GNU_FORMAT, tarfile.PAX_FORMAT, tarfile.USTAR_FORMAT],
+                         ids=['gnu', 'pax', 'ustar'])
+def test_tar_long_names(node, tmp_path, compression, tar_format):
+    long_dir = 'encoder/' + 'd' * 80 + '/' + 'e' * 40
+    names = ['model/a.npy', f'{long_dir}/weight.npy']
+    if tar_format != tarfile.USTAR_FORMAT:
+        # 超过 ustar 前缀 + 名称长度上限，只能写成 GNU 'L' 或 pax 'x' 扩展头
+        names.append('f' * 300 + '/层.npy')
+    path = str(tmp_path / f'a.{compression}')
+    pax_headers = {'comment': 'global'} if tar_format == tarfile.PAX_FORMAT else None
+    with tarfile.open(path, 'w:gz' if compression == 'tar.gz' else 'w', format=tar_format, pax_headers=pax_headers) as tf:
+        directory = tarfile.TarInfo('model')
+        directory.type = tarfile.DIRTYPE
+        tf.addfile(directory)
+        for i, name in enumerate(names):
+            data = os.urandom(700 + i)
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 1700000000
+            tf.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo('model/link')
+        link.type = tarfile.SYMTYPE
+        link.linkname = 'x' * 200
+        if tar_format != tarfile.USTAR_FORMAT:
+            tf.addfile(link)
+
+    entries = index_entries(node, path, compression)
+    assert_matches_tarfile(entries, path)
+    assert entries[f'{long_dir}/weight.npy']['modifiedTime'] == '2023-11-14T22:13:20.000Z'
+
+
+def test_tar_ustar_prefix_is_used(node, tmp_path):
+    name = 'p' * 90 + '/' + 'q' * 90 + '.npy'
+    path = str(tmp_path / 'a.tar')
+    with tarfile.open(path, 'w', format=tarfile.USTAR_FORMAT) as tf:
+        info = tarfile.TarInfo(name)
+        info.size = 3
+        tf.addfile(info, io.BytesIO(b'abc'))
+    with open(path, 'rb') as f:
+        header = f.read(512)
+    assert header[345:345 + 90] == b'p' * 90
+    assert index_entries(node, path, 'tar')[name]['data'] == b'abc'
+
+
+def test_persisted_index_follows_archive_identity(node, tmp_path):
+    path = str(tmp_path / 'a.zip')
+    storage = tmp_path / 'index'
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr('a.bin', b'1')
+
+    assert node(op='store', archive=path, format='zip', storage=storage) == {'built': True, 'paths': ['a.bin']}
+    assert len(list(storage.glob('*.json'))) == 1
+    # 新进程从磁盘读取索引，不再构建
+    assert node(op='store', archive=path, format='zip', storage=storage)['built'] is False
+
+    # 大小变化
+    with zipfile.ZipFile(path, 'a') as zf:
+        zf.writestr('b.bin', b'2')
+    assert node(op='store', archive=path, format='zip', storage=storage) == {'built': True, 'paths': ['a.bin', 'b.bin']}
+
+    # 大小不变、只有修改时间变化
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert node(op='store', archive=path, format='zip', storage=storage)['built'] is True
+    assert node(op='store', archive=path, format='zip', storage=storage)['built'] is False
@@ -0,0 +1,93 @@
+"""直接读取压缩包内的 .npy/.npz 成员（不解压到临时目录）"""
+import io
+import tarfile
+import zipfile
+
+import numpy as np
+import pytest
+
+MATRIX = np.arange(20, dtype=np.float32).reshape(4, 5)
+
+
+def npy_bytes(arr):
+    buf = io.BytesIO()
+    np.save(buf, arr)
+    return buf.getvalue()
+
+
+def npz_bytes(**arrays):
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+@pytest.fixture(params=['zip-stored', 'zip-deflated', 'tar', 'tar.gz', 'tar.bz2', 'tar.xz'])
+def archive(request, tmp_path):
+    members = {'part0/m.npy': npy_bytes(MATRIX), 'part0/b.npz': npz_bytes(x=np.arange(3), y=MATRIX.T)}
+    kind = request.param
+    if kind.startswith('zip'):
+        path = tmp_path / 'shards.zip'
+        compression = zipfile.ZIP_STORED if kind == 'zip-stored' else zipfile.ZIP_DEFLATED
+        with zipfile.ZipFile(path, 'w', compression=compression) as zf:
+            zf.writestr('readme.txt', 'x')
+            for name, data in members.items():
+                zf.writestr(name, data)
+    else:
+        path = tmp_path / f'shards.{kind}'
+        mode = 'w' if kind == 'tar' else 'w:' + kind.split('.')[1]
+        with tarfile.open(path, mode) as tf:
+            for name, data in [('readme.txt', b'x'), *members.items()]:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tf.addfile(info, io.BytesIO(data))
+    return str(path), kind
+
+
+def test_split_archive_path(th):
+    assert th.split_archive_path('a/b.tar.gz::x/y.npy') == ('a/b.tar.gz', 'x/y.npy')
+    assert th.split_archive_path('C:\\d::e.zip::p\\q.npy') == ('C:\\d::e.zip', 'p/q.npy')
+    assert th.split_archive_path('plain.npy') == ('plain.npy', None)
+
+
+def test_npy_member(th, archive):
+    path, kind = archive
+    member = path + '::part0/m.npy'
+    (info,) = th.get_tensor_info(member)
+    assert info['shape'] == [4, 5]
+    np.testing.assert_array_equal(th.get_array(member, 'data'), MATRIX)
+    np.testing.assert_array_equal(th.get_slice(member, 'data', '1:3, ::2').array, MATRIX[1:3, ::2])
+    # 未压缩的成员直接映射压缩包中的数据
+    assert (th.mapped_location(member) is not None) == (kind in ('zip-stored', 'tar'))
+
+
+def test_npz_member(th, archive):
+    path, _ = archive
+    member = path + '::part0/b.npz'
+    data = th.load_tensor_file(member)
+    assert [t['key'] for t in data['tensors']] == ['x', 'y']
+    np.testing.assert_array_equal(th.get_array(member, 'y'), MATRIX.T)
+    assert th.search_tensor(member, '19', regex=False, case_sensitive=False)[0]['matches'][0]['position'] == '(4, 3)'
+
+
+def test_missing_and_unsupported_members(th, archive):
+    path, _ = archive
+    with pytest.raises(FileNotFoundError):
+        th.get_tensor_info(path + '::part0/none.npy')
+    with pytest.raises(ValueError, match='需要先解压'):
+        th.get_tensor_info(path + '::readme.pt')
+
+
+def test_members_are_read_only(th, archive):
+    path, _ = archive
+    result = th.save_edits(path + '::part0/m.npy', 'data', [{'row': 0, 'col': 0, 'value': '1'}])
+    assert '只读' in result['error']
+
+
+def test_segment_file_seeks_within_member(th, tmp_path):
+    path = tmp_path / 'raw.bin'
+    path.write_bytes(bytes(range(100)))
+    with th.SegmentFile(open(path, 'rb'), 10, 20) as f:
+        assert f.read(5) == bytes(range(10, 15))
+        f.seek(-3, io.SEEK_END)
+        assert f.read() == bytes(range(27, 30))
+        assert f.read(1) == b''
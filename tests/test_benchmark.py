@@ -0,0 +1,54 @@
+"""基准测试工具的数据生成与报告比较"""
+import argparse
+
+import numpy as np
+import pytest
+
+import benchmark
+
+
+def test_parse_size():
+    assert benchmark.parse_size('512KB') == 512 * 1024
+    assert benchmark.parse_size('1.5gb') == int(1.5 * 1024 ** 3)
+    assert benchmark.parse_size('100') == 100
+    with pytest.raises(argparse.ArgumentTypeError):
+        benchmark.parse_size('lots')
+
+
+@pytest.mark.parametrize('fmt', ['npy', 'npz', 'npz-compressed'])
+def test_write_fixture(tmp_path, fmt):
+    shape = benchmark.fixture_shape(64 * 1024, 'float32', 3, 2, np)
+    assert shape == (2, 64, 64)
+    path = tmp_path / f'fixture.{fmt.split("-")[0]}'
+    benchmark.write_fixture(path, fmt, 'float32', shape, 2, seed=0)
+    assert not path.with_name(path.name + '.partial').exists()
+    if fmt == 'npy':
+        arrays = [np.load(path)]
+    else:
+        with np.load(path) as npz:
+            assert npz.files == ['tensor_0', 'tensor_1']
+            arrays = [npz[name] for name in npz.files]
+    for arr in arrays:
+        assert arr.shape == shape and arr.dtype == np.float32
+        assert abs(float(arr.mean())) < 0.1
+
+
+def report(seconds, rss, status='ok'):
+    result = {'fixture': {'id': 'npy-1MB'}, 'command': 'load', 'status': status}
+    if status == 'ok':
+        result.update({'wallSeconds': {'median': seconds}, 'peakRssBytes': rss})
+    return {'results': [result]}
+
+
+def test_compare_reports():
+    base = report(1.0, 100 * 1024 ** 2)
+    assert benchmark.compare_reports(base, report(1.1, 100 * 1024 ** 2), 0.2, 0.05) == []
+    # 比例超过阈值但绝对增加很小时不算退化
+    assert benchmark.compare_reports(report(0.01, None), report(0.02, None), 0.2, 0.05) == []
+
+    (slower,) = benchmark.compare_reports(base, report(2.0, 100 * 1024 ** 2), 0.2, 0.05)
+    assert slower['metric'] == 'wallSeconds' and slower['ratio'] == 2.0
+    (bigger,) = benchmark.compare_reports(base, report(1.0, 300 * 1024 ** 2), 0.2, 0.05)
+    assert bigger['metric'] == 'peakRssBytes'
+    (failed,) = benchmark.compare_reports(base, report(None, None, status='error'), 0.2, 0.05)
+    assert failed['metric'] == 'status'
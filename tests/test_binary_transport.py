@@ -0,0 +1,57 @@
+"""二进制帧编码"""
+import json
+
+import numpy as np
+
+
+def decode(th, result):
+    """按描述符把二进制块还原为数组，模拟扩展端的解析"""
+    line, buffers = th.encode_response(7, result)
+    message = json.loads(line)
+    payload = b''.join(bytes(buffer) for buffer in buffers)
+    assert message['id'] == 7 and message['binaryLength'] == len(payload)
+
+    def restore(value):
+        if isinstance(value, dict) and value.get('__binary__'):
+            data = payload[value['offset']:value['offset'] + value['length']]
+            return np.frombuffer(data, dtype='<' + np.dtype(value['dtype']).str[1:]).reshape(value['shape'])
+        if isinstance(value, dict):
+            return {k: restore(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [restore(v) for v in value]
+        return value
+
+    return restore(message['result'])
+
+
+def test_arrays_follow_json_line_in_order(th):
+    a = np.arange(12, dtype=np.float32).reshape(3, 4)
+    b = np.array([-1, 2**40], dtype=np.int64)
+    result = decode(th, {'x': th.to_payload(a, np), 'rows': [th.to_payload(b, np)], 'n': 3})
+    np.testing.assert_array_equal(result['x'], a)
+    np.testing.assert_array_equal(result['rows'][0], b)
+    assert result['n'] == 3
+
+
+def test_payload_conversions(th):
+    # 非连续、大端、float16 都转换为前端可直接使用的小端连续数组
+    big_endian = np.arange(6, dtype='>i4').reshape(2, 3).T
+    half = np.array([0.5, -1.25], dtype=np.float16)
+    result = decode(th, [th.to_payload(big_endian, np), th.to_payload(half, np)])
+    np.testing.assert_array_equal(result[0], big_endian)
+    assert result[1].dtype == np.float32
+    np.testing.assert_array_equal(result[1], half.astype(np.float32))
+
+    # 图表不支持 BigInt：需要时 64 位整数转为 float64
+    approx = th.to_payload(np.array([1, 2], dtype=np.uint64), np, exact_int64=False)
+    assert approx.array.dtype == np.float64
+
+
+def test_non_numeric_arrays_stay_lists(th):
+    assert th.to_payload(np.array([1 + 2j]), np) == [1 + 2j]
+    assert th.to_payload(np.array(['a', 'b']), np) == ['a', 'b']
+
+
+def test_single_shot_mode_uses_lists(th):
+    body = json.dumps({'x': th.to_payload(np.eye(2), np)}, default=th.json_default)
+    assert json.loads(body) == {'x': [[1.0, 0.0], [0.0, 1.0]]}
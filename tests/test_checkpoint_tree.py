@@ -0,0 +1,92 @@
+"""检查点树、按需描述与只比较元数据的筛选"""
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def npz_file(tmp_path):
+    path = str(tmp_path / 'model.npz')
+    np.savez(path, **{
+        'encoder.layer0.weight': np.ones((4, 3), dtype=np.float32),
+        'encoder.layer0.bias': np.zeros(4, dtype=np.float32),
+        'encoder.layer1.weight': np.ones((4, 4), dtype=np.float64),
+        'step': np.array(7, dtype=np.int64),
+    })
+    return path
+
+
+def no_data_reads(th, monkeypatch):
+    """读取张量数据或计算统计时让测试失败"""
+    def fail(*args, **kwargs):
+        raise AssertionError('不应读取张量数据')
+    monkeypatch.setattr(th, 'summarize_tensors', fail)
+    monkeypatch.setattr(th, 'load_tensor_file', fail)
+
+
+def test_dotted_keys_are_grouped(th, npz_file, monkeypatch):
+    no_data_reads(th, monkeypatch)
+    root = th.list_children(npz_file)
+    assert [child['name'] for child in root['children']] == ['encoder', 'step']
+    encoder = root['children'][0]
+    assert encoder['kind'] == 'group'
+    assert encoder['tensors'] == 3
+    assert encoder['params'] == 12 + 4 + 16
+
+    layer0 = th.list_children(npz_file, ['encoder', 'layer0'])
+    assert [child['name'] for child in layer0['children']] == ['weight', 'bias']
+    assert layer0['children'][0]['key'] == 'encoder.layer0.weight'
+    assert layer0['children'][0]['shape'] == [4, 3]
+
+
+def test_paging_and_errors(th, npz_file):
+    page = th.list_children(npz_file, ['encoder'], offset=1, limit=1)
+    assert page['total'] == 2
+    assert [child['name'] for child in page['children']] == ['layer1']
+    with pytest.raises(KeyError):
+        th.list_children(npz_file, ['missing'])
+    with pytest.raises(ValueError):
+        th.list_children(npz_file, ['step'])
+
+
+def test_describe_returns_stats(th, npz_file):
+    item = th.describe_tensor(npz_file, 'encoder.layer1.weight')
+    assert item['info']['shape'] == [4, 4]
+    assert item['info']['mean'] == pytest.approx(1.0)
+
+
+def test_filter_matches_metadata_only(th, npz_file, monkeypatch):
+    no_data_reads(th, monkeypatch)
+    result = th.filter_tensor(npz_file, key='weight', dtype='float32')
+    assert [item['key'] for item in result['tensors']] == ['encoder.layer0.weight']
+    assert result['totalSize'] == 4 * 3 * 4
+    assert [item['key'] for item in th.filter_tensor(npz_file, shape=[4, 4])['tensors']] == ['encoder.layer1.weight']
+
+
+def test_torch_object_graph(th, tmp_path, monkeypatch):
+    torch = pytest.importorskip('torch')
+    model = torch.nn.Linear(3, 2)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1, momentum=0.9)
+    model(torch.ones(1, 3)).sum().backward()
+    optimizer.step()
+    path = str(tmp_path / 'ckpt.pt')
+    torch.save({'model': model.state_dict(), 'optimizer': optimizer.state_dict(), 'epoch': 3}, path)
+
+    no_data_reads(th, monkeypatch)
+    root = th.list_children(path)
+    names = {child['name']: child for child in root['children']}
+    assert set(names) == {'model', 'optimizer', 'epoch'}
+    assert names['model']['tensors'] == 2
+    assert names['optimizer']['tensors'] == 2  # 两个参数的 momentum_buffer
+    assert names['epoch']['kind'] == 'value'
+    state = th.list_children(path, ['optimizer', 'state', '0'])
+    assert [child['name'] for child in state['children']] == ['momentum_buffer']
+
+
+def test_histograms_for_subtree(th, npz_file):
+    assert th.subtree_tensor_keys(npz_file, ['encoder']) == [
+        'encoder.layer0.weight', 'encoder.layer0.bias', 'encoder.layer1.weight']
+    results = th.dispatch('histogram', {'file': npz_file, 'path': ['encoder', 'layer0'], 'bins': 4})
+    assert [item['key'] for item in results] == ['encoder.layer0.weight', 'encoder.layer0.bias']
+    assert [int(item['counts'].array.sum()) for item in results] == [12, 4]
+    with pytest.raises(KeyError):
+        th.dispatch('histogram', {'file': npz_file, 'path': ['missing']})
@@ -0,0 +1,86 @@
+"""张量与检查点的流式比较"""
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def small_chunks(th, monkeypatch):
+    """每块 96 字节，张量被分成多块逐块比较"""
+    monkeypatch.setattr(th, 'DIFF_CHUNK_BYTES', 96)
+
+
+def test_match_keys(th):
+    pairs, only_a, only_b = th.match_diff_keys(
+        ['module.enc.w', 'dec.w', 'same', 'a_only'],
+        ['enc.w', '_orig_mod.module.dec.w', 'same', 'b_only'])
+    assert sorted(pairs) == [('dec.w', '_orig_mod.module.dec.w'), ('module.enc.w', 'enc.w'), ('same', 'same')]
+    assert (only_a, only_b) == (['a_only'], ['b_only'])
+    assert th.match_diff_keys(['x'], ['y']) == ([('x', 'y')], [], [])
+
+
+def test_aligned_chunks(th):
+    a = [np.arange(0, 5), np.arange(5, 6), np.arange(6, 10)]
+    b = [np.arange(0, 3), np.arange(3, 10)]
+    pairs = list(th.iter_aligned_chunks(a, b))
+    assert all(x.size == y.size for x, y in pairs)
+    np.testing.assert_array_equal(np.concatenate([x for x, _ in pairs]), np.arange(10))
+    with pytest.raises(ValueError):
+        list(th.iter_aligned_chunks([np.arange(3)], [np.arange(4)]))
+
+
+def test_diff_statuses(th, tmp_path, small_chunks):
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=(20, 30))
+    close = base + 1e-9
+    different = base.copy()
+    different[3, 7] += 1.0
+    different[15, 2] = np.nan
+
+    file_a, file_b = str(tmp_path / 'a.npz'), str(tmp_path / 'b.npz')
+    np.savez(file_a, same=base, close=base, different=base, shape=np.zeros(3), extra=np.zeros(1))
+    np.savez(file_b, same=base, close=close, different=different, shape=np.zeros(4))
+    result = th.diff_files(file_a, file_b)
+    entries = {entry['key']: entry for entry in result['entries']}
+
+    assert entries['same']['status'] == 'identical'
+    assert entries['close']['status'] == 'close' and entries['close']['diffCount'] == base.size
+    assert entries['shape']['status'] == 'shape'
+    diff = entries['different']
+    assert diff['status'] == 'different'
+    assert (diff['diffCount'], diff['mismatchCount'], diff['nonFiniteCount']) == (2, 2, 1)
+    assert diff['maxAbsDiff'] == pytest.approx(1.0)
+    assert [d['index'] for d in diff['firstDiffs']] == [[3, 7], [15, 2]]
+    assert result['onlyA'] == ['extra'] and result['onlyB'] == []
+    assert result['summary'] == {'identical': 1, 'close': 1, 'different': 1, 'shape': 1, 'error': 0}
+
+
+def test_mixed_memory_orders(th, tmp_path, small_chunks):
+    base = np.arange(12.0).reshape(3, 4)
+    changed = base.copy()
+    changed[2, 1] = -1
+    file_a, file_b = str(tmp_path / 'a.npy'), str(tmp_path / 'b.npy')
+    np.save(file_a, base)
+    np.save(file_b, np.asfortranarray(changed))
+    (entry,) = th.diff_files(file_a, file_b)['entries']
+    assert entry['diffCount'] == 1
+    assert entry['firstDiffs'] == [{'index': [2, 1], 'a': '9.0', 'b': '-1.0'}]
+
+
+def test_tolerances_and_nan(th, tmp_path):
+    file_a, file_b = str(tmp_path / 'a.npy'), str(tmp_path / 'b.npy')
+    np.save(file_a, np.array([1.0, np.nan, 100.0]))
+    np.save(file_b, np.array([1.0, np.nan, 100.5]))
+    (loose,) = th.diff_files(file_a, file_b, rtol=0.01)['entries']
+    assert loose['status'] == 'close'
+    (strict,) = th.diff_files(file_a, file_b, equal_nan=False)['entries']
+    assert strict['status'] == 'different' and strict['mismatchCount'] == 2
+
+
+def test_cross_format(th, tmp_path):
+    torch = pytest.importorskip('torch')
+    value = torch.arange(6, dtype=torch.float32).reshape(2, 3)
+    file_a, file_b = str(tmp_path / 'a.pt'), str(tmp_path / 'b.npz')
+    torch.save({'module.w': value.t()}, file_a)
+    np.savez(file_b, w=value.numpy().T)
+    (entry,) = th.diff_files(file_a, file_b)['entries']
+    assert (entry['key'], entry['keyB'], entry['status']) == ('module.w', 'w', 'identical')
@@ -0,0 +1,90 @@
+"""折线图降采样与热力图金字塔"""
+import functools
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def small_chunks(th, monkeypatch):
+    """每块 256 字节，桶会跨越数据块边界"""
+    monkeypatch.setattr(th, 'iter_buckets', functools.partial(th.iter_buckets, chunk_bytes=256))
+
+
+@pytest.fixture
+def spiky():
+    values = np.sin(np.linspace(0, 20, 10007))
+    values[1234] = 50.0
+    values[8000] = -50.0
+    values[500] = np.nan
+    return values
+
+
+def test_buckets_cover_array_in_order(th, small_chunks):
+    arr = np.arange(1000).reshape(10, 100).T  # 非连续
+    values = []
+    for start, block in th.iter_buckets(arr, np, 7):
+        values.append(block.ravel())
+        assert block.shape[1] == 7 or start + block.size == arr.size
+    np.testing.assert_array_equal(np.concatenate(values), arr.ravel())
+
+
+@pytest.mark.parametrize('method', ['minmax', 'lttb'])
+def test_spikes_survive(th, small_chunks, spiky, method):
+    x, y = th.DOWNSAMPLERS[method](spiky, np, 200, offset=3)
+    assert x.size <= 202
+    assert np.all(np.diff(x) > 0)
+    assert x[0] == 3 and x[-1] == spiky.size - 1 + 3
+    np.testing.assert_array_equal(y, spiky[x - 3])
+    assert 1234 + 3 in x and 8000 + 3 in x
+
+
+def test_minmax_keeps_extremes_per_bucket(th, small_chunks):
+    arr = np.array([3, 1, 2, 9, 5, 4, 0, 7], dtype=np.int32)
+    x, y = th.downsample_minmax(arr, np, 4)
+    assert x.tolist() == [1, 3, 6, 7]
+    assert y.tolist() == [1.0, 9.0, 0.0, 7.0]
+
+
+def test_stride(th, small_chunks):
+    arr = np.arange(100)
+    x, y = th.downsample_stride(arr, np, 10)
+    assert x.tolist() == list(range(0, 100, 10))
+    np.testing.assert_array_equal(y, x)
+
+
+def test_series_payload(th):
+    arr = np.arange(50, dtype=np.int64)
+    small = th.series_payload(arr, np, 'minmax', 100, {'start': 10, 'end': 20})
+    assert (small['x0'], small['dx'], small['total']) == (10, 1, 50)
+    assert small['y'].array.dtype == np.float64
+    np.testing.assert_array_equal(small['y'].array, arr[10:20])
+
+    large = th.series_payload(np.arange(1000.0).reshape(40, 25)[:, ::-1], np, 'stride', 10)
+    assert large['downsample'] == 'stride' and large['x'].array.size == 10
+
+
+def test_reduce_blocks_ignores_nan(th):
+    band = np.array([[1.0, 2.0, 3.0], [np.nan, 4.0, np.nan]])
+    np.testing.assert_allclose(th.reduce_blocks(band, 2, 2, 'mean', np), [[7 / 3, 3.0]], rtol=1e-6)
+    np.testing.assert_array_equal(th.reduce_blocks(band, 2, 2, 'max', np), [[4.0, 3.0]])
+    np.testing.assert_array_equal(th.reduce_blocks(np.full((2, 2), np.nan), 2, 2, 'mean', np), [[np.nan]])
+
+
+def test_pyramid_region(th, tmp_path):
+    path = str(tmp_path / 'img.npy')
+    data = np.arange(1100 * 300, dtype=np.float32).reshape(1100, 300)
+    np.save(path, data)
+    arr = th.get_array(path, 'data')
+
+    full = th.pyramid_region(path, 'data', arr, 'mean', None, np)
+    assert full['factor'] == [4, 1]
+    z = full['z'].array
+    assert z.shape == (275, 300)
+    np.testing.assert_allclose(z, data.reshape(275, 4, 300).mean(axis=1), rtol=1e-6)
+    assert (full['y0'], full['dy']) == (1.5, 4)
+
+    region = {'rowStart': 100, 'rowEnd': 200, 'colStart': 10, 'colEnd': 20}
+    zoomed = th.pyramid_region(path, 'data', arr, 'max', region, np)
+    assert zoomed['factor'] == [1, 1] and (zoomed['x0'], zoomed['y0']) == (10, 100)
+    np.testing.assert_array_equal(zoomed['z'].array, data[100:200, 10:20])
@@ -0,0 +1,85 @@
+"""分块遍历的元素顺序与流式导出"""
+import json
+
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('order', ['K', 'C'])
+def test_flat_chunks_of_non_contiguous_rows_are_row_major(th, order):
+    # 每行（40x40 的 Fortran 连续子数组）都大于块大小
+    arr = np.arange(2 * 40 * 40).reshape(2, 40, 40).transpose(0, 2, 1)
+    chunks = list(th.iter_flat_chunks(arr, np, 500, order))
+    assert max(chunk.size for chunk in chunks) <= 500
+    np.testing.assert_array_equal(np.concatenate(chunks), arr.ravel(order='C'))
+
+
+def test_flat_chunks_of_fortran_array_follow_memory_order(th):
+    arr = np.asfortranarray(np.arange(60).reshape(6, 10))
+    np.testing.assert_array_equal(np.concatenate(list(th.iter_flat_chunks(arr, np, 7))), arr.ravel(order='F'))
+    np.testing.assert_array_equal(np.concatenate(list(th.iter_flat_chunks(arr, np, 7, 'C'))), arr.ravel(order='C'))
+
+
+@pytest.mark.parametrize('fmt', ['npy', 'json', 'csv'])
+def test_export_roundtrip(th, tmp_path, fmt):
+    value = np.arange(24, dtype=np.float64).reshape(4, 6) / 4
+    source = str(tmp_path / 'data.npz')
+    np.savez(source, a=value, b=value.T)
+    output = str(tmp_path / f'out.{fmt}')
+    th.export_data(source, 'b', fmt, output)
+    if fmt == 'npy':
+        np.testing.assert_array_equal(np.load(output), value.T)
+    elif fmt == 'json':
+        with open(output, encoding='utf-8') as f:
+            assert json.load(f) == value.T.tolist()
+    else:
+        np.testing.assert_array_equal(np.loadtxt(output, delimiter=','), value.T)
+
+
+def test_export_transposed_torch_tensor(th, tmp_path):
+    torch = pytest.importorskip('torch')
+    # 非连续张量，每行 160000 个元素，大于导出块（1MB）
+    tensor = torch.arange(2 * 400 * 400).reshape(2, 400, 400).transpose(1, 2)
+    source = str(tmp_path / 'transposed.pt')
+    torch.save({'t': tensor, 'other': torch.zeros(1)}, source)
+    assert tensor.numel() > th.EXPORT_CHUNK_BYTES // 8
+
+    output = str(tmp_path / 'out.npy')
+    th.export_data(source, 't', 'npy', output)
+    np.testing.assert_array_equal(np.load(output), tensor.numpy())
+
+    shape, _, order, chunks = th.iter_tensor_chunks(source, 't', th.open_tensor_arrays(source), np)
+    assert order == 'C'
+    np.testing.assert_array_equal(np.concatenate(list(chunks)).reshape(shape), tensor.numpy())
+
+
+def run_in_request(th, context, fn, *args):
+    """在常驻模式的请求上下文中执行，使进度与取消检查生效"""
+    th._request_local.context = context
+    try:
+        return fn(*args)
+    finally:
+        th._request_local.context = None
+
+
+def test_export_reports_progress(th, tmp_path):
+    source = str(tmp_path / 'big.npy')
+    np.save(source, np.zeros(th.EXPORT_CHUNK_BYTES // 8 * 3 + 5))
+    messages = []
+    context = th.RequestContext(1, messages.append)
+    run_in_request(th, context, th.export_data, source, 'data', 'csv', str(tmp_path / 'out.csv'))
+    done = [message['progress']['done'] for message in messages]
+    assert done == sorted(done) and messages[-1]['progress']['done'] == messages[-1]['progress']['total']
+
+
+def test_cancelled_export_keeps_previous_output(th, tmp_path):
+    source = str(tmp_path / 'data.npy')
+    np.save(source, np.arange(10.0))
+    output = tmp_path / 'out.json'
+    output.write_text('previous')
+    context = th.RequestContext(1, lambda message: None)
+    context.cancelled.set()
+    with pytest.raises(th.RequestCancelled):
+        run_in_request(th, context, th.export_data, source, 'data', 'json', str(output))
+    assert output.read_text() == 'previous'
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['data.npy', 'out.json']
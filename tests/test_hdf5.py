@@ -0,0 +1,60 @@
+"""HDF5 后端：按数据块读取、句柄释放与数据块缓存的文件身份"""
+import os
+
+import numpy as np
+import pytest
+
+h5py = pytest.importorskip('h5py')
+
+
+def write_h5(path, value, compression='gzip'):
+    with h5py.File(path, 'w') as f:
+        f.create_dataset('group/data', data=value, chunks=(8, 8), compression=compression)
+
+
+def test_partial_reads_match(th, tmp_path):
+    path = str(tmp_path / 'data.h5')
+    value = np.arange(40 * 30, dtype=np.float32).reshape(40, 30)
+    write_h5(path, value)
+    arr = th.open_tensor_arrays(path)['group/data']
+    np.testing.assert_array_equal(np.asarray(arr[5:21, 3:17]), value[5:21, 3:17])
+    np.testing.assert_array_equal(np.asarray(arr[::-3, 7]), value[::-3, 7])
+    np.testing.assert_array_equal(np.concatenate(list(th.iter_flat_chunks(arr, np, 100))), value.ravel())
+
+
+def test_release_closes_file(th, tmp_path):
+    path = str(tmp_path / 'data.h5')
+    write_h5(path, np.zeros((16, 16), dtype=np.float32))
+    arrays = th.open_tensor_arrays(path)
+    handle = arrays._resources[0]
+    assert handle.id.valid
+    th.release_file(path)
+    assert not handle.id.valid
+
+
+def test_eviction_closes_file(th, tmp_path, monkeypatch):
+    monkeypatch.setattr(th, 'MAX_OPEN_FILES', 1)
+    first, second = str(tmp_path / 'a.h5'), str(tmp_path / 'b.h5')
+    write_h5(first, np.zeros((16, 16), dtype=np.float32))
+    write_h5(second, np.ones((16, 16), dtype=np.float32))
+    handle = th.open_tensor_arrays(first)._resources[0]
+    th.open_tensor_arrays(second)
+    assert not handle.id.valid
+
+
+def test_atomic_replace_does_not_serve_stale_chunks(th, tmp_path):
+    path = str(tmp_path / 'data.h5')
+    # 不压缩，两个文件的大小才相同
+    old = np.zeros((16, 16), dtype=np.float32)
+    write_h5(path, old, compression=None)
+    np.testing.assert_array_equal(np.asarray(th.open_tensor_arrays(path)['group/data'][:8, :8]), old[:8, :8])
+
+    # 原子替换为大小与修改时间都相同、内容不同的文件
+    stat = os.stat(path)
+    replacement = str(tmp_path / 'replacement.h5')
+    write_h5(replacement, np.full((16, 16), 7, dtype=np.float32), compression=None)
+    assert os.stat(replacement).st_size == stat.st_size
+    os.utime(replacement, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(replacement, path)
+
+    np.testing.assert_array_equal(np.asarray(th.open_tensor_arrays(path)['group/data'][:8, :8]), 7)
@@ -0,0 +1,81 @@
+"""服务端直方图"""
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def npz_file(tmp_path):
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=5000)
+    values[:3] = [np.nan, np.inf, -np.inf]
+    path = str(tmp_path / 'data.npz')
+    np.savez(path, values=values, grid=np.arange(60, dtype=np.int32).reshape(3, 20),
+             positive=rng.lognormal(size=2000), text=np.array(['a']))
+    return path, values
+
+
+def test_linear_matches_numpy(th, npz_file):
+    path, values = npz_file
+    hist = th.compute_histogram(path, 'values', bins=32)
+    finite = values[np.isfinite(values)]
+    counts, edges = np.histogram(finite, bins=32)
+    np.testing.assert_array_equal(hist['counts'].array, counts)
+    np.testing.assert_array_equal(hist['edges'].array, edges)
+    assert (hist['nanCount'], hist['posInfCount'], hist['negInfCount']) == (1, 1, 1)
+    assert hist['size'] == values.size
+
+
+def test_log_and_quantile_bins(th, npz_file):
+    path, _ = npz_file
+    log = th.compute_histogram(path, 'positive', bins=10, scale='log')
+    edges = log['edges'].array
+    np.testing.assert_allclose(edges[1:] / edges[:-1], edges[1] / edges[0])
+    assert log['counts'].array.sum() == 2000
+
+    quantile = th.compute_histogram(path, 'positive', bins=4, scale='quantile')
+    counts = quantile['counts'].array
+    assert counts.sum() == 2000
+    assert np.all(np.abs(counts - 500) <= 25)
+
+    with pytest.raises(ValueError, match='对数分箱'):
+        th.compute_histogram(path, 'grid', scale='log', slice_spec='0, :1')
+
+
+def test_axis_and_range(th, npz_file):
+    path, _ = npz_file
+    hist = th.compute_histogram(path, 'grid', bins=6, axis=0, value_range=[10, 40])
+    counts = hist['counts'].array
+    assert counts.shape == (3, 6)
+    assert counts.sum(axis=1).tolist() == [10, 20, 1]
+    assert hist['underflow'] == [10, 0, 0] and hist['overflow'] == [0, 0, 19]
+
+
+def test_results_are_cached(th, npz_file, monkeypatch):
+    path, _ = npz_file
+    first = th.compute_histogram(path, 'values', bins=8)
+    monkeypatch.setattr(th, 'count_histogram', None)
+    cached = th.compute_histogram(path, 'values', bins=8)
+    np.testing.assert_array_equal(cached['counts'].array, first['counts'].array)
+
+
+def test_many_keys_report_errors_per_key(th, npz_file):
+    path, _ = npz_file
+    results = {item['key']: item for item in th.compute_histograms(path, '*', bins=4)}
+    assert set(results) == {'values', 'grid', 'positive', 'text'}
+    assert 'error' in results['text'] and 'counts' in results['grid']
+
+
+def test_log_bins_with_non_positive_range_start(th, tmp_path):
+    values = np.linspace(-1, 10, 100)
+    path = str(tmp_path / 'data.npy')
+    np.save(path, values)
+    hist = th.compute_histogram(path, 'data', bins=8, scale='log', value_range=[-1, 10])
+    edges = hist['edges'].array
+    positive = values[values > 0]
+    assert edges[0] == positive.min() and edges[-1] == 10
+    assert hist['counts'].array.sum() == positive.size
+    assert hist['underflow'] == values.size - positive.size
+
+    # 范围内没有正值时仍然报错
+    with pytest.raises(ValueError, match='对数分箱'):
+        th.compute_histogram(path, 'data', scale='log', value_range=[-1, 0])
@@ -0,0 +1,59 @@
+"""工作区索引的文件头汇总"""
+import numpy as np
+import pytest
+
+
+def test_batch_summaries_and_errors(th, tmp_path, monkeypatch):
+    npz = str(tmp_path / 'a.npz')
+    np.savez(npz, w=np.zeros((3, 4), dtype=np.float32), b=np.zeros(4, dtype=np.float32),
+             s=np.zeros((3, 4), dtype=np.int8))
+    npy = str(tmp_path / 'b.npy')
+    np.save(npy, np.zeros(10))
+    broken = tmp_path / 'c.npy'
+    broken.write_bytes(b'not a npy file')
+
+    def fail(*args, **kwargs):
+        raise AssertionError('索引只应读取文件头')
+
+    monkeypatch.setattr(th, 'open_tensor_arrays', fail)
+    results = th.index_headers([npz, str(broken), npy, str(tmp_path / 'x.txt')])
+    assert [item['file'] for item in results] == [npz, str(broken), npy, str(tmp_path / 'x.txt')]
+    assert results[0] == {'file': npz, 'tensorCount': 3, 'elements': 28, 'nbytes': 76,
+                          'dtypes': ['float32', 'int8'], 'shapes': [[3, 4], [4]]}
+    assert results[2]['tensorCount'] == 1 and results[2]['nbytes'] == 80
+    assert 'error' in results[1] and 'error' in results[3]
+
+
+def test_distinct_shapes_are_capped(th, tmp_path, monkeypatch):
+    monkeypatch.setattr(th, 'INDEX_MAX_SHAPES', 3)
+    path = str(tmp_path / 'many.npz')
+    np.savez(path, **{f'k{i}': np.zeros(i + 1) for i in range(6)})
+    (result,) = th.index_headers([path])
+    assert result['tensorCount'] == 6 and result['shapes'] == [[1], [2], [3]]
+
+
+def test_legacy_torch_is_not_loaded(th, tmp_path):
+    torch = pytest.importorskip('torch')
+    path = str(tmp_path / 'legacy.pt')
+    torch.save({'w': torch.zeros(2)}, path, _use_new_zipfile_serialization=False)
+    (result,) = th.index_headers([path])
+    assert '旧版' in result['error']
+
+
+def test_progress_and_cancellation(th, tmp_path):
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f'{i}.npy'))
+        np.save(paths[-1], np.zeros(i + 1))
+    messages = []
+    context = th.RequestContext(1, messages.append)
+    context.PROGRESS_INTERVAL = 0
+    th._request_local.context = context
+    try:
+        th.index_headers(paths)
+        assert [m['progress'] for m in messages] == [{'done': i, 'total': 3} for i in (1, 2, 3)]
+        context.cancelled.set()
+        with pytest.raises(th.RequestCancelled):
+            th.index_headers(paths)
+    finally:
+        th._request_local.context = None
@@ -0,0 +1,48 @@
+"""info 命令只解析文件头，不读取张量数据"""
+import zipfile
+
+import numpy as np
+import pytest
+
+
+def test_npy_header_without_payload(th, tmp_path):
+    path = tmp_path / 'big.npy'
+    np.save(path, np.zeros((300, 200), dtype='>f4', order='F'))
+    # 截掉数据部分：只读头部时仍能得到完整信息
+    with open(path, 'r+b') as f:
+        f.truncate(128)
+    (info,) = th.get_tensor_info(str(path))
+    assert info == {'key': 'data', 'shape': [300, 200], 'dtype': '>f4', 'size': 60000, 'nbytes': 240000}
+
+
+@pytest.mark.parametrize('compressed', [False, True])
+def test_npz_members(th, tmp_path, compressed):
+    path = str(tmp_path / 'data.npz')
+    save = np.savez_compressed if compressed else np.savez
+    save(path, weights=np.ones((64, 32), dtype=np.float16), ids=np.arange(10, dtype=np.int64), empty=np.zeros((0, 3)))
+    infos = {info['key']: info for info in th.get_tensor_info(path)}
+    assert set(infos) == {'weights', 'ids', 'empty'}
+    assert infos['weights']['shape'] == [64, 32] and infos['weights']['nbytes'] == 64 * 32 * 2
+    assert infos['ids']['dtype'] == 'int64' and infos['ids']['size'] == 10
+    assert infos['empty']['size'] == 0
+    assert all(info['compressed'] == compressed for info in infos.values())
+    with zipfile.ZipFile(path) as zf:
+        assert infos['weights']['compressedSize'] == zf.getinfo('weights.npy').compress_size
+
+
+def test_torch_info_reads_only_the_pickle(th, tmp_path, monkeypatch):
+    torch = pytest.importorskip('torch')
+    path = str(tmp_path / 'model.pt')
+    torch.save({'encoder': {'weight': torch.zeros(8, 4, dtype=torch.bfloat16)}, 'step': 3,
+                'bias': torch.zeros(4).t()}, path)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('info 不应导入 torch 或加载张量')
+
+    monkeypatch.setattr(th, 'load_torch', fail)
+    monkeypatch.setattr(th, 'open_tensor_arrays', fail)
+    infos = {info['key']: info for info in th.get_tensor_info(path)}
+    assert infos == {
+        'encoder.weight': {'key': 'encoder.weight', 'shape': [8, 4], 'dtype': 'bfloat16', 'size': 32, 'nbytes': 64},
+        'bias': {'key': 'bias', 'shape': [4], 'dtype': 'float32', 'size': 4, 'nbytes': 16},
+    }
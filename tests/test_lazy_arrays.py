@@ -0,0 +1,44 @@
+"""惰性数组层：.npy/.npz 内存映射"""
+import numpy as np
+
+
+def make_npz(path, count, compressed=False):
+    arrays = {f'tensor_{i}': np.arange(i, i + 12, dtype=np.float32).reshape(3, 4) for i in range(count)}
+    (np.savez_compressed if compressed else np.savez)(path, **arrays)
+    return arrays
+
+
+def test_npz_stored_members_are_views(th, tmp_path):
+    path = str(tmp_path / 'stored.npz')
+    expected = make_npz(path, 3)
+    arrays = th.open_tensor_arrays(path)
+    for key, value in expected.items():
+        arr = arrays[key]
+        np.testing.assert_array_equal(arr, value)
+        assert not arr.flags.writeable
+    assert arrays.load_cost('tensor_0') == 0
+
+
+def test_npz_compressed_members_are_decompressed(th, tmp_path):
+    path = str(tmp_path / 'compressed.npz')
+    expected = make_npz(path, 2, compressed=True)
+    arrays = th.open_tensor_arrays(path)
+    assert arrays.load_cost('tensor_1') > 0
+    np.testing.assert_array_equal(arrays['tensor_1'], expected['tensor_1'])
+
+
+def test_npz_fortran_member(th, tmp_path):
+    path = str(tmp_path / 'fortran.npz')
+    value = np.asfortranarray(np.arange(20, dtype=np.int64).reshape(4, 5))
+    np.savez(path, f=value)
+    np.testing.assert_array_equal(th.open_tensor_arrays(path)['f'], value)
+
+
+def test_npz_many_members_under_low_fd_limit(th, tmp_path, low_fd_limit):
+    path = str(tmp_path / 'many.npz')
+    expected = make_npz(path, 400)
+    data = th.load_tensor_file(path)
+    assert len(data['tensors']) == 400
+    arrays = th.open_tensor_arrays(path)
+    for key, value in expected.items():
+        np.testing.assert_array_equal(arrays[key], value)
@@ -0,0 +1,66 @@
+"""压缩 .npz 成员的并行解压与内存预算"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def compressed_npz(tmp_path):
+    path = str(tmp_path / 'data.npz')
+    rng = np.random.default_rng(0)
+    np.savez_compressed(path, **{f'm{i}': rng.normal(size=(64, 64)) for i in range(12)})
+    return path
+
+
+def summarize(th, path):
+    arrays = th.open_tensor_arrays(path)
+    return arrays, th.summarize_tensors(path, arrays, list(arrays), np)
+
+
+def test_parallel_matches_serial(th, compressed_npz, monkeypatch):
+    monkeypatch.setenv('TENSORLENS_WORKERS', '1')
+    _, serial = summarize(th, compressed_npz)
+    th.release_file(compressed_npz)
+    monkeypatch.setenv('TENSORLENS_WORKERS', '4')
+    arrays, parallel = summarize(th, compressed_npz)
+    assert [item['info'] for item in parallel.values()] == [item['info'] for item in serial.values()]
+    assert list(parallel) == list(arrays)
+    # 解压出的数组用完即释放，不留在打开文件缓存中
+    assert not any(arrays.is_loaded(key) for key in arrays)
+
+
+def test_memory_budget_limits_resident_members(th, compressed_npz, monkeypatch):
+    member_bytes = 64 * 64 * 8
+    monkeypatch.setenv('TENSORLENS_WORKERS', '6')
+    # 预算只够同时容纳两个成员
+    monkeypatch.setenv('TENSORLENS_MEMORY_BUDGET_MB', str(2.5 * member_bytes / 1024 / 1024))
+
+    lock = threading.Lock()
+    active = [0, 0]
+    create = th.create_tensor_item
+
+    def tracked(*args, **kwargs):
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+        try:
+            time.sleep(0.01)
+            return create(*args, **kwargs)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    monkeypatch.setattr(th, 'create_tensor_item', tracked)
+    _, items = summarize(th, compressed_npz)
+    assert len(items) == 12
+    assert active[1] == 2
+
+
+def test_oversized_request_takes_whole_budget(th):
+    budget = th.MemoryBudget(100)
+    assert budget.acquire(1000) == 100
+    assert budget.available == 0
+    budget.release(100)
+    assert budget.available == 100
@@ -0,0 +1,138 @@
+"""safetensors 头部解析与零拷贝读取（按格式规范手工写出文件，不依赖 safetensors 包）"""
+import json
+import os
+import struct
+
+import numpy as np
+import pytest
+
+SAFETENSORS_NAMES = {'float32': 'F32', 'float16': 'F16', 'int64': 'I64', 'uint8': 'U8', 'bool': 'BOOL'}
+
+
+def write_safetensors(path, tensors, raw=None, metadata=None):
+    """tensors 为 名称 -> 数组；raw 为 名称 -> (safetensors dtype 名, 形状, 原始字节)"""
+    header = {'__metadata__': metadata or {'format': 'pt'}}
+    blobs = []
+    offset = 0
+    items = []
+    for name, arr in tensors.items():
+        data = arr.astype(arr.dtype.newbyteorder('<')).tobytes()
+        items.append((name, SAFETENSORS_NAMES[arr.dtype.name], list(arr.shape), data))
+    items += [(name, *spec) for name, spec in (raw or {}).items()]
+    for name, dtype, shape, data in items:
+        header[name] = {'dtype': dtype, 'shape': shape, 'data_offsets': [offset, offset + len(data)]}
+        blobs.append(data)
+        offset += len(data)
+    encoded = json.dumps(header).encode('utf-8')
+    encoded += b' ' * (-len(encoded) % 8)
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<Q', len(encoded)))
+        f.write(encoded)
+        for data in blobs:
+            f.write(data)
+
+
+def bfloat16_bytes(values):
+    """float32 截断高 16 位即为 bf16 位模式（测试值都可精确表示）"""
+    return (np.asarray(values, dtype=np.float32).view(np.uint32) >> 16).astype('<u2').tobytes()
+
+
+def test_info_and_views(th, tmp_path):
+    path = str(tmp_path / 'model.safetensors')
+    weight = np.arange(12, dtype=np.float32).reshape(3, 4)
+    write_safetensors(path, {'weight': weight, 'ids': np.array([5, -1], dtype=np.int64),
+                             'mask': np.array([True, False]), 'empty': np.zeros((0, 2), dtype=np.float16)})
+
+    infos = {info['key']: info for info in th.get_tensor_info(path)}
+    assert infos['weight'] == {'key': 'weight', 'shape': [3, 4], 'dtype': 'float32', 'size': 12, 'nbytes': 48}
+    assert set(infos) == {'weight', 'ids', 'mask', 'empty'}
+
+    arrays = th.open_tensor_arrays(path)
+    np.testing.assert_array_equal(arrays['weight'], weight)
+    np.testing.assert_array_equal(arrays['ids'], [5, -1])
+    np.testing.assert_array_equal(arrays['mask'], [True, False])
+    assert arrays['empty'].shape == (0, 2)
+    # 零拷贝：只读的内存映射视图
+    assert not arrays['weight'].flags['OWNDATA'] and not arrays['weight'].flags['WRITEABLE']
+
+
+def test_bfloat16_is_converted_in_chunks(th, tmp_path):
+    path = str(tmp_path / 'bf16.safetensors')
+    values = [1.5, -2.0, 0.0, 3.25, 1024.0, -0.125]
+    write_safetensors(path, {}, raw={'w': ('BF16', [2, 3], bfloat16_bytes(values))})
+
+    (info,) = th.get_tensor_info(path)
+    assert (info['dtype'], info['nbytes']) == ('bfloat16', 12)
+    item = th.load_tensor_file(path)['tensors'][0]
+    assert item['info']['dtype'] == 'float32'
+    assert item['info']['min'] == -2.0 and item['info']['max'] == 1024.0
+    arr = th.open_tensor_arrays(path)['w']
+    assert arr.dtype == np.float32
+    np.testing.assert_array_equal(arr, np.reshape(values, (2, 3)))
+
+
+def test_sharded_checkpoint(th, tmp_path):
+    a, b = np.ones((2, 2), dtype=np.float32), np.arange(3, dtype=np.uint8)
+    write_safetensors(str(tmp_path / 'model-00001-of-00002.safetensors'), {'a': a})
+    write_safetensors(str(tmp_path / 'model-00002-of-00002.safetensors'), {'b': b})
+    index = tmp_path / 'model.safetensors.index.json'
+    index.write_text(json.dumps({'metadata': {}, 'weight_map': {
+        'b': 'model-00002-of-00002.safetensors', 'a': 'model-00001-of-00002.safetensors'}}))
+
+    assert [info['key'] for info in th.get_tensor_info(str(index))] == ['b', 'a']
+    arrays = th.open_tensor_arrays(str(index))
+    np.testing.assert_array_equal(arrays['a'], a)
+    np.testing.assert_array_equal(arrays['b'], b)
+
+
+def test_rewritten_shard_changes_index_identity(th, tmp_path):
+    shard = str(tmp_path / 'model-00001-of-00002.safetensors')
+    write_safetensors(shard, {'a': np.ones(4, dtype=np.float32)})
+    write_safetensors(str(tmp_path / 'model-00002-of-00002.safetensors'), {'b': np.zeros(2, dtype=np.float32)})
+    index = str(tmp_path / 'model.safetensors.index.json')
+    with open(index, 'w') as f:
+        json.dump({'weight_map': {'a': 'model-00001-of-00002.safetensors', 'b': 'model-00002-of-00002.safetensors'}}, f)
+
+    identity = th.file_identity(index)
+    assert th.describe_tensor(index, 'a')['info']['mean'] == pytest.approx(1.0)
+    assert th.describe_tensor(index, 'b')['info']['mean'] == pytest.approx(0.0)
+
+    # 原地改写一个分片，索引文件本身不变
+    stat = os.stat(shard)
+    with open(shard, 'r+b') as f:
+        f.seek(stat.st_size - 16)
+        f.write(np.full(4, 3, dtype='<f4').tobytes())
+    os.utime(shard, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert th.file_identity(index) != identity
+    np.testing.assert_array_equal(th.open_tensor_arrays(index)['a'], [3, 3, 3, 3])
+    # 统计缓存按分片记录：改写的分片重新计算，其他分片的条目仍然命中
+    cache = th.get_stats_cache()
+    assert cache.get(index, 'a', 'item') is None
+    assert cache.get(index, 'b', 'item') is not None
+    assert th.describe_tensor(index, 'a')['info']['mean'] == pytest.approx(3.0)
+
+
+def test_corrupt_files(th, tmp_path):
+    mismatch = str(tmp_path / 'mismatch.safetensors')
+    write_safetensors(mismatch, {}, raw={'w': ('F32', [4], b'\0' * 12)})
+    with pytest.raises(ValueError, match='长度与形状不符'):
+        th.open_tensor_arrays(mismatch)['w']
+
+    huge = tmp_path / 'huge.safetensors'
+    huge.write_bytes(struct.pack('<Q', 1 << 40) + b'{}')
+    with pytest.raises(ValueError, match='头部过大'):
+        th.get_tensor_info(str(huge))
+
+    unknown = str(tmp_path / 'unknown.safetensors')
+    write_safetensors(unknown, {}, raw={'w': ('F4', [2], b'\0')})
+    with pytest.raises(ValueError, match='不支持的 safetensors 类型'):
+        th.get_tensor_info(unknown)
+
+
+def test_many_tensors_share_one_mapping(th, tmp_path, low_fd_limit):
+    path = str(tmp_path / 'many.safetensors')
+    write_safetensors(path, {f'layer{i}': np.full(4, i, dtype=np.float32) for i in range(400)})
+    arrays = th.open_tensor_arrays(path)
+    views = [arrays[key] for key in arrays]
+    assert [int(view[0]) for view in views] == list(range(400))
@@ -0,0 +1,92 @@
+"""单元格编辑的增量保存"""
+import os
+import zipfile
+
+import numpy as np
+import pytest
+
+
+def test_npy_is_written_in_place(th, tmp_path):
+    path = str(tmp_path / 'data.npy')
+    data = np.asfortranarray(np.zeros((4, 5), dtype=np.float32))
+    np.save(path, data)
+    inode = os.stat(path).st_ino
+
+    result = th.save_edits(path, 'data', [{'row': 1, 'col': 2, 'value': '1.5'}, {'row': 3, 'col': 4, 'value': '-2'}])
+    assert result['success'] and result['modified'] == 2
+    data[1, 2], data[3, 4] = 1.5, -2
+    saved = np.load(path)
+    assert saved.flags['F_CONTIGUOUS']
+    np.testing.assert_array_equal(saved, data)
+    assert os.stat(path).st_ino == inode
+
+
+def test_higher_dimensions(th, tmp_path):
+    path = str(tmp_path / 'cube.npy')
+    data = np.zeros((2, 3, 4), dtype=np.int16)
+    np.save(path, data)
+    assert th.save_edits(path, 'data', [{'row': 1, 'col': 3, 'value': '7'}], index=[1])['success']
+    assert th.save_edits(path, 'data', [{'row': 5, 'col': 0, 'value': '9'}])['success']
+    data[1, 1, 3] = 7
+    data[1, 2, 0] = 9
+    np.testing.assert_array_equal(np.load(path), data)
+
+
+@pytest.mark.parametrize('compressed', [False, True])
+def test_npz_rewrites_only_the_edited_member(th, tmp_path, compressed):
+    path = str(tmp_path / 'data.npz')
+    save = np.savez_compressed if compressed else np.savez
+    other = np.random.default_rng(0).normal(size=(50, 50))
+    save(path, edited=np.arange(12, dtype=np.int64).reshape(3, 4), other=other)
+    with zipfile.ZipFile(path) as zf:
+        before = {info.filename: (info.compress_type, info.CRC, info.compress_size) for info in zf.infolist()}
+
+    assert th.save_edits(path, 'edited', [{'row': 2, 'col': 1, 'value': '100'}])['success']
+
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        after = {info.filename: (info.compress_type, info.CRC, info.compress_size) for info in zf.infolist()}
+    assert after['other.npy'] == before['other.npy']
+    assert after['edited.npy'][0] == before['edited.npy'][0]
+    with np.load(path) as npz:
+        expected = np.arange(12).reshape(3, 4)
+        expected[2, 1] = 100
+        np.testing.assert_array_equal(npz['edited'], expected)
+        np.testing.assert_array_equal(npz['other'], other)
+
+
+def test_saved_data_is_reread(th, tmp_path):
+    path = str(tmp_path / 'data.npz')
+    np.savez(path, a=np.zeros(3))
+    assert th.get_window(path, 'a', 0, 3, 0, 1)['data'].array.ravel().tolist() == [0, 0, 0]
+    th.save_edits(path, 'a', [{'row': 1, 'col': 0, 'value': '4'}])
+    assert th.get_window(path, 'a', 0, 3, 0, 1)['data'].array.ravel().tolist() == [0, 4, 0]
+
+
+@pytest.mark.parametrize('value, message', [
+    ('abc', '无法将'),
+    ('1.5', '包含小数点'),
+    ('40000', '超出'),
+])
+def test_invalid_values_leave_file_untouched(th, tmp_path, value, message):
+    path = tmp_path / 'data.npy'
+    np.save(path, np.zeros(4, dtype=np.int16))
+    before = path.read_bytes()
+    result = th.save_edits(str(path), 'data', [{'row': 0, 'col': 0, 'value': '1'}, {'row': 1, 'col': 0, 'value': value}])
+    assert result['error'].startswith('第 2 处修改失败') and message in result['error']
+    assert path.read_bytes() == before
+
+
+def test_out_of_range_position(th, tmp_path):
+    path = str(tmp_path / 'data.npy')
+    np.save(path, np.zeros((2, 2)))
+    result = th.save_edits(path, 'data', [{'row': 0, 'col': 0, 'value': '1'}, {'row': 0, 'col': 2, 'value': '1'}])
+    assert '超出数组范围' in result['error']
+    assert not np.load(path).any()
+
+
+def test_object_array(th, tmp_path):
+    path = str(tmp_path / 'objects.npy')
+    np.save(path, np.array(['a', 'b'], dtype=object), allow_pickle=True)
+    assert th.save_edits(path, 'data', [{'row': 1, 'col': 0, 'value': 'z'}])['success']
+    assert np.load(path, allow_pickle=True).tolist() == ['a', 'z']
@@ -0,0 +1,84 @@
+"""分块数值搜索"""
+import functools
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def small_chunks(th, monkeypatch):
+    """每块 64 字节，小数组也会被分成多块扫描"""
+    monkeypatch.setattr(th, 'iter_tensor_chunks', functools.partial(th.iter_tensor_chunks, chunk_bytes=64))
+
+
+@pytest.mark.parametrize('query, values, expected', [
+    ('1.5', [1.5, 1.5000001, 1.6], [True, True, False]),
+    ('1.5±0.2', [1.5, 1.65, 1.8], [True, True, False]),
+    ('>= 2', [1.0, 2.0, 3.0], [False, True, True]),
+    ('<0', [-1.0, 0.0, 1.0], [True, False, False]),
+    ('3..1', [0.5, 1.0, 3.0], [False, True, True]),
+    ('nan', [np.nan, np.inf, 0.0], [True, False, False]),
+    ('inf', [np.inf, -np.inf, np.nan], [True, True, False]),
+    ('-inf', [np.inf, -np.inf, 0.0], [False, True, False]),
+])
+def test_value_queries(th, query, values, expected):
+    _, matcher = th.parse_value_query(query, np)
+    np.testing.assert_array_equal(matcher(np.array(values)), expected)
+
+
+def test_integer_queries_match_exactly(th):
+    _, matcher = th.parse_value_query('3', np)
+    np.testing.assert_array_equal(matcher(np.array([2, 3, 4], dtype=np.int64)), [False, True, False])
+    _, matcher = th.parse_value_query('nan', np)
+    assert not matcher(np.arange(3)).any()
+
+
+def test_non_numeric_query(th):
+    assert th.parse_value_query('weight', np) is None
+
+
+def test_positions_follow_memory_order(th, tmp_path, small_chunks):
+    path = str(tmp_path / 'data.npz')
+    arr = np.zeros((6, 7))
+    arr[4, 5] = arr[1, 6] = 9.0
+    np.savez(path, c=arr, f=np.asfortranarray(arr))
+    results = {item['key']: item for item in th.search_tensor(path, '9', regex=False, case_sensitive=False)}
+    for key in ('c', 'f'):
+        assert {m['position'] for m in results[key]['matches']} == {'(1, 6)', '(4, 5)'}
+        assert results[key]['hitCount'] == 2 and results[key]['hitCountExact']
+
+
+def test_early_termination_and_count_all(th, tmp_path, small_chunks):
+    path = str(tmp_path / 'ones.npy')
+    np.save(path, np.ones(1000))
+    (partial,) = th.search_tensor(path, '1', regex=False, case_sensitive=False, max_results=5)
+    assert not partial['hitCountExact']
+    assert 5 <= partial['hitCount'] < 1000
+    assert partial['matches'][-1]['position'] == '...'
+    assert [m['position'] for m in partial['matches'][:5]] == [f'({i},)' for i in range(5)]
+
+    (full,) = th.search_tensor(path, '1', regex=False, case_sensitive=False, max_results=5, count_all=True)
+    assert full['hitCountExact'] and full['hitCount'] == 1000
+
+
+def test_key_matches(th, tmp_path):
+    path = str(tmp_path / 'data.npz')
+    np.savez(path, **{'Encoder.weight': np.zeros(2), 'decoder.bias': np.zeros(2)})
+    assert [item['key'] for item in th.search_tensor(path, 'encoder', regex=False, case_sensitive=False)] == \
+        ['Encoder.weight']
+    assert th.search_tensor(path, 'encoder', regex=False, case_sensitive=True) == []
+    assert {item['key'] for item in th.search_tensor(path, r'\.(weight|bias)$', regex=True, case_sensitive=False)} == \
+        {'Encoder.weight', 'decoder.bias'}
+
+
+def test_cancelled_search_stops(th, tmp_path, small_chunks):
+    path = str(tmp_path / 'ones.npy')
+    np.save(path, np.ones(1000))
+    context = th.RequestContext(1, lambda message: None)
+    context.cancelled.set()
+    th._request_local.context = context
+    try:
+        with pytest.raises(th.RequestCancelled):
+            th.search_tensor(path, '1', regex=False, case_sensitive=False)
+    finally:
+        th._request_local.context = None
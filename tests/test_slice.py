@@ -0,0 +1,79 @@
+"""切片表达式解析与分页"""
+import numpy as np
+import pytest
+
+ARR = np.arange(4 * 5 * 6).reshape(4, 5, 6)
+
+
+@pytest.mark.parametrize('spec, index', [
+    ('', ()),
+    ('0', (0,)),
+    ('-1, 2', (-1, 2)),
+    (':', (slice(None),)),
+    ('1:3', (slice(1, 3),)),
+    ('::-2', (slice(None, None, -2),)),
+    ('+1:-1:2', (slice(1, -1, 2),)),
+    ('...,0', (Ellipsis, 0)),
+    ('None,:', (None, slice(None))),
+    ('np.newaxis, newaxis', (None, None)),
+    ('[0, 2, -1], :2', ([0, 2, -1], slice(None, 2))),
+    ('0,', (0,)),
+])
+def test_parse_index_expr(th, spec, index):
+    assert th.parse_index_expr(spec) == index
+
+
+@pytest.mark.parametrize('spec', ['1:2:3:4', '::0', '..., ...', '[1, :]', '[1', '1 2', '1,,2', ':)'])
+def test_syntax_errors(th, spec):
+    with pytest.raises(ValueError, match='切片语法错误'):
+        th.parse_index_expr(spec)
+
+
+@pytest.mark.parametrize('spec', [
+    "__import__('os').system('true')",
+    'arr.tolist()',
+    '().__class__',
+    '1 if True else 0',
+    'lambda: 0',
+])
+def test_expressions_are_never_evaluated(th, spec):
+    with pytest.raises(ValueError, match='切片语法错误'):
+        th.apply_slice(ARR, spec)
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('1, :, ::2', ARR[1, :, ::2]),
+    ('..., -1', ARR[..., -1]),
+    ('[0][1][:5]', ARR[0][1][:5]),
+    ('[0, 3], 1', ARR[[0, 3], 1]),
+    ('None, 2', ARR[None, 2]),
+])
+def test_apply_slice_matches_numpy(th, spec, expected):
+    np.testing.assert_array_equal(th.apply_slice(ARR, spec), expected)
+
+
+def test_basic_slices_are_views(th):
+    assert np.shares_memory(th.apply_slice(ARR, '1:, ::2'), ARR)
+
+
+def test_out_of_range_index(th):
+    with pytest.raises(ValueError, match='切片索引错误'):
+        th.apply_slice(ARR, '4')
+
+
+def test_get_slice_pages_along_first_axis(th, tmp_path):
+    path = str(tmp_path / 'big.npy')
+    data = np.arange(100 * 8, dtype=np.float64).reshape(100, 8)
+    np.save(path, data)
+
+    whole = th.get_slice(path, 'data', '10:20')
+    np.testing.assert_array_equal(whole.array, data[10:20])
+    assert th.get_slice(path, 'data', '3, 4') == data[3, 4]
+
+    # 每行 64 字节，上限 640 字节时每页 10 行
+    page = th.get_slice(path, 'data', '::2', offset=45, max_bytes=640)
+    assert (page['paged'], page['shape'], page['offset'], page['count']) == (True, [50, 8], 45, 5)
+    np.testing.assert_array_equal(page['data'].array, data[::2][45:50])
+
+    with pytest.raises(ValueError, match='切片结果过大'):
+        th.get_slice(path, 'data', ':', max_bytes=32)
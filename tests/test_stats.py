@@ -0,0 +1,78 @@
+"""分块单遍统计与可合并的分位数草图"""
+import numpy as np
+import pytest
+
+
+def test_chunked_stats_match_numpy(th):
+    rng = np.random.default_rng(1)
+    data = rng.normal(1e6, 3.0, size=(300, 70))
+    data[5, :10] = 0.0
+    # 每块 1 KiB，强制多次合并
+    stats = th.compute_stats(data, np, chunk_bytes=1024)
+    assert stats['min'] == data.min() and stats['max'] == data.max()
+    assert stats['mean'] == pytest.approx(data.mean(), rel=1e-12)
+    assert stats['std'] == pytest.approx(data.std(), rel=1e-9)
+    assert stats['zeroCount'] == 10
+    assert stats['nanCount'] == 0 and stats['infCount'] == 0
+
+
+def test_non_finite_values_are_counted_not_averaged(th):
+    data = np.array([1.0, np.nan, 3.0, np.inf, -np.inf, np.nan, 0.0], dtype=np.float32)
+    stats = th.compute_stats(data, np, chunk_bytes=16)
+    assert stats['nanCount'] == 2 and stats['infCount'] == 2 and stats['zeroCount'] == 1
+    assert (stats['min'], stats['max']) == (0.0, 3.0)
+    assert stats['mean'] == pytest.approx(4 / 3)
+
+
+def test_integer_and_non_contiguous_input(th):
+    data = np.arange(-500, 700, dtype=np.int16).reshape(40, 30)[::3, ::-2]
+    stats = th.compute_stats(data, np, chunk_bytes=64)
+    assert (stats['min'], stats['max']) == (data.min(), data.max())
+    assert stats['mean'] == pytest.approx(data.mean())
+    assert stats['std'] == pytest.approx(data.std())
+
+
+def test_all_nan_has_no_value_stats(th):
+    stats = th.compute_stats(np.full(10, np.nan), np)
+    assert stats == {'nanCount': 10, 'infCount': 0, 'zeroCount': 0}
+
+
+def test_merge_equals_single_pass(th):
+    rng = np.random.default_rng(2)
+    parts = [rng.exponential(5.0, size=n) for n in (1000, 1, 25000)]
+    merged = th.StreamingStats(np)
+    for part in parts:
+        partial = th.StreamingStats(np)
+        partial.update(part)
+        merged.merge(partial)
+    merged.merge(th.StreamingStats(np))
+    single = th.StreamingStats(np)
+    single.update(np.concatenate(parts))
+
+    a, b = merged.result(), single.result()
+    assert a['min'] == b['min'] and a['max'] == b['max']
+    assert a['mean'] == pytest.approx(b['mean'], rel=1e-12)
+    assert a['std'] == pytest.approx(b['std'], rel=1e-12)
+
+
+def test_quantile_sketch_rank_error(th):
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(size=1_000_000)
+    sketch = th.QuantileSketch(np)
+    other = th.QuantileSketch(np, seed=1)
+    for chunk in np.array_split(values[:600_000], 7):
+        sketch.update(chunk)
+    other.update(values[600_000:])
+    sketch.merge(other)
+
+    # 草图大小有界，不随数据量增长
+    assert sum(level.size for level in sketch.levels) <= sketch.capacity * len(sketch.levels)
+    ordered = np.sort(values)
+    qs = (0.01, 0.25, 0.5, 0.75, 0.99)
+    for q, estimate in zip(qs, sketch.quantiles(qs)):
+        rank = np.searchsorted(ordered, estimate) / values.size
+        assert abs(rank - q) < 0.01
+
+
+def test_empty_sketch(th):
+    assert th.QuantileSketch(np).quantiles([0.5]) == [None]
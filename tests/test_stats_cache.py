@@ -0,0 +1,83 @@
+"""按文件身份缓存的统计与元数据"""
+import os
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def cache(th, tmp_path):
+    cache = th.StatsCache(str(tmp_path / 'cache'))
+    yield cache
+    cache.conn.close()
+
+
+def test_roundtrip_keeps_binary_arrays(th, cache, tmp_path):
+    path = str(tmp_path / 'a.npy')
+    np.save(path, np.zeros(3))
+    preview = th.BinaryArray(np.arange(6, dtype=np.int32).reshape(2, 3), np)
+    cache.put(path, 'data', 'item', {'info': {'mean': 1.5}, 'preview': preview})
+
+    value = cache.get(path, 'data', 'item')
+    assert value['info'] == {'mean': 1.5}
+    assert isinstance(value['preview'], th.BinaryArray)
+    np.testing.assert_array_equal(value['preview'].array, preview.array)
+    assert cache.get(path, 'data', 'other') is None
+
+
+def test_changed_file_is_a_miss(cache, tmp_path):
+    path = str(tmp_path / 'a.npy')
+    np.save(path, np.zeros(3))
+    cache.put(path, 'data', 'item', {'v': 1})
+    np.save(path, np.zeros(4))
+    assert cache.get(path, 'data', 'item') is None
+
+
+def test_same_size_and_mtime_replacement_is_a_miss(cache, tmp_path):
+    path = str(tmp_path / 'a.npy')
+    np.save(path, np.zeros(3))
+    cache.put(path, 'data', 'item', {'v': 1})
+    stat = os.stat(path)
+    replacement = str(tmp_path / 'b.npy')
+    np.save(replacement, np.ones(3))
+    os.utime(replacement, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(replacement, path)
+    assert cache.get(path, 'data', 'item') is None
+
+
+def test_lru_eviction(th, tmp_path):
+    path = str(tmp_path / 'a.npy')
+    np.save(path, np.zeros(3))
+    cache = th.StatsCache(str(tmp_path / 'cache'), max_bytes=2048)
+    rng = np.random.default_rng(0)
+    for i in range(20):
+        # 每条几百字节且难以压缩
+        cache.put(path, f'k{i}', 'item', rng.integers(0, 1 << 30, size=60).tolist())
+        cache.get(path, 'k0', 'item')  # k0 始终是最近访问的
+    total = cache.conn.execute('SELECT SUM(nbytes) FROM entries').fetchone()[0]
+    assert total <= 2048
+    assert cache.get(path, 'k0', 'item') is not None
+    assert cache.get(path, 'k1', 'item') is None
+    assert cache.get(path, 'k19', 'item') is not None
+    cache.conn.close()
+
+
+def test_disabled_without_directory(th, tmp_path):
+    cache = th.StatsCache(None)
+    path = str(tmp_path / 'a.npy')
+    np.save(path, np.zeros(3))
+    cache.put(path, 'data', 'item', {'v': 1})
+    assert not cache.enabled and cache.get(path, 'data', 'item') is None
+
+
+def test_load_reuses_cached_items(th, tmp_path, monkeypatch):
+    path = str(tmp_path / 'data.npz')
+    np.savez(path, a=np.arange(10.0), b=np.ones((2, 2)))
+    first = th.load_tensor_file(path)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('统计应来自缓存')
+
+    monkeypatch.setattr(th, 'compute_stats', fail)
+    second = th.load_tensor_file(path)
+    assert [t['info'] for t in second['tensors']] == [t['info'] for t in first['tensors']]
@@ -0,0 +1,73 @@
+"""请求的分阶段遥测"""
+import json
+import threading
+import time
+
+import numpy as np
+
+
+def run_with_telemetry(th, fn, *args):
+    telemetry = th.Telemetry()
+    th._request_local.telemetry = telemetry
+    try:
+        result = fn(*args)
+    finally:
+        th._request_local.telemetry = None
+    return result, telemetry.finish()
+
+
+def test_phases_are_exclusive(th):
+    def work():
+        with th.telemetry_phase('open'):
+            time.sleep(0.02)
+            with th.telemetry_phase('read'):
+                time.sleep(0.03)
+        time.sleep(0.01)
+
+    _, report = run_with_telemetry(th, work)
+    phases = report['phases']
+    assert list(phases) == ['open', 'read', 'compute']
+    # 子阶段的时间不计入父阶段
+    assert 15 <= phases['open']['ms'] < phases['read']['ms']
+    assert phases['read']['ms'] >= 25
+    assert report['totalMs'] >= sum(phase['ms'] for phase in phases.values()) - 1
+
+
+def test_worker_threads_are_timed(th):
+    def work():
+        def read():
+            with th.telemetry_phase('read'):
+                time.sleep(0.02)
+        threads = [threading.Thread(target=th.bind_request(read)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    _, report = run_with_telemetry(th, work)
+    # 并行阶段的时间按线程累加，可以超过总耗时
+    assert report['phases']['read']['ms'] >= 55
+
+
+def test_bytes_and_memory(th, tmp_path):
+    path = str(tmp_path / 'data.npz')
+    np.savez_compressed(path, a=np.random.default_rng(0).normal(size=200_000))
+    _, report = run_with_telemetry(th, th.load_tensor_file, path)
+    assert {'open', 'read'} <= set(report['phases'])
+    if 'bytesRead' in report:
+        assert report['bytesRead'] > 0
+        assert report['bytesRead'] == sum(phase['bytesRead'] for phase in report['phases'].values())
+    if 'peakRssBytes' in report:
+        assert report['peakRssScope'] in ('request', 'process')
+
+
+def test_finish_is_idempotent(th):
+    telemetry = th.Telemetry()
+    assert telemetry.finish() is telemetry.finish()
+
+
+def test_encoded_response_carries_telemetry(th):
+    (line, _), report = run_with_telemetry(th, th.encode_response, 1, {'ok': True})
+    message = json.loads(line)
+    assert message['result'] == {'ok': True}
+    assert message['telemetry'] == report and 'serialize' in report['phases']
@@ -0,0 +1,56 @@
+"""zip 格式 PyTorch 检查点的惰性打开（不导入 torch 读取，torch 只用于生成测试文件）"""
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+
+
+def save_many(path, count):
+    state = {f'layer{i}.weight': torch.arange(i, i + 6, dtype=torch.float32).reshape(2, 3) for i in range(count)}
+    torch.save(state, path)
+    return state
+
+
+def test_tensors_match_torch(th, tmp_path):
+    base = torch.arange(24, dtype=torch.float64).reshape(4, 6)
+    state = {
+        'plain': base,
+        'transposed': base.t(),
+        'offset': base[1:, 2:],
+        'half': torch.linspace(-1, 1, 7, dtype=torch.float16),
+        'nested': {'list': [torch.ones(2, dtype=torch.int64)]},
+    }
+    path = str(tmp_path / 'model.pt')
+    torch.save(state, path)
+    arrays = th.open_tensor_arrays(path)
+    assert set(arrays) == {'plain', 'transposed', 'offset', 'half', 'nested.list.0'}
+    np.testing.assert_array_equal(arrays['plain'], base.numpy())
+    np.testing.assert_array_equal(arrays['transposed'], base.t().numpy())
+    np.testing.assert_array_equal(arrays['offset'], base[1:, 2:].numpy())
+    np.testing.assert_array_equal(arrays['half'], state['half'].numpy())
+    np.testing.assert_array_equal(arrays['nested.list.0'], np.ones(2, dtype=np.int64))
+
+
+def test_bfloat16_is_upcast(th, tmp_path):
+    value = torch.tensor([1.5, -2.0, 3.25], dtype=torch.bfloat16)
+    path = str(tmp_path / 'bf16.pt')
+    torch.save({'w': value}, path)
+    arr = th.open_tensor_arrays(path)['w']
+    assert arr.dtype == np.float32
+    np.testing.assert_array_equal(arr, value.float().numpy())
+
+
+def test_many_tensors_under_low_fd_limit(th, tmp_path, low_fd_limit):
+    path = str(tmp_path / 'many.pt')
+    state = save_many(path, 400)
+
+    data = th.load_tensor_file(path)
+    assert len(data['tensors']) == 400
+
+    results = th.search_tensor(path, '>=399', regex=False, case_sensitive=False)
+    assert {item['key'] for item in results} == {'layer394.weight', 'layer395.weight', 'layer396.weight',
+                                                 'layer397.weight', 'layer398.weight', 'layer399.weight'}
+
+    diff = th.diff_files(path, path)
+    assert diff['summary']['identical'] == len(state)
+    assert diff['summary']['error'] == 0
@@ -0,0 +1,47 @@
+"""表格窗口读取"""
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def npz_file(tmp_path):
+    path = str(tmp_path / 'data.npz')
+    np.savez(path, matrix=np.arange(50 * 40, dtype=np.float32).reshape(50, 40),
+             cube=np.arange(2 * 3 * 4 * 5).reshape(2, 3, 4, 5), vector=np.arange(7), scalar=np.array(3.5))
+    return path
+
+
+def test_window_of_matrix(th, npz_file):
+    window = th.get_window(npz_file, 'matrix', 10, 5, 30, 20)
+    assert (window['rows'], window['cols'], window['rowStart'], window['colStart']) == (50, 40, 10, 30)
+    full = np.arange(50 * 40, dtype=np.float32).reshape(50, 40)
+    np.testing.assert_array_equal(window['data'].array, full[10:15, 30:40])
+
+
+def test_window_is_clamped(th, npz_file):
+    window = th.get_window(npz_file, 'matrix', 100, 5, -3, 100000)
+    assert window['rowStart'] == 50 and window['colStart'] == 0
+    assert window['data'].array.shape == (0, 40)
+    window = th.get_window(npz_file, 'matrix', 0, 100000, 0, 1)
+    assert window['data'].array.shape == (50, 1)
+
+
+def test_higher_dimensions(th, npz_file):
+    cube = np.arange(2 * 3 * 4 * 5).reshape(2, 3, 4, 5)
+    merged = th.get_window(npz_file, 'cube', 0, 100, 0, 100)
+    assert (merged['rows'], merged['cols']) == (24, 5)
+    np.testing.assert_array_equal(merged['data'].array, cube.reshape(-1, 5))
+
+    plane = th.get_window(npz_file, 'cube', 1, 2, 2, 3, index=[1, 2])
+    np.testing.assert_array_equal(plane['data'].array, cube[1, 2, 1:3, 2:5])
+
+    with pytest.raises(ValueError):
+        th.get_window(npz_file, 'cube', 0, 1, 0, 1, index=[0])
+
+
+def test_low_dimensions(th, npz_file):
+    vector = th.get_window(npz_file, 'vector', 2, 3, 0, 10)
+    assert (vector['rows'], vector['cols']) == (7, 1)
+    np.testing.assert_array_equal(vector['data'].array.ravel(), [2, 3, 4])
+    scalar = th.get_window(npz_file, 'scalar', 0, 10, 0, 10)
+    assert scalar['data'].array.tolist() == [[3.5]]
@@ -0,0 +1,157 @@
+"""常驻工作进程的 JSON 行协议"""
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import SCRIPTS_DIR
+
+SCRIPT = os.path.join(SCRIPTS_DIR, 'tensor_handler.py')
+
+
+class Worker:
+    """以 --server 模式启动的 tensor_handler.py，按协议读写"""
+
+    def __init__(self, *args):
+        self.proc = subprocess.Popen(
+            [sys.executable, SCRIPT, '--server', *args],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+
+    def send(self, message):
+        line = message if isinstance(message, str) else json.dumps(message)
+        self.proc.stdin.write(line.encode('utf-8') + b'\n')
+        self.proc.stdin.flush()
+
+    def receive(self):
+        """读取一条响应及其后的二进制载荷"""
+        line = self.proc.stdout.readline()
+        assert line, self.proc.stderr.read().decode('utf-8', 'replace')
+        message = json.loads(line)
+        payload = self.proc.stdout.read(message.get('binaryLength') or 0)
+        return message, payload
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.send({'id': None, 'command': 'shutdown'})
+        return self.proc.wait(timeout=30)
+
+    def kill(self):
+        """测试失败时结束进程并关闭管道"""
+        if self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+        for stream in (self.proc.stdin, self.proc.stdout, self.proc.stderr):
+            stream.close()
+
+
+@pytest.fixture
+def worker():
+    w = Worker()
+    yield w
+    w.kill()
+
+
+def test_ready_ping_and_shutdown(worker):
+    ready, _ = worker.receive()
+    assert ready['id'] is None and ready['ready']
+
+    worker.send({'id': 1, 'command': 'ping', 'args': {}})
+    response, _ = worker.receive()
+    assert response['id'] == 1
+    assert response['result'] == {'pong': True, 'pid': ready['pid']}
+    assert 'telemetry' in response
+    assert worker.close() == 0
+
+
+def test_errors_do_not_stop_the_worker(worker, tmp_path):
+    worker.receive()
+    worker.send('{not json')
+    message, _ = worker.receive()
+    assert message['id'] is None and '请求解析失败' in message['error']
+
+    worker.send({'id': 2, 'command': 'nope', 'args': {}})
+    message, _ = worker.receive()
+    assert message['result'] == {'error': '未知命令: nope'}
+
+    worker.send({'id': 3, 'command': 'info', 'args': {'file': str(tmp_path / 'missing.npy')}})
+    message, _ = worker.receive()
+    assert message['id'] == 3 and 'error' in message
+
+    worker.send({'id': 4, 'command': 'ping', 'args': {}})
+    message, _ = worker.receive()
+    assert message['id'] == 4 and message['result']['pong']
+    assert worker.close() == 0
+
+
+def test_concurrent_requests_are_matched_by_id(worker, tmp_path):
+    worker.receive()
+    path = str(tmp_path / 'data.npz')
+    np.savez(path, a=np.zeros((3, 4), dtype=np.float32), b=np.arange(5))
+    for request_id in range(10, 20):
+        worker.send({'id': request_id, 'command': 'info', 'args': {'file': path}})
+    responses = {}
+    for _ in range(10):
+        message, _ = worker.receive()
+        responses[message['id']] = message['result']
+    assert sorted(responses) == list(range(10, 20))
+    for result in responses.values():
+        assert {item['key']: item['shape'] for item in result} == {'a': [3, 4], 'b': [5]}
+    assert worker.close() == 0
+
+
+def test_single_shot_mode(tmp_path):
+    path = str(tmp_path / 'data.npy')
+    np.save(path, np.arange(6, dtype=np.int16).reshape(2, 3))
+    output = subprocess.run(
+        [sys.executable, SCRIPT, 'info', json.dumps({'file': path})],
+        capture_output=True, check=True
+    ).stdout
+    (item,) = json.loads(output)
+    assert item['shape'] == [2, 3] and item['dtype'] == 'int16'
+
+
+def test_cancel_queued_request(tmp_path):
+    path = str(tmp_path / 'big.npy')
+    np.save(path, np.zeros(8 * 1024 * 1024))
+    search = {'file': path, 'query': '>1', 'countAll': True}
+    # 单线程：第二个请求排在第一个之后，取消在它开始扫描前到达
+    worker = Worker('1')
+    try:
+        worker.receive()
+        worker.send({'id': 1, 'command': 'search', 'args': search})
+        worker.send({'id': 2, 'command': 'search', 'args': search})
+        worker.send({'id': None, 'command': 'cancel', 'args': {'id': 2}})
+        responses = {}
+        for _ in range(2):
+            message, _ = worker.receive()
+            responses[message['id']] = message
+        assert responses[1]['result'] == [] and not responses[1].get('cancelled')
+        assert responses[2]['cancelled'] and responses[2]['error'] == '请求已取消'
+        assert worker.close() == 0
+    finally:
+        worker.kill()
+
+
+def test_cancel_queued_non_polling_request(tmp_path):
+    path = str(tmp_path / 'big.npy')
+    np.save(path, np.zeros(8 * 1024 * 1024))
+    # describe 执行中不检查取消，排队时被取消的请求不应再执行
+    worker = Worker('1')
+    try:
+        worker.receive()
+        worker.send({'id': 1, 'command': 'search', 'args': {'file': path, 'query': '>1', 'countAll': True}})
+        worker.send({'id': 2, 'command': 'describe', 'args': {'file': path, 'key': 'data'}})
+        worker.send({'id': None, 'command': 'cancel', 'args': {'id': 2}})
+        responses = {}
+        for _ in range(2):
+            message, _ = worker.receive()
+            responses[message['id']] = message
+        assert responses[1]['result'] == []
+        assert responses[2]['cancelled'] and 'result' not in responses[2]
+        assert worker.close() == 0
+    finally:
+        worker.kill()